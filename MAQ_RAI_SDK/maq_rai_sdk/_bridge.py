@@ -0,0 +1,95 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""The async client on a private event loop, for synchronous callers."""
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+
+
+class _LoopThread:
+    """Runs an async client on an event loop in a daemon thread, started on first use.
+
+    :param dict options: Keyword arguments of the :class:`~maq_rai_sdk.aio.MAQRAISDK`.
+    """
+
+    def __init__(self, options: dict[str, Any]) -> None:
+        self._options = options
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._client: Any = None
+        self._lock = threading.Lock()
+
+    def run(self, work: Callable[[Any], Awaitable[T]]) -> T:
+        """Run ``work(client)`` on the loop and wait for its result.
+
+        :param work: Returns the awaitable to run, given the async client.
+        :type work: Callable
+        :return: The result of the awaitable.
+        :rtype: any
+        """
+        with self._lock:
+            if self._loop is None:
+                self._start()
+            future = asyncio.run_coroutine_threadsafe(work(self._client), self._loop)  # type: ignore[arg-type]
+        try:
+            return future.result()
+        except BaseException:
+            future.cancel()  # for example on KeyboardInterrupt, so the calls do not run on
+            raise
+
+    def _start(self) -> None:
+        from .aio import MAQRAISDK  # pylint: disable=import-outside-toplevel
+
+        async def open_client() -> Any:
+            client = MAQRAISDK(**self._options)
+            await client.__aenter__()
+            return client
+
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, name="maq-rai-loop", daemon=True)
+        thread.start()
+        try:
+            self._client = asyncio.run_coroutine_threadsafe(open_client(), loop).result()
+        except BaseException:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+            raise
+        self._loop, self._thread = loop, thread
+
+    def close(self) -> None:
+        """Close the client and stop the loop."""
+        with self._lock:
+            if self._loop is None or self._thread is None:
+                return
+            asyncio.run_coroutine_threadsafe(self._client.close(), self._loop).result()
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop.close()
+            self._loop = self._thread = self._client = None
+
+
+async def _map(
+    call: Callable[..., Awaitable[Any]],
+    bodies: Sequence[Any],
+    max_concurrency: int,
+    return_exceptions: bool,
+    kwargs: dict[str, Any],
+) -> list[Any]:
+    slots = asyncio.Semaphore(max_concurrency)
+
+    async def one(body: Any) -> Any:
+        async with slots:
+            return await call(body, **kwargs)
+
+    tasks = [asyncio.ensure_future(one(body)) for body in bodies]
+    try:
+        return await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+    finally:
+        for task in tasks:
+            task.cancel()  # the calls still running after the first failure
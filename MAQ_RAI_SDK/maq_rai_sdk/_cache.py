@@ -0,0 +1,223 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""Client-side response cache following ``ETag`` and ``Cache-Control``."""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Mapping, MutableMapping, NamedTuple, Optional
+
+from azure.core.utils import case_insensitive_dict
+
+
+def _parse_cache_control(value: Optional[str]) -> dict[str, Optional[str]]:
+    directives: dict[str, Optional[str]] = {}
+    for part in (value or "").split(","):
+        name, sep, arg = part.strip().partition("=")
+        if name:
+            directives[name.strip().lower()] = arg.strip().strip('"') if sep else None
+    return directives
+
+
+def _seconds(value: Optional[str]) -> Optional[int]:
+    try:
+        return max(int(value), 0) if value is not None else None
+    except ValueError:
+        return None
+
+
+class CacheEntry(NamedTuple):
+    """A stored response.
+
+    :ivar int status_code: The status code of the stored response.
+    :ivar str reason: The reason phrase of the stored response.
+    :ivar headers: The stored response headers, without content coding headers.
+    :vartype headers: MutableMapping[str, str]
+    :ivar bytes content: The decoded response body.
+    :ivar etag: The ``ETag`` validator, or None.
+    :vartype etag: str or None
+    :ivar float expires: ``time.monotonic()`` value after which the entry must be revalidated.
+    """
+
+    status_code: int
+    reason: str
+    headers: MutableMapping[str, str]
+    content: bytes
+    etag: Optional[str]
+    expires: float
+
+    @property
+    def fresh(self) -> bool:
+        """Whether the entry can be served without contacting the service.
+
+        :return: True while ``max-age`` has not elapsed.
+        :rtype: bool
+        """
+        return time.monotonic() < self.expires
+
+
+def _freshness(headers: Mapping[str, str]) -> Optional[float]:
+    """Return how many seconds a response stays fresh, or None if it must not be stored.
+
+    :param headers: The response headers.
+    :type headers: Mapping[str, str]
+    :return: The freshness lifetime in seconds, or None.
+    :rtype: float or None
+    """
+    directives = _parse_cache_control(headers.get("Cache-Control"))
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0.0
+    max_age = _seconds(directives.get("max-age"))
+    if max_age is None:
+        return 0.0
+    return float(max(max_age - (_seconds(headers.get("Age")) or 0), 0))
+
+
+class ResponseCache:
+    """Thread-safe LRU store of responses keyed by method, URL, media types and request body.
+
+    A response is stored when it carries an ``ETag`` or a positive ``max-age`` and no
+    ``no-store``. While ``max-age`` has not elapsed it is served without a request; afterwards
+    it is revalidated with ``If-None-Match`` and a ``304 Not Modified`` serves the stored body.
+    One instance can be shared by several clients.
+
+    :keyword max_entries: Maximum number of stored responses. Default value is 1024.
+    :paramtype max_entries: int
+    :keyword max_body_size: Largest body in bytes that is stored. Default value is 1048576.
+    :paramtype max_body_size: int
+    """
+
+    def __init__(self, *, max_entries: int = 1024, max_body_size: int = 1024 * 1024) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.max_body_size = max_body_size
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(method: str, url: str, headers: Mapping[str, str], body: Optional[bytes]) -> str:
+        """Build the cache key of a request.
+
+        :param str method: The HTTP method.
+        :param str url: The full request URL.
+        :param headers: The request headers; ``Accept`` and ``Content-Type`` are part of the key.
+        :type headers: Mapping[str, str]
+        :param body: The request body. Default value is None.
+        :type body: bytes or None
+        :return: The key.
+        :rtype: str
+        """
+        digest = hashlib.sha256()
+        for part in (method.upper(), url, headers.get("Accept", ""), headers.get("Content-Type", "")):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        digest.update(body or b"")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """Return the entry stored under ``key``, or None.
+
+        :param str key: The cache key.
+        :return: The entry or None.
+        :rtype: ~maq_rai_sdk.CacheEntry or None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def store(
+        self, key: str, status_code: int, reason: str, headers: Mapping[str, str], content: bytes
+    ) -> Optional[CacheEntry]:
+        """Store a response if its headers allow it.
+
+        :param str key: The cache key.
+        :param int status_code: The response status code.
+        :param str reason: The response reason phrase.
+        :param headers: The response headers.
+        :type headers: Mapping[str, str]
+        :param bytes content: The decoded response body.
+        :return: The stored entry, or None if the response is not cacheable.
+        :rtype: ~maq_rai_sdk.CacheEntry or None
+        """
+        lifetime = _freshness(headers)
+        etag = headers.get("ETag")
+        if (
+            lifetime is None
+            or (not etag and not lifetime)
+            or len(content) > self.max_body_size
+            or headers.get("Vary", "").strip() == "*"
+        ):
+            self.discard(key)
+            return None
+        stored_headers = case_insensitive_dict(
+            (name, value)
+            for name, value in headers.items()
+            if name.lower() not in ("content-encoding", "content-length", "transfer-encoding")
+        )
+        entry = CacheEntry(status_code, reason, stored_headers, content, etag, time.monotonic() + lifetime)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def refresh(self, key: str, entry: CacheEntry, headers: Mapping[str, str]) -> CacheEntry:
+        """Renew ``entry`` after a ``304 Not Modified`` carrying ``headers``.
+
+        :param str key: The cache key.
+        :param entry: The revalidated entry.
+        :type entry: ~maq_rai_sdk.CacheEntry
+        :param headers: The 304 response headers.
+        :type headers: Mapping[str, str]
+        :return: The renewed entry.
+        :rtype: ~maq_rai_sdk.CacheEntry
+        """
+        merged = case_insensitive_dict(entry.headers)
+        merged.pop("Age", None)
+        for name in ("Cache-Control", "ETag", "Date", "Expires", "Age"):
+            if name in headers:
+                merged[name] = headers[name]
+        lifetime = _freshness(merged) or 0.0
+        renewed = entry._replace(
+            headers=merged, etag=merged.get("ETag", entry.etag), expires=time.monotonic() + lifetime
+        )
+        with self._lock:
+            self._entries[key] = renewed
+        return renewed
+
+    def _record(self, counter: str) -> None:
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def discard(self, key: str) -> None:
+        """Remove the entry stored under ``key``, if any.
+
+        :param str key: The cache key.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return "<ResponseCache entries={} hits={} revalidations={} misses={}>".format(
+            len(self), self.hits, self.revalidations, self.misses
+        )
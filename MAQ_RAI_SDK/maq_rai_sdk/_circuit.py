@@ -0,0 +1,261 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""Per-endpoint circuit breakers."""
+import threading
+import time
+from collections import deque
+from typing import Any, Optional
+from urllib.parse import urlsplit
+
+from azure.core.exceptions import ServiceRequestError
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(ServiceRequestError):
+    """Raised instead of sending a request while the circuit of its endpoint is open.
+
+    It is a :class:`~azure.core.exceptions.ServiceRequestError`, the request never left the
+    client, so :class:`~maq_rai_sdk.MultiEndpointClient` fails over to another endpoint.
+
+    :ivar str endpoint: The endpoint, as ``scheme://host:port``.
+    :ivar float retry_after: Seconds until the circuit lets a trial call through.
+    """
+
+    def __init__(self, endpoint: str, retry_after: float, **kwargs: Any) -> None:
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+        super().__init__("Circuit for {} is open, retry in {:.1f}s.".format(endpoint, retry_after), **kwargs)
+
+
+class CircuitBreaker:
+    """Circuit of one endpoint: closed, open or half-open.
+
+    While closed, the outcomes of the last ``window`` calls are kept. Once at least ``min_calls``
+    were seen, the circuit opens when the share of failed calls reaches ``failure_rate`` or the
+    share of calls slower than ``latency_threshold`` reaches ``slow_call_rate``. An open circuit
+    rejects every call for ``open_time`` seconds, then turns half-open and lets
+    ``half_open_calls`` trial calls through: if all of them succeed in time it closes again,
+    otherwise it reopens.
+
+    :keyword failure_rate: Share of failed calls that opens the circuit. Default value is 0.5.
+    :paramtype failure_rate: float
+    :keyword latency_threshold: Seconds above which a call counts as slow. Default value is None,
+     latency is ignored.
+    :paramtype latency_threshold: float
+    :keyword slow_call_rate: Share of slow calls that opens the circuit. Default value is 0.5.
+    :paramtype slow_call_rate: float
+    :keyword window: Number of recent calls the rates are computed over. Default value is 20.
+    :paramtype window: int
+    :keyword min_calls: Calls to observe before the circuit can open. Default value is 10.
+    :paramtype min_calls: int
+    :keyword open_time: Seconds the circuit stays open. Default value is 30.
+    :paramtype open_time: float
+    :keyword half_open_calls: Trial calls let through while half-open. Default value is 3.
+    :paramtype half_open_calls: int
+    :ivar int trips: Times the circuit opened.
+    :ivar int rejected: Calls rejected while the circuit was open.
+    """
+
+    def __init__(
+        self,
+        *,
+        failure_rate: float = 0.5,
+        latency_threshold: Optional[float] = None,
+        slow_call_rate: float = 0.5,
+        window: int = 20,
+        min_calls: int = 10,
+        open_time: float = 30.0,
+        half_open_calls: int = 3,
+    ) -> None:
+        if not 0 < failure_rate <= 1 or not 0 < slow_call_rate <= 1:
+            raise ValueError("failure_rate and slow_call_rate must be between 0 and 1")
+        if half_open_calls < 1:
+            raise ValueError("half_open_calls must be at least 1")
+        self.failure_rate = failure_rate
+        self.latency_threshold = latency_threshold
+        self.slow_call_rate = slow_call_rate
+        self.min_calls = min(min_calls, window)
+        self.open_time = open_time
+        self.half_open_calls = half_open_calls
+        self.trips = 0
+        self.rejected = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._outcomes: "deque[tuple[bool, bool]]" = deque(maxlen=window)
+        self._trials = 0
+        self._trial_successes = 0
+        self._lock = threading.Lock()
+
+    def _current_state(self) -> str:
+        if self._state == OPEN and time.monotonic() >= self._opened_at + self.open_time:
+            self._state = HALF_OPEN
+            self._trials = 0
+            self._trial_successes = 0
+        return self._state
+
+    @property
+    def state(self) -> str:
+        """The state of the circuit: "closed", "open" or "half_open".
+
+        :return: The state.
+        :rtype: str
+        """
+        with self._lock:
+            return self._current_state()
+
+    @property
+    def retry_after(self) -> float:
+        """Seconds until an open circuit turns half-open, 0 otherwise.
+
+        :return: The remaining open time.
+        :rtype: float
+        """
+        with self._lock:
+            if self._current_state() != OPEN:
+                return 0.0
+            return max(self._opened_at + self.open_time - time.monotonic(), 0.0)
+
+    def allow(self) -> bool:
+        """Whether a call may be sent now. A True answer must be followed by :meth:`record`.
+
+        :return: True if the call may go ahead.
+        :rtype: bool
+        """
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._trials < self.half_open_calls:
+                self._trials += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, latency: float, ok: bool) -> None:
+        """Record the outcome of a call let through by :meth:`allow`.
+
+        :param float latency: The call latency in seconds.
+        :param bool ok: False if the call failed.
+        """
+        slow = self.latency_threshold is not None and latency > self.latency_threshold
+        with self._lock:
+            state = self._current_state()
+            if state == HALF_OPEN:
+                if not ok or slow:
+                    self._trip()
+                    return
+                self._trial_successes += 1
+                if self._trial_successes >= self.half_open_calls:
+                    self._state = CLOSED
+                    self._outcomes.clear()
+                return
+            if state == OPEN:
+                return  # started before the circuit opened
+            self._outcomes.append((ok, slow))
+            if len(self._outcomes) < self.min_calls:
+                return
+            failed = sum(1 for succeeded, _ in self._outcomes if not succeeded)
+            slowed = sum(1 for _, was_slow in self._outcomes if was_slow)
+            if failed >= self.failure_rate * len(self._outcomes) or slowed >= self.slow_call_rate * len(self._outcomes):
+                self._trip()
+
+    def _release(self) -> None:
+        # A trial call ended without an outcome, for example because it was cancelled.
+        with self._lock:
+            if self._state == HALF_OPEN and self._trials > 0:
+                self._trials -= 1
+
+    def _trip(self) -> None:
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.trips += 1
+
+    def reset(self) -> None:
+        """Close the circuit and forget the recorded calls."""
+        with self._lock:
+            self._state = CLOSED
+            self._outcomes.clear()
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the circuit state as a plain dict.
+
+        :return: state, calls, failure_rate and slow_call_rate over the window, trips, rejected
+         and retry_after.
+        :rtype: dict
+        """
+        retry_after = self.retry_after
+        with self._lock:
+            calls = len(self._outcomes)
+            return {
+                "state": self._current_state(),
+                "calls": calls,
+                "failure_rate": sum(1 for ok, _ in self._outcomes if not ok) / calls if calls else 0.0,
+                "slow_call_rate": sum(1 for _, slow in self._outcomes if slow) / calls if calls else 0.0,
+                "trips": self.trips,
+                "rejected": self.rejected,
+                "retry_after": retry_after,
+            }
+
+    def __repr__(self) -> str:
+        return "<CircuitBreaker state={} trips={} rejected={}>".format(self.state, self.trips, self.rejected)
+
+
+def _endpoint_of(url: str) -> str:
+    parts = urlsplit(url)
+    return "{}://{}".format(parts.scheme, parts.netloc.rpartition("@")[2]).lower()
+
+
+class CircuitBreakers:
+    """Thread-safe set of :class:`~maq_rai_sdk.CircuitBreaker`, one per endpoint.
+
+    Endpoints are told apart by scheme, host and port. One instance can be shared by several
+    clients, and by the sync and async pipelines, so they all see the same circuits.
+
+    Keyword arguments are the thresholds of every circuit, see :class:`~maq_rai_sdk.CircuitBreaker`.
+    """
+
+    def __init__(self, **settings: Any) -> None:
+        CircuitBreaker(**settings)  # validates the settings up front
+        self.settings = settings
+        self._breakers: dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str) -> CircuitBreaker:
+        """Return the circuit of the endpoint of ``url``, creating it closed.
+
+        :param str url: Any URL on the endpoint.
+        :return: The circuit.
+        :rtype: ~maq_rai_sdk.CircuitBreaker
+        """
+        endpoint = _endpoint_of(url)
+        with self._lock:
+            breaker = self._breakers.get(endpoint)
+            if breaker is None:
+                breaker = self._breakers[endpoint] = CircuitBreaker(**self.settings)
+            return breaker
+
+    def snapshot(self) -> dict[str, dict[str, Any]]:
+        """Return the state of every circuit.
+
+        :return: One :meth:`CircuitBreaker.snapshot` per endpoint, keyed ``scheme://host:port``.
+        :rtype: dict[str, dict]
+        """
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {endpoint: breaker.snapshot() for endpoint, breaker in breakers.items()}
+
+    def __len__(self) -> int:
+        return len(self._breakers)
+
+    def __repr__(self) -> str:
+        states = self.snapshot()
+        return "<CircuitBreakers endpoints={} open={}>".format(
+            len(states), sum(1 for state in states.values() if state["state"] != CLOSED)
+        )
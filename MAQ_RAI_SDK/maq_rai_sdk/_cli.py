@@ -0,0 +1,158 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""The ``maq-rai`` command line."""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from typing import Any, Optional, Sequence
+
+from azure.core.exceptions import AzureError
+
+from ._patch import _DEFAULT_ENDPOINT, _with_function_key
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="maq-rai", description="Command line tools for the MAQ RAI service.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    batch = commands.add_parser(
+        "batch",
+        help="run a JSONL file of request bodies",
+        description=(
+            "Send every line of a JSONL file to the service and write the results to a JSONL file, "
+            "in input order. Progress is journaled: run the same command again to resume an "
+            "interrupted run."
+        ),
+    )
+    batch.add_argument("input", help="JSONL file with one request body per line, or - for stdin")
+    batch.add_argument("-o", "--output", required=True, help="JSONL file receiving one result per line")
+    batch.add_argument(
+        "--operation",
+        choices=("reviewer", "testcase"),
+        default="reviewer",
+        help="reviewer.post or testcase.generator_post (default: %(default)s)",
+    )
+    batch.add_argument("--endpoint", default=_DEFAULT_ENDPOINT, help="service URL (default: %(default)s)")
+    batch.add_argument(
+        "--key",
+        default=os.environ.get("MAQ_RAI_FUNCTION_KEY"),
+        help="Function App host key (default: the MAQ_RAI_FUNCTION_KEY environment variable)",
+    )
+    batch.add_argument("-c", "--concurrency", type=int, default=8, help="calls running at once (default: %(default)s)")
+    batch.add_argument("--timeout", type=float, help="seconds each call may take")
+    batch.add_argument("--journal", help="checkpoint journal (default: OUTPUT.journal)")
+    batch.add_argument("--restart", action="store_true", help="ignore the journal and start over")
+
+    submit = commands.add_parser(
+        "submit",
+        help="publish a JSONL file as work units for workers on any host",
+        description="Publish the lines of a JSONL file as work units in a shared database and print the run id.",
+    )
+    submit.add_argument("input", help="JSONL file with one request body per line, or - for stdin")
+    submit.add_argument("--db", required=True, help="SQLite database shared with the workers")
+    submit.add_argument(
+        "--operation", choices=("reviewer", "testcase"), default="reviewer", help="(default: %(default)s)"
+    )
+    submit.add_argument("--unit-size", type=int, default=64, help="lines per work unit (default: %(default)s)")
+    submit.add_argument("--rate-limit", type=float, help="calls per second over every worker")
+    submit.add_argument("--timeout", type=float, help="seconds each call may take")
+
+    work = commands.add_parser(
+        "work",
+        help="run work units published with submit",
+        description="Lease work units from the shared database, run them and commit their results.",
+    )
+    work.add_argument("--db", required=True, help="SQLite database shared with the coordinator")
+    work.add_argument("--endpoint", default=_DEFAULT_ENDPOINT, help="service URL (default: %(default)s)")
+    work.add_argument(
+        "--key",
+        default=os.environ.get("MAQ_RAI_FUNCTION_KEY"),
+        help="Function App host key (default: the MAQ_RAI_FUNCTION_KEY environment variable)",
+    )
+    work.add_argument("-c", "--concurrency", type=int, default=8, help="calls running at once (default: %(default)s)")
+    work.add_argument("--until-idle", action="store_true", help="exit once no work unit is left")
+
+    collect = commands.add_parser(
+        "collect",
+        help="wait for a run and write its results",
+        description="Wait until every work unit of a run is done and write the results in input order.",
+    )
+    collect.add_argument("run", help="run id printed by submit")
+    collect.add_argument("--db", required=True, help="SQLite database shared with the workers")
+    collect.add_argument("-o", "--output", required=True, help="JSONL file receiving one result per line")
+    collect.add_argument("--timeout", type=float, help="seconds to wait at most")
+    return parser
+
+
+async def _batch(args: argparse.Namespace) -> dict[str, Any]:
+    from .aio import MAQRAISDK, BatchRunner  # pylint: disable=import-outside-toplevel
+
+    async with MAQRAISDK(endpoint=_with_function_key(args.endpoint, args.key), resilient=True) as client:
+        runner = BatchRunner(client, args.operation, max_concurrency=args.concurrency, timeout=args.timeout)
+        source = sys.stdin.buffer if args.input == "-" else args.input
+        return await runner.run(source, args.output, journal=args.journal, restart=args.restart)
+
+
+def _coordinate(args: argparse.Namespace) -> int:
+    from ._coordinator import BatchCoordinator, BatchWorker  # pylint: disable=import-outside-toplevel
+
+    if args.command == "work":
+        worker = BatchWorker(
+            args.db,
+            _with_function_key(args.endpoint, args.key),
+            max_concurrency=args.concurrency,
+            client_options={"resilient": True},
+        )
+        stats = worker.run(until_idle=args.until_idle)
+        print(json.dumps(stats), file=sys.stderr)
+        return 0
+    with BatchCoordinator(args.db) as coordinator:
+        if args.command == "submit":
+            options = {"timeout": args.timeout} if args.timeout is not None else {}
+            source = sys.stdin.buffer if args.input == "-" else args.input
+            print(
+                coordinator.submit(
+                    source, args.operation, unit_size=args.unit_size, rate_limit=args.rate_limit, **options
+                )
+            )
+            return 0
+        progress = coordinator.collect(args.run, args.output, timeout=args.timeout)
+    print(json.dumps(progress), file=sys.stderr)
+    return 0 if progress["failed"] == 0 and progress["dead"] == 0 else 1
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Entry point of the ``maq-rai`` command.
+
+    :param argv: The arguments. Default value is None, ``sys.argv[1:]``.
+    :type argv: list[str]
+    :return: The exit status.
+    :rtype: int
+    """
+    args = _parser().parse_args(argv)
+    if args.command != "batch":
+        try:
+            return _coordinate(args)
+        except KeyboardInterrupt:
+            return 130
+        except (AzureError, OSError, ValueError) as error:
+            print("maq-rai: {}".format(error), file=sys.stderr)
+            return 2
+    try:
+        stats = asyncio.run(_batch(args))
+    except KeyboardInterrupt:
+        print("Interrupted; run the same command again to resume.", file=sys.stderr)
+        return 130
+    except (AzureError, OSError, ValueError) as error:
+        print("maq-rai: {}".format(error), file=sys.stderr)
+        return 2
+    print(json.dumps(stats), file=sys.stderr)
+    return 0 if stats["failed"] == 0 and stats["complete"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
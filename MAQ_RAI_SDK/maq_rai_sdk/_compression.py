@@ -0,0 +1,169 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""Content codings used for request compression and response decompression.
+
+gzip and deflate are always available. br needs ``brotli`` (or ``brotlicffi``) and zstd needs
+``zstandard``; those codings are only offered when the package can be imported.
+"""
+import gzip
+import zlib
+from typing import Any, Optional
+
+
+def _import_brotli() -> Any:
+    try:
+        import brotli  # type: ignore  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        try:
+            import brotlicffi as brotli  # type: ignore  # pylint: disable=import-outside-toplevel
+        except ImportError:
+            return None
+    return brotli
+
+
+def _import_zstandard() -> Any:
+    try:
+        import zstandard  # type: ignore  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        return None
+    return zstandard
+
+
+def available_encodings() -> list[str]:
+    """Return the content codings this installation can both compress and decompress.
+
+    The list is in order of preference and can be passed as ``accept_encodings`` to the client.
+
+    :return: The supported content codings, for example ``["zstd", "br", "gzip", "deflate"]``.
+    :rtype: list[str]
+    """
+    encodings = []
+    if _import_zstandard() is not None:
+        encodings.append("zstd")
+    if _import_brotli() is not None:
+        encodings.append("br")
+    encodings.extend(["gzip", "deflate"])
+    return encodings
+
+
+def check_encoding(encoding: str) -> str:
+    """Normalize ``encoding`` and make sure it can be used.
+
+    :param str encoding: A content coding such as "gzip".
+    :return: The lower-cased coding.
+    :rtype: str
+    :raises ValueError: If the coding is unknown or its package is not installed.
+    """
+    normalized = encoding.strip().lower()
+    if normalized not in available_encodings():
+        raise ValueError(
+            "Content-Encoding '{}' is not available. Supported: {}. "
+            "br needs the 'brotli' package and zstd needs the 'zstandard' package.".format(
+                encoding, ", ".join(available_encodings())
+            )
+        )
+    return normalized
+
+
+def compress(encoding: str, data: bytes, level: Optional[int] = None) -> bytes:
+    """Compress ``data`` with the given content coding.
+
+    :param str encoding: One of the codings returned by :func:`available_encodings`.
+    :param bytes data: The payload.
+    :param level: Codec-specific compression level. Default value is None, the codec default.
+    :type level: int or None
+    :return: The compressed payload.
+    :rtype: bytes
+    """
+    if encoding == "gzip":
+        return gzip.compress(data, compresslevel=9 if level is None else level)
+    if encoding == "deflate":
+        return zlib.compress(data, -1 if level is None else level)
+    if encoding == "br":
+        brotli = _import_brotli()
+        return brotli.compress(data) if level is None else brotli.compress(data, quality=level)
+    if encoding == "zstd":
+        zstandard = _import_zstandard()
+        return zstandard.ZstdCompressor(level=3 if level is None else level).compress(data)
+    raise ValueError("Unsupported Content-Encoding '{}'".format(encoding))
+
+
+class _ZlibDecoder:
+    def __init__(self, wbits: int) -> None:
+        self._wbits = wbits
+        self._obj = zlib.decompressobj(wbits)
+        self._first = True
+
+    def decompress(self, chunk: bytes) -> bytes:
+        if self._first and self._wbits == zlib.MAX_WBITS:
+            self._first = False
+            try:
+                return self._obj.decompress(chunk)
+            except zlib.error:
+                # Some servers send raw deflate without the zlib header.
+                self._obj = zlib.decompressobj(-zlib.MAX_WBITS)
+        return self._obj.decompress(chunk)
+
+    def flush(self) -> bytes:
+        return self._obj.flush()
+
+
+class _BrotliDecoder:
+    def __init__(self, brotli: Any) -> None:
+        self._obj = brotli.Decompressor()
+
+    def decompress(self, chunk: bytes) -> bytes:
+        if hasattr(self._obj, "process"):
+            return self._obj.process(chunk)
+        return self._obj.decompress(chunk)
+
+    def flush(self) -> bytes:
+        return b""
+
+
+class _ZstdDecoder:
+    def __init__(self, zstandard: Any) -> None:
+        self._zstandard = zstandard
+        self._obj = zstandard.ZstdDecompressor().decompressobj()
+
+    def decompress(self, chunk: bytes) -> bytes:
+        out = []
+        while chunk:
+            out.append(self._obj.decompress(chunk))
+            # A body may hold several concatenated frames.
+            chunk = self._obj.unused_data
+            if chunk:
+                self._obj = self._zstandard.ZstdDecompressor().decompressobj()
+        return b"".join(out)
+
+    def flush(self) -> bytes:
+        return b""
+
+
+def get_decoder(encoding: Optional[str]) -> Any:
+    """Return an incremental decoder for ``encoding``, or None if it is not handled.
+
+    The decoder has ``decompress(chunk) -> bytes`` and ``flush() -> bytes`` methods.
+
+    :param encoding: The value of the response Content-Encoding header.
+    :type encoding: str or None
+    :return: An incremental decoder or None.
+    :rtype: any
+    """
+    if not encoding:
+        return None
+    encoding = encoding.strip().lower()
+    if encoding in ("gzip", "x-gzip"):
+        return _ZlibDecoder(16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        return _ZlibDecoder(zlib.MAX_WBITS)
+    if encoding == "br":
+        brotli = _import_brotli()
+        return _BrotliDecoder(brotli) if brotli is not None else None
+    if encoding == "zstd":
+        zstandard = _import_zstandard()
+        return _ZstdDecoder(zstandard) if zstandard is not None else None
+    return None
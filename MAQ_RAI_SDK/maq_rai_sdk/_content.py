@@ -0,0 +1,285 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""Pluggable body codecs and media-type negotiation.
+
+JSON is always available. MessagePack needs ``msgpack`` and CBOR needs ``cbor2``; other
+codecs can be added with :func:`register_codec`.
+"""
+import json
+import re
+import threading
+from json.decoder import JSONDecodeError, scanstring
+from typing import Any, Mapping, Optional, Sequence
+
+
+class ContentCodec:
+    """Encodes and decodes request and response bodies for one media type.
+
+    Subclass it and pass an instance to :func:`register_codec` to support another media type.
+
+    :ivar str media_type: The media type handled, for example "application/msgpack".
+    """
+
+    media_type: str = ""
+
+    def dumps(self, obj: Any) -> bytes:
+        """Encode ``obj`` as bytes.
+
+        :param any obj: The body to encode.
+        :return: The encoded body.
+        :rtype: bytes
+        """
+        raise NotImplementedError()
+
+    def loads(self, data: bytes) -> Any:
+        """Decode ``data``.
+
+        :param bytes data: The encoded body.
+        :return: The decoded body.
+        :rtype: any
+        """
+        raise NotImplementedError()
+
+
+class JsonCodec(ContentCodec):
+    """``application/json`` codec."""
+
+    media_type = "application/json"
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data.decode("utf-8-sig")) if data else None
+
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+
+
+def _loads_in_pieces(data: bytes, encoding: Optional[str] = None, depth: int = 2) -> Any:
+    """Decode a JSON body like ``json.loads``, one element of its outer containers at a time.
+
+    ``json.loads`` keeps the GIL for the whole document, so running it on a worker thread still
+    blocks the event loop thread until it returns. Decoding the members of the outer ``depth``
+    levels of arrays and objects one by one lets the interpreter switch threads between them.
+
+    :param bytes data: The body.
+    :param encoding: The charset of the body. Default value is None, UTF-8.
+    :type encoding: str or None
+    :param int depth: Container levels decoded member by member. Default value is 2.
+    :return: The decoded body, None if it is empty.
+    :rtype: any
+    :raises json.JSONDecodeError: If the body is not valid JSON.
+    """
+    if not data:
+        return None
+    text = data.decode(encoding or "utf-8")
+    if text.startswith("\ufeff"):
+        text = text[1:]
+    try:
+        value, end = _decode_value(text, _WHITESPACE.match(text, 0).end(), depth)
+    except IndexError:
+        raise JSONDecodeError("Unexpected end of data", text, len(text)) from None
+    end = _WHITESPACE.match(text, end).end()
+    if end != len(text):
+        raise JSONDecodeError("Extra data", text, end)
+    return value
+
+
+def _decode_value(text: str, pos: int, depth: int) -> tuple[Any, int]:
+    opener = text[pos : pos + 1]
+    if not depth or opener not in ("[", "{"):
+        return _DECODER.raw_decode(text, pos)
+    closer = "]" if opener == "[" else "}"
+    items: list[Any] = []
+    members: dict[str, Any] = {}
+    pos = _WHITESPACE.match(text, pos + 1).end()
+    if text[pos] == closer:
+        return (items if opener == "[" else members), pos + 1
+    while True:
+        if opener == "[":
+            item, pos = _decode_value(text, pos, depth - 1)
+            items.append(item)
+        else:
+            if text[pos] != '"':
+                raise JSONDecodeError("Expecting property name enclosed in double quotes", text, pos)
+            key, pos = scanstring(text, pos + 1)
+            pos = _WHITESPACE.match(text, pos).end()
+            if text[pos] != ":":
+                raise JSONDecodeError("Expecting ':' delimiter", text, pos)
+            pos = _WHITESPACE.match(text, pos + 1).end()
+            members[key], pos = _decode_value(text, pos, depth - 1)
+        pos = _WHITESPACE.match(text, pos).end()
+        if text[pos] == closer:
+            return (items if opener == "[" else members), pos + 1
+        if text[pos] != ",":
+            raise JSONDecodeError("Expecting ',' delimiter", text, pos)
+        pos = _WHITESPACE.match(text, pos + 1).end()
+
+
+class MsgPackCodec(ContentCodec):
+    """``application/msgpack`` codec. Requires ``msgpack``."""
+
+    media_type = "application/msgpack"
+
+    def __init__(self) -> None:
+        import msgpack  # type: ignore  # pylint: disable=import-outside-toplevel
+
+        self._msgpack = msgpack
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._msgpack.packb(obj, use_bin_type=True)
+
+    def loads(self, data: bytes) -> Any:
+        return self._msgpack.unpackb(data, raw=False) if data else None
+
+
+class CborCodec(ContentCodec):
+    """``application/cbor`` codec. Requires ``cbor2``."""
+
+    media_type = "application/cbor"
+
+    def __init__(self) -> None:
+        import cbor2  # type: ignore  # pylint: disable=import-outside-toplevel
+
+        self._cbor2 = cbor2
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._cbor2.dumps(obj)
+
+    def loads(self, data: bytes) -> Any:
+        return self._cbor2.loads(data) if data else None
+
+
+_CODECS: dict[str, ContentCodec] = {JsonCodec.media_type: JsonCodec()}
+_CODEC_FACTORIES = {
+    MsgPackCodec.media_type: MsgPackCodec,
+    "application/x-msgpack": MsgPackCodec,
+    "application/vnd.msgpack": MsgPackCodec,
+    CborCodec.media_type: CborCodec,
+}
+
+
+def _media_type(content_type: Optional[str]) -> str:
+    return (content_type or "").split(";")[0].strip().lower()
+
+
+def register_codec(codec: ContentCodec, *aliases: str) -> None:
+    """Register ``codec`` for its media type and any ``aliases``.
+
+    :param codec: The codec to register.
+    :type codec: ~maq_rai_sdk.ContentCodec
+    :param str aliases: Other media types the codec handles.
+    """
+    for media_type in (codec.media_type,) + aliases:
+        _CODECS[_media_type(media_type)] = codec
+
+
+def get_codec(content_type: Optional[str]) -> Optional[ContentCodec]:
+    """Return the codec for ``content_type``, or None if none is registered or installed.
+
+    :param content_type: A Content-Type header value; parameters are ignored.
+    :type content_type: str or None
+    :return: The codec or None.
+    :rtype: ~maq_rai_sdk.ContentCodec or None
+    """
+    media_type = _media_type(content_type)
+    codec = _CODECS.get(media_type)
+    if codec is None and media_type in _CODEC_FACTORIES:
+        try:
+            codec = _CODEC_FACTORIES[media_type]()
+        except ImportError:
+            return None
+        _CODECS[media_type] = codec
+    return codec
+
+
+def _parse_media_types(value: Optional[str]) -> list[str]:
+    return [_media_type(part) for part in (value or "").split(",") if _media_type(part)]
+
+
+class ContentNegotiator:
+    """Tracks which body media types the service speaks.
+
+    Responses are negotiated through ``Accept`` from the first call. Request bodies switch
+    from JSON to a preferred binary media type only once the service has advertised it, either
+    in an ``Accept-Post`` or ``Accept`` response header or by answering in that media type.
+    A media type the service rejects with 415 is dropped and JSON is used again.
+
+    :param media_types: Preferred media types, most preferred first. JSON is always the fallback.
+    :type media_types: list[str]
+    :raises ValueError: If a media type has no registered or installed codec.
+    """
+
+    def __init__(self, media_types: Sequence[str]) -> None:
+        preferred = []
+        for media_type in media_types:
+            codec = get_codec(media_type)
+            if codec is None:
+                raise ValueError(
+                    "No codec available for '{}'. application/msgpack needs the 'msgpack' package and "
+                    "application/cbor needs the 'cbor2' package.".format(media_type)
+                )
+            if codec.media_type not in preferred and codec.media_type != JsonCodec.media_type:
+                preferred.append(codec.media_type)
+        self.preferred = preferred
+        self._advertised: set[str] = set()
+        self._rejected: set[str] = set()
+        self._lock = threading.Lock()
+
+    def accept_header(self) -> str:
+        """Build the ``Accept`` header listing the preferred media types, then JSON.
+
+        :return: The header value.
+        :rtype: str
+        """
+        parts = []
+        for index, media_type in enumerate(self.preferred):
+            quality = max(0.9 - 0.1 * index, 0.6)
+            parts.append(media_type if index == 0 else "{};q={:.1f}".format(media_type, quality))
+        parts.append("{};q=0.5".format(JsonCodec.media_type) if parts else JsonCodec.media_type)
+        return ", ".join(parts)
+
+    def observe(self, headers: Mapping[str, str], content_type: Optional[str] = None) -> None:
+        """Record the media types a response advertises.
+
+        :param headers: The response headers.
+        :type headers: Mapping[str, str]
+        :param content_type: The response Content-Type. Default value is None.
+        :type content_type: str or None
+        """
+        advertised = _parse_media_types(headers.get("Accept-Post")) + _parse_media_types(headers.get("Accept"))
+        if content_type:
+            advertised.append(_media_type(content_type))
+        found = set()
+        for media_type in advertised:
+            codec = get_codec(media_type)
+            if codec is not None:
+                found.add(codec.media_type)
+        if found:
+            with self._lock:
+                self._advertised.update(found)
+
+    def reject(self, media_type: str) -> None:
+        """Stop sending ``media_type`` after the service refused it.
+
+        :param str media_type: The refused media type.
+        """
+        with self._lock:
+            self._rejected.add(_media_type(media_type))
+
+    def request_codec(self) -> Optional[ContentCodec]:
+        """Return the codec to encode request bodies with, or None to send JSON.
+
+        :return: The negotiated codec or None.
+        :rtype: ~maq_rai_sdk.ContentCodec or None
+        """
+        with self._lock:
+            for media_type in self.preferred:
+                if media_type in self._advertised and media_type not in self._rejected:
+                    return get_codec(media_type)
+        return None
@@ -0,0 +1,527 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""Batch runs split into work units that workers on any host lease from a shared database."""
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, BinaryIO, Optional, Union
+
+from ._metrics import LatencyHistogram
+from ._ratelimit import SqliteRateLimiter
+from ._sharded import _OPERATIONS, _chunks, _LineRunner
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run TEXT PRIMARY KEY,
+    operation TEXT NOT NULL,
+    options TEXT NOT NULL,
+    rate REAL,
+    burst REAL,
+    max_attempts INTEGER NOT NULL,
+    units INTEGER NOT NULL,
+    lines INTEGER NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS units (
+    run TEXT NOT NULL,
+    unit INTEGER NOT NULL,
+    first INTEGER NOT NULL,
+    lines BLOB NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease TEXT,
+    expires REAL,
+    worker TEXT,
+    result BLOB,
+    succeeded INTEGER,
+    failed INTEGER,
+    PRIMARY KEY (run, unit)
+);
+CREATE INDEX IF NOT EXISTS units_ready ON units (state, expires);
+"""
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    db = sqlite3.connect(path, timeout=60, isolation_level=None, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.executescript(_SCHEMA)
+    return db
+
+
+class BatchCoordinator:
+    """Publishes batch runs as work units in a SQLite database that :class:`~maq_rai_sdk.BatchWorker`
+    processes on any host drain.
+
+    :meth:`submit` cuts a JSONL input into units of ``unit_size`` lines. Workers lease a unit for
+    their ``lease_time`` and renew the lease while they run it; the unit of a worker that died
+    is leased again once its lease expires. A result is only accepted from the worker holding
+    the current lease and only once, so a unit is never counted twice. :meth:`collect` writes
+    the results in input order, in the format of :class:`~maq_rai_sdk.aio.BatchRunner`.
+
+    Put the database on a volume every host can reach. SQLite needs working file locks there,
+    and hosts need synchronized clocks for lease expiry and the rate budget.
+
+    :param str path: Path of the SQLite database, created if needed.
+    :keyword max_attempts: Leases of a unit before it is given up and its lines are reported as
+     failed. Default value is 3.
+    :paramtype max_attempts: int
+    """
+
+    def __init__(self, path: str, *, max_attempts: int = 3) -> None:
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.path = path
+        self.max_attempts = max_attempts
+        self._db = _connect(path)
+        self._lock = threading.Lock()
+
+    def submit(
+        self,
+        source: Union[str, BinaryIO],
+        operation: str = "reviewer",
+        *,
+        unit_size: int = 64,
+        rate_limit: Optional[float] = None,
+        burst: Optional[float] = None,
+        **kwargs: Any
+    ) -> str:
+        """Publish the lines of ``source`` as work units of a new run.
+
+        :param source: Path of the JSONL input, or a binary stream.
+        :type source: str or BinaryIO
+        :param str operation: "reviewer" for ``reviewer.post`` or "testcase" for
+         ``testcase.generator_post``. Default value is "reviewer".
+        :keyword unit_size: Lines per work unit. Default value is 64.
+        :paramtype unit_size: int
+        :keyword rate_limit: Calls per second over every worker of the run. Default value is None, no limit.
+        :paramtype rate_limit: float
+        :keyword burst: Calls that may start at once after an idle period. Default value is None,
+         see :class:`~maq_rai_sdk.RateLimiter`.
+        :paramtype burst: float
+
+        Any other keyword arguments, such as ``timeout``, are passed to every call. They must be
+        JSON serializable.
+
+        :return: The id of the run.
+        :rtype: str
+        """
+        if operation not in _OPERATIONS:
+            raise ValueError("Unknown operation {!r}, expected one of: {}".format(operation, ", ".join(_OPERATIONS)))
+        if unit_size < 1:
+            raise ValueError("unit_size must be at least 1")
+        run = uuid.uuid4().hex
+        src: BinaryIO = open(source, "rb") if isinstance(source, str) else source  # pylint: disable=consider-using-with
+        try:
+            with self._lock:
+                self._db.execute("BEGIN IMMEDIATE")
+                try:
+                    units = lines = 0
+                    for first, raw in _chunks(src, unit_size):
+                        self._db.execute(
+                            "INSERT INTO units (run, unit, first, lines, state) VALUES (?, ?, ?, ?, 'queued')",
+                            (run, units, first, b"".join(raw)),
+                        )
+                        units += 1
+                        lines = first + len(raw) - 1
+                    self._db.execute(
+                        "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            run,
+                            operation,
+                            json.dumps(kwargs),
+                            rate_limit,
+                            burst,
+                            self.max_attempts,
+                            units,
+                            lines,
+                            time.time(),
+                        ),
+                    )
+                    self._db.execute("COMMIT")
+                except BaseException:
+                    self._db.execute("ROLLBACK")
+                    raise
+        finally:
+            if isinstance(source, str):
+                src.close()
+        return run
+
+    def progress(self, run: str) -> dict[str, Any]:
+        """Return the state of a run.
+
+        :param str run: The id returned by :meth:`submit`.
+        :return: ``units`` and ``lines`` of the run, the number of units ``queued``,
+         ``running``, ``done`` and ``dead``, and ``succeeded`` and ``failed`` calls so far.
+        :rtype: dict[str, any]
+        :raises ValueError: If the run is unknown.
+        """
+        with self._lock:
+            row = self._db.execute("SELECT units, lines FROM runs WHERE run = ?", (run,)).fetchone()
+            if row is None:
+                raise ValueError("Unknown run {!r}.".format(run))
+            progress: dict[str, Any] = {"units": row[0], "lines": row[1]}
+            progress.update(queued=0, running=0, done=0, dead=0)
+            for state, count in self._db.execute(
+                "SELECT state, COUNT(*) FROM units WHERE run = ? GROUP BY state", (run,)
+            ):
+                progress[state] = count
+            succeeded, failed = self._db.execute(
+                "SELECT TOTAL(succeeded), TOTAL(failed) FROM units WHERE run = ?", (run,)
+            ).fetchone()
+        progress["succeeded"], progress["failed"] = int(succeeded), int(failed)
+        return progress
+
+    def collect(
+        self, run: str, output: str, *, timeout: Optional[float] = None, poll_interval: float = 1.0
+    ) -> dict[str, Any]:
+        """Wait for every unit of a run and write the results to ``output`` in input order.
+
+        :param str run: The id returned by :meth:`submit`.
+        :param str output: Path of the JSONL output.
+        :keyword timeout: Longest wait in seconds. Default value is None, no limit.
+        :paramtype timeout: float
+        :keyword poll_interval: Seconds between two checks of the progress. Default value is 1.
+        :paramtype poll_interval: float
+        :return: The :meth:`progress` of the finished run.
+        :rtype: dict[str, any]
+        :raises TimeoutError: If the run did not finish within ``timeout``.
+        """
+        give_up = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self._expire(run)
+            progress = self.progress(run)
+            if progress["done"] + progress["dead"] == progress["units"]:
+                break
+            if give_up is not None and time.monotonic() >= give_up:
+                raise TimeoutError("Run {} has {} units left.".format(run, progress["queued"] + progress["running"]))
+            time.sleep(poll_interval)
+        with open(output, "wb") as out:
+            for unit in range(progress["units"]):
+                with self._lock:
+                    state, first, lines, result = self._db.execute(
+                        "SELECT state, first, lines, result FROM units WHERE run = ? AND unit = ?", (run, unit)
+                    ).fetchone()
+                out.write(result if state == "done" else _lost_records(first, lines))
+        return progress
+
+    def delete(self, run: str) -> None:
+        """Delete a run and its results.
+
+        :param str run: The id returned by :meth:`submit`.
+        """
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            self._db.execute("DELETE FROM units WHERE run = ?", (run,))
+            self._db.execute("DELETE FROM runs WHERE run = ?", (run,))
+            self._db.execute("COMMIT")
+
+    def _expire(self, run: str) -> None:
+        """Give up the units of ``run`` whose last lease expired after ``max_attempts`` leases."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE units SET state = 'dead', lease = NULL WHERE run = ? AND state = 'running' "
+                "AND expires < ? AND attempts >= (SELECT max_attempts FROM runs WHERE run = ?)",
+                (run, time.time(), run),
+            )
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._db.close()
+
+    def __enter__(self) -> "BatchCoordinator":
+        return self
+
+    def __exit__(self, *exc_details: Any) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return "<BatchCoordinator path={!r} max_attempts={}>".format(self.path, self.max_attempts)
+
+
+def _lost_records(first: int, lines: bytes) -> bytes:
+    from .aio._runner import _encode  # pylint: disable=import-outside-toplevel
+
+    records = []
+    for number, raw in enumerate(lines.splitlines(keepends=True), first):
+        if raw.strip():
+            error = {"type": "WorkerLost", "status": None, "message": "every lease of the work unit expired"}
+            records.append(_encode({"line": number, "error": error}))
+    return b"".join(records)
+
+
+class _Lease:
+    __slots__ = ("run", "unit", "first", "lines", "token", "operation", "options", "rate", "burst")
+
+    def __init__(self, *row: Any) -> None:
+        for name, value in zip(self.__slots__, row):
+            setattr(self, name, value)
+
+
+class BatchWorker:
+    """Runs the work units a :class:`~maq_rai_sdk.BatchCoordinator` published, on any host.
+
+    Start as many workers as needed, on as many hosts as can reach the database. Each runs
+    ``max_concurrency`` calls at a time through its own :class:`~maq_rai_sdk.aio.MAQRAISDK` per
+    run, closed once no unit of the run is in flight, renews the leases of the units it is
+    running, and commits each finished unit. Runs with a
+    ``rate_limit`` share one budget over every worker through a
+    :class:`~maq_rai_sdk.SqliteRateLimiter` in the same database.
+
+    :param str path: Path of the SQLite database of the coordinator.
+    :param str endpoint: Service URL, including the function key if needed.
+    :keyword max_concurrency: Maximum number of calls running at once. Default value is 8.
+    :paramtype max_concurrency: int
+    :keyword lease_time: Seconds the worker may go silent before its units are handed to another
+     worker; the lease is renewed every third of it. Default value is 60.
+    :paramtype lease_time: float
+    :keyword poll_interval: Seconds an idle worker waits before looking for units again. Default value is 1.
+    :paramtype poll_interval: float
+    :keyword client_options: Keyword arguments for the client, for example ``{"resilient": True}``.
+     Default value is None.
+    :paramtype client_options: dict[str, any]
+    :keyword name: Name of the worker, recorded with the units it leases. Default value is None,
+     the host name and process id.
+    :paramtype name: str
+    """
+
+    def __init__(
+        self,
+        path: str,
+        endpoint: str,
+        *,
+        max_concurrency: int = 8,
+        lease_time: float = 60.0,
+        poll_interval: float = 1.0,
+        client_options: Optional[dict[str, Any]] = None,
+        name: Optional[str] = None,
+    ) -> None:
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.path = path
+        self.endpoint = endpoint
+        self.max_concurrency = max_concurrency
+        self.lease_time = lease_time
+        self.poll_interval = poll_interval
+        self.client_options = dict(client_options or {})
+        self.name = name or "{}:{}".format(socket.gethostname(), os.getpid())
+        self.units = 0
+        self.lost = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.latency = LatencyHistogram()
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._limiters: dict[str, SqliteRateLimiter] = {}
+        self._stop = threading.Event()
+
+    def run(self, *, until_idle: bool = False) -> dict[str, Any]:
+        """Run units until :meth:`stop` is called, or until none is left with ``until_idle``.
+
+        :keyword until_idle: Return once no unit is queued or running. Default value is False.
+        :paramtype until_idle: bool
+        :return: ``units`` committed, ``lost`` (units finished after another worker took them
+         over), ``succeeded`` and ``failed`` calls of committed units, and ``latency``, a
+         :meth:`~maq_rai_sdk.LatencyHistogram.snapshot` of the calls.
+        :rtype: dict[str, any]
+        :raises ~azure.core.exceptions.ClientAuthenticationError: If the service rejects the
+         credentials. The unit is handed back.
+        """
+        self._stop.clear()
+        self._db = _connect(self.path)
+        try:
+            return asyncio.run(self._run(until_idle))
+        finally:
+            for limiter in self._limiters.values():
+                limiter.close()
+            self._limiters.clear()
+            with self._lock:
+                self._db.close()
+                self._db = None
+
+    def stop(self) -> None:
+        """Stop leasing units; :meth:`run` returns once the units in progress are committed."""
+        self._stop.set()
+
+    async def _run(self, until_idle: bool) -> dict[str, Any]:
+        from .aio import MAQRAISDK  # pylint: disable=import-outside-toplevel
+
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.max_concurrency)
+        clients: dict[str, Any] = {}
+        in_flight: dict[str, int] = {}
+        running: set["asyncio.Task[None]"] = set()
+        failure: list[BaseException] = []
+
+        async def finish(lease: _Lease, *args: Any) -> None:
+            try:
+                await self._finish(lease, *args)
+            finally:
+                in_flight[lease.run] -= 1
+                if not in_flight[lease.run]:
+                    # The run may be over: let go of its connections and its limiter's database handle.
+                    del in_flight[lease.run]
+                    client = clients.pop(lease.run)
+                    limiter = self._limiters.pop(lease.run, None)
+                    await client.close()
+                    if limiter is not None:
+                        limiter.close()
+
+        try:
+            while not self._stop.is_set() and not failure:
+                await slots.acquire()  # only lease a unit that can start right away
+                lease = await loop.run_in_executor(None, self._lease)
+                if lease is None:
+                    slots.release()
+                    if until_idle and not running and not await loop.run_in_executor(None, self._pending):
+                        break
+                    await asyncio.sleep(self.poll_interval)
+                    continue
+                if lease.run not in clients:
+                    limiter = None
+                    if lease.rate:
+                        limiter = SqliteRateLimiter(self.path, lease.rate, burst=lease.burst, key=lease.run)
+                        self._limiters[lease.run] = limiter
+                    clients[lease.run] = MAQRAISDK(endpoint=self.endpoint, rate_limit=limiter, **self.client_options)
+                    await clients[lease.run].__aenter__()
+                in_flight[lease.run] = in_flight.get(lease.run, 0) + 1
+                group, name = _OPERATIONS[lease.operation]
+                runner = _LineRunner(getattr(getattr(clients[lease.run], group), name), json.loads(lease.options))
+                renewal = asyncio.ensure_future(self._keep(lease))
+                tasks = []
+                for index, (number, raw) in enumerate(enumerate(lease.lines.splitlines(keepends=True), lease.first)):
+                    if index:
+                        await slots.acquire()
+                    task = asyncio.ensure_future(runner.run(number, raw))
+                    task.add_done_callback(lambda _: slots.release())
+                    tasks.append(task)
+                unit = asyncio.ensure_future(finish(lease, runner, tasks, renewal, failure))
+                running.add(unit)
+                unit.add_done_callback(running.discard)
+            if running:
+                await asyncio.gather(*running)
+        finally:
+            for client in clients.values():
+                await client.close()
+        if failure:
+            raise failure[0]
+        return {
+            "units": self.units,
+            "lost": self.lost,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "latency": self.latency.snapshot(),
+        }
+
+    async def _keep(self, lease: _Lease) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.lease_time / 3)
+            await loop.run_in_executor(None, self._renew, lease)
+
+    async def _finish(
+        self,
+        lease: _Lease,
+        runner: _LineRunner,
+        tasks: list["asyncio.Task[bytes]"],
+        renewal: "asyncio.Task[None]",
+        failure: list[BaseException],
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            records = await asyncio.gather(*tasks)
+        finally:
+            renewal.cancel()
+        if runner.fatal is not None:
+            await loop.run_in_executor(None, self._release, lease)
+            failure.append(runner.fatal)
+            return
+        await loop.run_in_executor(None, self._commit, lease, runner, b"".join(records))
+
+    def _lease(self) -> Optional[_Lease]:
+        now = time.time()
+        token = uuid.uuid4().hex
+        with self._lock:
+            db = self._connection()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                row = db.execute(
+                    "SELECT units.run, units.unit, units.first, units.lines FROM units JOIN runs USING (run) "
+                    "WHERE units.state = 'queued' "
+                    "OR (units.state = 'running' AND units.expires < ? AND units.attempts < runs.max_attempts) "
+                    "ORDER BY runs.created_at, units.unit LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is None:
+                    db.execute("COMMIT")
+                    return None
+                run, unit, first, lines = row
+                db.execute(
+                    "UPDATE units SET state = 'running', attempts = attempts + 1, lease = ?, expires = ?, worker = ? "
+                    "WHERE run = ? AND unit = ?",
+                    (token, now + self.lease_time, self.name, run, unit),
+                )
+                operation, options, rate, burst = db.execute(
+                    "SELECT operation, options, rate, burst FROM runs WHERE run = ?", (run,)
+                ).fetchone()
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+        return _Lease(run, unit, first, lines, token, operation, options, rate, burst)
+
+    def _pending(self) -> bool:
+        with self._lock:
+            # Units other workers are running may still come back; units out of attempts will not.
+            row = self._connection().execute(
+                "SELECT 1 FROM units JOIN runs USING (run) WHERE units.state = 'queued' OR (units.state = 'running' "
+                "AND (units.expires >= ? OR units.attempts < runs.max_attempts)) LIMIT 1",
+                (time.time(),),
+            ).fetchone()
+        return row is not None
+
+    def _renew(self, lease: _Lease) -> None:
+        with self._lock:
+            self._connection().execute(
+                "UPDATE units SET expires = ? WHERE run = ? AND unit = ? AND lease = ?",
+                (time.time() + self.lease_time, lease.run, lease.unit, lease.token),
+            )
+
+    def _commit(self, lease: _Lease, runner: _LineRunner, records: bytes) -> None:
+        with self._lock:
+            cursor = self._connection().execute(
+                "UPDATE units SET state = 'done', result = ?, succeeded = ?, failed = ?, lease = NULL "
+                "WHERE run = ? AND unit = ? AND lease = ? AND state = 'running'",
+                (records, runner.succeeded, runner.failed, lease.run, lease.unit, lease.token),
+            )
+            if cursor.rowcount != 1:
+                self.lost += 1  # another worker took the unit over; its result wins
+                return
+            self.units += 1
+            self.succeeded += runner.succeeded
+            self.failed += runner.failed
+        self.latency.merge(runner.latency)
+
+    def _release(self, lease: _Lease) -> None:
+        with self._lock:
+            self._connection().execute(
+                "UPDATE units SET state = 'queued', attempts = attempts - 1, lease = NULL, expires = NULL "
+                "WHERE run = ? AND unit = ? AND lease = ?",
+                (lease.run, lease.unit, lease.token),
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            raise ValueError("The worker is not running.")
+        return self._db
+
+    def __repr__(self) -> str:
+        return "<BatchWorker name={!r} max_concurrency={} units={}>".format(self.name, self.max_concurrency, self.units)
@@ -0,0 +1,58 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""Per-call deadlines."""
+import time
+from datetime import datetime, timezone
+from typing import Any, Optional, Union
+
+from azure.core.exceptions import ServiceResponseTimeoutError
+
+DEADLINE_HEADER = "x-ms-client-deadline"
+
+Deadline = Union[float, datetime]
+
+
+class DeadlineExceededError(ServiceResponseTimeoutError):
+    """Raised when a call did not complete before its deadline. The call was cancelled.
+
+    Unlike other timeouts it does not make :class:`~maq_rai_sdk.MultiEndpointClient` fail over,
+    since the time left for the call is used up.
+
+    :ivar float deadline: The deadline, in seconds since the epoch.
+    """
+
+    def __init__(self, deadline: float, **kwargs: Any) -> None:
+        self.deadline = deadline
+        super().__init__("Deadline {} exceeded.".format(_format_deadline(deadline)), **kwargs)
+
+
+def _resolve_deadline(kwargs: dict[str, Any]) -> Optional[float]:
+    """Pop the ``deadline`` operation keyword and combine it with ``timeout``.
+
+    ``timeout`` is left in ``kwargs``, the retry policy still uses it to bound the retries.
+
+    :param dict kwargs: The operation keyword arguments, updated in place.
+    :return: The earlier of both, in seconds since the epoch, or None if neither was given.
+    :rtype: float or None
+    """
+    deadline = kwargs.pop("deadline", None)
+    if isinstance(deadline, datetime):
+        deadline = deadline.timestamp()
+    timeout = kwargs.get("timeout")
+    if timeout is not None:
+        by_timeout = time.time() + timeout
+        deadline = by_timeout if deadline is None else min(deadline, by_timeout)
+    return deadline
+
+
+def _format_deadline(deadline: float) -> str:
+    """Format ``deadline`` as an RFC 3339 UTC timestamp with milliseconds.
+
+    :param float deadline: Seconds since the epoch.
+    :return: The timestamp, for example "2025-01-31T12:00:00.250Z".
+    :rtype: str
+    """
+    return datetime.fromtimestamp(deadline, timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
@@ -0,0 +1,239 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""DNS resolution cache shared by the transports, and connection pre-establishment."""
+import asyncio
+import ipaddress
+import socket
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+from urllib3.util.retry import Retry
+
+from azure.core.pipeline.transport import RequestsTransport
+
+Address = tuple[int, str]
+
+
+def _is_ip(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host.strip("[]"))
+    except ValueError:
+        return False
+    return True
+
+
+class DnsCache:
+    """Thread-safe cache of host name resolutions with a time to live.
+
+    One instance can be shared by the sync and async transports of several clients, so a
+    burst of new connections resolves each host once.
+
+    :param float ttl: Seconds a resolution is reused. Default value is 300.
+    :keyword max_entries: Maximum number of cached host names. Default value is 256.
+    :paramtype max_entries: int
+    """
+
+    def __init__(self, ttl: float = 300.0, *, max_entries: int = 256) -> None:
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple[str, int], tuple[float, list[Address]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _lookup(self, host: str, family: int) -> Optional[list[Address]]:
+        with self._lock:
+            entry = self._entries.get((host, family))
+            if entry is None or entry[0] <= time.monotonic():
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end((host, family))
+            return entry[1]
+
+    def _store(self, host: str, family: int, infos: list[Any]) -> list[Address]:
+        addresses: list[Address] = []
+        for info in infos:
+            address = (info[0], info[4][0])
+            if address not in addresses:
+                addresses.append(address)
+        with self._lock:
+            self._entries[(host, family)] = (time.monotonic() + self.ttl, addresses)
+            self._entries.move_to_end((host, family))
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return addresses
+
+    def resolve(self, host: str, port: int = 0, family: int = socket.AF_UNSPEC) -> list[Address]:
+        """Resolve ``host`` to ``(family, address)`` pairs, from the cache when possible.
+
+        :param str host: The host name. IP addresses are returned as they are.
+        :param int port: The port, passed to the resolver. Default value is 0.
+        :param int family: The address family. Default value is ``socket.AF_UNSPEC``.
+        :return: The addresses, in resolver order.
+        :rtype: list[tuple[int, str]]
+        :raises socket.gaierror: If the name cannot be resolved.
+        """
+        if _is_ip(host):
+            return [(socket.AF_INET6 if ":" in host else socket.AF_INET, host.strip("[]"))]
+        addresses = self._lookup(host, family)
+        if addresses is None:
+            addresses = self._store(host, family, socket.getaddrinfo(host, port, family, socket.SOCK_STREAM))
+        return addresses
+
+    async def resolve_async(self, host: str, port: int = 0, family: int = socket.AF_UNSPEC) -> list[Address]:
+        """Async version of :meth:`resolve`, resolving on the loop's executor.
+
+        :param str host: The host name. IP addresses are returned as they are.
+        :param int port: The port, passed to the resolver. Default value is 0.
+        :param int family: The address family. Default value is ``socket.AF_UNSPEC``.
+        :return: The addresses, in resolver order.
+        :rtype: list[tuple[int, str]]
+        :raises socket.gaierror: If the name cannot be resolved.
+        """
+        if _is_ip(host):
+            return self.resolve(host, port, family)
+        addresses = self._lookup(host, family)
+        if addresses is None:
+            infos = await asyncio.get_running_loop().getaddrinfo(host, port, family=family, type=socket.SOCK_STREAM)
+            addresses = self._store(host, family, infos)
+        return addresses
+
+    def invalidate(self, host: Optional[str] = None) -> None:
+        """Forget the resolutions of ``host``, or of every host.
+
+        :param host: The host name. Default value is None, every host.
+        :type host: str or None
+        """
+        with self._lock:
+            if host is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] == host]:
+                del self._entries[key]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __repr__(self) -> str:
+        return "<DnsCache entries={} hits={} misses={}>".format(len(self), self.hits, self.misses)
+
+
+class _CachedDnsConnectionMixin:
+    dns_cache: DnsCache
+    _dns_host: str
+    port: int
+
+    def _new_conn(self) -> socket.socket:
+        host = self._dns_host
+        try:
+            addresses = self.dns_cache.resolve(host, self.port)
+        except socket.gaierror:
+            return super()._new_conn()  # type: ignore[misc]  # reports the failure the usual way
+        error: Optional[Exception] = None
+        for _, address in addresses:
+            # Only the socket is opened here; TLS and the Host header still see the host name.
+            self._dns_host = address
+            try:
+                return super()._new_conn()  # type: ignore[misc]
+            except (NewConnectionError, ConnectTimeoutError) as err:
+                error = err
+            finally:
+                self._dns_host = host
+        self.dns_cache.invalidate(host)
+        raise error  # type: ignore[misc]
+
+
+class DnsCachingAdapter(HTTPAdapter):
+    """``requests`` adapter whose connections resolve host names through a :class:`DnsCache`.
+
+    :param dns_cache: The cache to resolve with.
+    :type dns_cache: ~maq_rai_sdk.DnsCache
+
+    Any other arguments are passed to :class:`requests.adapters.HTTPAdapter`.
+    """
+
+    def __init__(self, dns_cache: DnsCache, *args: Any, **kwargs: Any) -> None:
+        self.dns_cache = dns_cache
+        super().__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        attrs = {"dns_cache": self.dns_cache}
+        http_conn = type("HTTPConnection", (_CachedDnsConnectionMixin, HTTPConnection), attrs)
+        https_conn = type("HTTPSConnection", (_CachedDnsConnectionMixin, HTTPSConnection), attrs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": type("HTTPConnectionPool", (HTTPConnectionPool,), {"ConnectionCls": http_conn}),
+            "https": type("HTTPSConnectionPool", (HTTPSConnectionPool,), {"ConnectionCls": https_conn}),
+        }
+
+
+def _mount_dns_cache(session: requests.Session, dns_cache: DnsCache, **adapter_kwargs: Any) -> None:
+    adapter = DnsCachingAdapter(
+        dns_cache, max_retries=Retry(total=False, redirect=False, raise_on_status=False), **adapter_kwargs
+    )
+    for prefix in ("http://", "https://"):
+        session.mount(prefix, adapter)
+
+
+class _DnsCachingRequestsTransport(RequestsTransport):
+    def __init__(self, dns_cache: DnsCache, **kwargs: Any) -> None:
+        self._dns_cache = dns_cache
+        super().__init__(**kwargs)
+
+    def _init_session(self, session: requests.Session) -> None:
+        super()._init_session(session)
+        _mount_dns_cache(session, self._dns_cache)
+
+
+def _preconnect(session: requests.Session, url: str, connections: int) -> Optional[int]:
+    """Open up to ``connections`` keep-alive connections to the host of ``url`` in the pool of ``session``.
+
+    The connections are taken from and put back into the pool with the private ``_get_conn`` and
+    ``_put_conn`` of urllib3's connection pools, which urllib3 1.x and 2.x both have.
+
+    :param session: The session whose pool is filled.
+    :type session: ~requests.Session
+    :param str url: Any URL on the target host.
+    :param int connections: Number of connections wanted. Capped at the pool size.
+    :return: The number of open connections now waiting in the pool, or None if the pool cannot
+     be filled this way.
+    :rtype: int or None
+    """
+    adapter = session.get_adapter(url)
+    if not isinstance(adapter, HTTPAdapter):
+        return 0
+    settings = session.merge_environment_settings(url, {}, None, None, None)
+    # Look the pool up the way a request would, so the connections land where requests reuse them.
+    if hasattr(adapter, "get_connection_with_tls_context"):
+        request = requests.Request("HEAD", url).prepare()
+        pool = adapter.get_connection_with_tls_context(
+            request, settings["verify"], settings["proxies"], settings["cert"]
+        )
+    else:
+        pool = adapter.get_connection(url, settings["proxies"])
+    if not (callable(getattr(pool, "_get_conn", None)) and callable(getattr(pool, "_put_conn", None))):
+        return None
+    adapter.cert_verify(pool, url, settings["verify"], settings["cert"])
+    wanted = min(connections, pool.pool.maxsize) if pool.pool is not None else 0
+    taken = []
+    try:
+        for _ in range(wanted):
+            conn = pool._get_conn()  # pylint: disable=protected-access
+            taken.append(conn)
+            if not conn.is_connected:
+                conn.connect()
+    finally:
+        for conn in taken:
+            pool._put_conn(conn)  # pylint: disable=protected-access
+    return sum(1 for conn in taken if conn.is_connected)
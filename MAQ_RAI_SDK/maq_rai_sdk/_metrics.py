@@ -0,0 +1,120 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""Lightweight client-side metrics."""
+import bisect
+import math
+import threading
+from typing import Any, Optional, Sequence
+
+_DEFAULT_BOUNDS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class LatencyHistogram:
+    """Thread-safe fixed-bucket histogram of latencies in seconds.
+
+    :param bounds: Upper bounds of the buckets in seconds, ascending. A final unbounded bucket is
+     always added. Default value is None, 10 ms to 60 s on a roughly logarithmic scale.
+    :type bounds: list[float]
+    """
+
+    def __init__(self, bounds: Optional[Sequence[float]] = None) -> None:
+        self.bounds = tuple(sorted(bounds if bounds is not None else _DEFAULT_BOUNDS))
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Record one latency.
+
+        :param float value: The latency in seconds.
+        """
+        with self._lock:
+            self.counts[bisect.bisect_left(self.bounds, value)] += 1
+            self.count += 1
+            self.total += value
+            self.min = min(self.min, value)
+            self.max = max(self.max, value)
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        """Add the latencies recorded by ``other``, for example in another process.
+
+        :param other: A histogram with the same bounds.
+        :type other: ~maq_rai_sdk.LatencyHistogram
+        :raises ValueError: If the bounds differ.
+        """
+        if other.bounds != self.bounds:
+            raise ValueError("Cannot merge histograms with different bounds.")
+        with self._lock:
+            self.counts = [mine + theirs for mine, theirs in zip(self.counts, other.counts)]
+            self.count += other.count
+            self.total += other.total
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+
+    def __getstate__(self) -> dict[str, Any]:
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    @property
+    def mean(self) -> float:
+        """Mean of the recorded latencies, 0 if there are none.
+
+        :return: The mean in seconds.
+        :rtype: float
+        """
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q: float) -> float:
+        """Estimate the ``q`` quantile as the upper bound of the bucket holding it.
+
+        :param float q: The quantile, between 0 and 1.
+        :return: The estimate in seconds, 0 if nothing was recorded.
+        :rtype: float
+        """
+        with self._lock:
+            if not self.count:
+                return 0.0
+            rank = q * self.count
+            seen = 0
+            for index, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank and count:
+                    return min(self.bounds[index], self.max) if index < len(self.bounds) else self.max
+            return self.max
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the histogram as a plain dict.
+
+        :return: count, sum, min, max, mean, p50, p95, p99 and ``buckets`` (upper bound to count,
+         "+Inf" for the unbounded bucket).
+        :rtype: dict
+        """
+        buckets = {str(bound): count for bound, count in zip(self.bounds, self.counts)}
+        buckets["+Inf"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "sum": self.total,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            "mean": self.mean,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+            "buckets": buckets,
+        }
+
+    def __repr__(self) -> str:
+        return "<LatencyHistogram count={} p50={:.3f} p95={:.3f} max={:.3f}>".format(
+            self.count, self.quantile(0.5), self.quantile(0.95), self.max
+        )
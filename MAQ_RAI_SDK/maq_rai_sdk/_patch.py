@@ -7,9 +7,866 @@
 
 Follow our quickstart for examples: https://aka.ms/azsdk/python/dpcodegen/python/customize
 """
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import IOBase
+from typing import Any, Callable, IO, Iterable, Optional, Sequence, Union
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+from typing_extensions import Self
 
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
-__all__: list[str] = []  # Add all objects you want publicly available to users at this package level
+from azure.core.pipeline import policies
+from azure.core.pipeline.transport import RequestsTransport
+from azure.core.rest import HttpRequest
+
+from ._bridge import _LoopThread, _map
+from ._cache import CacheEntry, ResponseCache
+from ._circuit import CircuitBreaker, CircuitBreakers, CircuitOpenError
+from ._client import MAQRAISDK as MAQRAISDKGenerated
+from ._compression import available_encodings
+from ._configuration import MAQRAISDKConfiguration
+from ._content import ContentCodec, ContentNegotiator, get_codec, register_codec
+from ._coordinator import BatchCoordinator, BatchWorker
+from ._deadline import DeadlineExceededError
+from ._dns import DnsCache, DnsCachingAdapter, _DnsCachingRequestsTransport, _preconnect
+from ._metrics import LatencyHistogram
+from ._polling import AdaptiveLROBasePolling
+from ._pool import _ThreadedRequestsTransport
+from ._queue import DeadLetter, DeadLetterError, QueueDrainer, QueuedCall, SubmissionQueue
+from ._ratelimit import FileRateLimiter, RateLimiter, SqliteRateLimiter
+from ._retry import RetryBudget
+from ._review import ConvergeResult
+from ._routing import (
+    ConsistentHashRouter,
+    Endpoint,
+    EndpointPool,
+    EndpointSpec,
+    LeastLoadedRouter,
+    _call_outcome,
+    _is_failover_error,
+    _parse_endpoint,
+    _routing_key,
+    _status_recorder,
+)
+from ._sharded import ShardedBatchRunner
+from .operations._operations import JSON
+from ._policies import (
+    CircuitBreakerPolicy,
+    CodecContentDecodePolicy,
+    ContentNegotiationPolicy,
+    RateLimitPolicy,
+    RequestCompressionPolicy,
+    ResilientRetryPolicy,
+    ResponseCachePolicy,
+    ResponseDecompressionPolicy,
+)
+
+_DEFAULT_ENDPOINT = "https://func-rai-agent-eus.azurewebsites.net/api"
+_OPERATIONS = {"reviewer": ("reviewer", "post"), "testcase": ("testcase", "generator_post")}
+# Client keywords holding sync pipeline objects, which the async client of map() cannot use.
+_SYNC_ONLY_OPTIONS = frozenset(
+    ("transport", "policies", "per_call_policies", "per_retry_policies", "retry_policy", "session")
+)
+
+
+def _add_policies(kwargs: dict[str, Any], per_call: Iterable[Any] = (), per_retry: Iterable[Any] = ()) -> None:
+    """Append policies to the ``per_call_policies`` and ``per_retry_policies`` client keywords.
+
+    :param dict kwargs: The client keyword arguments, updated in place.
+    :param per_call: Policies run once per call, before the retry policy.
+    :type per_call: list
+    :param per_retry: Policies run on every attempt, after the retry policy.
+    :type per_retry: list
+    """
+    for name, extra in (("per_call_policies", list(per_call)), ("per_retry_policies", list(per_retry))):
+        if not extra:
+            continue
+        current = kwargs.get(name) or []
+        if not isinstance(current, Iterable):
+            current = [current]
+        kwargs[name] = list(current) + extra
+
+
+def _default_policies(
+    config_type: type, kwargs: dict[str, Any], content_decode_policy: policies.SansIOHTTPPolicy
+) -> list[Any]:
+    """Build the generated client's default policy list with a replacement ContentDecodePolicy.
+
+    The configuration policies are written back into ``kwargs`` so the configuration the
+    generated client creates holds the same instances as the pipeline.
+
+    :param type config_type: The configuration class of the client being built.
+    :param dict kwargs: The client keyword arguments, updated in place.
+    :param content_decode_policy: The policy used instead of ``ContentDecodePolicy``.
+    :type content_decode_policy: ~azure.core.pipeline.policies.SansIOHTTPPolicy
+    :return: The policy list.
+    :rtype: list
+    """
+    config = config_type(**kwargs)
+    for name in (
+        "user_agent_policy",
+        "headers_policy",
+        "proxy_policy",
+        "logging_policy",
+        "http_logging_policy",
+        "custom_hook_policy",
+        "redirect_policy",
+        "retry_policy",
+        "authentication_policy",
+    ):
+        kwargs[name] = getattr(config, name)
+    return [
+        policies.RequestIdPolicy(**kwargs),
+        config.headers_policy,
+        config.user_agent_policy,
+        config.proxy_policy,
+        content_decode_policy,
+        config.redirect_policy,
+        config.retry_policy,
+        config.authentication_policy,
+        config.custom_hook_policy,
+        config.logging_policy,
+        policies.DistributedTracingPolicy(**kwargs),
+        policies.SensitiveHeaderCleanupPolicy(**kwargs) if config.redirect_policy else None,
+        config.http_logging_policy,
+    ]
+
+
+def _with_function_key(endpoint: str, key: Optional[str]) -> str:
+    """Return ``endpoint`` with the Function App host key set as its ``code`` query parameter.
+
+    :param str endpoint: The Function App base URL.
+    :param key: The host or function key. If None, the endpoint is returned unchanged.
+    :type key: str or None
+    :return: The endpoint URL carrying the key.
+    :rtype: str
+    """
+    if not key:
+        return endpoint
+    parts = urlsplit(endpoint)
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k != "code"]
+    query.append(("code", key))
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def _dns_cache_option(dns_cache: Union[bool, DnsCache, None], kwargs: dict[str, Any]) -> Optional[DnsCache]:
+    """Resolve the ``dns_cache`` client keyword to a cache, or None.
+
+    :param dns_cache: The keyword value.
+    :type dns_cache: bool or ~maq_rai_sdk.DnsCache or None
+    :param dict kwargs: The client keyword arguments.
+    :return: The cache or None.
+    :rtype: ~maq_rai_sdk.DnsCache or None
+    :raises ValueError: If a transport is passed as well.
+    """
+    cache = DnsCache() if dns_cache is True else dns_cache if isinstance(dns_cache, DnsCache) else None
+    if cache is not None and kwargs.get("transport") is not None:
+        raise ValueError("dns_cache cannot be combined with transport; configure the transport's resolver instead.")
+    return cache
+
+
+class MAQRAISDK(MAQRAISDKGenerated):  # pylint: disable=client-accepts-api-version-keyword
+    """Azure functions for reviewing and updating prompts.
+
+    :ivar reviewer: ReviewerOperations operations
+    :vartype reviewer: maq_rai_sdk.operations.ReviewerOperations
+    :ivar testcase: TestcaseOperations operations
+    :vartype testcase: maq_rai_sdk.operations.TestcaseOperations
+    :keyword endpoint: Service URL. Default value is
+     "https://func-rai-agent-eus.azurewebsites.net/api".
+    :paramtype endpoint: str
+    :keyword request_compression: Content coding used to compress large request bodies ("gzip",
+     "deflate", "br" or "zstd"). Default value is None, bodies are sent uncompressed.
+    :paramtype request_compression: str
+    :keyword request_compression_threshold: Minimum body size in bytes to compress. Default value is 1024.
+    :paramtype request_compression_threshold: int
+    :keyword accept_encodings: Content codings to negotiate for responses, in order of preference.
+     Responses are decoded as they stream in. Pass :func:`~maq_rai_sdk.available_encodings` to
+     accept everything installed. Default value is None, the transport default.
+    :paramtype accept_encodings: list[str]
+    :keyword content_types: Binary media types to negotiate for bodies, most preferred first, for
+     example ``["application/msgpack", "application/cbor"]``. Responses are requested in them right
+     away; JSON request bodies switch over once the service advertises support. JSON stays the
+     fallback. Default value is None, JSON only.
+    :paramtype content_types: list[str]
+    :keyword response_cache: Cache responses following their ``ETag`` and ``Cache-Control`` headers.
+     Pass True for a private :class:`~maq_rai_sdk.ResponseCache` or an instance to share one between
+     clients. Default value is None, no caching.
+    :paramtype response_cache: bool or ~maq_rai_sdk.ResponseCache
+    :keyword dns_cache: Resolve host names through a :class:`~maq_rai_sdk.DnsCache`. Pass True for a
+     private cache or an instance to share one between clients. Cannot be combined with
+     ``transport``. Default value is None, the system resolver on every new connection.
+    :paramtype dns_cache: bool or ~maq_rai_sdk.DnsCache
+    :keyword circuit_breakers: Fail fast on endpoints that keep failing or answering slowly, see
+     :class:`~maq_rai_sdk.CircuitBreakerPolicy`. Pass True for the default thresholds or a
+     :class:`~maq_rai_sdk.CircuitBreakers` to tune or share them. Default value is None, no circuits.
+    :paramtype circuit_breakers: bool or ~maq_rai_sdk.CircuitBreakers
+    :keyword resilient: Resilient mode. 401 and 500 answers raise
+     :class:`~azure.core.exceptions.ClientAuthenticationError` and
+     :class:`~azure.core.exceptions.HttpResponseError` instead of returning None, and calls are
+     retried after 500, 502, 503 and 504 answers with jittered backoff honoring ``Retry-After``,
+     paid from a :class:`~maq_rai_sdk.RetryBudget`. Pass True for a private budget of 10% of calls
+     or a budget to share it between clients. A custom ``retry_policy`` is kept as it is.
+     Default value is None, the generated behavior.
+    :paramtype resilient: bool or ~maq_rai_sdk.RetryBudget
+    :keyword rate_limit: Pace every request, retries included, through a
+     :class:`~maq_rai_sdk.RateLimiter`; share one to pace several clients together. 429 and 503
+     answers with ``Retry-After`` pause the limiter. Default value is None, no limit.
+    :paramtype rate_limit: ~maq_rai_sdk.RateLimiter
+    :keyword submission_queue: Enable ``enqueue`` on the operations, storing calls in this
+     :class:`~maq_rai_sdk.SubmissionQueue`. Pass a path to open a queue the client closes with
+     itself. Default value is None, no queue.
+    :paramtype submission_queue: str or ~maq_rai_sdk.SubmissionQueue
+    :keyword drain_workers: Number of :class:`~maq_rai_sdk.QueueDrainer` threads sending the queued
+     calls through this client, 0 to only fill the queue. Default value is 2.
+    :paramtype drain_workers: int
+    :keyword max_threads: Number of threads expected to call the client at once, for example the
+     worker threads of a WSGI server. The connection pool is sized to it (plus the drain workers),
+     threads beyond it wait for a free connection instead of opening one that is thrown away, and
+     the waits are recorded in :attr:`pool_wait`. Cannot be combined with ``transport``.
+     Default value is None, the transport default of 10 pooled connections.
+    :paramtype max_threads: int
+
+    The client is safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        *,
+        endpoint: str = _DEFAULT_ENDPOINT,
+        request_compression: Optional[str] = None,
+        request_compression_threshold: int = 1024,
+        accept_encodings: Optional[Sequence[str]] = None,
+        content_types: Optional[Sequence[str]] = None,
+        response_cache: Union[bool, ResponseCache, None] = None,
+        dns_cache: Union[bool, DnsCache, None] = None,
+        circuit_breakers: Union[bool, CircuitBreakers, None] = None,
+        resilient: Union[bool, RetryBudget, None] = None,
+        rate_limit: Optional[RateLimiter] = None,
+        submission_queue: Union[str, SubmissionQueue, None] = None,
+        drain_workers: int = 2,
+        max_threads: Optional[int] = None,
+        **kwargs: Any
+    ) -> None:
+        resolver = _dns_cache_option(dns_cache, kwargs)
+        if max_threads is not None:
+            if max_threads < 1:
+                raise ValueError("max_threads must be at least 1")
+            if kwargs.get("transport") is not None:
+                raise ValueError("max_threads cannot be combined with transport; size the transport's pool instead.")
+        budget = resilient if isinstance(resilient, RetryBudget) else None
+        if resilient is True:
+            budget = RetryBudget()
+        pipeline_options = {name: value for name, value in kwargs.items() if name not in _SYNC_ONLY_OPTIONS}
+        if budget is not None and kwargs.get("retry_policy") is None:
+            kwargs["retry_policy"] = ResilientRetryPolicy(budget, **kwargs)
+        pool_wait = None
+        if max_threads is not None:
+            pool_wait = LatencyHistogram()
+            pool_size = max_threads + (drain_workers if submission_queue is not None else 0)
+            kwargs["transport"] = _ThreadedRequestsTransport(pool_size, pool_wait, resolver, **kwargs)
+        elif resolver is not None:
+            kwargs["transport"] = _DnsCachingRequestsTransport(resolver, **kwargs)
+        per_call = []
+        per_retry = []
+        cache = response_cache if isinstance(response_cache, ResponseCache) else None
+        if response_cache is True:
+            cache = ResponseCache()
+        if cache is not None:
+            per_call.append(ResponseCachePolicy(cache))
+        breakers = circuit_breakers if isinstance(circuit_breakers, CircuitBreakers) else None
+        if circuit_breakers is True:
+            breakers = CircuitBreakers()
+        if breakers is not None:
+            per_call.append(CircuitBreakerPolicy(breakers))
+        negotiator = None
+        if content_types:
+            negotiator = ContentNegotiator(content_types)
+            per_call.append(ContentNegotiationPolicy(negotiator))
+            if kwargs.get("policies") is None:
+                kwargs["policies"] = _default_policies(
+                    MAQRAISDKConfiguration, kwargs, CodecContentDecodePolicy(**kwargs)
+                )
+        if request_compression:
+            per_call.append(RequestCompressionPolicy(request_compression, threshold=request_compression_threshold))
+        if accept_encodings is not None:
+            per_retry.append(ResponseDecompressionPolicy(accept_encodings))
+        if rate_limit is not None:
+            per_retry.append(RateLimitPolicy(rate_limit))
+        _add_policies(kwargs, per_call, per_retry)
+        super().__init__(endpoint=endpoint, **kwargs)
+        self._config.content_negotiator = negotiator
+        self._config.response_cache = cache
+        self._config.circuit_breakers = breakers
+        self._config.retry_budget = budget
+        self._config.rate_limiter = rate_limit
+        self._config.pool_wait = pool_wait
+        # The async twin used by map() shares the stateful options: budget, circuits, cache, limiter.
+        self._loop_thread = _LoopThread(
+            dict(
+                pipeline_options,
+                endpoint=endpoint,
+                request_compression=request_compression,
+                request_compression_threshold=request_compression_threshold,
+                accept_encodings=accept_encodings,
+                content_types=content_types,
+                response_cache=cache,
+                dns_cache=resolver,
+                circuit_breakers=breakers,
+                resilient=budget,
+                rate_limit=rate_limit,
+            )
+        )
+        self._owns_queue = isinstance(submission_queue, str)
+        queue = SubmissionQueue(submission_queue) if isinstance(submission_queue, str) else submission_queue
+        self._config.submission_queue = queue
+        self._drainer = None
+        if queue is not None and drain_workers:
+            self._drainer = QueueDrainer(self, queue, workers=drain_workers)
+            self._drainer.start()
+
+    @property
+    def response_cache(self) -> Optional[ResponseCache]:
+        """The response cache of this client, or None if caching is off.
+
+        :return: The cache or None.
+        :rtype: ~maq_rai_sdk.ResponseCache or None
+        """
+        return self._config.response_cache
+
+    @property
+    def circuit_breakers(self) -> Optional[CircuitBreakers]:
+        """The circuits of this client, or None if circuit breaking is off.
+
+        :return: The circuits or None.
+        :rtype: ~maq_rai_sdk.CircuitBreakers or None
+        """
+        return self._config.circuit_breakers
+
+    @property
+    def retry_budget(self) -> Optional[RetryBudget]:
+        """The retry budget of this client, or None outside resilient mode.
+
+        :return: The budget or None.
+        :rtype: ~maq_rai_sdk.RetryBudget or None
+        """
+        return self._config.retry_budget
+
+    @property
+    def rate_limiter(self) -> Optional[RateLimiter]:
+        """The rate limiter of this client, or None if calls are not paced.
+
+        :return: The limiter or None.
+        :rtype: ~maq_rai_sdk.RateLimiter or None
+        """
+        return self._config.rate_limiter
+
+    @property
+    def pool_wait(self) -> Optional[LatencyHistogram]:
+        """Time requests waited for a pooled connection, or None unless ``max_threads`` is set.
+
+        :return: The histogram or None.
+        :rtype: ~maq_rai_sdk.LatencyHistogram or None
+        """
+        return self._config.pool_wait
+
+    @property
+    def submission_queue(self) -> Optional[SubmissionQueue]:
+        """The queue filled by ``enqueue``, or None if queuing is off.
+
+        :return: The queue or None.
+        :rtype: ~maq_rai_sdk.SubmissionQueue or None
+        """
+        return self._config.submission_queue
+
+    @property
+    def drainer(self) -> Optional[QueueDrainer]:
+        """The workers draining the submission queue, or None.
+
+        :return: The drainer or None.
+        :rtype: ~maq_rai_sdk.QueueDrainer or None
+        """
+        return self._drainer
+
+    def map(
+        self,
+        operation: str,
+        bodies: Iterable[JSON],
+        *,
+        max_concurrency: int = 8,
+        return_exceptions: bool = False,
+        **kwargs: Any
+    ) -> list[Any]:
+        """Run one operation for many bodies concurrently and return the results in order.
+
+        The calls run on the async client, on a private event loop started on first use, so
+        ``max_concurrency`` calls share a few connections instead of needing a thread each. The
+        async client is configured like this one and shares its retry budget, circuits, response
+        cache and rate limiter; a custom ``transport`` or custom policies are not carried over.
+        Can be called from several threads at once.
+
+        :param str operation: "reviewer" for ``reviewer.post`` or "testcase" for ``testcase.generator_post``.
+        :param bodies: The JSON bodies of the calls.
+        :type bodies: iterable[JSON]
+        :keyword max_concurrency: Maximum number of calls running at once. Default value is 8.
+        :paramtype max_concurrency: int
+        :keyword return_exceptions: Return the exception of a failed call in its place instead of
+         raising the first one and cancelling the other calls. Default value is False.
+        :paramtype return_exceptions: bool
+
+        Any other keyword arguments, such as ``timeout``, are passed to every call.
+
+        :return: The result of each call, in the order of ``bodies``.
+        :rtype: list
+        :raises ValueError: If the operation is unknown.
+        :raises ~azure.core.exceptions.HttpResponseError: The first error, unless ``return_exceptions``.
+        """
+        if operation not in _OPERATIONS:
+            raise ValueError("Unknown operation {!r}, expected one of: {}".format(operation, ", ".join(_OPERATIONS)))
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        group, name = _OPERATIONS[operation]
+        bodies = list(bodies)
+        return self._loop_thread.run(
+            lambda client: _map(
+                getattr(getattr(client, group), name), bodies, max_concurrency, return_exceptions, kwargs
+            )
+        )
+
+    def _shutdown(self) -> None:
+        self._loop_thread.close()
+        if self._drainer is not None:
+            self._drainer.stop()
+        if self._owns_queue and self._config.submission_queue is not None:
+            self._config.submission_queue.close()
+
+    def close(self) -> None:
+        self._shutdown()
+        super().close()
+
+    def __exit__(self, *exc_details: Any) -> None:
+        self._shutdown()
+        super().__exit__(*exc_details)
+
+    def warmup(self, connections: int = 1) -> int:
+        """Resolve the endpoint and open ``connections`` keep-alive connections before the first calls.
+
+        With the default transport the connections are only established (TCP and TLS), no request
+        is sent, and their number is capped at the connection pool size. Other transports, and
+        urllib3 versions whose pools cannot be filled directly, are warmed with concurrent ``HEAD``
+        requests.
+
+        :param int connections: Number of connections to open. Default value is 1.
+        :return: The number of connections ready for use.
+        :rtype: int
+        """
+        transport = self._client._pipeline._transport  # pylint: disable=protected-access
+        url = self._client.format_url("/")
+        if isinstance(transport, RequestsTransport):
+            transport.open()
+            ready = _preconnect(transport.session, url, connections)
+            if ready is not None:
+                return ready
+
+        def probe() -> bool:
+            try:
+                transport.send(HttpRequest("HEAD", url)).close()
+            except Exception:  # pylint: disable=broad-except
+                return False
+            return True
+
+        with ThreadPoolExecutor(max_workers=max(connections, 1)) as executor:
+            return sum(executor.map(lambda _: probe(), range(connections)))
+
+
+class ClientRegistry:
+    """Cache of :class:`~maq_rai_sdk.MAQRAISDK` clients keyed by endpoint and function key.
+
+    Every client handed out by the registry runs on one shared transport, so all tenants draw
+    from a single connection pool instead of each client opening its own. The least recently
+    used client is closed once more than ``max_clients`` are cached.
+
+    :keyword max_clients: Maximum number of cached clients. Default value is 128.
+    :paramtype max_clients: int
+    :keyword pool_connections: Number of per-host connection pools to keep. Default value is 10.
+    :paramtype pool_connections: int
+    :keyword pool_maxsize: Maximum number of connections kept open per host. Default value is 10.
+    :paramtype pool_maxsize: int
+    :keyword keep_alive: Whether connections are kept alive between requests. Default value is True.
+    :paramtype keep_alive: bool
+    :keyword dns_cache: Resolve host names for the shared pool through a :class:`~maq_rai_sdk.DnsCache`.
+     Pass True for a private cache or an instance to share one. Default value is None, the system
+     resolver on every new connection.
+    :paramtype dns_cache: bool or ~maq_rai_sdk.DnsCache
+
+    Any other keyword arguments are forwarded to every client the registry creates.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_clients: int = 128,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        keep_alive: bool = True,
+        dns_cache: Union[bool, DnsCache, None] = None,
+        **kwargs: Any
+    ) -> None:
+        if max_clients < 1:
+            raise ValueError("max_clients must be at least 1")
+        self._max_clients = max_clients
+        self._client_kwargs = kwargs
+        self._clients: "OrderedDict[tuple[str, Optional[str]], MAQRAISDK]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._session = requests.Session()
+        self._session.trust_env = kwargs.get("use_env_settings", True)
+        adapter_kwargs: dict[str, Any] = {
+            "pool_connections": pool_connections,
+            "pool_maxsize": pool_maxsize,
+            "max_retries": Retry(total=False, redirect=False, raise_on_status=False),
+        }
+        resolver = _dns_cache_option(dns_cache, {})
+        adapter = DnsCachingAdapter(resolver, **adapter_kwargs) if resolver else HTTPAdapter(**adapter_kwargs)
+        for prefix in ("http://", "https://"):
+            self._session.mount(prefix, adapter)
+        if not keep_alive:
+            self._session.headers["Connection"] = "close"
+        self._transport = RequestsTransport(session=self._session, session_owner=False)
+
+    @property
+    def transport(self) -> RequestsTransport:
+        """The transport shared by every client of this registry.
+
+        :return: The shared transport.
+        :rtype: ~azure.core.pipeline.transport.RequestsTransport
+        """
+        return self._transport
+
+    def get(self, endpoint: str = _DEFAULT_ENDPOINT, key: Optional[str] = None) -> MAQRAISDK:
+        """Return the client for ``endpoint`` and ``key``, creating it on first use.
+
+        :param str endpoint: Service URL. Default value is
+         "https://func-rai-agent-eus.azurewebsites.net/api".
+        :param key: Function App host key, sent as the ``code`` query parameter. Default value is None.
+        :type key: str or None
+        :return: The cached client.
+        :rtype: ~maq_rai_sdk.MAQRAISDK
+        """
+        cache_key = (endpoint, key)
+        evicted = []
+        with self._lock:
+            if self._session is None:
+                raise ValueError("ClientRegistry has already been closed.")
+            client = self._clients.get(cache_key)
+            if client is not None:
+                self._clients.move_to_end(cache_key)
+                return client
+            client = MAQRAISDK(
+                endpoint=_with_function_key(endpoint, key), transport=self._transport, **self._client_kwargs
+            )
+            self._clients[cache_key] = client
+            while len(self._clients) > self._max_clients:
+                evicted.append(self._clients.popitem(last=False)[1])
+        for old in evicted:
+            old.close()
+        return client
+
+    def evict(self, endpoint: str = _DEFAULT_ENDPOINT, key: Optional[str] = None) -> None:
+        """Close and forget the cached client for ``endpoint`` and ``key``, if any.
+
+        :param str endpoint: Service URL.
+        :param key: Function App host key. Default value is None.
+        :type key: str or None
+        """
+        with self._lock:
+            client = self._clients.pop((endpoint, key), None)
+        if client is not None:
+            client.close()
+
+    def close(self) -> None:
+        """Close every cached client and the shared connection pool."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            session, self._session = self._session, None
+        for client in clients:
+            client.close()
+        if session is not None:
+            session.close()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_details: Any) -> None:
+        self.close()
+
+
+class _RoutedReviewerOperations:
+    def __init__(self, client: "MultiEndpointClient") -> None:
+        self._client = client
+
+    def post(self, body: Union[JSON, IO[bytes]], **kwargs: Any) -> Optional[JSON]:
+        """Review and update a prompt on one of the endpoints.
+
+        :param body: Is either a JSON type or a IO[bytes] type. Required.
+        :type body: JSON or IO[bytes]
+        :return: JSON object or None
+        :rtype: JSON or None
+        :raises ~azure.core.exceptions.HttpResponseError:
+        """
+        return self._client._call(  # pylint: disable=protected-access
+            lambda client, **kw: client.reviewer.post(body, **kw), body, kwargs
+        )
+
+
+class _RoutedTestcaseOperations:
+    def __init__(self, client: "MultiEndpointClient") -> None:
+        self._client = client
+
+    def generator_post(self, body: Union[JSON, IO[bytes]], **kwargs: Any) -> Optional[JSON]:
+        """Generate testcases from a prompt on one of the endpoints.
+
+        :param body: Is either a JSON type or a IO[bytes] type. Required.
+        :type body: JSON or IO[bytes]
+        :return: JSON object or None
+        :rtype: JSON or None
+        :raises ~azure.core.exceptions.HttpResponseError:
+        """
+        return self._client._call(  # pylint: disable=protected-access
+            lambda client, **kw: client.testcase.generator_post(body, **kw), body, kwargs
+        )
+
+
+class MultiEndpointClient:
+    """Client spreading calls over several Function App endpoints, for example one per region.
+
+    Each call goes to the healthy endpoint with the fewest outstanding requests weighted by its
+    latency EWMA (see :class:`~maq_rai_sdk.LeastLoadedRouter`). Connection errors, timeouts, 429
+    and 5xx answers fail over to the next endpoint, and an endpoint failing ``eject_after`` times
+    in a row is taken out of rotation for ``ejection_time`` seconds or until a health check
+    passes. Stream bodies are not replayed on another endpoint.
+
+    :param endpoints: Endpoint URLs, or ``(url, key)`` pairs with the Function App host key.
+    :type endpoints: list[str or tuple[str, str]]
+    :keyword router: The routing strategy, for example a :class:`~maq_rai_sdk.ConsistentHashRouter`
+     to keep each prompt on one endpoint. Default value is None, a :class:`~maq_rai_sdk.LeastLoadedRouter`.
+    :paramtype router: ~maq_rai_sdk.LeastLoadedRouter or ~maq_rai_sdk.ConsistentHashRouter
+    :keyword max_attempts: Endpoints tried per call. Default value is None, every endpoint.
+    :paramtype max_attempts: int
+    :keyword eject_after: Consecutive failures that eject an endpoint. Default value is 3.
+    :paramtype eject_after: int
+    :keyword ejection_time: Seconds an ejected endpoint stays out of rotation. Default value is 30.
+    :paramtype ejection_time: float
+    :keyword health_check_interval: Seconds between background health checks of every endpoint.
+     Default value is None, endpoints are only checked by :meth:`health_check`.
+    :paramtype health_check_interval: float
+
+    Any other keyword arguments are forwarded to the :class:`~maq_rai_sdk.MAQRAISDK` client created
+    for each endpoint.
+    """
+
+    def __init__(
+        self,
+        endpoints: Sequence[EndpointSpec],
+        *,
+        router: Any = None,
+        max_attempts: Optional[int] = None,
+        eject_after: int = 3,
+        ejection_time: float = 30.0,
+        health_check_interval: Optional[float] = None,
+        **kwargs: Any
+    ) -> None:
+        if kwargs.get("submission_queue") is not None:
+            raise ValueError("Drain a SubmissionQueue through a MultiEndpointClient with a QueueDrainer.")
+        if kwargs.get("circuit_breakers") is True:
+            kwargs["circuit_breakers"] = CircuitBreakers()
+        if kwargs.get("resilient") is True:
+            kwargs["resilient"] = RetryBudget()
+        members = []
+        for spec in endpoints:
+            url, key = _parse_endpoint(spec)
+            members.append(Endpoint(url, MAQRAISDK(endpoint=_with_function_key(url, key), **kwargs)))
+        self._pool = EndpointPool(
+            members, router=router, eject_after=eject_after, ejection_time=ejection_time
+        )
+        self._max_attempts = max_attempts
+        self._client_kwargs = kwargs
+        self.reviewer = _RoutedReviewerOperations(self)
+        self.testcase = _RoutedTestcaseOperations(self)
+        self._stop = threading.Event()
+        self._health_thread: Optional[threading.Thread] = None
+        if health_check_interval:
+            self._health_thread = threading.Thread(
+                target=self._health_loop, args=(health_check_interval,), name="maq-rai-health", daemon=True
+            )
+            self._health_thread.start()
+
+    @property
+    def endpoints(self) -> list[Endpoint]:
+        """The endpoints and their routing state.
+
+        :return: The endpoints.
+        :rtype: list[~maq_rai_sdk.Endpoint]
+        """
+        return self._pool.endpoints
+
+    def add_endpoint(self, url: str, key: Optional[str] = None) -> Endpoint:
+        """Add an endpoint to the rotation.
+
+        :param str url: The endpoint URL.
+        :param key: The Function App host key. Default value is None.
+        :type key: str or None
+        :return: The new endpoint.
+        :rtype: ~maq_rai_sdk.Endpoint
+        """
+        endpoint = Endpoint(url, MAQRAISDK(endpoint=_with_function_key(url, key), **self._client_kwargs))
+        self._pool.add(endpoint)
+        return endpoint
+
+    def remove_endpoint(self, url: str) -> None:
+        """Take an endpoint out of the rotation and close its client.
+
+        :param str url: The endpoint URL, without its key.
+        """
+        self._pool.remove(url).client.close()
+
+    def metrics(self) -> dict[str, Any]:
+        """Return the routing and circuit state of every endpoint.
+
+        :return: ``{"endpoints": [...]}`` with one :meth:`~maq_rai_sdk.Endpoint.snapshot` per endpoint,
+         and ``"circuits"`` with :meth:`~maq_rai_sdk.CircuitBreakers.snapshot` if circuit breaking is on.
+        :rtype: dict
+        """
+        metrics: dict[str, Any] = {"endpoints": self._pool.snapshot()}
+        breakers = self._client_kwargs.get("circuit_breakers")
+        if isinstance(breakers, CircuitBreakers):
+            metrics["circuits"] = breakers.snapshot()
+        return metrics
+
+    def _call(self, invoke: Callable[..., Any], body: Any, kwargs: dict[str, Any]) -> Any:
+        key = _routing_key(body)
+        attempts = 1 if isinstance(body, IOBase) else self._max_attempts or len(self._pool.endpoints)
+        user_cls = kwargs.pop("cls", None)
+        tried: list[Endpoint] = []
+        error: Optional[BaseException] = None
+        result = None
+        for _ in range(attempts):
+            endpoint = self._pool.acquire(key, tried)
+            if endpoint is None:
+                break
+            tried.append(endpoint)
+            statuses: list[int] = []
+            started = time.monotonic()
+            ok: Optional[bool] = None  # stays None for errors that are not the endpoint's fault
+            try:
+                result = invoke(endpoint.client, cls=_status_recorder(user_cls, statuses), **kwargs)
+                ok = _call_outcome(statuses)
+                error = None
+            except Exception as err:  # pylint: disable=broad-except
+                if not _is_failover_error(err):
+                    raise
+                ok = False
+                error = err
+            finally:
+                self._pool.release(endpoint, time.monotonic() - started, ok)
+            if ok is not False:
+                return result
+        if error is not None:
+            raise error
+        return result
+
+    def health_check(self) -> dict[str, bool]:
+        """Probe every endpoint once and update its health.
+
+        An endpoint is healthy when a plain ``GET`` to it gets any answer below 500.
+
+        :return: Health per endpoint URL.
+        :rtype: dict[str, bool]
+        """
+        results = {}
+        for endpoint in self._pool.endpoints:
+            try:
+                request = HttpRequest("GET", "/", headers={"Cache-Control": "no-store"})
+                healthy = endpoint.client.send_request(request).status_code < 500
+            except Exception:  # pylint: disable=broad-except
+                healthy = False
+            self._pool.mark_health(endpoint, healthy)
+            results[endpoint.url] = healthy
+        return results
+
+    def _health_loop(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            self.health_check()
+
+    def close(self) -> None:
+        """Stop the health checks and close every endpoint client."""
+        self._stop.set()
+        if self._health_thread is not None:
+            self._health_thread.join()
+        for endpoint in self._pool.endpoints:
+            endpoint.client.close()
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_details: Any) -> None:
+        self.close()
+
+
+__all__: list[str] = [
+    "MAQRAISDK",
+    "AdaptiveLROBasePolling",
+    "BatchCoordinator",
+    "BatchWorker",
+    "CacheEntry",
+    "CircuitBreaker",
+    "CircuitBreakerPolicy",
+    "CircuitBreakers",
+    "CircuitOpenError",
+    "ClientRegistry",
+    "CodecContentDecodePolicy",
+    "ContentCodec",
+    "ContentNegotiationPolicy",
+    "ConsistentHashRouter",
+    "ContentNegotiator",
+    "ConvergeResult",
+    "DeadLetter",
+    "DeadLetterError",
+    "DeadlineExceededError",
+    "DnsCache",
+    "DnsCachingAdapter",
+    "Endpoint",
+    "EndpointPool",
+    "FileRateLimiter",
+    "LatencyHistogram",
+    "LeastLoadedRouter",
+    "MultiEndpointClient",
+    "QueueDrainer",
+    "QueuedCall",
+    "RateLimitPolicy",
+    "RateLimiter",
+    "RequestCompressionPolicy",
+    "ResilientRetryPolicy",
+    "ResponseCache",
+    "ResponseCachePolicy",
+    "ResponseDecompressionPolicy",
+    "RetryBudget",
+    "ShardedBatchRunner",
+    "SqliteRateLimiter",
+    "SubmissionQueue",
+    "available_encodings",
+    "get_codec",
+    "register_codec",
+]  # Add all objects you want publicly available to users at this package level
 
 
 def patch_sdk():
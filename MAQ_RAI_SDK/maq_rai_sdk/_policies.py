@@ -0,0 +1,449 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""Pipeline policies used by the customized clients."""
+import random
+import time
+from typing import Any, Optional, Sequence, Tuple
+
+from azure.core.exceptions import ServiceRequestError, ServiceResponseError
+from azure.core.pipeline import PipelineRequest, PipelineResponse
+from azure.core.pipeline.policies import ContentDecodePolicy, HTTPPolicy, RetryPolicy, SansIOHTTPPolicy
+from azure.core.pipeline.policies._utils import get_retry_after
+from azure.core.rest._http_response_impl import HttpResponseImpl
+from azure.core.utils import case_insensitive_dict
+
+from ._cache import CacheEntry, ResponseCache, _parse_cache_control
+from ._circuit import CircuitBreaker, CircuitBreakers, CircuitOpenError, _endpoint_of
+from ._compression import available_encodings, check_encoding, compress, get_decoder
+from ._content import ContentNegotiator, JsonCodec, get_codec
+from ._ratelimit import RateLimiter
+from ._retry import RetryBudget
+
+
+class RequestCompressionPolicy(SansIOHTTPPolicy):
+    """Compress request bodies larger than a threshold and set ``Content-Encoding``.
+
+    Bodies that already carry a ``Content-Encoding`` or are streams are sent unchanged.
+    Add it as a per-call policy so a body is compressed once, not on every retry.
+
+    :param str encoding: Content coding to use: "gzip", "deflate", "br" or "zstd". Default value is "gzip".
+    :keyword threshold: Minimum body size in bytes to compress. Default value is 1024.
+    :paramtype threshold: int
+    :keyword level: Codec-specific compression level. Default value is None, the codec default.
+    :paramtype level: int
+    """
+
+    def __init__(self, encoding: str = "gzip", *, threshold: int = 1024, level: Optional[int] = None) -> None:
+        self.encoding = check_encoding(encoding)
+        self.threshold = threshold
+        self.level = level
+
+    def on_request(self, request: PipelineRequest) -> None:
+        http_request = request.http_request
+        if "Content-Encoding" in http_request.headers:
+            return
+        body = http_request.content
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        if not isinstance(body, bytes) or len(body) < self.threshold:
+            return
+        content_type = http_request.headers.get("Content-Type")
+        http_request.set_bytes_body(compress(self.encoding, body, self.level))
+        if content_type:
+            http_request.headers["Content-Type"] = content_type
+        http_request.headers["Content-Encoding"] = self.encoding
+
+
+class _ResponseDecompressionPolicyBase:
+    def __init__(self, accept_encodings: Optional[Sequence[str]] = None) -> None:
+        encodings = available_encodings() if accept_encodings is None else accept_encodings
+        self.accept_encodings = [check_encoding(e) for e in encodings]
+
+    def _prepare(self, request: PipelineRequest) -> bool:
+        """Advertise the accepted codings and switch the transport to streaming.
+
+        :param request: The PipelineRequest object.
+        :type request: ~azure.core.pipeline.PipelineRequest
+        :return: The ``stream`` option the caller asked for.
+        :rtype: bool
+        """
+        request.http_request.headers.setdefault("Accept-Encoding", ", ".join(self.accept_encodings))
+        options = request.context.options
+        stream = options.get("stream", False)
+        options["stream"] = True
+        return stream
+
+    @staticmethod
+    def _restore(request: PipelineRequest, stream: bool) -> None:
+        request.context.options["stream"] = stream
+
+
+class ResponseDecompressionPolicy(_ResponseDecompressionPolicyBase, HTTPPolicy):
+    """Negotiate ``Accept-Encoding`` and decode compressed responses while they stream in.
+
+    The body is read in raw chunks and fed through an incremental decoder, so the decoded
+    payload is ready before :class:`~azure.core.pipeline.policies.ContentDecodePolicy` and the
+    operations read it. Add it as a per-retry policy so it sits between the retry policy and
+    the transport.
+
+    :param accept_encodings: Codings to advertise, in order of preference. Default value is None,
+     every coding returned by :func:`~maq_rai_sdk.available_encodings`.
+    :type accept_encodings: list[str]
+    """
+
+    def send(self, request: PipelineRequest) -> PipelineResponse:
+        stream = self._prepare(request)
+        try:
+            response = self.next.send(request)
+        finally:
+            self._restore(request, stream)
+        if stream:
+            return response
+        http_response = response.http_response
+        decoder = get_decoder(http_response.headers.get("Content-Encoding"))
+        if decoder is None:
+            http_response.read()
+            return response
+        chunks = [decoder.decompress(chunk) for chunk in http_response.iter_raw()]
+        chunks.append(decoder.flush())
+        _set_decoded_content(http_response, b"".join(chunks))
+        return response
+
+
+def _set_decoded_content(http_response: Any, content: bytes) -> None:
+    # The transport must not decode the body a second time.
+    http_response._content = content  # pylint: disable=protected-access
+    for header in ("Content-Encoding", "Content-Length"):
+        if header in http_response.headers:
+            del http_response.headers[header]
+
+
+class ContentNegotiationPolicy(SansIOHTTPPolicy):
+    """Advertise the negotiated response media types and learn which ones the service accepts.
+
+    :param negotiator: The negotiation state shared with the operations.
+    :type negotiator: ~maq_rai_sdk.ContentNegotiator
+    """
+
+    def __init__(self, negotiator: ContentNegotiator) -> None:
+        self.negotiator = negotiator
+
+    def on_request(self, request: PipelineRequest) -> None:
+        headers = request.http_request.headers
+        if headers.get("Accept", JsonCodec.media_type) == JsonCodec.media_type:
+            headers["Accept"] = self.negotiator.accept_header()
+
+    def on_response(self, request: PipelineRequest, response: PipelineResponse) -> None:
+        http_response = response.http_response
+        self.negotiator.observe(http_response.headers, http_response.content_type)
+
+
+class CodecContentDecodePolicy(ContentDecodePolicy):
+    """ContentDecodePolicy that also decodes bodies of every registered :class:`~maq_rai_sdk.ContentCodec`.
+
+    The decoded body is what ``response.json()`` returns, so the operations work unchanged
+    whatever media type the service answered with.
+    """
+
+    def on_response(self, request: PipelineRequest, response: PipelineResponse) -> None:
+        if response.context.options.get("stream", True):
+            return
+        http_response = response.http_response
+        codec = get_codec(http_response.content_type)
+        if codec is None or isinstance(codec, JsonCodec):
+            super().on_response(request, response)
+            return
+        deserialized = codec.loads(http_response.content)
+        http_response._json = deserialized  # pylint: disable=protected-access
+        response.context[self.CONTEXT_NAME] = deserialized
+
+
+class _ResponseCachePolicyBase:
+    def __init__(self, cache: Optional[ResponseCache] = None) -> None:
+        self.cache = cache if cache is not None else ResponseCache()
+
+    def _lookup(self, request: PipelineRequest) -> Tuple[Optional[str], Optional[CacheEntry]]:
+        """Return the cache key of the request and its stored entry.
+
+        The key is None when the request bypasses the cache: methods other than GET, HEAD and
+        POST, streamed calls, stream bodies, requests carrying their own validator and
+        ``Cache-Control: no-store``.
+
+        :param request: The PipelineRequest object.
+        :type request: ~azure.core.pipeline.PipelineRequest
+        :return: The key and the entry, either of which may be None.
+        :rtype: tuple
+        """
+        http_request = request.http_request
+        headers = http_request.headers
+        if http_request.method.upper() not in ("GET", "HEAD", "POST"):
+            return None, None
+        if request.context.options.get("stream", False) or "If-None-Match" in headers:
+            return None, None
+        request_directives = _parse_cache_control(headers.get("Cache-Control"))
+        if "no-store" in request_directives:
+            return None, None
+        body = http_request.content
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        if body is not None and not isinstance(body, bytes):
+            return None, None
+        key = self.cache.key(http_request.method, http_request.url, headers, body)
+        entry = self.cache.get(key)
+        if entry is not None and "no-cache" in request_directives:
+            entry = entry._replace(expires=0.0)
+        return key, entry
+
+    def _revalidate(self, request: PipelineRequest, entry: Optional[CacheEntry]) -> bool:
+        if entry is None or not entry.etag:
+            return False
+        request.http_request.headers["If-None-Match"] = entry.etag
+        return True
+
+    def _complete(
+        self, request: PipelineRequest, key: str, entry: Optional[CacheEntry], response: PipelineResponse
+    ) -> Optional[CacheEntry]:
+        """Update the cache from ``response``.
+
+        :param request: The PipelineRequest object.
+        :type request: ~azure.core.pipeline.PipelineRequest
+        :param str key: The cache key.
+        :param entry: The entry that was revalidated, or None.
+        :type entry: ~maq_rai_sdk.CacheEntry or None
+        :param response: The PipelineResponse object.
+        :type response: ~azure.core.pipeline.PipelineResponse
+        :return: The entry to serve instead of ``response`` after a 304, otherwise None.
+        :rtype: ~maq_rai_sdk.CacheEntry or None
+        """
+        http_response = response.http_response
+        if entry is not None and http_response.status_code == 304:
+            self.cache._record("revalidations")  # pylint: disable=protected-access
+            return self.cache.refresh(key, entry, http_response.headers)
+        self.cache._record("misses")  # pylint: disable=protected-access
+        if http_response.status_code == 200:
+            self.cache.store(
+                key, http_response.status_code, http_response.reason, http_response.headers, http_response.content
+            )
+        return None
+
+    def _serve(self, request: PipelineRequest, entry: CacheEntry, response_type: type) -> PipelineResponse:
+        """Build a response holding the body of ``entry``.
+
+        :param request: The PipelineRequest object.
+        :type request: ~azure.core.pipeline.PipelineRequest
+        :param entry: The stored response.
+        :type entry: ~maq_rai_sdk.CacheEntry
+        :param type response_type: The in-memory response class of the sync or async pipeline.
+        :return: The PipelineResponse object.
+        :rtype: ~azure.core.pipeline.PipelineResponse
+        """
+        http_response = response_type(
+            request=request.http_request,
+            internal_response=None,
+            status_code=entry.status_code,
+            reason=entry.reason,
+            content_type=entry.headers.get("Content-Type"),
+            headers=case_insensitive_dict(entry.headers),
+            stream_download_generator=None,
+        )
+        http_response._content = entry.content  # pylint: disable=protected-access
+        http_response._is_stream_consumed = True  # pylint: disable=protected-access
+        http_response._is_closed = True  # pylint: disable=protected-access
+        codec = get_codec(http_response.content_type)
+        if codec is not None and not isinstance(codec, JsonCodec):
+            http_response._json = codec.loads(entry.content)  # pylint: disable=protected-access
+        return PipelineResponse(request.http_request, http_response, request.context)
+
+
+class ResponseCachePolicy(_ResponseCachePolicyBase, HTTPPolicy):
+    """Serve repeat calls from a :class:`~maq_rai_sdk.ResponseCache`.
+
+    Fresh entries (``Cache-Control: max-age``) are returned without sending a request. Stale
+    entries with an ``ETag`` are revalidated with ``If-None-Match``; a ``304 Not Modified`` is
+    answered with the stored body, so the operations see an ordinary 200 and the service can skip
+    the work for an unchanged prompt. Add it as the first per-call policy.
+
+    :param cache: The cache to use. Default value is None, a new private cache.
+    :type cache: ~maq_rai_sdk.ResponseCache
+    """
+
+    def send(self, request: PipelineRequest) -> PipelineResponse:
+        key, entry = self._lookup(request)
+        if key is None:
+            return self.next.send(request)
+        if entry is not None and entry.fresh:
+            self.cache._record("hits")  # pylint: disable=protected-access
+            return self._serve(request, entry, HttpResponseImpl)
+        conditional = self._revalidate(request, entry)
+        try:
+            response = self.next.send(request)
+        finally:
+            if conditional:
+                del request.http_request.headers["If-None-Match"]
+        renewed = self._complete(request, key, entry, response)
+        if renewed is None:
+            return response
+        response.http_response.close()
+        return self._serve(request, renewed, HttpResponseImpl)
+
+
+class _CircuitBreakerPolicyBase:
+    def __init__(self, breakers: Optional[CircuitBreakers] = None) -> None:
+        self.breakers = breakers if breakers is not None else CircuitBreakers()
+
+    def _admit(self, request: PipelineRequest) -> CircuitBreaker:
+        """Return the circuit of the request's endpoint if it lets the request through.
+
+        :param request: The PipelineRequest object.
+        :type request: ~azure.core.pipeline.PipelineRequest
+        :return: The circuit, to record the outcome on.
+        :rtype: ~maq_rai_sdk.CircuitBreaker
+        :raises ~maq_rai_sdk.CircuitOpenError: If the circuit is open.
+        """
+        url = request.http_request.url
+        breaker = self.breakers.get(url)
+        if not breaker.allow():
+            raise CircuitOpenError(_endpoint_of(url), breaker.retry_after)
+        return breaker
+
+    @staticmethod
+    def _failed(response: Optional[PipelineResponse], error: Optional[BaseException]) -> Optional[bool]:
+        """Classify the outcome of a call for the circuit.
+
+        :param response: The PipelineResponse object, or None if the call raised.
+        :type response: ~azure.core.pipeline.PipelineResponse or None
+        :param error: The exception raised by the call, or None.
+        :type error: BaseException or None
+        :return: True for 5xx answers, connection errors and timeouts, None if the call ended
+         without telling anything about the endpoint, otherwise False.
+        :rtype: bool or None
+        """
+        if response is not None:
+            return response.http_response.status_code >= 500
+        if isinstance(error, (ServiceRequestError, ServiceResponseError)):
+            return True
+        return False if isinstance(error, Exception) else None
+
+
+class CircuitBreakerPolicy(_CircuitBreakerPolicyBase, HTTPPolicy):
+    """Fail fast on endpoints whose :class:`~maq_rai_sdk.CircuitBreaker` is open.
+
+    5xx answers, connection errors and timeouts count as failures, and calls slower than the
+    latency threshold as slow. While a circuit is open, requests to its endpoint raise
+    :class:`~maq_rai_sdk.CircuitOpenError` without being sent. Add it as a per-call policy, in
+    front of the retry policy, so an open circuit is not retried and a call's retries make one
+    outcome.
+
+    :param breakers: The circuits to use. Default value is None, a new private set.
+    :type breakers: ~maq_rai_sdk.CircuitBreakers
+    """
+
+    def send(self, request: PipelineRequest) -> PipelineResponse:
+        breaker = self._admit(request)
+        started = time.monotonic()
+        response = None
+        error: Optional[BaseException] = None
+        try:
+            response = self.next.send(request)
+            return response
+        except BaseException as err:
+            error = err
+            raise
+        finally:
+            failed = self._failed(response, error)
+            if failed is None:
+                breaker._release()  # pylint: disable=protected-access
+            else:
+                breaker.record(time.monotonic() - started, not failed)
+
+
+_RESILIENT_STATUS_CODES = frozenset([500, 502, 503, 504])
+
+
+class _ResilientRetryPolicyBase:
+    budget: RetryBudget
+    backoff_factor: float
+    backoff_max: float
+
+    def _is_method_retryable(self, settings: Any, request: Any, response: Any = None) -> bool:
+        # The review and test case functions have no side effects, so POST is as safe to repeat as GET.
+        if request.method.upper() == "POST" and (response is None or response.status_code in _RESILIENT_STATUS_CODES):
+            return True
+        return super()._is_method_retryable(settings, request, response)  # type: ignore[misc]
+
+    def get_backoff_time(self, settings: dict[str, Any]) -> float:
+        """Return a random backoff between 0 and the exponential backoff of this retry.
+
+        :param dict settings: The retry settings.
+        :return: The backoff in seconds.
+        :rtype: float
+        """
+        attempts = max(len(settings["history"]), 1)
+        return random.uniform(0, min(self.backoff_max, self.backoff_factor * 2 ** (attempts - 1)))
+
+    def increment(self, settings: dict[str, Any], response: Any = None, error: Optional[Exception] = None) -> bool:
+        retry = super().increment(settings, response=response, error=error)  # type: ignore[misc]
+        return retry and self.budget._withdraw()  # pylint: disable=protected-access
+
+
+class ResilientRetryPolicy(_ResilientRetryPolicyBase, RetryPolicy):
+    """Retry policy of clients created with ``resilient``.
+
+    On top of :class:`~azure.core.pipeline.policies.RetryPolicy`, POST calls are retried after
+    500, 502, 503 and 504 answers, connection errors and timeouts. ``Retry-After`` is honored;
+    otherwise the wait is drawn at random up to the exponential backoff, so clients that failed
+    together do not retry together. Every retry is paid from ``budget``.
+
+    :param budget: The retry budget. Default value is None, a new private budget.
+    :type budget: ~maq_rai_sdk.RetryBudget
+
+    Any other keyword arguments are passed to :class:`~azure.core.pipeline.policies.RetryPolicy`.
+    """
+
+    def __init__(self, budget: Optional[RetryBudget] = None, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.budget = budget if budget is not None else RetryBudget()
+
+    def send(self, request: PipelineRequest) -> PipelineResponse:
+        self.budget._deposit()  # pylint: disable=protected-access
+        return super().send(request)
+
+
+_THROTTLING_STATUS_CODES = frozenset([429, 503])
+
+
+class _RateLimitPolicyBase:
+    def __init__(self, limiter: RateLimiter) -> None:
+        self.limiter = limiter
+
+    def _observe(self, response: PipelineResponse) -> None:
+        """Pause the limiter for the ``Retry-After`` of a throttled answer.
+
+        :param response: The PipelineResponse object.
+        :type response: ~azure.core.pipeline.PipelineResponse
+        """
+        if response.http_response.status_code in _THROTTLING_STATUS_CODES:
+            retry_after = get_retry_after(response)
+            if retry_after:
+                self.limiter.pause(retry_after)
+
+
+class RateLimitPolicy(_RateLimitPolicyBase, HTTPPolicy):
+    """Hold every attempt back until its :class:`~maq_rai_sdk.RateLimiter` lets it through.
+
+    A 429 or 503 answer carrying ``Retry-After`` pauses the limiter, so every call sharing it
+    waits, not only the one that was throttled. Add it as a per-retry policy so retries are
+    paced as well.
+
+    :param limiter: The rate limit to apply.
+    :type limiter: ~maq_rai_sdk.RateLimiter
+    """
+
+    def send(self, request: PipelineRequest) -> PipelineResponse:
+        self.limiter.acquire()
+        response = self.next.send(request)
+        self._observe(response)
+        return response
@@ -0,0 +1,74 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""Polling of long-running test case generation jobs."""
+import random
+from typing import Any, Optional
+
+from azure.core.pipeline import PipelineResponse
+from azure.core.pipeline.policies._utils import get_retry_after
+from azure.core.polling.base_polling import LROBasePolling
+
+
+class _AdaptivePollingMixin:
+    _pipeline_response: Any
+    _timeout: float
+
+    def _init_adaptive(self, min_interval: float, factor: float) -> None:
+        self.min_interval = min_interval
+        self.factor = factor
+        self.polls = 0
+
+    def _extract_delay(self) -> float:
+        retry_after = get_retry_after(self._pipeline_response)
+        if retry_after:
+            return retry_after
+        interval = min(self.min_interval * self.factor**self.polls, self._timeout)
+        self.polls += 1
+        return interval * random.uniform(0.9, 1.1)
+
+
+class AdaptiveLROBasePolling(_AdaptivePollingMixin, LROBasePolling):
+    """Polling method that checks on a job soon after submitting it, then less and less often.
+
+    The job is checked right after it is accepted, then after ``min_interval`` seconds, and every
+    following wait is ``factor`` times longer, up to ``timeout``. A ``Retry-After`` header from
+    the service always wins. Short jobs finish without waiting out a full interval, and long
+    jobs cost few status requests.
+
+    :param float timeout: Longest wait between two status checks, in seconds. Default value is 30,
+     the ``polling_interval`` of the client.
+    :keyword min_interval: Wait after the first status check, in seconds. Default value is 1.
+    :paramtype min_interval: float
+    :keyword factor: Growth of the wait after every check. Default value is 2.
+    :paramtype factor: float
+
+    Any other arguments are passed to :class:`~azure.core.polling.base_polling.LROBasePolling`.
+    """
+
+    def __init__(self, timeout: float = 30, *, min_interval: float = 1.0, factor: float = 2.0, **kwargs: Any) -> None:
+        super().__init__(timeout, **kwargs)
+        self._init_adaptive(min_interval, factor)
+
+
+def _job_result(pipeline_response: PipelineResponse) -> Optional[Any]:
+    """Extract the result of a finished job.
+
+    A service that ran the job right away answers with the result itself; otherwise the final
+    status resource carries it in its ``result`` property.
+
+    :param pipeline_response: The last response of the operation.
+    :type pipeline_response: ~azure.core.pipeline.PipelineResponse
+    :return: The deserialized result, or None if the response has no body.
+    :rtype: any
+    """
+    response = pipeline_response.http_response
+    if not response.content:
+        return None
+    body = response.json()
+    if isinstance(body, dict) and "status" in body and "result" in body:
+        return body["result"]
+    return body
+
@@ -0,0 +1,92 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""Connection pools sized for multi-threaded callers."""
+import threading
+import time
+from typing import Any, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from azure.core.pipeline.transport import RequestsTransport
+
+from ._dns import DnsCache, DnsCachingAdapter
+from ._metrics import LatencyHistogram
+
+
+class _TimedPoolMixin:
+    """Connection pool mixin recording in ``pool_wait`` how long each request waited for a connection."""
+
+    pool_wait: LatencyHistogram
+
+    def _get_conn(self, timeout: Optional[float] = None) -> Any:
+        started = time.monotonic()
+        try:
+            return super()._get_conn(timeout)  # type: ignore[misc]
+        finally:
+            self.pool_wait.observe(time.monotonic() - started)
+
+
+class _PoolWaitAdapterMixin:
+    """``requests`` adapter mixin whose connection pools record the time spent waiting for a connection."""
+
+    def __init__(self, *args: Any, pool_wait: LatencyHistogram, **kwargs: Any) -> None:
+        self.pool_wait = pool_wait  # read by init_poolmanager, which the adapter constructor calls
+        super().__init__(*args, **kwargs)  # type: ignore[call-arg]
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any) -> None:
+        super().init_poolmanager(*args, **kwargs)  # type: ignore[misc]
+        manager = self.poolmanager  # type: ignore[attr-defined]
+        manager.pool_classes_by_scheme = {
+            scheme: type(cls.__name__, (_TimedPoolMixin, cls), {"pool_wait": self.pool_wait})
+            for scheme, cls in manager.pool_classes_by_scheme.items()
+        }
+
+
+class _PoolWaitAdapter(_PoolWaitAdapterMixin, HTTPAdapter):
+    pass
+
+
+class _DnsCachingPoolWaitAdapter(_PoolWaitAdapterMixin, DnsCachingAdapter):
+    pass
+
+
+class _ThreadedRequestsTransport(RequestsTransport):
+    """Transport with a blocking pool of ``pool_size`` connections per host.
+
+    Threads beyond the pool size wait for a connection to come back instead of opening one that
+    is thrown away after the call; the waits are recorded in ``pool_wait``. The session is opened
+    under a lock, so threads making the first calls at once share one pool.
+    """
+
+    def __init__(
+        self, pool_size: int, pool_wait: LatencyHistogram, dns_cache: Optional[DnsCache] = None, **kwargs: Any
+    ) -> None:
+        self._pool_size = pool_size
+        self._pool_wait = pool_wait
+        self._dns_cache = dns_cache
+        self._open_lock = threading.Lock()
+        super().__init__(**kwargs)
+
+    def open(self) -> None:
+        with self._open_lock:
+            super().open()
+
+    def _init_session(self, session: requests.Session) -> None:
+        super()._init_session(session)
+        adapter_kwargs: dict[str, Any] = {
+            "pool_maxsize": self._pool_size,
+            "pool_block": True,
+            "max_retries": Retry(total=False, redirect=False, raise_on_status=False),
+            "pool_wait": self._pool_wait,
+        }
+        if self._dns_cache is not None:
+            adapter: HTTPAdapter = _DnsCachingPoolWaitAdapter(self._dns_cache, **adapter_kwargs)
+        else:
+            adapter = _PoolWaitAdapter(**adapter_kwargs)
+        for prefix in self._protocols:
+            session.mount(prefix, adapter)
@@ -0,0 +1,520 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""Durable local queue of calls, drained in the background."""
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, NamedTuple, Optional
+
+from azure.core.exceptions import AzureError, HttpResponseError
+
+from ._deadline import DeadlineExceededError
+from ._routing import _is_failover_error
+from .operations._patch import _raise_for_status
+
+_LOGGER = logging.getLogger(__name__)
+
+_OPERATIONS = {"reviewer": ("reviewer", "post"), "testcase": ("testcase", "generator_post")}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS calls (
+    ticket TEXT PRIMARY KEY,
+    operation TEXT NOT NULL,
+    body TEXT NOT NULL,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    visible_at REAL NOT NULL,
+    lease TEXT,
+    result TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS calls_ready ON calls (state, visible_at);
+CREATE TABLE IF NOT EXISTS dead_letters (
+    ticket TEXT PRIMARY KEY,
+    operation TEXT NOT NULL,
+    body TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    error TEXT,
+    failed_at REAL NOT NULL
+);
+"""
+
+
+class QueuedCall(NamedTuple):
+    """A call leased from a :class:`~maq_rai_sdk.SubmissionQueue` by a worker."""
+
+    ticket: str
+    operation: str
+    body: Any
+    attempts: int
+    lease: str
+
+
+class DeadLetter(NamedTuple):
+    """A call that failed for good and was moved to the dead-letter table."""
+
+    ticket: str
+    operation: str
+    body: Any
+    attempts: int
+    error: Optional[str]
+    failed_at: float
+
+
+class DeadLetterError(AzureError):
+    """The queued call failed for good and was moved to the dead-letter table.
+
+    :param str ticket: The ticket of the call.
+    :param error: The last error of the call.
+    :type error: str or None
+    :ivar str ticket: The ticket of the call.
+    """
+
+    def __init__(self, ticket: str, error: Optional[str], **kwargs: Any) -> None:
+        self.ticket = ticket
+        super().__init__("Queued call {} failed: {}".format(ticket, error), **kwargs)
+
+
+class SubmissionQueue:
+    """Durable queue of calls in a SQLite database, so calls are accepted while the service is slow or down.
+
+    :meth:`put` stores a call and returns its ticket at once. Workers, usually a
+    :class:`~maq_rai_sdk.QueueDrainer`, :meth:`lease` calls, which hides them from other workers
+    for ``visibility_timeout`` seconds, and then :meth:`complete` or :meth:`fail` them. A call
+    whose worker died becomes visible again once its lease expires. A call that fails
+    ``max_attempts`` times, or with an error that retrying cannot fix, moves to the dead-letter
+    table. Several processes can share the database file.
+
+    :param str path: Path of the SQLite database, created if needed.
+    :keyword visibility_timeout: Seconds a leased call stays hidden from other workers. Default value is 300.
+    :paramtype visibility_timeout: float
+    :keyword max_attempts: Attempts before a call is dead-lettered. Default value is 5.
+    :paramtype max_attempts: int
+    """
+
+    def __init__(self, path: str, *, visibility_timeout: float = 300.0, max_attempts: int = 5) -> None:
+        if max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1")
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self._db: Optional[sqlite3.Connection] = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._lock = threading.Lock()
+        self._finished = threading.Condition(self._lock)
+        with self._lock:
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        if self._db is None:
+            raise ValueError("SubmissionQueue has already been closed.")
+        return self._db
+
+    def put(self, operation: str, body: Any) -> str:
+        """Store a call.
+
+        :param str operation: "reviewer" for ``reviewer.post`` or "testcase" for ``testcase.generator_post``.
+        :param any body: The JSON body of the call.
+        :return: The ticket of the call.
+        :rtype: str
+        :raises ValueError: If the operation is unknown.
+        :raises TypeError: If the body cannot be serialized to JSON.
+        """
+        if operation not in _OPERATIONS:
+            raise ValueError("Unknown operation {!r}, expected one of: {}".format(operation, ", ".join(_OPERATIONS)))
+        ticket = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._connection().execute(
+                "INSERT INTO calls (ticket, operation, body, state, visible_at, created_at) "
+                "VALUES (?, ?, ?, 'queued', ?, ?)",
+                (ticket, operation, json.dumps(body), now, now),
+            )
+        return ticket
+
+    def lease(self, limit: int = 1) -> list[QueuedCall]:
+        """Take up to ``limit`` calls that are due, oldest first.
+
+        Calls whose lease expired after their last attempt, because their worker died, are moved
+        to the dead-letter table instead.
+
+        :param int limit: Maximum number of calls. Default value is 1.
+        :return: The leased calls, possibly none.
+        :rtype: list[~maq_rai_sdk.QueuedCall]
+        """
+        now = time.time()
+        with self._lock:
+            db = self._connection()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                expired = db.execute(
+                    "SELECT ticket FROM calls WHERE state = 'running' AND visible_at <= ? AND attempts >= ?",
+                    (now, self.max_attempts),
+                ).fetchall()
+                for (ticket,) in expired:
+                    db.execute(
+                        "UPDATE calls SET state = 'dead', error = ?, lease = NULL, finished_at = ? WHERE ticket = ?",
+                        ("Lease expired on the last attempt.", now, ticket),
+                    )
+                    db.execute(
+                        "INSERT OR REPLACE INTO dead_letters (ticket, operation, body, attempts, error, failed_at) "
+                        "SELECT ticket, operation, body, attempts, error, ? FROM calls WHERE ticket = ?",
+                        (now, ticket),
+                    )
+                rows = db.execute(
+                    "SELECT ticket, operation, body, attempts FROM calls "
+                    "WHERE state IN ('queued', 'running') AND visible_at <= ? AND attempts < ? "
+                    "ORDER BY created_at LIMIT ?",
+                    (now, self.max_attempts, limit),
+                ).fetchall()
+                calls = []
+                for ticket, operation, body, attempts in rows:
+                    lease = uuid.uuid4().hex
+                    db.execute(
+                        "UPDATE calls SET state = 'running', attempts = ?, visible_at = ?, lease = ? WHERE ticket = ?",
+                        (attempts + 1, now + self.visibility_timeout, lease, ticket),
+                    )
+                    calls.append(QueuedCall(ticket, operation, json.loads(body), attempts + 1, lease))
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            if expired:
+                self._finished.notify_all()
+        return calls
+
+    def complete(self, call: QueuedCall, result: Any) -> bool:
+        """Record the result of a leased call.
+
+        :param call: The call, as returned by :meth:`lease`.
+        :type call: ~maq_rai_sdk.QueuedCall
+        :param any result: The JSON result of the call.
+        :return: False if the lease had expired and the call was taken by another worker; the
+         result is then dropped.
+        :rtype: bool
+        """
+        with self._lock:
+            cursor = self._connection().execute(
+                "UPDATE calls SET state = 'done', result = ?, error = NULL, lease = NULL, finished_at = ? "
+                "WHERE ticket = ? AND lease = ?",
+                (json.dumps(result), time.time(), call.ticket, call.lease),
+            )
+            self._finished.notify_all()
+        return cursor.rowcount == 1
+
+    def fail(self, call: QueuedCall, error: str, *, retry_in: Optional[float] = None) -> bool:
+        """Record a failed attempt of a leased call.
+
+        :param call: The call, as returned by :meth:`lease`.
+        :type call: ~maq_rai_sdk.QueuedCall
+        :param str error: Description of the error.
+        :keyword retry_in: Seconds before the call is due again. Default value is None, the call
+         is dead-lettered right away.
+        :paramtype retry_in: float
+        :return: False if the lease had expired and the call was taken by another worker.
+        :rtype: bool
+        """
+        now = time.time()
+        with self._lock:
+            db = self._connection()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                if retry_in is not None and call.attempts < self.max_attempts:
+                    cursor = db.execute(
+                        "UPDATE calls SET state = 'queued', error = ?, lease = NULL, visible_at = ? "
+                        "WHERE ticket = ? AND lease = ?",
+                        (error, now + retry_in, call.ticket, call.lease),
+                    )
+                else:
+                    cursor = db.execute(
+                        "UPDATE calls SET state = 'dead', error = ?, lease = NULL, finished_at = ? "
+                        "WHERE ticket = ? AND lease = ?",
+                        (error, now, call.ticket, call.lease),
+                    )
+                    if cursor.rowcount == 1:
+                        db.execute(
+                            "INSERT OR REPLACE INTO dead_letters (ticket, operation, body, attempts, error, failed_at) "
+                            "SELECT ticket, operation, body, attempts, error, ? FROM calls WHERE ticket = ?",
+                            (now, call.ticket),
+                        )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+            self._finished.notify_all()
+        return cursor.rowcount == 1
+
+    def status(self, ticket: str) -> Optional[str]:
+        """Return the state of a call: "queued", "running", "done" or "dead".
+
+        :param str ticket: The ticket returned by :meth:`put`.
+        :return: The state, or None for an unknown ticket.
+        :rtype: str or None
+        """
+        with self._lock:
+            row = self._connection().execute("SELECT state FROM calls WHERE ticket = ?", (ticket,)).fetchone()
+        return row[0] if row else None
+
+    def result(self, ticket: str, timeout: Optional[float] = None) -> Any:
+        """Wait for a call to finish and return its result.
+
+        :param str ticket: The ticket returned by :meth:`put`.
+        :param timeout: Longest wait in seconds. Default value is None, no limit.
+        :type timeout: float or None
+        :return: The JSON result of the call.
+        :rtype: any
+        :raises ValueError: If the ticket is unknown.
+        :raises ~maq_rai_sdk.DeadLetterError: If the call was dead-lettered.
+        :raises TimeoutError: If the call did not finish within ``timeout``.
+        """
+        give_up = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while True:
+                row = self._connection().execute(
+                    "SELECT state, result, error FROM calls WHERE ticket = ?", (ticket,)
+                ).fetchone()
+                if row is None:
+                    raise ValueError("Unknown ticket {!r}.".format(ticket))
+                state, result, error = row
+                if state == "done":
+                    return json.loads(result)
+                if state == "dead":
+                    raise DeadLetterError(ticket, error)
+                wait = 0.5  # calls finished by other processes are only seen by polling
+                if give_up is not None:
+                    wait = min(wait, give_up - time.monotonic())
+                    if wait <= 0:
+                        raise TimeoutError("Queued call {} has not finished.".format(ticket))
+                self._finished.wait(wait)
+
+    def forget(self, ticket: str) -> None:
+        """Delete a call and its result, for example once the result was collected.
+
+        :param str ticket: The ticket returned by :meth:`put`.
+        """
+        with self._lock:
+            self._connection().execute("DELETE FROM calls WHERE ticket = ?", (ticket,))
+
+    def dead_letters(self) -> list[DeadLetter]:
+        """Return the dead-lettered calls, oldest first.
+
+        :return: The dead letters.
+        :rtype: list[~maq_rai_sdk.DeadLetter]
+        """
+        with self._lock:
+            rows = self._connection().execute(
+                "SELECT ticket, operation, body, attempts, error, failed_at FROM dead_letters ORDER BY failed_at"
+            ).fetchall()
+        return [
+            DeadLetter(ticket, op, json.loads(body), attempts, error, at)
+            for ticket, op, body, attempts, error, at in rows
+        ]
+
+    def requeue(self, ticket: str) -> None:
+        """Move a dead-lettered call back into the queue with a fresh set of attempts.
+
+        :param str ticket: The ticket of the dead letter.
+        :raises ValueError: If there is no dead letter with this ticket.
+        """
+        with self._lock:
+            db = self._connection()
+            db.execute("BEGIN IMMEDIATE")
+            try:
+                if db.execute("DELETE FROM dead_letters WHERE ticket = ?", (ticket,)).rowcount != 1:
+                    raise ValueError("No dead letter with ticket {!r}.".format(ticket))
+                db.execute(
+                    "UPDATE calls SET state = 'queued', attempts = 0, visible_at = ?, finished_at = NULL "
+                    "WHERE ticket = ?",
+                    (time.time(), ticket),
+                )
+                db.execute("COMMIT")
+            except BaseException:
+                db.execute("ROLLBACK")
+                raise
+
+    def counts(self) -> dict[str, int]:
+        """Return the number of calls in each state.
+
+        :return: Counts for "queued", "running", "done" and "dead".
+        :rtype: dict[str, int]
+        """
+        counts = {"queued": 0, "running": 0, "done": 0, "dead": 0}
+        with self._lock:
+            for state, count in self._connection().execute("SELECT state, COUNT(*) FROM calls GROUP BY state"):
+                counts[state] = count
+        return counts
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+            self._finished.notify_all()
+
+    def __repr__(self) -> str:
+        return "<SubmissionQueue path={!r} visibility_timeout={} max_attempts={}>".format(
+            self.path, self.visibility_timeout, self.max_attempts
+        )
+
+
+class QueueDrainer:
+    """Worker threads sending the calls of a :class:`~maq_rai_sdk.SubmissionQueue` through a client.
+
+    Each worker leases one call at a time and stores its result. Connection errors, timeouts,
+    429 and 5xx answers are retried with exponential backoff, or after the ``Retry-After`` the
+    service asked for; other errors dead-letter the call. Pace the workers with the client's
+    ``rate_limit``. Clients created with ``submission_queue`` run a drainer of their own; create
+    one directly to drain a queue filled by another process.
+
+    :param client: The client sending the calls.
+    :type client: ~maq_rai_sdk.MAQRAISDK or ~maq_rai_sdk.MultiEndpointClient
+    :param queue: The queue to drain.
+    :type queue: ~maq_rai_sdk.SubmissionQueue
+    :keyword workers: Number of worker threads. Default value is 2.
+    :paramtype workers: int
+    :keyword poll_interval: Seconds an idle worker waits before looking for calls again. Default value is 0.5.
+    :paramtype poll_interval: float
+    :keyword backoff: Wait before the first retry of a call, doubled on every further attempt.
+     Default value is 1.
+    :paramtype backoff: float
+    :keyword max_backoff: Longest wait between two attempts of a call. Default value is 300.
+    :paramtype max_backoff: float
+    :ivar int succeeded: Calls completed by this drainer.
+    :ivar int retried: Attempts that failed and were scheduled again.
+    :ivar int dead_lettered: Calls this drainer moved to the dead-letter table.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        queue: SubmissionQueue,
+        *,
+        workers: int = 2,
+        poll_interval: float = 0.5,
+        backoff: float = 1.0,
+        max_backoff: float = 300.0,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.client = client
+        self.queue = queue
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.succeeded = 0
+        self.retried = 0
+        self.dead_lettered = 0
+        self._stats_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    @property
+    def running(self) -> bool:
+        """Whether the workers are running.
+
+        :return: True between :meth:`start` and :meth:`stop`.
+        :rtype: bool
+        """
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self) -> None:
+        """Start the worker threads."""
+        if self.running:
+            return
+        self._stop.clear()
+        self._threads = [
+            threading.Thread(target=self._work, name="maq-rai-drain-{}".format(index), daemon=True)
+            for index in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop the workers after their current call. Calls left running become due again when
+        their lease expires.
+
+        :param timeout: Longest wait for each worker in seconds. Default value is None, no limit.
+        :type timeout: float or None
+        """
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _work(self) -> None:
+        while not self._stop.is_set():
+            try:
+                calls = self.queue.lease()
+            except (sqlite3.Error, ValueError):
+                if self._stop.is_set():
+                    return
+                _LOGGER.warning("Could not lease from %s.", self.queue.path, exc_info=True)
+                calls = []
+            if not calls:
+                self._stop.wait(self.poll_interval)
+                continue
+            self._run(calls[0])
+
+    def _run(self, call: QueuedCall) -> None:
+        group, name = _OPERATIONS[call.operation]
+        operation = getattr(getattr(self.client, group), name)
+        try:
+            result = operation(call.body, timeout=self.queue.visibility_timeout, cls=_raise_for_status(None))
+        except Exception as error:  # pylint: disable=broad-except
+            retry_in = self._retry_in(call, error)
+            self.queue.fail(call, "{}: {}".format(type(error).__name__, error), retry_in=retry_in)
+            dead = retry_in is None or call.attempts >= self.queue.max_attempts
+            _LOGGER.info("Queued call %s failed on attempt %d: %s", call.ticket, call.attempts, error)
+            with self._stats_lock:
+                if dead:
+                    self.dead_lettered += 1
+                else:
+                    self.retried += 1
+            return
+        self.queue.complete(call, result)
+        with self._stats_lock:
+            self.succeeded += 1
+
+    def _retry_in(self, call: QueuedCall, error: Exception) -> Optional[float]:
+        """Return the wait before the next attempt of ``call``, or None if retrying is pointless.
+
+        :param call: The call that failed.
+        :type call: ~maq_rai_sdk.QueuedCall
+        :param error: The error raised by the call.
+        :type error: Exception
+        :return: Seconds until the next attempt, or None.
+        :rtype: float or None
+        """
+        if not (_is_failover_error(error) or isinstance(error, DeadlineExceededError)):
+            return None
+        response = getattr(error, "response", None)
+        if isinstance(error, HttpResponseError) and response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return float(retry_after)
+        return random.uniform(0.5, 1.0) * min(self.max_backoff, self.backoff * 2 ** (call.attempts - 1))
+
+    def __enter__(self) -> "QueueDrainer":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_details: Any) -> None:
+        self.stop()
+
+    def __repr__(self) -> str:
+        return "<QueueDrainer workers={} succeeded={} retried={} dead_lettered={}>".format(
+            self.workers, self.succeeded, self.retried, self.dead_lettered
+        )
+
@@ -0,0 +1,259 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""Token bucket rate limits for calls to the service."""
+import asyncio
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, NamedTuple, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore
+
+
+class _Bucket(NamedTuple):
+    tokens: float
+    updated: float
+    paused_until: float
+
+    def take(self, rate: float, burst: float, now: float) -> Tuple["_Bucket", float]:
+        """Refill the bucket up to ``now`` and take a token if there is one.
+
+        :param float rate: Tokens added per second.
+        :param float burst: Capacity of the bucket.
+        :param float now: The current time.
+        :return: The new state, and 0 if a token was taken or else the seconds until one is due.
+        :rtype: tuple
+        """
+        if now < self.paused_until:
+            return self, self.paused_until - now
+        tokens = min(burst, self.tokens + max(now - self.updated, 0.0) * rate)
+        if tokens >= 1:
+            return _Bucket(tokens - 1, now, self.paused_until), 0.0
+        return _Bucket(tokens, now, self.paused_until), (1 - tokens) / rate
+
+    def pause(self, until: float) -> "_Bucket":
+        return self._replace(paused_until=max(self.paused_until, until))
+
+
+class RateLimiter:
+    """Limits the calls of one or more clients to ``rate`` per second.
+
+    A token bucket: after an idle period up to ``burst`` calls start at once, then calls are
+    spaced ``1 / rate`` seconds apart. :meth:`pause` holds every call back for a while; clients
+    created with ``rate_limit`` pause when the service answers 429 or 503 with ``Retry-After``.
+    One instance can be shared by the threads and clients of a process.
+
+    :param float rate: Calls allowed per second.
+    :keyword burst: Calls that may start at once after an idle period. Default value is None,
+     ``rate`` rounded up, and at least 1.
+    :paramtype burst: float
+    :ivar int acquired: Calls let through.
+    :ivar float waited: Seconds calls spent waiting for the limiter.
+    """
+
+    def __init__(self, rate: float, *, burst: Optional[float] = None) -> None:
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.burst = float(burst if burst is not None else max(math.ceil(rate), 1))
+        if self.burst < 1:
+            raise ValueError("burst must be at least 1")
+        self.acquired = 0
+        self.waited = 0.0
+        self._bucket = _Bucket(self.burst, self._now(), 0.0)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _now() -> float:
+        return time.time()
+
+    def _update(self, change: Callable[[_Bucket], Tuple[_Bucket, Any]]) -> Any:
+        """Apply ``change`` to the bucket atomically. Shared limiters keep the bucket elsewhere.
+
+        :param change: Returns the new bucket and a result.
+        :type change: Callable
+        :return: The result of ``change``.
+        :rtype: any
+        """
+        with self._lock:
+            self._bucket, result = change(self._bucket)
+        return result
+
+    def try_acquire(self) -> float:
+        """Take a call's token if one is available, without waiting.
+
+        :return: 0 if the call may start, otherwise the seconds to wait before trying again.
+        :rtype: float
+        """
+        wait = self._update(lambda bucket: bucket.take(self.rate, self.burst, self._now()))
+        if not wait:
+            with self._lock:
+                self.acquired += 1
+        return wait
+
+    def _waited(self, started: float) -> None:
+        with self._lock:
+            self.waited += time.monotonic() - started
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Wait until a call may start.
+
+        :param timeout: Longest wait in seconds. Default value is None, no limit.
+        :type timeout: float or None
+        :return: True once the call may start, False if ``timeout`` elapsed first.
+        :rtype: bool
+        """
+        started = time.monotonic()
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                self._waited(started)
+                return True
+            if timeout is not None:
+                remaining = started + timeout - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        """Wait on the event loop until a call may start."""
+        started = time.monotonic()
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                self._waited(started)
+                return
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Hold every call back for ``seconds``.
+
+        :param float seconds: The pause, for example the ``Retry-After`` of a throttled call.
+        """
+        until = self._now() + seconds
+        self._update(lambda bucket: (bucket.pause(until), None))
+
+    def __repr__(self) -> str:
+        return "<{} rate={} burst={} acquired={} waited={:.1f}s>".format(
+            type(self).__name__, self.rate, self.burst, self.acquired, self.waited
+        )
+
+
+class FileRateLimiter(RateLimiter):
+    """A :class:`~maq_rai_sdk.RateLimiter` shared by every process opening the same file.
+
+    The token bucket is kept in the file at ``path`` and updated under an exclusive ``flock``,
+    so worker processes on one host draw from a single budget. Pickling the limiter, for
+    example to hand it to a :mod:`multiprocessing` worker, keeps it attached to the file.
+    Counters such as ``acquired`` are per process. Not available on Windows.
+
+    :param str path: Path of the state file, created if needed.
+    :param float rate: Calls allowed per second, over all processes.
+    :keyword burst: Calls that may start at once after an idle period. Default value is None,
+     ``rate`` rounded up, and at least 1.
+    :paramtype burst: float
+    :raises RuntimeError: On platforms without ``fcntl``, such as Windows.
+    """
+
+    def __init__(self, path: str, rate: float, *, burst: Optional[float] = None) -> None:
+        if fcntl is None:
+            raise RuntimeError("FileRateLimiter needs fcntl, which is not available on this platform.")
+        super().__init__(rate, burst=burst)
+        self.path = path
+
+    def _update(self, change: Callable[[_Bucket], Tuple[_Bucket, Any]]) -> Any:
+        with self._lock:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                raw = os.read(fd, 256)
+                bucket = _Bucket(*json.loads(raw)) if raw else _Bucket(self.burst, self._now(), 0.0)
+                bucket, result = change(bucket)
+                os.lseek(fd, 0, os.SEEK_SET)
+                os.ftruncate(fd, 0)
+                os.write(fd, json.dumps(bucket).encode("ascii"))
+            finally:
+                os.close(fd)  # releases the lock
+        return result
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (FileRateLimiter, (self.path, self.rate), {"burst": self.burst})
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.burst = state["burst"]
+
+    def __repr__(self) -> str:
+        return "<FileRateLimiter path={!r} rate={} burst={} acquired={} waited={:.1f}s>".format(
+            self.path, self.rate, self.burst, self.acquired, self.waited
+        )
+
+
+class SqliteRateLimiter(RateLimiter):
+    """A :class:`~maq_rai_sdk.RateLimiter` shared through a SQLite database.
+
+    The token bucket is a row of the ``rate_buckets`` table, updated in a write transaction, so
+    every process and host using the database draws from one budget. Limiters with different
+    ``key`` values are independent. Hosts must have synchronized clocks. Pickling the limiter
+    keeps it attached to the database.
+
+    :param str path: Path of the SQLite database, created if needed.
+    :param float rate: Calls allowed per second, over every user of the bucket.
+    :keyword burst: Calls that may start at once after an idle period. Default value is None,
+     ``rate`` rounded up, and at least 1.
+    :paramtype burst: float
+    :keyword key: Name of the bucket. Default value is "default".
+    :paramtype key: str
+    """
+
+    def __init__(self, path: str, rate: float, *, burst: Optional[float] = None, key: str = "default") -> None:
+        super().__init__(rate, burst=burst)
+        self.path = path
+        self.key = key
+        self._db = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        with self._lock:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS rate_buckets "
+                "(key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL, paused_until REAL NOT NULL)"
+            )
+
+    def _update(self, change: Callable[[_Bucket], Tuple[_Bucket, Any]]) -> Any:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT tokens, updated, paused_until FROM rate_buckets WHERE key = ?", (self.key,)
+                ).fetchone()
+                bucket, result = change(_Bucket(*row) if row else _Bucket(self.burst, self._now(), 0.0))
+                self._db.execute("INSERT OR REPLACE INTO rate_buckets VALUES (?, ?, ?, ?)", (self.key, *bucket))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return result
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._db.close()
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (SqliteRateLimiter, (self.path, self.rate), {"burst": self.burst, "key": self.key})
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.burst = state["burst"]
+        self.key = state["key"]
+
+    def __repr__(self) -> str:
+        return "<SqliteRateLimiter path={!r} key={!r} rate={} burst={} acquired={} waited={:.1f}s>".format(
+            self.path, self.key, self.rate, self.burst, self.acquired, self.waited
+        )
@@ -0,0 +1,63 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""Client-wide retry budget."""
+import threading
+
+
+class RetryBudget:
+    """Caps retries at a share of the calls made, so retries cannot multiply an overload.
+
+    Every call earns ``ratio`` retry tokens and every retry spends one; once the tokens are
+    used up, failed attempts are returned or raised as they are. At most ``burst`` tokens are
+    saved up, and the budget starts full so an isolated failure is always retried. One instance
+    can be shared by several clients, sync and async.
+
+    :param float ratio: Retries allowed per call. Default value is 0.1, 10% of traffic.
+    :keyword burst: Maximum number of retry tokens that can be saved up. Default value is 10.
+    :paramtype burst: float
+    :ivar int calls: Calls made.
+    :ivar int retries: Retries sent.
+    :ivar int refused: Retries skipped because the budget was used up.
+    """
+
+    def __init__(self, ratio: float = 0.1, *, burst: float = 10.0) -> None:
+        if ratio < 0:
+            raise ValueError("ratio must not be negative")
+        self.ratio = ratio
+        self.burst = burst
+        self.calls = 0
+        self.retries = 0
+        self.refused = 0
+        self._tokens = burst
+        self._lock = threading.Lock()
+
+    @property
+    def tokens(self) -> float:
+        """Retries currently available.
+
+        :return: The saved up retry tokens.
+        :rtype: float
+        """
+        return self._tokens
+
+    def _deposit(self) -> None:
+        with self._lock:
+            self.calls += 1
+            self._tokens = min(self._tokens + self.ratio, self.burst)
+
+    def _withdraw(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                self.refused += 1
+                return False
+            self._tokens -= 1
+            self.retries += 1
+            return True
+
+    def __repr__(self) -> str:
+        return "<RetryBudget calls={} retries={} refused={} tokens={:.1f}>".format(
+            self.calls, self.retries, self.refused, self._tokens
+        )
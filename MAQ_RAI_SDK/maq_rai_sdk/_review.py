@@ -0,0 +1,137 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""Helpers reading the results of the reviewer operation."""
+from collections.abc import MutableMapping
+from typing import Any, NamedTuple, Optional
+
+_COMPLIANT = "compliant"
+_SCORE = "compliance_score (%)"
+
+
+class ConvergeResult(NamedTuple):
+    """Outcome of ``reviewer.converge``.
+
+    ``prompt`` is the best prompt found: the updated prompt with the highest compliance score, or
+    the original prompt if no review updated it. ``review`` is the review that produced it, or
+    the last review if none did. ``converged`` tells whether every category of the review of
+    ``prompt`` is Compliant. ``rounds`` holds the review of every round in order, and ``calls``
+    the number of reviews actually sent, rounds answered from the cache not included.
+
+    ``reason`` tells why the loop stopped: "compliant" when every category of the review of the
+    updated prompt is Compliant, "no_improvement" when the updated compliance score did not
+    improve on the previous round, "repeated" when the service handed back a prompt reviewed
+    earlier in the loop, "no_update" when a review carried no updated prompt, or "max_rounds".
+    """
+
+    prompt: str
+    review: Any
+    converged: bool
+    reason: str
+    rounds: list[Any]
+    calls: int
+
+
+def _updated_prompt(review: Any) -> Optional[str]:
+    """Return the updated prompt of a ``reviewer.post`` result, or None if it has none.
+
+    Reviews carry it in ``updated_result.updatedPrompt``; answers to a request with ``feedback``
+    carry it at the top level as ``updatedPrompt``.
+    """
+    if not isinstance(review, dict):
+        return None
+    updated = review.get("updated_result")
+    prompt = updated.get("updatedPrompt") if isinstance(updated, dict) else None
+    if prompt is None:
+        prompt = review.get("updatedPrompt")
+    return prompt if isinstance(prompt, str) and prompt else None
+
+
+def _all_compliant(categories: Any) -> bool:
+    """Whether a ``review_result`` or ``review_of_updated_prompt`` has categories, all Compliant."""
+    if not isinstance(categories, dict):
+        return False
+    statuses = [value.get("status") for value in categories.values() if isinstance(value, dict)]
+    return bool(statuses) and all(str(status).strip().lower() == _COMPLIANT for status in statuses)
+
+
+def _updated_score(review: Any) -> Optional[float]:
+    score = review.get("updated_compliance_score") if isinstance(review, dict) else None
+    value = score.get(_SCORE) if isinstance(score, dict) else None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class _Convergence:
+    """State of a ``reviewer.converge`` loop, shared by the sync and async operations.
+
+    :meth:`next_prompt` returns the prompt to review next, answering rounds from ``cache`` where
+    it can; :meth:`record` takes the review the service returned for it.
+    """
+
+    def __init__(self, prompt: str, max_rounds: int, cache: Optional[MutableMapping]) -> None:
+        if max_rounds < 1:
+            raise ValueError("max_rounds must be at least 1")
+        self.prompt = prompt
+        self.max_rounds = max_rounds
+        self.cache: MutableMapping = cache if cache is not None else {}
+        self.current = prompt
+        self.visited = {prompt}
+        self.rounds: list[Any] = []
+        self.calls = 0
+        self.best: Optional[tuple[Optional[float], str, Any]] = None
+        self.reason: Optional[str] = None
+
+    def next_prompt(self) -> Optional[str]:
+        while self.reason is None:
+            if len(self.rounds) == self.max_rounds:
+                self.reason = "max_rounds"
+                break
+            review = self.cache.get(self.current)
+            if review is None:
+                return self.current
+            self._advance(review)
+        return None
+
+    def record(self, review: Any) -> None:
+        self.calls += 1
+        if review is not None:
+            self.cache[self.current] = review
+        self._advance(review)
+
+    def _advance(self, review: Any) -> None:
+        self.rounds.append(review)
+        updated = _updated_prompt(review)
+        if updated is None:
+            self.reason = "no_update"
+            return
+        score = _updated_score(review)
+        if self.best is not None and self.best[0] is not None and score is not None and score <= self.best[0]:
+            self.reason = "no_improvement"
+            return
+        self.best = (score, updated, review)
+        if _all_compliant(review.get("review_of_updated_prompt")):
+            self.reason = "compliant"
+        elif updated in self.visited:
+            self.reason = "repeated"
+        else:
+            self.visited.add(updated)
+            self.current = updated
+
+    def result(self) -> ConvergeResult:
+        if self.best is None:
+            prompt, review = self.prompt, self.rounds[-1] if self.rounds else None
+        else:
+            _, prompt, review = self.best
+        return ConvergeResult(
+            prompt,
+            review,
+            self.reason == "compliant",
+            self.reason or "max_rounds",
+            self.rounds,
+            self.calls,
+        )
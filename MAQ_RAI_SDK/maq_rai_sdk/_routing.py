@@ -0,0 +1,417 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""Endpoint selection, health tracking and failover shared by the multi-endpoint clients."""
+import bisect
+import hashlib
+import random
+import threading
+import time
+from typing import Any, Callable, Collection, Optional, Sequence, Union
+
+from azure.core.exceptions import HttpResponseError, ServiceRequestError, ServiceResponseError
+
+from ._deadline import DeadlineExceededError
+
+EndpointSpec = Union[str, Sequence[Optional[str]]]
+
+
+class Endpoint:
+    """Routing state of one endpoint of a multi-endpoint client.
+
+    :ivar str url: The endpoint URL, without its key.
+    :ivar any client: The client calling this endpoint.
+    :ivar int outstanding: Calls currently in flight.
+    :ivar ewma: Exponentially weighted moving average of successful call latency in seconds,
+     None before the first success.
+    :vartype ewma: float or None
+    :ivar int requests: Calls sent.
+    :ivar int failures: Calls that failed or were answered with a retriable status.
+    """
+
+    def __init__(self, url: str, client: Any) -> None:
+        self.url = url
+        self.client = client
+        self.outstanding = 0
+        self.ewma: Optional[float] = None
+        self.requests = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejected_until = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        """Whether the endpoint is in rotation.
+
+        :return: False while the endpoint is ejected.
+        :rtype: bool
+        """
+        return time.monotonic() >= self.ejected_until
+
+    def snapshot(self) -> dict[str, Any]:
+        """Return the routing state as a plain dict.
+
+        :return: url, healthy, outstanding, ewma, requests and failures.
+        :rtype: dict
+        """
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "ewma": self.ewma,
+            "requests": self.requests,
+            "failures": self.failures,
+        }
+
+    def __repr__(self) -> str:
+        return "<Endpoint {} healthy={} outstanding={} ewma={}>".format(
+            self.url, self.healthy, self.outstanding, None if self.ewma is None else round(self.ewma, 3)
+        )
+
+
+class LeastLoadedRouter:
+    """Route to the endpoint with the lowest ``(outstanding + 1) * latency EWMA``.
+
+    Endpoints without a latency sample yet are scored with the fastest known EWMA, so new and
+    re-admitted endpoints receive traffic right away. Ties are broken at random.
+    """
+
+    def choose(self, endpoints: Sequence[Endpoint], key: Optional[str] = None) -> Endpoint:
+        """Pick the endpoint for a call.
+
+        :param endpoints: Candidate endpoints, never empty.
+        :type endpoints: list[~maq_rai_sdk.Endpoint]
+        :param key: The routing key of the call; unused by this router. Default value is None.
+        :type key: str or None
+        :return: The chosen endpoint.
+        :rtype: ~maq_rai_sdk.Endpoint
+        """
+        known = [endpoint.ewma for endpoint in endpoints if endpoint.ewma is not None]
+        default = min(known) if known else 1.0
+        best: list[Endpoint] = []
+        best_score = float("inf")
+        for endpoint in endpoints:
+            score = (endpoint.outstanding + 1) * (endpoint.ewma if endpoint.ewma is not None else default)
+            if score < best_score:
+                best, best_score = [endpoint], score
+            elif score == best_score:
+                best.append(endpoint)
+        return random.choice(best)
+
+    def update(self, endpoints: Sequence[Endpoint]) -> None:
+        """Called when the set of endpoints changes. Nothing to do for this router.
+
+        :param endpoints: All endpoints of the pool.
+        :type endpoints: list[~maq_rai_sdk.Endpoint]
+        """
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class ConsistentHashRouter:
+    """Route calls with the same normalized prompt to the same endpoint.
+
+    Endpoints are placed on a hash ring ``vnodes`` times each, so adding or removing an endpoint
+    only moves about ``1 / len(endpoints)`` of the prompts. When the owner of a prompt is
+    unhealthy or was already tried, the next endpoint clockwise on the ring, its replica, takes
+    the call. Calls without a prompt are routed by ``fallback``.
+
+    :keyword vnodes: Virtual nodes per endpoint. Default value is 160.
+    :paramtype vnodes: int
+    :keyword fallback: Router for calls without a routing key. Default value is None, a
+     :class:`~maq_rai_sdk.LeastLoadedRouter`.
+    :paramtype fallback: ~maq_rai_sdk.LeastLoadedRouter
+    """
+
+    def __init__(self, *, vnodes: int = 160, fallback: Any = None) -> None:
+        if vnodes < 1:
+            raise ValueError("vnodes must be at least 1")
+        self.vnodes = vnodes
+        self.fallback = fallback if fallback is not None else LeastLoadedRouter()
+        self._hashes: list[int] = []
+        self._owners: list[str] = []
+
+    def update(self, endpoints: Sequence[Endpoint]) -> None:
+        """Rebuild the ring for ``endpoints``.
+
+        :param endpoints: All endpoints of the pool.
+        :type endpoints: list[~maq_rai_sdk.Endpoint]
+        """
+        ring = sorted(
+            (_hash("{}#{}".format(endpoint.url, index)), endpoint.url)
+            for endpoint in endpoints
+            for index in range(self.vnodes)
+        )
+        self._hashes = [point for point, _ in ring]
+        self._owners = [url for _, url in ring]
+        self.fallback.update(endpoints)
+
+    def owners(self, key: str) -> list[str]:
+        """Return the endpoint URLs responsible for ``key``, owner first, then its replicas.
+
+        :param str key: The routing key.
+        :return: Every endpoint URL, in ring order starting at the key.
+        :rtype: list[str]
+        """
+        if not self._hashes:
+            return []
+        start = bisect.bisect(self._hashes, _hash(key))
+        seen: list[str] = []
+        for offset in range(len(self._owners)):
+            url = self._owners[(start + offset) % len(self._owners)]
+            if url not in seen:
+                seen.append(url)
+        return seen
+
+    def choose(self, endpoints: Sequence[Endpoint], key: Optional[str] = None) -> Endpoint:
+        """Pick the first candidate on the ring after ``key``.
+
+        :param endpoints: Candidate endpoints, never empty.
+        :type endpoints: list[~maq_rai_sdk.Endpoint]
+        :param key: The routing key of the call. Default value is None.
+        :type key: str or None
+        :return: The chosen endpoint.
+        :rtype: ~maq_rai_sdk.Endpoint
+        """
+        if key is None:
+            return self.fallback.choose(endpoints, key)
+        candidates = {endpoint.url: endpoint for endpoint in endpoints}
+        for url in self.owners(key):
+            if url in candidates:
+                return candidates[url]
+        return self.fallback.choose(endpoints, key)
+
+
+def _is_retriable_status(status_code: Optional[int]) -> bool:
+    return status_code is not None and (status_code == 429 or status_code >= 500)
+
+
+def _call_outcome(statuses: Sequence[int]) -> Optional[bool]:
+    """Classify a call that returned, from the statuses recorded by :func:`_status_recorder`.
+
+    :param statuses: The response status codes of the call.
+    :type statuses: list[int]
+    :return: True for a success, False for 429 and 5xx answers, None for other error answers,
+     which tell nothing about the health of the endpoint.
+    :rtype: bool or None
+    """
+    if not statuses or statuses[-1] < 400:
+        return True
+    if _is_retriable_status(statuses[-1]):
+        return False
+    return None
+
+
+def _is_failover_error(error: BaseException) -> bool:
+    """Whether another endpoint should be tried after ``error``.
+
+    :param error: The exception raised by the call.
+    :type error: BaseException
+    :return: True for connection errors, timeouts other than an exceeded deadline, 429 and 5xx.
+    :rtype: bool
+    """
+    if isinstance(error, DeadlineExceededError):
+        return False
+    if isinstance(error, (ServiceRequestError, ServiceResponseError)):
+        return True
+    return isinstance(error, HttpResponseError) and _is_retriable_status(error.status_code)
+
+
+def _status_recorder(user_cls: Optional[Callable[..., Any]], statuses: list[int]) -> Callable[..., Any]:
+    """Wrap an operation ``cls`` callback so the response status of each call is recorded.
+
+    The generated operations return None for some error statuses instead of raising, so the
+    status is the only way to tell those failures apart.
+
+    :param user_cls: The callback passed by the caller, or None.
+    :type user_cls: Callable or None
+    :param list statuses: Receives the status codes.
+    :return: The wrapping callback.
+    :rtype: Callable
+    """
+
+    def cls(pipeline_response: Any, deserialized: Any, headers: Any) -> Any:
+        statuses.append(pipeline_response.http_response.status_code)
+        if user_cls is not None:
+            return user_cls(pipeline_response, deserialized, headers)
+        return deserialized
+
+    return cls
+
+
+class EndpointPool:
+    """Thread-safe set of endpoints with health tracking and a routing strategy.
+
+    An endpoint is ejected for ``ejection_time`` seconds after ``eject_after`` consecutive
+    failures and re-admitted when the time is up or a health check succeeds. When every
+    endpoint is ejected the one due back first is used, so calls keep flowing.
+
+    :param endpoints: The endpoints.
+    :type endpoints: list[~maq_rai_sdk.Endpoint]
+    :keyword router: The routing strategy. Default value is None, a
+     :class:`~maq_rai_sdk.LeastLoadedRouter`.
+    :paramtype router: ~maq_rai_sdk.LeastLoadedRouter
+    :keyword float ewma_alpha: Weight of the newest latency in the EWMA. Default value is 0.3.
+    :keyword int eject_after: Consecutive failures that eject an endpoint. Default value is 3.
+    :keyword float ejection_time: Seconds an endpoint stays ejected. Default value is 30.
+    """
+
+    def __init__(
+        self,
+        endpoints: Sequence[Endpoint],
+        *,
+        router: Any = None,
+        ewma_alpha: float = 0.3,
+        eject_after: int = 3,
+        ejection_time: float = 30.0,
+    ) -> None:
+        if not endpoints:
+            raise ValueError("At least one endpoint is required.")
+        self.endpoints = list(endpoints)
+        self.router = router if router is not None else LeastLoadedRouter()
+        self.ewma_alpha = ewma_alpha
+        self.eject_after = eject_after
+        self.ejection_time = ejection_time
+        self._lock = threading.Lock()
+        self.router.update(self.endpoints)
+
+    def acquire(self, key: Optional[str] = None, exclude: Collection[Endpoint] = ()) -> Optional[Endpoint]:
+        """Choose an endpoint for a call and count it as outstanding.
+
+        :param key: The routing key of the call. Default value is None.
+        :type key: str or None
+        :param exclude: Endpoints already tried by this call.
+        :type exclude: list[~maq_rai_sdk.Endpoint]
+        :return: The endpoint, or None if every endpoint was excluded.
+        :rtype: ~maq_rai_sdk.Endpoint or None
+        """
+        with self._lock:
+            candidates = [endpoint for endpoint in self.endpoints if endpoint not in exclude]
+            if not candidates:
+                return None
+            healthy = [endpoint for endpoint in candidates if endpoint.healthy]
+            if healthy:
+                endpoint = self.router.choose(healthy, key)
+            else:
+                endpoint = min(candidates, key=lambda candidate: candidate.ejected_until)
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def release(self, endpoint: Endpoint, latency: float, ok: Optional[bool]) -> None:
+        """Record the outcome of a call started with :meth:`acquire`.
+
+        :param endpoint: The endpoint that was called.
+        :type endpoint: ~maq_rai_sdk.Endpoint
+        :param float latency: The call latency in seconds.
+        :param ok: Whether the call succeeded, or None if its outcome says nothing about the
+         endpoint, such as a rejected request or a cancelled call. Such calls only stop counting
+         as outstanding.
+        :type ok: bool or None
+        """
+        with self._lock:
+            endpoint.outstanding -= 1
+            if ok is None:
+                return
+            if ok:
+                endpoint.consecutive_failures = 0
+                endpoint.ejected_until = 0.0
+                if endpoint.ewma is None:
+                    endpoint.ewma = latency
+                else:
+                    endpoint.ewma += self.ewma_alpha * (latency - endpoint.ewma)
+                return
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            if endpoint.consecutive_failures >= self.eject_after:
+                endpoint.ejected_until = time.monotonic() + self.ejection_time
+
+    def add(self, endpoint: Endpoint) -> None:
+        """Add ``endpoint`` to the rotation.
+
+        :param endpoint: The endpoint.
+        :type endpoint: ~maq_rai_sdk.Endpoint
+        :raises ValueError: If an endpoint with the same URL is already in the pool.
+        """
+        with self._lock:
+            if any(member.url == endpoint.url for member in self.endpoints):
+                raise ValueError("Endpoint {} is already in the pool.".format(endpoint.url))
+            self.endpoints = self.endpoints + [endpoint]
+            self.router.update(self.endpoints)
+
+    def remove(self, url: str) -> Endpoint:
+        """Take the endpoint with ``url`` out of the pool.
+
+        :param str url: The endpoint URL, without its key.
+        :return: The removed endpoint.
+        :rtype: ~maq_rai_sdk.Endpoint
+        :raises ValueError: If no such endpoint exists or it is the last one.
+        """
+        with self._lock:
+            matches = [member for member in self.endpoints if member.url == url]
+            if not matches:
+                raise ValueError("Endpoint {} is not in the pool.".format(url))
+            if len(self.endpoints) == 1:
+                raise ValueError("Cannot remove the last endpoint.")
+            self.endpoints = [member for member in self.endpoints if member.url != url]
+            self.router.update(self.endpoints)
+            return matches[0]
+
+    def mark_health(self, endpoint: Endpoint, healthy: bool) -> None:
+        """Apply the result of a health check.
+
+        :param endpoint: The checked endpoint.
+        :type endpoint: ~maq_rai_sdk.Endpoint
+        :param bool healthy: Whether the check succeeded.
+        """
+        with self._lock:
+            if healthy:
+                endpoint.consecutive_failures = 0
+                endpoint.ejected_until = 0.0
+            else:
+                endpoint.ejected_until = max(endpoint.ejected_until, time.monotonic() + self.ejection_time)
+
+    def snapshot(self) -> list[dict[str, Any]]:
+        """Return the routing state of every endpoint.
+
+        :return: One dict per endpoint, see :meth:`Endpoint.snapshot`.
+        :rtype: list[dict]
+        """
+        with self._lock:
+            return [endpoint.snapshot() for endpoint in self.endpoints]
+
+
+def _parse_endpoint(spec: EndpointSpec) -> tuple[str, Optional[str]]:
+    """Split an endpoint given as a URL or a ``(url, key)`` pair.
+
+    :param spec: The endpoint.
+    :type spec: str or tuple[str, str or None]
+    :return: The URL and the key.
+    :rtype: tuple[str, str or None]
+    """
+    if isinstance(spec, str):
+        return spec, None
+    url, key = spec
+    if not url:
+        raise ValueError("Endpoint URL must not be empty.")
+    return url, key
+
+
+def _routing_key(body: Any) -> Optional[str]:
+    """Return the normalized prompt of an operation body, used as its routing key.
+
+    Case and runs of whitespace are ignored, so trivially different spellings of one prompt
+    share a key.
+
+    :param any body: The operation body.
+    :return: The key, or None if the body carries no prompt.
+    :rtype: str or None
+    """
+    prompt = body.get("prompt") if isinstance(body, dict) else None
+    if not isinstance(prompt, str):
+        return None
+    return " ".join(prompt.split()).casefold()
@@ -0,0 +1,321 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""Batch runs spread over several worker processes."""
+import asyncio
+import json
+import multiprocessing
+import os
+import queue
+import shutil
+import tempfile
+import time
+from typing import Any, BinaryIO, Iterator, Optional, Union
+
+from azure.core.exceptions import AzureError, ClientAuthenticationError
+
+from . import _ratelimit
+from ._metrics import LatencyHistogram
+from ._ratelimit import FileRateLimiter
+
+_OPERATIONS = {"reviewer": ("reviewer", "post"), "testcase": ("testcase", "generator_post")}
+
+
+class ShardedBatchRunner:
+    """Runs every line of a JSONL file through one operation, spread over worker processes.
+
+    For runs where one process is the bottleneck: each worker process has its own
+    :class:`~maq_rai_sdk.aio.MAQRAISDK` and runs ``max_concurrency`` calls at a time, decoding
+    bodies and encoding results on its own core. The input is cut into chunks of ``chunk_size``
+    lines on a shared queue; a worker takes the next chunk as soon as it has a free slot, so fast
+    workers take over the work slow ones have not started and a straggler holds up at most one
+    chunk. Results are merged back in input order, in the format of
+    :class:`~maq_rai_sdk.aio.BatchRunner`, and the workers' metrics are combined.
+
+    Unlike :class:`~maq_rai_sdk.aio.BatchRunner` the run is not journaled and cannot be resumed.
+
+    :param str endpoint: Service URL, including the function key if needed.
+    :param str operation: "reviewer" for ``reviewer.post`` or "testcase" for
+     ``testcase.generator_post``. Default value is "reviewer".
+    :keyword processes: Number of worker processes. Default value is None, one per CPU.
+    :paramtype processes: int
+    :keyword max_concurrency: Maximum number of calls running at once in each process. Default value is 8.
+    :paramtype max_concurrency: int
+    :keyword chunk_size: Lines handed to a worker at a time. Default value is 64.
+    :paramtype chunk_size: int
+    :keyword rate_limit: Calls per second over all processes, or a
+     :class:`~maq_rai_sdk.FileRateLimiter` to share with other runs. Default value is None, no limit.
+    :paramtype rate_limit: float or ~maq_rai_sdk.FileRateLimiter
+    :keyword timeout: Seconds each call may take; a call exceeding it is written as an error.
+     Default value is None, no limit.
+    :paramtype timeout: float
+    :keyword client_options: Keyword arguments for the client of each process, for example
+     ``{"resilient": True}``. They must be picklable. Default value is None.
+    :paramtype client_options: dict[str, any]
+
+    Any other keyword arguments are passed to every call.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        operation: str = "reviewer",
+        *,
+        processes: Optional[int] = None,
+        max_concurrency: int = 8,
+        chunk_size: int = 64,
+        rate_limit: Union[float, FileRateLimiter, None] = None,
+        timeout: Optional[float] = None,
+        client_options: Optional[dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> None:
+        if operation not in _OPERATIONS:
+            raise ValueError("Unknown operation {!r}, expected one of: {}".format(operation, ", ".join(_OPERATIONS)))
+        if max_concurrency < 1 or chunk_size < 1:
+            raise ValueError("max_concurrency and chunk_size must be at least 1")
+        self.endpoint = endpoint
+        self.operation = operation
+        self.processes = processes or os.cpu_count() or 1
+        self.max_concurrency = max_concurrency
+        self.chunk_size = chunk_size
+        self.rate_limit = rate_limit
+        self.client_options = dict(client_options or {})
+        self._kwargs = kwargs
+        if timeout is not None:
+            self._kwargs["timeout"] = timeout
+
+    def run(self, source: Union[str, BinaryIO], output: str) -> dict[str, Any]:
+        """Run every line of ``source`` and write the results to ``output``.
+
+        :param source: Path of the JSONL input, or a binary stream such as ``sys.stdin.buffer``.
+        :type source: str or BinaryIO
+        :param str output: Path of the JSONL output.
+        :return: ``lines`` read, ``succeeded`` and ``failed`` calls, ``latency`` (a
+         :meth:`~maq_rai_sdk.LatencyHistogram.snapshot` of the calls of every process),
+         ``rate_limit_wait`` (seconds calls spent waiting for the rate limit), ``elapsed``
+         seconds, and ``workers``: per process its ``pid`` and the ``chunks``, ``succeeded``
+         and ``failed`` calls it ran.
+        :rtype: dict[str, any]
+        :raises ~azure.core.exceptions.ClientAuthenticationError: If the service rejects the
+         credentials. The workers are stopped.
+        :raises ChildProcessError: If a worker process died.
+        :raises RuntimeError: If ``rate_limit`` is set on a platform without ``fcntl``, such as Windows.
+        """
+        if self.rate_limit is not None and _ratelimit.fcntl is None:
+            raise RuntimeError(
+                "The rate_limit of ShardedBatchRunner is shared through a file lock, which needs fcntl and is not "
+                'available on this platform. Pass client_options={"rate_limit": SqliteRateLimiter(...)} instead.'
+            )
+        started = time.monotonic()
+        state_dir = None
+        limiter = self.rate_limit
+        if limiter is not None and not isinstance(limiter, FileRateLimiter):
+            state_dir = tempfile.mkdtemp(prefix="maq-rai-")
+            limiter = FileRateLimiter(os.path.join(state_dir, "rate"), limiter)
+        context = multiprocessing.get_context("spawn")
+        chunks = context.Queue()
+        results = context.Queue()
+        job = (self.endpoint, self.operation, self.client_options, self._kwargs, self.max_concurrency, limiter)
+        workers = [
+            context.Process(
+                target=_worker, args=(job, chunks, results), name="maq-rai-shard-{}".format(index), daemon=True
+            )
+            for index in range(self.processes)
+        ]
+        for worker in workers:
+            worker.start()
+        src: BinaryIO = open(source, "rb") if isinstance(source, str) else source  # pylint: disable=consider-using-with
+        try:
+            with open(output, "wb") as out:
+                stats = _Merge(out, results, workers).run(_chunks(src, self.chunk_size), chunks)
+        finally:
+            for worker in workers:
+                if worker.is_alive():
+                    worker.terminate()
+                worker.join()
+            if isinstance(source, str):
+                src.close()
+            if state_dir is not None:
+                shutil.rmtree(state_dir, ignore_errors=True)
+        stats["elapsed"] = time.monotonic() - started
+        return stats
+
+    def __repr__(self) -> str:
+        return "<ShardedBatchRunner operation={} processes={} max_concurrency={} chunk_size={}>".format(
+            self.operation, self.processes, self.max_concurrency, self.chunk_size
+        )
+
+
+def _chunks(src: BinaryIO, size: int) -> Iterator[tuple[int, list[bytes]]]:
+    """Yield the input as ``(number of the first line, lines)`` chunks."""
+    first, lines = 1, []
+    for raw in src:
+        lines.append(raw)
+        if len(lines) == size:
+            yield first, lines
+            first, lines = first + size, []
+    if lines:
+        yield first, lines
+
+
+class _Merge:
+    """Feeds chunks to the workers and writes their results back in input order."""
+
+    def __init__(self, out: BinaryIO, results: Any, workers: list[Any]) -> None:
+        self.out = out
+        self.results = results
+        self.workers = workers
+        self.done: dict[int, bytes] = {}
+        self.written = 0
+        self.in_flight = 0
+        self.reports: list[dict[str, Any]] = []
+
+    def run(self, source: Iterator[tuple[int, list[bytes]]], chunks: Any) -> dict[str, Any]:
+        limit = len(self.workers) * 4  # bounds the memory held by queued and unmerged chunks
+        lines = 0
+        for index, (first, raw) in enumerate(source):
+            while self.in_flight >= limit:
+                self._receive()
+            chunks.put((index, first, raw))
+            self.in_flight += 1
+            lines = first + len(raw) - 1
+        for _ in self.workers:
+            chunks.put(None)
+        while self.in_flight:
+            self._receive()
+        stats: dict[str, Any] = {"lines": lines, "succeeded": 0, "failed": 0, "rate_limit_wait": 0.0, "workers": []}
+        latency = LatencyHistogram()
+        while len(self.reports) < len(self.workers):
+            self._next("report")
+        for report in self.reports:
+            latency.merge(report.pop("latency"))
+            stats["succeeded"] += report["succeeded"]
+            stats["failed"] += report["failed"]
+            stats["rate_limit_wait"] += report.pop("rate_limit_wait")
+            stats["workers"].append(report)
+        stats["latency"] = latency.snapshot()
+        return stats
+
+    def _receive(self) -> None:
+        index, records = self._next("chunk")
+        self.in_flight -= 1
+        self.done[index] = records
+        while self.written in self.done:
+            self.out.write(self.done.pop(self.written))
+            self.written += 1
+
+    def _next(self, kind: str) -> Any:
+        while True:
+            try:
+                message = self.results.get(timeout=1)
+            except queue.Empty:
+                for worker in self.workers:
+                    if worker.exitcode not in (None, 0):
+                        raise ChildProcessError(
+                            "Worker process {} exited with code {}.".format(worker.pid, worker.exitcode)
+                        ) from None
+                continue
+            if message[0] == "fatal":
+                raise ClientAuthenticationError(message[1])
+            if message[0] == "report":
+                self.reports.append(message[1])  # a worker that ran out of chunks
+            if message[0] == kind:
+                return message[1]
+
+
+class _LineRunner:
+    """Runs input lines through an operation of an async client and counts the outcomes."""
+
+    def __init__(self, call: Any, kwargs: dict[str, Any]) -> None:
+        self.call = call
+        self.kwargs = kwargs
+        self.succeeded = 0
+        self.failed = 0
+        self.latency = LatencyHistogram()
+        self.fatal: Optional[ClientAuthenticationError] = None
+
+    async def run(self, number: int, raw: bytes) -> bytes:
+        """Run one line and return its output record, empty for a blank line.
+
+        :param int number: The line number.
+        :param bytes raw: The line.
+        :return: The encoded record.
+        :rtype: bytes
+        """
+        from .aio._runner import _encode, _error_record  # pylint: disable=import-outside-toplevel
+
+        if not raw.strip():
+            return b""
+        try:
+            body = json.loads(raw)
+        except ValueError as error:
+            self.failed += 1
+            return _error_record(number, error)
+        started = time.monotonic()
+        try:
+            result = await self.call(body, **self.kwargs)
+        except AzureError as error:
+            if isinstance(error, ClientAuthenticationError):
+                self.fatal = error
+            self.failed += 1
+            return _error_record(number, error)
+        self.latency.observe(time.monotonic() - started)
+        self.succeeded += 1
+        return _encode({"line": number, "result": result})
+
+
+def _worker(job: tuple[Any, ...], chunks: Any, results: Any) -> None:
+    asyncio.run(_work(job, chunks, results))
+
+
+async def _work(job: tuple[Any, ...], chunks: Any, results: Any) -> None:
+    from .aio import MAQRAISDK  # pylint: disable=import-outside-toplevel
+
+    endpoint, operation, client_options, kwargs, max_concurrency, limiter = job
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(max_concurrency)
+    chunks_run = 0
+
+    async with MAQRAISDK(endpoint=endpoint, rate_limit=limiter, **client_options) as client:
+        group, name = _OPERATIONS[operation]
+        runner = _LineRunner(getattr(getattr(client, group), name), kwargs)
+
+        async def process(number: int, raw: bytes) -> bytes:
+            try:
+                return await runner.run(number, raw)
+            finally:
+                slots.release()
+
+        async def finish(index: int, tasks: list["asyncio.Task[bytes]"]) -> None:
+            records = b"".join(await asyncio.gather(*tasks))
+            if runner.fatal is not None:
+                results.put(("fatal", str(runner.fatal)))
+            results.put(("chunk", (index, records)))
+
+        pending: set["asyncio.Task[None]"] = set()
+        while True:
+            chunk = await loop.run_in_executor(None, chunks.get)
+            if chunk is None:
+                break
+            index, first, lines = chunk
+            chunks_run += 1
+            tasks = []
+            for number, raw in enumerate(lines, first):
+                await slots.acquire()
+                tasks.append(asyncio.ensure_future(process(number, raw)))
+            task = asyncio.ensure_future(finish(index, tasks))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.gather(*pending)
+    report = {
+        "pid": os.getpid(),
+        "chunks": chunks_run,
+        "succeeded": runner.succeeded,
+        "failed": runner.failed,
+        "latency": runner.latency,
+        "rate_limit_wait": limiter.waited if limiter is not None else 0.0,
+    }
+    results.put(("report", report))
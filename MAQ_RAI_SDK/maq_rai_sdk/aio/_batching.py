@@ -0,0 +1,245 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""Client-side micro-batching of concurrent calls."""
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, Mapping, NamedTuple, Optional
+
+from azure.core.exceptions import ClientAuthenticationError, HttpResponseError
+from azure.core.rest import HttpRequest
+
+_LOGGER = logging.getLogger(__name__)
+
+# Enforced by the caller around the whole call, so they need not reach the batch request.
+_BATCHABLE_OPTIONS = frozenset(("timeout", "deadline"))
+_DEFAULT_ROUTES = {"reviewer": "/Reviewer/batch", "testcase": "/Testcase_generator/batch"}
+# Item statuses a single call would retry, and batch statuses that may be caused by batching itself.
+_RETRYABLE_ITEM_STATUSES = frozenset((500, 502, 503, 504))
+_SPLIT_BATCH_STATUSES = frozenset((400, 413))
+
+
+class BatchItemResult(NamedTuple):
+    """Outcome of one item of a batch: the status it would have had as a single call, and its body."""
+
+    status: int
+    body: Any
+
+
+class BatchFormat:
+    """Wire format of batch requests. Subclass it to talk to a batch route with another format.
+
+    The default format posts ``{"items": [body, ...]}`` as JSON and expects
+    ``{"results": [{"status": 200, "body": {...}}, ...]}`` back, one result per item in order.
+    """
+
+    content_type = "application/json"
+
+    def encode(self, bodies: list[Any]) -> bytes:
+        """Serialize the bodies of a batch.
+
+        :param list bodies: The operation bodies, in order.
+        :return: The request content.
+        :rtype: bytes
+        """
+        return json.dumps({"items": bodies}).encode("utf-8")
+
+    def decode(self, content: bytes) -> list[BatchItemResult]:
+        """Split a batch response into the results of its items.
+
+        :param bytes content: The response content.
+        :return: One result per item, in request order.
+        :rtype: list[~maq_rai_sdk.aio.BatchItemResult]
+        """
+        payload = json.loads(content)
+        results = payload["results"] if isinstance(payload, dict) else payload
+        return [BatchItemResult(int(result.get("status", 200)), result.get("body")) for result in results]
+
+
+class MicroBatcher:
+    """Gathers concurrent calls of one operation into batch requests.
+
+    A call waits at most ``linger`` seconds for others to join it; a batch is sent as soon as it
+    holds ``max_items`` calls. The results are handed back to each caller as if it had made its
+    own call. If the service answers a batch route with 404 or 405, batching is turned off for
+    that route and calls are sent one by one. The calls of a batch answered with 400 or 413, and
+    items answered with 500, 502, 503 or 504, are sent again on their own, so they go through the
+    client's retry policy like any single call. Only JSON bodies without per-call options other
+    than ``timeout`` and ``deadline`` are batched; the client enforces those while the call
+    waits for its batch. Pass it, or True for the defaults, to the client as ``batching``; each
+    client needs its own batcher.
+
+    :keyword linger: Seconds a call waits for others to join its batch. Default value is 0.02.
+    :paramtype linger: float
+    :keyword max_items: Maximum number of calls per batch. Default value is 16.
+    :paramtype max_items: int
+    :keyword batch_format: The wire format. Default value is None, a :class:`~maq_rai_sdk.aio.BatchFormat`.
+    :paramtype batch_format: ~maq_rai_sdk.aio.BatchFormat
+    :keyword routes: Batch route per operation group, "reviewer" and "testcase". Default value is
+     None, "/Reviewer/batch" and "/Testcase_generator/batch".
+    :paramtype routes: dict[str, str]
+    :ivar int batches: Batch requests sent.
+    :ivar int items: Calls sent in batches.
+    """
+
+    def __init__(
+        self,
+        *,
+        linger: float = 0.02,
+        max_items: int = 16,
+        batch_format: Optional[BatchFormat] = None,
+        routes: Optional[Mapping[str, str]] = None,
+    ) -> None:
+        if max_items < 1:
+            raise ValueError("max_items must be at least 1")
+        self.linger = linger
+        self.max_items = max_items
+        self.batch_format = batch_format if batch_format is not None else BatchFormat()
+        self.routes = dict(_DEFAULT_ROUTES if routes is None else routes)
+        self.batches = 0
+        self.items = 0
+        self._client: Any = None
+        self._strict = False
+        self._unsupported: set[str] = set()
+        self._pending: dict[str, list[tuple[Any, "asyncio.Future[Any]"]]] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._tasks: set["asyncio.Task[None]"] = set()
+
+    def _attach(self, client: Any, *, strict: bool = False) -> None:
+        if self._client is not None and self._client is not client:
+            raise ValueError("A MicroBatcher can only be used by one client.")
+        self._client = client
+        self._strict = strict
+
+    def accepts(self, group: str, body: Any, kwargs: Mapping[str, Any]) -> bool:
+        """Whether a call can be batched.
+
+        :param str group: The operation group, "reviewer" or "testcase".
+        :param any body: The operation body.
+        :param kwargs: The remaining operation keyword arguments.
+        :type kwargs: dict
+        :return: True for JSON bodies without per-call options other than ``timeout`` and
+         ``deadline``, on a route that supports batches.
+        :rtype: bool
+        """
+        return (
+            self._client is not None
+            and isinstance(body, dict)
+            and not set(kwargs) - _BATCHABLE_OPTIONS
+            and group in self.routes
+            and group not in self._unsupported
+        )
+
+    async def submit(self, group: str, body: Any, single: Callable[[], Awaitable[Any]]) -> Any:
+        """Add a call to the next batch of ``group`` and wait for its result.
+
+        :param str group: The operation group, "reviewer" or "testcase".
+        :param any body: The operation body.
+        :param single: Makes the call on its own, used if the route turns out not to support
+         batches or the call has to be retried.
+        :type single: Callable[[], Awaitable[any]]
+        :return: The result of the call.
+        :rtype: any
+        """
+        loop = asyncio.get_running_loop()
+        future: "asyncio.Future[Any]" = loop.create_future()
+        pending = self._pending.setdefault(group, [])
+        pending.append((body, future))
+        if len(pending) >= self.max_items:
+            self._flush(group)
+        elif group not in self._timers:
+            self._timers[group] = loop.call_later(self.linger, self._flush, group)
+        result = await future
+        if result is _SINGLE:
+            return await single()
+        return result
+
+    def _flush(self, group: str) -> None:
+        timer = self._timers.pop(group, None)
+        if timer is not None:
+            timer.cancel()
+        items = [(body, future) for body, future in self._pending.pop(group, []) if not future.done()]
+        if not items:
+            return
+        task = asyncio.ensure_future(self._send(group, items))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, group: str, items: list[tuple[Any, "asyncio.Future[Any]"]]) -> None:
+        try:
+            request = HttpRequest(
+                "POST",
+                self.routes[group],
+                content=self.batch_format.encode([body for body, _ in items]),
+                headers={"Content-Type": self.batch_format.content_type, "Accept": self.batch_format.content_type},
+            )
+            request.url = self._client.format_url(request.url)
+            response = await self._client.send_request(request)
+            if response.status_code in (404, 405):
+                _LOGGER.info("%s does not accept batches, sending calls one by one.", request.url)
+                self._unsupported.add(group)
+                self._resolve(items, [_SINGLE] * len(items))
+                return
+            if response.status_code in _SPLIT_BATCH_STATUSES:
+                _LOGGER.info("%s rejected a batch of %d calls, sending them one by one.", request.url, len(items))
+                self._resolve(items, [_SINGLE] * len(items))
+                return
+            if response.status_code != 200:
+                raise HttpResponseError(response=response)
+            results = self.batch_format.decode(await response.read())
+            if len(results) != len(items):
+                raise HttpResponseError(
+                    message="Batch of {} calls was answered with {} results.".format(len(items), len(results)),
+                    response=response,
+                )
+            self.batches += 1
+            self.items += len(items)
+            self._resolve(items, [self._result(result) for result in results])
+        except Exception as err:  # pylint: disable=broad-except
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(err)
+
+    def _result(self, result: BatchItemResult) -> Any:
+        if result.status == 200:
+            return result.body
+        if result.status in _RETRYABLE_ITEM_STATUSES:
+            return _SINGLE  # the batch was not retried for it
+        if result.status == 401 and not self._strict:
+            return None  # like the single-call operations
+        error_type = ClientAuthenticationError if result.status == 401 else HttpResponseError
+        error = error_type(message="Batch item failed with status {}.".format(result.status))
+        error.status_code = result.status
+        return _Failure(error)
+
+    @staticmethod
+    def _resolve(items: list[tuple[Any, "asyncio.Future[Any]"]], results: list[Any]) -> None:
+        for (_, future), result in zip(items, results):
+            if future.done():
+                continue
+            if isinstance(result, _Failure):
+                future.set_exception(result.error)
+            else:
+                future.set_result(result)
+
+    async def close(self) -> None:
+        """Send the calls still lingering and wait for all batches in flight."""
+        for group in list(self._pending):
+            self._flush(group)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def __repr__(self) -> str:
+        return "<MicroBatcher batches={} items={} linger={} max_items={}>".format(
+            self.batches, self.items, self.linger, self.max_items
+        )
+
+
+class _Failure(NamedTuple):
+    error: Exception
+
+
+_SINGLE = object()
@@ -0,0 +1,67 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""aiohttp integration of :class:`~maq_rai_sdk.DnsCache`."""
+import socket
+from typing import Any
+
+import aiohttp
+from aiohttp.abc import AbstractResolver
+
+from azure.core.pipeline.transport import AioHttpTransport
+
+from .._dns import DnsCache
+
+
+class _DnsCacheResolver(AbstractResolver):
+    """aiohttp resolver answering from a :class:`~maq_rai_sdk.DnsCache`.
+
+    Pass it to ``aiohttp.TCPConnector(resolver=...)`` to share resolutions with other sessions
+    and with the sync client.
+
+    :param dns_cache: The cache to resolve with.
+    :type dns_cache: ~maq_rai_sdk.DnsCache
+    """
+
+    def __init__(self, dns_cache: DnsCache) -> None:
+        self.dns_cache = dns_cache
+
+    async def resolve(self, host: str, port: int = 0, family: int = socket.AF_INET) -> list[Any]:
+        addresses = await self.dns_cache.resolve_async(host, port, family)
+        return [
+            {
+                "hostname": host,
+                "host": address,
+                "port": port,
+                "family": address_family,
+                "proto": 0,
+                "flags": socket.AI_NUMERICHOST,
+            }
+            for address_family, address in addresses
+        ]
+
+    async def close(self) -> None:
+        pass
+
+
+def _dns_connector(dns_cache: DnsCache, **kwargs: Any) -> aiohttp.TCPConnector:
+    # The shared cache replaces aiohttp's own per-connector cache.
+    return aiohttp.TCPConnector(resolver=_DnsCacheResolver(dns_cache), use_dns_cache=False, **kwargs)
+
+
+class _DnsCachingAioHttpTransport(AioHttpTransport):
+    def __init__(self, dns_cache: DnsCache, **kwargs: Any) -> None:
+        self._dns_cache = dns_cache
+        super().__init__(**kwargs)
+
+    async def open(self) -> None:
+        if not self.session and self._session_owner:
+            self.session = aiohttp.ClientSession(
+                connector=_dns_connector(self._dns_cache),
+                trust_env=self._use_env_settings,
+                cookie_jar=aiohttp.DummyCookieJar(),
+                auto_decompress=False,
+            )
+        await super().open()
@@ -0,0 +1,154 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""Hedged requests for the async operations."""
+import asyncio
+import bisect
+import threading
+from collections import deque
+from typing import Any, Awaitable, Callable, Optional
+
+
+class RequestHedger:
+    """Sends a duplicate of slow calls and keeps whichever attempt finishes first.
+
+    A call that has not completed after :meth:`delay` seconds, the ``quantile`` of recently
+    observed call latencies, is hedged with a second identical request. The first attempt to
+    succeed wins and the other is cancelled. Every call earns ``budget`` hedge tokens, so hedges
+    stay below that fraction of traffic plus a small burst allowance.
+
+    :keyword quantile: Latency quantile after which a call is hedged. Default value is 0.95.
+    :paramtype quantile: float
+    :keyword budget: Maximum fraction of extra requests. Default value is 0.05.
+    :paramtype budget: float
+    :keyword burst: Maximum number of hedge tokens that can be saved up. Default value is 10.
+    :paramtype burst: float
+    :keyword initial_delay: Delay in seconds used until ``min_samples`` latencies were observed.
+     Default value is 2.0.
+    :paramtype initial_delay: float
+    :keyword min_delay: Lower bound of the delay in seconds. Default value is 0.05.
+    :paramtype min_delay: float
+    :keyword min_samples: Latencies to observe before the quantile is used. Default value is 20.
+    :paramtype min_samples: int
+    :keyword window: Number of recent latencies the quantile is computed over. Default value is 1000.
+    :paramtype window: int
+    """
+
+    def __init__(
+        self,
+        *,
+        quantile: float = 0.95,
+        budget: float = 0.05,
+        burst: float = 10.0,
+        initial_delay: float = 2.0,
+        min_delay: float = 0.05,
+        min_samples: int = 20,
+        window: int = 1000,
+    ) -> None:
+        if not 0 < quantile < 1:
+            raise ValueError("quantile must be between 0 and 1")
+        if budget < 0:
+            raise ValueError("budget must not be negative")
+        self.quantile = quantile
+        self.budget = budget
+        self.burst = burst
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._tokens = 0.0
+        self._window: "deque[float]" = deque(maxlen=window)
+        self._sorted: list[float] = []
+        self._lock = threading.Lock()
+
+    def delay(self) -> float:
+        """Seconds to wait for a call before hedging it.
+
+        :return: The hedging delay.
+        :rtype: float
+        """
+        with self._lock:
+            if len(self._sorted) < self.min_samples:
+                return self.initial_delay
+            index = min(int(len(self._sorted) * self.quantile), len(self._sorted) - 1)
+            return max(self._sorted[index], self.min_delay)
+
+    def record(self, latency: float) -> None:
+        """Add the latency of a completed attempt to the window.
+
+        :param float latency: The latency in seconds.
+        """
+        with self._lock:
+            if len(self._window) == self._window.maxlen:
+                del self._sorted[bisect.bisect_left(self._sorted, self._window[0])]
+            self._window.append(latency)
+            bisect.insort(self._sorted, latency)
+
+    def _start_call(self) -> None:
+        with self._lock:
+            self.calls += 1
+            self._tokens = min(self._tokens + self.budget, self.burst)
+
+    def _acquire(self) -> bool:
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            self.hedges += 1
+            return True
+
+    async def run(self, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Await ``call()``, hedging it with a second ``call()`` if it is slow.
+
+        :param call: Starts one attempt of the operation.
+        :type call: Callable[[], Awaitable[any]]
+        :return: The result of the first attempt to succeed.
+        :rtype: any
+        """
+        loop = asyncio.get_running_loop()
+        self._start_call()
+        started = loop.time()
+        primary = asyncio.ensure_future(call())
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self.delay())
+        except BaseException:
+            primary.cancel()
+            raise
+        if done or not self._acquire():
+            result = await primary
+            self.record(loop.time() - started)
+            return result
+
+        hedged_at = loop.time()
+        hedge = asyncio.ensure_future(call())
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = error or task.exception()
+                        continue
+                    if task is hedge:
+                        with self._lock:
+                            self.hedge_wins += 1
+                        self.record(loop.time() - hedged_at)
+                    else:
+                        self.record(loop.time() - started)
+                    return task.result()
+            raise error  # type: ignore[misc]
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    def __repr__(self) -> str:
+        return "<RequestHedger calls={} hedges={} hedge_wins={} delay={:.3f}>".format(
+            self.calls, self.hedges, self.hedge_wins, self.delay()
+        )
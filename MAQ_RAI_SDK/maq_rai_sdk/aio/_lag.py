@@ -0,0 +1,95 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""Event loop lag monitoring."""
+import asyncio
+import logging
+from typing import Callable, Optional
+
+from .._metrics import LatencyHistogram
+
+_LOGGER = logging.getLogger(__name__)
+
+_LAG_BOUNDS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class LoopLagMonitor:
+    """Detects stalls of the event loop by measuring how late a periodic timer fires.
+
+    A timer due every ``interval`` seconds fires late by as long as some callback kept the loop
+    busy, for example a large response decoded on the loop thread. Every lag is recorded in
+    :attr:`lag`; lags of at least ``threshold`` seconds are counted as stalls, logged as warnings
+    and passed to ``on_stall``. Started with :meth:`maq_rai_sdk.aio.MAQRAISDK.monitor_loop`.
+
+    :keyword interval: Seconds between two measurements. Default value is 0.1.
+    :paramtype interval: float
+    :keyword threshold: Lag in seconds reported as a stall. Default value is 0.1.
+    :paramtype threshold: float
+    :keyword on_stall: Called with the lag in seconds of every stall. Default value is None.
+    :paramtype on_stall: Callable[[float], None]
+    :ivar lag: How late the timer fired, 1 ms to 5 s buckets.
+    :vartype lag: ~maq_rai_sdk.LatencyHistogram
+    :ivar int stalls: Number of lags of at least ``threshold``.
+    """
+
+    def __init__(
+        self,
+        *,
+        interval: float = 0.1,
+        threshold: float = 0.1,
+        on_stall: Optional[Callable[[float], None]] = None,
+    ) -> None:
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        self.interval = interval
+        self.threshold = threshold
+        self.on_stall = on_stall
+        self.lag = LatencyHistogram(_LAG_BOUNDS)
+        self.stalls = 0
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the monitor task is running.
+
+        :return: True while monitoring.
+        :rtype: bool
+        """
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        """Start monitoring the running loop. Does nothing if already running."""
+        if not self.running:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        """Stop monitoring."""
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    def record(self, lag: float) -> None:
+        """Record one measured lag.
+
+        :param float lag: Seconds the timer fired late.
+        """
+        self.lag.observe(lag)
+        if lag < self.threshold:
+            return
+        self.stalls += 1
+        _LOGGER.warning("Event loop stalled for %.3f s", lag)
+        if self.on_stall is not None:
+            self.on_stall(lag)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            self.record(max(loop.time() - started - self.interval, 0.0))
+
+    def __repr__(self) -> str:
+        return "<LoopLagMonitor running={} stalls={} max_lag={:.3f}>".format(self.running, self.stalls, self.lag.max)
@@ -7,9 +7,782 @@
 
 Follow our quickstart for examples: https://aka.ms/azsdk/python/dpcodegen/python/customize
 """
+import asyncio
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor
+from io import IOBase
+from typing import Any, Awaitable, Callable, IO, Optional, Sequence, Union
+from typing_extensions import Self
 
+from azure.core.pipeline.transport import AsyncHttpTransport
+from azure.core.rest import HttpRequest
 
-__all__: list[str] = []  # Add all objects you want publicly available to users at this package level
+from .._cache import ResponseCache
+from .._circuit import CircuitBreakers
+from .._deadline import _resolve_deadline
+from .._ratelimit import RateLimiter
+from .._retry import RetryBudget
+from .._content import ContentNegotiator
+from .._dns import DnsCache
+from .._patch import _DEFAULT_ENDPOINT, _add_policies, _default_policies, _dns_cache_option, _with_function_key
+from .._routing import (
+    Endpoint,
+    EndpointPool,
+    EndpointSpec,
+    _call_outcome,
+    _is_failover_error,
+    _parse_endpoint,
+    _routing_key,
+    _status_recorder,
+)
+from .._policies import CodecContentDecodePolicy, ContentNegotiationPolicy, RequestCompressionPolicy
+from ._batching import BatchFormat, BatchItemResult, MicroBatcher
+from ._client import MAQRAISDK as MAQRAISDKGenerated
+from ._configuration import MAQRAISDKConfiguration
+from ._hedging import RequestHedger
+from ._lag import LoopLagMonitor
+from ._pipeline import PromptResult, ReviewPipeline
+from ._policies import (
+    AsyncCircuitBreakerPolicy,
+    AsyncRateLimitPolicy,
+    AsyncResilientRetryPolicy,
+    AsyncResponseCachePolicy,
+    AsyncResponseDecompressionPolicy,
+    DeadlinePolicy,
+    OffloadingContentDecodePolicy,
+)
+from ._polling import AsyncAdaptiveLROBasePolling
+from ._runner import BatchRunner
+from ._scheduler import PriorityScheduler
+from ._transport import AsyncHttpXTransport
+from ._warm import KeepWarm
+from .operations._operations import JSON
+
+
+class MAQRAISDK(MAQRAISDKGenerated):  # pylint: disable=client-accepts-api-version-keyword
+    """Azure functions for reviewing and updating prompts.
+
+    :ivar reviewer: ReviewerOperations operations
+    :vartype reviewer: maq_rai_sdk.aio.operations.ReviewerOperations
+    :ivar testcase: TestcaseOperations operations
+    :vartype testcase: maq_rai_sdk.aio.operations.TestcaseOperations
+    :keyword endpoint: Service URL. Default value is
+     "https://func-rai-agent-eus.azurewebsites.net/api".
+    :paramtype endpoint: str
+    :keyword request_compression: Content coding used to compress large request bodies ("gzip",
+     "deflate", "br" or "zstd"). Default value is None, bodies are sent uncompressed.
+    :paramtype request_compression: str
+    :keyword request_compression_threshold: Minimum body size in bytes to compress. Default value is 1024.
+    :paramtype request_compression_threshold: int
+    :keyword accept_encodings: Content codings to negotiate for responses, in order of preference.
+     Responses are decoded as they stream in. Pass :func:`~maq_rai_sdk.available_encodings` to
+     accept everything installed. Default value is None, the transport default.
+    :paramtype accept_encodings: list[str]
+    :keyword content_types: Binary media types to negotiate for bodies, most preferred first, for
+     example ``["application/msgpack", "application/cbor"]``. Responses are requested in them right
+     away; JSON request bodies switch over once the service advertises support. JSON stays the
+     fallback. Default value is None, JSON only.
+    :paramtype content_types: list[str]
+    :keyword response_cache: Cache responses following their ``ETag`` and ``Cache-Control`` headers.
+     Pass True for a private :class:`~maq_rai_sdk.ResponseCache` or an instance to share one between
+     clients. Default value is None, no caching.
+    :paramtype response_cache: bool or ~maq_rai_sdk.ResponseCache
+    :keyword dns_cache: Resolve host names through a :class:`~maq_rai_sdk.DnsCache` with the default
+     aiohttp transport. Pass True for a private cache or an instance to share one between clients.
+     Cannot be combined with ``transport``. Default value is None, aiohttp's own per-session cache.
+    :paramtype dns_cache: bool or ~maq_rai_sdk.DnsCache
+    :keyword hedging: Send a duplicate request for calls slower than the observed p95 latency and
+     keep the first answer, within a budget of 5% extra requests. Pass True for the defaults or a
+     :class:`~maq_rai_sdk.aio.RequestHedger` to tune or share them. Stream bodies are never hedged.
+     Default value is None, no hedging.
+    :paramtype hedging: bool or ~maq_rai_sdk.aio.RequestHedger
+    :keyword circuit_breakers: Fail fast on endpoints that keep failing or answering slowly, see
+     :class:`~maq_rai_sdk.CircuitBreakerPolicy`. Pass True for the default thresholds or a
+     :class:`~maq_rai_sdk.CircuitBreakers` to tune or share them. Default value is None, no circuits.
+    :paramtype circuit_breakers: bool or ~maq_rai_sdk.CircuitBreakers
+    :keyword resilient: Resilient mode. 401 and 500 answers raise
+     :class:`~azure.core.exceptions.ClientAuthenticationError` and
+     :class:`~azure.core.exceptions.HttpResponseError` instead of returning None, and calls are
+     retried after 500, 502, 503 and 504 answers with jittered backoff honoring ``Retry-After``,
+     paid from a :class:`~maq_rai_sdk.RetryBudget`. Pass True for a private budget of 10% of calls
+     or a budget to share it between clients. A custom ``retry_policy`` is kept as it is.
+     Default value is None, the generated behavior.
+    :paramtype resilient: bool or ~maq_rai_sdk.RetryBudget
+    :keyword rate_limit: Pace every request, retries included, through a
+     :class:`~maq_rai_sdk.RateLimiter`; share one to pace several clients together. 429 and 503
+     answers with ``Retry-After`` pause the limiter. Default value is None, no limit.
+    :paramtype rate_limit: ~maq_rai_sdk.RateLimiter
+    :keyword scheduler: Queue calls by priority class, see :class:`~maq_rai_sdk.aio.PriorityScheduler`.
+     Can be shared between clients. Default value is None, calls are sent right away.
+    :paramtype scheduler: ~maq_rai_sdk.aio.PriorityScheduler
+    :keyword batching: Gather concurrent calls into batch requests, see
+     :class:`~maq_rai_sdk.aio.MicroBatcher`. Pass True for the defaults or a batcher to tune it.
+     Needs a service exposing the batch routes. Default value is None, one request per call.
+    :paramtype batching: bool or ~maq_rai_sdk.aio.MicroBatcher
+    :keyword decode_offload_threshold: Decode JSON response bodies of at least this many bytes on a
+     worker thread instead of the event loop, see :class:`~maq_rai_sdk.aio.OffloadingContentDecodePolicy`.
+     Default value is None, every body is decoded on the loop.
+    :paramtype decode_offload_threshold: int
+    :keyword decode_executor: Executor large bodies are decoded in. Default value is None, the
+     loop's default thread pool.
+    :paramtype decode_executor: ~concurrent.futures.Executor
+    """
+
+    def __init__(
+        self,
+        *,
+        endpoint: str = _DEFAULT_ENDPOINT,
+        request_compression: Optional[str] = None,
+        request_compression_threshold: int = 1024,
+        accept_encodings: Optional[Sequence[str]] = None,
+        content_types: Optional[Sequence[str]] = None,
+        response_cache: Union[bool, ResponseCache, None] = None,
+        hedging: Union[bool, RequestHedger, None] = None,
+        dns_cache: Union[bool, DnsCache, None] = None,
+        circuit_breakers: Union[bool, CircuitBreakers, None] = None,
+        resilient: Union[bool, RetryBudget, None] = None,
+        rate_limit: Optional[RateLimiter] = None,
+        scheduler: Optional[PriorityScheduler] = None,
+        batching: Union[bool, MicroBatcher, None] = None,
+        decode_offload_threshold: Optional[int] = None,
+        decode_executor: Optional[Executor] = None,
+        **kwargs: Any
+    ) -> None:
+        resolver = _dns_cache_option(dns_cache, kwargs)
+        budget = resilient if isinstance(resilient, RetryBudget) else None
+        if resilient is True:
+            budget = RetryBudget()
+        if budget is not None and kwargs.get("retry_policy") is None:
+            kwargs["retry_policy"] = AsyncResilientRetryPolicy(budget, **kwargs)
+        if resolver is not None:
+            from ._dns import _DnsCachingAioHttpTransport  # pylint: disable=import-outside-toplevel
+
+            kwargs["transport"] = _DnsCachingAioHttpTransport(resolver, **kwargs)
+        per_call = []
+        per_retry: list[Any] = [DeadlinePolicy()]
+        cache = response_cache if isinstance(response_cache, ResponseCache) else None
+        if response_cache is True:
+            cache = ResponseCache()
+        if cache is not None:
+            per_call.append(AsyncResponseCachePolicy(cache))
+        breakers = circuit_breakers if isinstance(circuit_breakers, CircuitBreakers) else None
+        if circuit_breakers is True:
+            breakers = CircuitBreakers()
+        if breakers is not None:
+            per_call.append(AsyncCircuitBreakerPolicy(breakers))
+        negotiator = None
+        decode_policy = None
+        if content_types:
+            negotiator = ContentNegotiator(content_types)
+            per_call.append(ContentNegotiationPolicy(negotiator))
+            decode_policy = CodecContentDecodePolicy(**kwargs)
+        if decode_offload_threshold is not None:
+            decode_policy = OffloadingContentDecodePolicy(decode_offload_threshold, decode_executor, **kwargs)
+        if decode_policy is not None and kwargs.get("policies") is None:
+            kwargs["policies"] = _default_policies(MAQRAISDKConfiguration, kwargs, decode_policy)
+        if request_compression:
+            per_call.append(RequestCompressionPolicy(request_compression, threshold=request_compression_threshold))
+        if accept_encodings is not None:
+            per_retry.append(AsyncResponseDecompressionPolicy(accept_encodings))
+        if rate_limit is not None:
+            per_retry.append(AsyncRateLimitPolicy(rate_limit))
+        _add_policies(kwargs, per_call, per_retry)
+        super().__init__(endpoint=endpoint, **kwargs)
+        self._config.content_negotiator = negotiator
+        self._config.response_cache = cache
+        self._config.circuit_breakers = breakers
+        self._config.retry_budget = budget
+        self._config.rate_limiter = rate_limit
+        self._config.hedger = RequestHedger() if hedging is True else hedging or None
+        self._config.scheduler = scheduler
+        batcher = batching if isinstance(batching, MicroBatcher) else None
+        if batching is True:
+            batcher = MicroBatcher()
+        if batcher is not None:
+            batcher._attach(self._client, strict=budget is not None)  # pylint: disable=protected-access
+        self._config.batcher = batcher
+        self._warmer: Optional[KeepWarm] = None
+        self._loop_monitor: Optional[LoopLagMonitor] = None
+
+    @property
+    def response_cache(self) -> Optional[ResponseCache]:
+        """The response cache of this client, or None if caching is off.
+
+        :return: The cache or None.
+        :rtype: ~maq_rai_sdk.ResponseCache or None
+        """
+        return self._config.response_cache
+
+    @property
+    def circuit_breakers(self) -> Optional[CircuitBreakers]:
+        """The circuits of this client, or None if circuit breaking is off.
+
+        :return: The circuits or None.
+        :rtype: ~maq_rai_sdk.CircuitBreakers or None
+        """
+        return self._config.circuit_breakers
+
+    @property
+    def retry_budget(self) -> Optional[RetryBudget]:
+        """The retry budget of this client, or None outside resilient mode.
+
+        :return: The budget or None.
+        :rtype: ~maq_rai_sdk.RetryBudget or None
+        """
+        return self._config.retry_budget
+
+    @property
+    def rate_limiter(self) -> Optional[RateLimiter]:
+        """The rate limiter of this client, or None if calls are not paced.
+
+        :return: The limiter or None.
+        :rtype: ~maq_rai_sdk.RateLimiter or None
+        """
+        return self._config.rate_limiter
+
+    @property
+    def hedger(self) -> Optional[RequestHedger]:
+        """The request hedger of this client, or None if hedging is off.
+
+        :return: The hedger or None.
+        :rtype: ~maq_rai_sdk.aio.RequestHedger or None
+        """
+        return self._config.hedger
+
+    @property
+    def scheduler(self) -> Optional[PriorityScheduler]:
+        """The priority scheduler of this client, or None if calls are not scheduled.
+
+        :return: The scheduler or None.
+        :rtype: ~maq_rai_sdk.aio.PriorityScheduler or None
+        """
+        return self._config.scheduler
+
+    @property
+    def batcher(self) -> Optional[MicroBatcher]:
+        """The micro-batcher of this client, or None if calls are not batched.
+
+        :return: The batcher or None.
+        :rtype: ~maq_rai_sdk.aio.MicroBatcher or None
+        """
+        return self._config.batcher
+
+    @property
+    def warmer(self) -> Optional[KeepWarm]:
+        """The keep-warm prober with its cold and warm latency histograms, or None before
+        :meth:`keep_warm` or :meth:`prewarm` was first called.
+
+        :return: The prober or None.
+        :rtype: ~maq_rai_sdk.aio.KeepWarm or None
+        """
+        return self._warmer
+
+    async def keep_warm(self, interval: float = 240.0, **kwargs: Any) -> KeepWarm:
+        """Start probing the endpoint every ``interval`` seconds in the background.
+
+        The first probe is sent right away. Calling it again restarts probing with the new
+        settings and keeps the recorded histograms. Probing stops when the client is closed.
+
+        :param float interval: Seconds between probes. Default value is 240.
+        :keyword path: Path probed, relative to the endpoint. Default value is "/".
+        :paramtype path: str
+        :keyword cold_threshold: Probe latency in seconds above which the instance is considered
+         cold. Default value is 1.0.
+        :paramtype cold_threshold: float
+        :keyword jitter: Fraction of ``interval`` the schedule is randomly shifted by. Default value is 0.1.
+        :paramtype jitter: float
+        :return: The running prober.
+        :rtype: ~maq_rai_sdk.aio.KeepWarm
+        """
+        previous = self._warmer
+        warmer = KeepWarm(self, interval=interval, **kwargs)
+        if previous is not None:
+            await previous.stop()
+            warmer.cold, warmer.warm, warmer.failures = previous.cold, previous.warm, previous.failures
+        self._warmer = warmer
+        warmer.start()
+        return warmer
+
+    async def stop_keep_warm(self) -> None:
+        """Stop the background probing started by :meth:`keep_warm`."""
+        if self._warmer is not None:
+            await self._warmer.stop()
+
+    async def prewarm(self, instances: int) -> list[Optional[float]]:
+        """Send ``instances`` concurrent probes, each on its own connection, before a large batch.
+
+        Concurrent load is what makes the Function App scale out; how many instances it actually
+        allocates is up to the platform.
+
+        :param int instances: Number of concurrent probes.
+        :return: The probe latencies, None for failed probes.
+        :rtype: list[float or None]
+        """
+        if self._warmer is None:
+            self._warmer = KeepWarm(self)
+        return await self._warmer.prewarm(instances)
+
+    @property
+    def loop_monitor(self) -> Optional[LoopLagMonitor]:
+        """The event loop lag monitor started by :meth:`monitor_loop`, or None.
+
+        :return: The monitor or None.
+        :rtype: ~maq_rai_sdk.aio.LoopLagMonitor or None
+        """
+        return self._loop_monitor
+
+    async def monitor_loop(self, interval: float = 0.1, **kwargs: Any) -> LoopLagMonitor:
+        """Start measuring the lag of the running event loop in the background.
+
+        Calling it again restarts monitoring with the new settings. Monitoring stops when the
+        client is closed.
+
+        :param float interval: Seconds between two measurements. Default value is 0.1.
+        :keyword threshold: Lag in seconds reported as a stall. Default value is 0.1.
+        :paramtype threshold: float
+        :keyword on_stall: Called with the lag in seconds of every stall. Default value is None.
+        :paramtype on_stall: Callable[[float], None]
+        :return: The running monitor.
+        :rtype: ~maq_rai_sdk.aio.LoopLagMonitor
+        """
+        await self.stop_monitor_loop()
+        self._loop_monitor = LoopLagMonitor(interval=interval, **kwargs)
+        self._loop_monitor.start()
+        return self._loop_monitor
+
+    async def stop_monitor_loop(self) -> None:
+        """Stop the monitoring started by :meth:`monitor_loop`."""
+        if self._loop_monitor is not None:
+            await self._loop_monitor.stop()
+
+    async def warmup(self, connections: int = 1) -> int:
+        """Resolve the endpoint and open ``connections`` keep-alive connections before the first calls.
+
+        The connections are opened by concurrent ``HEAD`` requests sent straight to the transport,
+        and stay in its pool afterwards. Over HTTP/2 they share one connection.
+
+        :param int connections: Number of connections to open. Default value is 1.
+        :return: The number of probes that succeeded.
+        :rtype: int
+        """
+        transport = self._client._pipeline._transport  # pylint: disable=protected-access
+        await transport.open()
+        url = self._client.format_url("/")
+
+        async def probe() -> None:
+            response = await transport.send(HttpRequest("HEAD", url))
+            await response.close()
+
+        results = await asyncio.gather(*(probe() for _ in range(connections)), return_exceptions=True)
+        return sum(1 for result in results if not isinstance(result, BaseException))
+
+    async def _shutdown(self) -> None:
+        await self.stop_keep_warm()
+        await self.stop_monitor_loop()
+        if self._config.batcher is not None:
+            await self._config.batcher.close()
+
+    async def close(self) -> None:
+        await self._shutdown()
+        await super().close()
+
+    async def __aexit__(self, *exc_details: Any) -> None:
+        await self._shutdown()
+        await super().__aexit__(*exc_details)
+
+
+class ClientRegistry:
+    """Cache of :class:`~maq_rai_sdk.aio.MAQRAISDK` clients keyed by endpoint and function key.
+
+    Every client handed out by the registry runs on one shared aiohttp session, so all tenants
+    draw from a single connection pool instead of each client opening its own. The least
+    recently used client is closed once more than ``max_clients`` are cached, which stops its
+    keep-warm probes and sends the calls lingering in its batcher. The shared session is created
+    on the first call to :meth:`get`, which must happen on a running loop.
+
+    :keyword max_clients: Maximum number of cached clients. Default value is 128.
+    :paramtype max_clients: int
+    :keyword pool_maxsize: Maximum number of simultaneous connections across all hosts.
+     Default value is 100.
+    :paramtype pool_maxsize: int
+    :keyword pool_maxsize_per_host: Maximum number of simultaneous connections to one host. 0 means
+     no per-host limit. Default value is 0.
+    :paramtype pool_maxsize_per_host: int
+    :keyword keep_alive: Whether connections are kept alive between requests. Default value is True.
+    :paramtype keep_alive: bool
+    :keyword keep_alive_timeout: Seconds an idle connection is kept open. Default value is 15.
+    :paramtype keep_alive_timeout: float
+    :keyword dns_cache: Resolve host names for the shared session through a
+     :class:`~maq_rai_sdk.DnsCache`. Pass True for a private cache or an instance to share one.
+     Default value is None, aiohttp's own per-session cache.
+    :paramtype dns_cache: bool or ~maq_rai_sdk.DnsCache
+
+    Any other keyword arguments are forwarded to every client the registry creates.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_clients: int = 128,
+        pool_maxsize: int = 100,
+        pool_maxsize_per_host: int = 0,
+        keep_alive: bool = True,
+        keep_alive_timeout: float = 15.0,
+        dns_cache: Union[bool, DnsCache, None] = None,
+        **kwargs: Any
+    ) -> None:
+        if max_clients < 1:
+            raise ValueError("max_clients must be at least 1")
+        self._max_clients = max_clients
+        self._pool_maxsize = pool_maxsize
+        self._pool_maxsize_per_host = pool_maxsize_per_host
+        self._keep_alive = keep_alive
+        self._keep_alive_timeout = keep_alive_timeout
+        self._dns_cache = _dns_cache_option(dns_cache, {})
+        self._client_kwargs = kwargs
+        self._clients: "OrderedDict[tuple[str, Optional[str]], MAQRAISDK]" = OrderedDict()
+        self._session: Any = None
+        self._transport: Optional[AsyncHttpTransport] = None
+        self._closing: set["asyncio.Task[None]"] = set()
+        self._closed = False
+
+    def _get_transport(self) -> AsyncHttpTransport:
+        if self._transport is None:
+            import aiohttp  # pylint: disable=import-outside-toplevel
+            from azure.core.pipeline.transport import (  # pylint: disable=import-outside-toplevel
+                AioHttpTransport,
+            )
+
+            connector_kwargs = {
+                "limit": self._pool_maxsize,
+                "limit_per_host": self._pool_maxsize_per_host,
+                "keepalive_timeout": self._keep_alive_timeout if self._keep_alive else None,
+                "force_close": not self._keep_alive,
+            }
+            if self._dns_cache is not None:
+                from ._dns import _dns_connector  # pylint: disable=import-outside-toplevel
+
+                connector = _dns_connector(self._dns_cache, **connector_kwargs)
+            else:
+                connector = aiohttp.TCPConnector(**connector_kwargs)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                trust_env=self._client_kwargs.get("use_env_settings", True),
+                cookie_jar=aiohttp.DummyCookieJar(),
+                auto_decompress=False,
+            )
+            self._transport = AioHttpTransport(session=self._session, session_owner=False)
+        return self._transport
+
+    def get(self, endpoint: str = _DEFAULT_ENDPOINT, key: Optional[str] = None) -> MAQRAISDK:
+        """Return the client for ``endpoint`` and ``key``, creating it on first use.
+
+        :param str endpoint: Service URL. Default value is
+         "https://func-rai-agent-eus.azurewebsites.net/api".
+        :param key: Function App host key, sent as the ``code`` query parameter. Default value is None.
+        :type key: str or None
+        :return: The cached client.
+        :rtype: ~maq_rai_sdk.aio.MAQRAISDK
+        """
+        if self._closed:
+            raise ValueError("ClientRegistry has already been closed.")
+        cache_key = (endpoint, key)
+        client = self._clients.get(cache_key)
+        if client is not None:
+            self._clients.move_to_end(cache_key)
+            return client
+        client = MAQRAISDK(
+            endpoint=_with_function_key(endpoint, key), transport=self._get_transport(), **self._client_kwargs
+        )
+        self._clients[cache_key] = client
+        loop = asyncio.get_running_loop()
+        while len(self._clients) > self._max_clients:
+            # Closing a client leaves the shared transport open; the registry owns it.
+            task = loop.create_task(self._clients.popitem(last=False)[1].close())
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+        return client
+
+    async def evict(self, endpoint: str = _DEFAULT_ENDPOINT, key: Optional[str] = None) -> None:
+        """Close and forget the cached client for ``endpoint`` and ``key``, if any.
+
+        :param str endpoint: Service URL.
+        :param key: Function App host key. Default value is None.
+        :type key: str or None
+        """
+        client = self._clients.pop((endpoint, key), None)
+        if client is not None:
+            await client.close()
+
+    async def close(self) -> None:
+        """Close every cached client and the shared connection pool."""
+        self._closed = True
+        clients = list(self._clients.values())
+        self._clients.clear()
+        for client in clients:
+            await client.close()
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+            self._transport = None
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *exc_details: Any) -> None:
+        await self.close()
+
+
+class _RoutedReviewerOperations:
+    def __init__(self, client: "MultiEndpointClient") -> None:
+        self._client = client
+
+    async def post(self, body: Union[JSON, IO[bytes]], **kwargs: Any) -> Optional[JSON]:
+        """Review and update a prompt on one of the endpoints.
+
+        :param body: Is either a JSON type or a IO[bytes] type. Required.
+        :type body: JSON or IO[bytes]
+        :keyword deadline: Time by which the call must complete, failovers included, as seconds since
+         the epoch or an aware datetime. Default value is None, no deadline.
+        :paramtype deadline: float or ~datetime.datetime
+        :return: JSON object or None
+        :rtype: JSON or None
+        :raises ~azure.core.exceptions.HttpResponseError:
+        """
+        return await self._client._call(  # pylint: disable=protected-access
+            lambda client, **kw: client.reviewer.post(body, **kw), body, kwargs
+        )
+
+
+class _RoutedTestcaseOperations:
+    def __init__(self, client: "MultiEndpointClient") -> None:
+        self._client = client
+
+    async def generator_post(self, body: Union[JSON, IO[bytes]], **kwargs: Any) -> Optional[JSON]:
+        """Generate testcases from a prompt on one of the endpoints.
+
+        :param body: Is either a JSON type or a IO[bytes] type. Required.
+        :type body: JSON or IO[bytes]
+        :keyword deadline: Time by which the call must complete, failovers included, as seconds since
+         the epoch or an aware datetime. Default value is None, no deadline.
+        :paramtype deadline: float or ~datetime.datetime
+        :return: JSON object or None
+        :rtype: JSON or None
+        :raises ~azure.core.exceptions.HttpResponseError:
+        """
+        return await self._client._call(  # pylint: disable=protected-access
+            lambda client, **kw: client.testcase.generator_post(body, **kw), body, kwargs
+        )
+
+
+class MultiEndpointClient:
+    """Async version of :class:`~maq_rai_sdk.MultiEndpointClient`.
+
+    Background health checks start with the first call or ``async with``.
+
+    :param endpoints: Endpoint URLs, or ``(url, key)`` pairs with the Function App host key.
+    :type endpoints: list[str or tuple[str, str]]
+    :keyword router: The routing strategy, for example a :class:`~maq_rai_sdk.ConsistentHashRouter`
+     to keep each prompt on one endpoint. Default value is None, a :class:`~maq_rai_sdk.LeastLoadedRouter`.
+    :paramtype router: ~maq_rai_sdk.LeastLoadedRouter or ~maq_rai_sdk.ConsistentHashRouter
+    :keyword max_attempts: Endpoints tried per call. Default value is None, every endpoint.
+    :paramtype max_attempts: int
+    :keyword eject_after: Consecutive failures that eject an endpoint. Default value is 3.
+    :paramtype eject_after: int
+    :keyword ejection_time: Seconds an ejected endpoint stays out of rotation. Default value is 30.
+    :paramtype ejection_time: float
+    :keyword health_check_interval: Seconds between background health checks of every endpoint.
+     Default value is None, endpoints are only checked by :meth:`health_check`.
+    :paramtype health_check_interval: float
+
+    Any other keyword arguments are forwarded to the :class:`~maq_rai_sdk.aio.MAQRAISDK` client
+    created for each endpoint.
+    """
+
+    def __init__(
+        self,
+        endpoints: Sequence[EndpointSpec],
+        *,
+        router: Any = None,
+        max_attempts: Optional[int] = None,
+        eject_after: int = 3,
+        ejection_time: float = 30.0,
+        health_check_interval: Optional[float] = None,
+        **kwargs: Any
+    ) -> None:
+        if kwargs.get("circuit_breakers") is True:
+            kwargs["circuit_breakers"] = CircuitBreakers()
+        if kwargs.get("resilient") is True:
+            kwargs["resilient"] = RetryBudget()
+        members = []
+        for spec in endpoints:
+            url, key = _parse_endpoint(spec)
+            members.append(Endpoint(url, MAQRAISDK(endpoint=_with_function_key(url, key), **kwargs)))
+        self._pool = EndpointPool(
+            members, router=router, eject_after=eject_after, ejection_time=ejection_time
+        )
+        self._max_attempts = max_attempts
+        self._client_kwargs = kwargs
+        self._health_check_interval = health_check_interval
+        self._health_task: Optional["asyncio.Task[None]"] = None
+        self.reviewer = _RoutedReviewerOperations(self)
+        self.testcase = _RoutedTestcaseOperations(self)
+
+    @property
+    def endpoints(self) -> list[Endpoint]:
+        """The endpoints and their routing state.
+
+        :return: The endpoints.
+        :rtype: list[~maq_rai_sdk.Endpoint]
+        """
+        return self._pool.endpoints
+
+    def add_endpoint(self, url: str, key: Optional[str] = None) -> Endpoint:
+        """Add an endpoint to the rotation.
+
+        :param str url: The endpoint URL.
+        :param key: The Function App host key. Default value is None.
+        :type key: str or None
+        :return: The new endpoint.
+        :rtype: ~maq_rai_sdk.Endpoint
+        """
+        endpoint = Endpoint(url, MAQRAISDK(endpoint=_with_function_key(url, key), **self._client_kwargs))
+        self._pool.add(endpoint)
+        return endpoint
+
+    async def remove_endpoint(self, url: str) -> None:
+        """Take an endpoint out of the rotation and close its client.
+
+        :param str url: The endpoint URL, without its key.
+        """
+        await self._pool.remove(url).client.close()
+
+    def metrics(self) -> dict[str, Any]:
+        """Return the routing and circuit state of every endpoint.
+
+        :return: ``{"endpoints": [...]}`` with one :meth:`~maq_rai_sdk.Endpoint.snapshot` per endpoint,
+         and ``"circuits"`` with :meth:`~maq_rai_sdk.CircuitBreakers.snapshot` if circuit breaking is on.
+        :rtype: dict
+        """
+        metrics: dict[str, Any] = {"endpoints": self._pool.snapshot()}
+        breakers = self._client_kwargs.get("circuit_breakers")
+        if isinstance(breakers, CircuitBreakers):
+            metrics["circuits"] = breakers.snapshot()
+        return metrics
+
+    def _start_health_checks(self) -> None:
+        if self._health_check_interval and self._health_task is None:
+            self._health_task = asyncio.ensure_future(self._health_loop(self._health_check_interval))
+
+    async def _call(self, invoke: Callable[..., Awaitable[Any]], body: Any, kwargs: dict[str, Any]) -> Any:
+        self._start_health_checks()
+        deadline = _resolve_deadline(kwargs)
+        if deadline is not None:
+            kwargs["deadline"] = deadline  # one deadline for every endpoint tried
+        key = _routing_key(body)
+        attempts = 1 if isinstance(body, IOBase) else self._max_attempts or len(self._pool.endpoints)
+        user_cls = kwargs.pop("cls", None)
+        tried: list[Endpoint] = []
+        error: Optional[BaseException] = None
+        result = None
+        for _ in range(attempts):
+            endpoint = self._pool.acquire(key, tried)
+            if endpoint is None:
+                break
+            tried.append(endpoint)
+            statuses: list[int] = []
+            started = time.monotonic()
+            ok: Optional[bool] = None  # stays None for errors that are not the endpoint's fault
+            try:
+                result = await invoke(endpoint.client, cls=_status_recorder(user_cls, statuses), **kwargs)
+                ok = _call_outcome(statuses)
+                error = None
+            except Exception as err:  # pylint: disable=broad-except
+                if not _is_failover_error(err):
+                    raise
+                ok = False
+                error = err
+            finally:
+                self._pool.release(endpoint, time.monotonic() - started, ok)
+            if ok is not False:
+                return result
+        if error is not None:
+            raise error
+        return result
+
+    async def health_check(self) -> dict[str, bool]:
+        """Probe every endpoint concurrently and update its health.
+
+        An endpoint is healthy when a plain ``GET`` to it gets any answer below 500.
+
+        :return: Health per endpoint URL.
+        :rtype: dict[str, bool]
+        """
+
+        async def check(endpoint: Endpoint) -> bool:
+            try:
+                request = HttpRequest("GET", "/", headers={"Cache-Control": "no-store"})
+                healthy = (await endpoint.client.send_request(request)).status_code < 500
+            except Exception:  # pylint: disable=broad-except
+                healthy = False
+            self._pool.mark_health(endpoint, healthy)
+            return healthy
+
+        results = await asyncio.gather(*(check(endpoint) for endpoint in self._pool.endpoints))
+        return {endpoint.url: healthy for endpoint, healthy in zip(self._pool.endpoints, results)}
+
+    async def _health_loop(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await self.health_check()
+
+    async def close(self) -> None:
+        """Stop the health checks and close every endpoint client."""
+        task, self._health_task = self._health_task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        for endpoint in self._pool.endpoints:
+            await endpoint.client.close()
+
+    async def __aenter__(self) -> Self:
+        self._start_health_checks()
+        return self
+
+    async def __aexit__(self, *exc_details: Any) -> None:
+        await self.close()
+
+
+__all__: list[str] = [
+    "MAQRAISDK",
+    "AsyncAdaptiveLROBasePolling",
+    "AsyncCircuitBreakerPolicy",
+    "AsyncHttpXTransport",
+    "AsyncRateLimitPolicy",
+    "AsyncResilientRetryPolicy",
+    "AsyncResponseCachePolicy",
+    "AsyncResponseDecompressionPolicy",
+    "BatchFormat",
+    "BatchItemResult",
+    "BatchRunner",
+    "ClientRegistry",
+    "DeadlinePolicy",
+    "KeepWarm",
+    "LoopLagMonitor",
+    "MicroBatcher",
+    "MultiEndpointClient",
+    "OffloadingContentDecodePolicy",
+    "PriorityScheduler",
+    "PromptResult",
+    "RequestHedger",
+    "ReviewPipeline",
+]  # Add all objects you want publicly available to users at this package level
 
 
 def patch_sdk():
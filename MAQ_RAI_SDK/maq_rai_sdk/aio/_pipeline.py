@@ -0,0 +1,247 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""Staged review, update and test case generation of many prompts."""
+import asyncio
+import time
+from typing import Any, AsyncIterable, AsyncIterator, Iterable, NamedTuple, Optional, Union
+
+from azure.core.exceptions import AzureError, ClientAuthenticationError
+
+from .._metrics import LatencyHistogram
+from .._review import _updated_prompt
+
+
+class PromptResult(NamedTuple):
+    """Outcome of one prompt of a :class:`~maq_rai_sdk.aio.ReviewPipeline`.
+
+    A stage that failed has its exception in ``errors`` under "review", "testcases" or
+    "updated_testcases", and None as its result.
+    """
+
+    index: int
+    prompt: str
+    review: Any
+    updated_prompt: Optional[str]
+    testcases: Any
+    updated_testcases: Any
+    errors: dict[str, AzureError]
+
+
+class _Prompt:
+    __slots__ = (
+        "index",
+        "prompt",
+        "pending",
+        "review",
+        "updated_prompt",
+        "testcases",
+        "updated_testcases",
+        "errors",
+        "unchanged",
+    )
+
+    def __init__(self, index: int, prompt: str, pending: int) -> None:
+        self.index = index
+        self.prompt = prompt
+        self.pending = pending
+        self.review: Any = None
+        self.updated_prompt: Optional[str] = None
+        self.testcases: Any = None
+        self.updated_testcases: Any = None
+        self.errors: dict[str, AzureError] = {}
+        self.unchanged = False
+
+    def result(self) -> PromptResult:
+        return PromptResult(
+            self.index,
+            self.prompt,
+            self.review,
+            self.updated_prompt,
+            self.testcases,
+            self.testcases if self.unchanged else self.updated_testcases,
+            self.errors,
+        )
+
+
+class ReviewPipeline:
+    """Reviews many prompts and generates test cases for them and their updated versions.
+
+    Every prompt goes through the workflow of the README: ``reviewer.post``, then
+    ``testcase.generator_post`` on the ``updated_result.updatedPrompt`` of the review, and on the
+    original prompt. The stages run concurrently, each with its own number of workers, and hand
+    prompts over through queues of ``queue_size``: a stage that falls behind fills its queue and
+    holds the stages before it back instead of letting work pile up in memory. Generation on the
+    original prompt does not wait for the review and is queued as soon as the prompt is read. A
+    run therefore takes about as long as its slowest stage, not the sum of the stages.
+
+    When the review leaves the prompt unchanged, the test cases of the original prompt are reused
+    for the updated one.
+
+    :param client: A :class:`~maq_rai_sdk.aio.MAQRAISDK` or :class:`~maq_rai_sdk.aio.MultiEndpointClient`.
+    :type client: ~maq_rai_sdk.aio.MAQRAISDK or ~maq_rai_sdk.aio.MultiEndpointClient
+    :keyword review_concurrency: Reviews running at once. Default value is 8.
+    :paramtype review_concurrency: int
+    :keyword generate_concurrency: Test case generations running at once. Default value is 8.
+    :paramtype generate_concurrency: int
+    :keyword queue_size: Capacity of the queue in front of each stage and of the results not yet
+     consumed. Default value is None, twice the larger concurrency.
+    :paramtype queue_size: int
+    :keyword generate_original: Also generate test cases on the original prompt. Default value is True.
+    :paramtype generate_original: bool
+    :keyword review_options: Fields added to every review body, for example ``{"need_metrics": True}``.
+     Default value is None.
+    :paramtype review_options: dict[str, any]
+    :keyword testcase_options: Fields added to every generation body, for example
+     ``{"number_of_testcases": 10, "user_categories": ["xpia", "jailbreak"]}``. Default value is None.
+    :paramtype testcase_options: dict[str, any]
+    :ivar latency: Latencies of the successful calls of each stage, under "review" and "generate".
+    :vartype latency: dict[str, ~maq_rai_sdk.LatencyHistogram]
+
+    Any other keyword arguments, such as ``timeout``, are passed to every call.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        *,
+        review_concurrency: int = 8,
+        generate_concurrency: int = 8,
+        queue_size: Optional[int] = None,
+        generate_original: bool = True,
+        review_options: Optional[dict[str, Any]] = None,
+        testcase_options: Optional[dict[str, Any]] = None,
+        **kwargs: Any
+    ) -> None:
+        if review_concurrency < 1 or generate_concurrency < 1:
+            raise ValueError("review_concurrency and generate_concurrency must be at least 1")
+        if queue_size is not None and queue_size < 1:
+            raise ValueError("queue_size must be at least 1")
+        self.client = client
+        self.review_concurrency = review_concurrency
+        self.generate_concurrency = generate_concurrency
+        self.queue_size = queue_size or 2 * max(review_concurrency, generate_concurrency)
+        self.generate_original = generate_original
+        self.review_options = dict(review_options or {})
+        self.testcase_options = dict(testcase_options or {})
+        self.latency = {"review": LatencyHistogram(), "generate": LatencyHistogram()}
+        self._kwargs = kwargs
+
+    async def run(self, prompts: Union[Iterable[str], AsyncIterable[str]]) -> AsyncIterator[PromptResult]:
+        """Run ``prompts`` through the stages and yield each result once all its stages are done.
+
+        Results come in the order they complete; their ``index`` is the position of the prompt in
+        ``prompts``. Prompts are read only as fast as the review stage takes them. Stopping the
+        iteration cancels the calls still running.
+
+        :param prompts: The prompts.
+        :type prompts: iterable[str] or async iterable[str]
+        :return: The results.
+        :rtype: AsyncIterator[~maq_rai_sdk.aio.PromptResult]
+        :raises ~azure.core.exceptions.ClientAuthenticationError: If the service rejects the
+         credentials. The calls still running are cancelled.
+        """
+        reviews: "asyncio.Queue[Optional[_Prompt]]" = asyncio.Queue(self.queue_size)
+        generations: "asyncio.Queue[Optional[tuple[_Prompt, str, str]]]" = asyncio.Queue(self.queue_size)
+        results: "asyncio.Queue[Optional[PromptResult]]" = asyncio.Queue(self.queue_size)
+
+        async def settle(state: _Prompt) -> None:
+            state.pending -= 1
+            if not state.pending:
+                await results.put(state.result())
+
+        async def read() -> None:
+            index = 0
+            async for prompt in _iterate(prompts):
+                state = _Prompt(index, prompt, 2 if self.generate_original else 1)
+                index += 1
+                await reviews.put(state)
+                if self.generate_original:
+                    await generations.put((state, "testcases", prompt))
+            for _ in range(self.review_concurrency):
+                await reviews.put(None)
+
+        async def review() -> None:
+            while True:
+                state = await reviews.get()
+                if state is None:
+                    return
+                body = dict(self.review_options, prompt=state.prompt)
+                state.review = await self._call(self.client.reviewer.post, body, "review", state, "review")
+                state.updated_prompt = _updated_prompt(state.review)
+                if state.updated_prompt == state.prompt and self.generate_original:
+                    state.unchanged = True  # its test cases are already being generated
+                elif state.updated_prompt is not None:
+                    state.pending += 1
+                    await generations.put((state, "updated_testcases", state.updated_prompt))
+                await settle(state)
+
+        async def generate() -> None:
+            while True:
+                job = await generations.get()
+                if job is None:
+                    return
+                state, field, prompt = job
+                body = dict(self.testcase_options, prompt=prompt)
+                testcases = await self._call(self.client.testcase.generator_post, body, "generate", state, field)
+                setattr(state, field, testcases)
+                await settle(state)
+
+        async def stages() -> None:
+            reviewers = [asyncio.ensure_future(review()) for _ in range(self.review_concurrency)]
+            generators = [asyncio.ensure_future(generate()) for _ in range(self.generate_concurrency)]
+            try:
+                await asyncio.gather(read(), *reviewers)
+                for _ in generators:
+                    await generations.put(None)
+                await asyncio.gather(*generators)
+                await results.put(None)
+            finally:
+                for task in reviewers + generators:
+                    task.cancel()
+                await asyncio.gather(*reviewers, *generators, return_exceptions=True)
+
+        runner = asyncio.ensure_future(stages())
+        try:
+            while True:
+                get = asyncio.ensure_future(results.get())
+                await asyncio.wait((get, runner), return_when=asyncio.FIRST_COMPLETED)
+                if not get.done():
+                    get.cancel()
+                    runner.result()  # raises what stopped the stages
+                    continue  # they finished; the last results and the end marker are queued
+                result = get.result()
+                if result is None:
+                    return
+                yield result
+        finally:
+            runner.cancel()
+            await asyncio.gather(runner, return_exceptions=True)
+
+    async def _call(self, operation: Any, body: dict[str, Any], stage: str, state: _Prompt, field: str) -> Any:
+        started = time.monotonic()
+        try:
+            result = await operation(body, **self._kwargs)
+        except ClientAuthenticationError:
+            raise
+        except AzureError as error:
+            state.errors[field] = error
+            return None
+        self.latency[stage].observe(time.monotonic() - started)
+        return result
+
+    def __repr__(self) -> str:
+        return "<ReviewPipeline review_concurrency={} generate_concurrency={} queue_size={}>".format(
+            self.review_concurrency, self.generate_concurrency, self.queue_size
+        )
+
+
+async def _iterate(prompts: Union[Iterable[str], AsyncIterable[str]]) -> AsyncIterator[str]:
+    if isinstance(prompts, AsyncIterable):
+        async for prompt in prompts:
+            yield prompt
+    else:
+        for prompt in prompts:
+            yield prompt
@@ -0,0 +1,214 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""Async pipeline policies used by the customized aio client."""
+import asyncio
+import time
+from concurrent.futures import Executor
+from typing import Any, Optional
+
+from azure.core.pipeline import PipelineRequest, PipelineResponse
+from azure.core.exceptions import DecodeError
+from azure.core.pipeline.policies import AsyncHTTPPolicy, AsyncRetryPolicy, SansIOHTTPPolicy
+from azure.core.rest._http_response_impl_async import AsyncHttpResponseImpl
+
+from .._compression import get_decoder
+from .._content import JsonCodec, _loads_in_pieces, get_codec
+from .._deadline import DEADLINE_HEADER, DeadlineExceededError, _format_deadline
+from .._retry import RetryBudget
+from .._policies import (
+    CodecContentDecodePolicy,
+    _CircuitBreakerPolicyBase,
+    _RateLimitPolicyBase,
+    _ResilientRetryPolicyBase,
+    _ResponseCachePolicyBase,
+    _ResponseDecompressionPolicyBase,
+    _set_decoded_content,
+)
+
+
+class AsyncResponseDecompressionPolicy(_ResponseDecompressionPolicyBase, AsyncHTTPPolicy):
+    """Async version of :class:`~maq_rai_sdk.ResponseDecompressionPolicy`.
+
+    :param accept_encodings: Codings to advertise, in order of preference. Default value is None,
+     every coding returned by :func:`~maq_rai_sdk.available_encodings`.
+    :type accept_encodings: list[str]
+    """
+
+    async def send(self, request: PipelineRequest) -> PipelineResponse:
+        stream = self._prepare(request)
+        try:
+            response = await self.next.send(request)
+        finally:
+            self._restore(request, stream)
+        if stream:
+            return response
+        http_response = response.http_response
+        decoder = get_decoder(http_response.headers.get("Content-Encoding"))
+        if decoder is None:
+            await http_response.read()
+            return response
+        chunks = []
+        async for chunk in http_response.iter_raw():
+            chunks.append(decoder.decompress(chunk))
+        chunks.append(decoder.flush())
+        _set_decoded_content(http_response, b"".join(chunks))
+        return response
+
+
+class AsyncResponseCachePolicy(_ResponseCachePolicyBase, AsyncHTTPPolicy):
+    """Async version of :class:`~maq_rai_sdk.ResponseCachePolicy`.
+
+    :param cache: The cache to use. Default value is None, a new private cache.
+    :type cache: ~maq_rai_sdk.ResponseCache
+    """
+
+    async def send(self, request: PipelineRequest) -> PipelineResponse:
+        key, entry = self._lookup(request)
+        if key is None:
+            return await self.next.send(request)
+        if entry is not None and entry.fresh:
+            self.cache._record("hits")  # pylint: disable=protected-access
+            return self._serve(request, entry, AsyncHttpResponseImpl)
+        conditional = self._revalidate(request, entry)
+        try:
+            response = await self.next.send(request)
+        finally:
+            if conditional:
+                del request.http_request.headers["If-None-Match"]
+        renewed = self._complete(request, key, entry, response)
+        if renewed is None:
+            return response
+        await response.http_response.close()
+        return self._serve(request, renewed, AsyncHttpResponseImpl)
+
+
+class AsyncCircuitBreakerPolicy(_CircuitBreakerPolicyBase, AsyncHTTPPolicy):
+    """Async version of :class:`~maq_rai_sdk.CircuitBreakerPolicy`.
+
+    :param breakers: The circuits to use. Default value is None, a new private set.
+    :type breakers: ~maq_rai_sdk.CircuitBreakers
+    """
+
+    async def send(self, request: PipelineRequest) -> PipelineResponse:
+        breaker = self._admit(request)
+        started = time.monotonic()
+        response = None
+        error: Optional[BaseException] = None
+        try:
+            response = await self.next.send(request)
+            return response
+        except BaseException as err:
+            error = err
+            raise
+        finally:
+            failed = self._failed(response, error)
+            if failed is None:
+                breaker._release()  # pylint: disable=protected-access
+            else:
+                breaker.record(time.monotonic() - started, not failed)
+
+
+class AsyncResilientRetryPolicy(_ResilientRetryPolicyBase, AsyncRetryPolicy):
+    """Async version of :class:`~maq_rai_sdk.ResilientRetryPolicy`.
+
+    :param budget: The retry budget. Default value is None, a new private budget.
+    :type budget: ~maq_rai_sdk.RetryBudget
+
+    Any other keyword arguments are passed to :class:`~azure.core.pipeline.policies.AsyncRetryPolicy`.
+    """
+
+    def __init__(self, budget: Optional[RetryBudget] = None, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.budget = budget if budget is not None else RetryBudget()
+
+    async def send(self, request: PipelineRequest) -> PipelineResponse:
+        self.budget._deposit()  # pylint: disable=protected-access
+        return await super().send(request)
+
+
+class AsyncRateLimitPolicy(_RateLimitPolicyBase, AsyncHTTPPolicy):
+    """Async version of :class:`~maq_rai_sdk.RateLimitPolicy`. Waiting calls do not block the event loop.
+
+    :param limiter: The rate limit to apply.
+    :type limiter: ~maq_rai_sdk.RateLimiter
+    """
+
+    async def send(self, request: PipelineRequest) -> PipelineResponse:
+        await self.limiter.acquire_async()
+        response = await self.next.send(request)
+        self._observe(response)
+        return response
+
+
+class DeadlinePolicy(SansIOHTTPPolicy):
+    """Fit every attempt of a call into the time left before its ``deadline``.
+
+    The ``deadline`` option of a call, in seconds since the epoch, caps the connect and read
+    timeouts of each attempt at the remaining time and is sent to the service in the
+    ``x-ms-client-deadline`` header as an RFC 3339 timestamp. An attempt that would start after
+    the deadline raises :class:`~maq_rai_sdk.DeadlineExceededError`. Add it as a per-retry
+    policy.
+    """
+
+    def on_request(self, request: PipelineRequest) -> None:
+        options = request.context.options
+        if "deadline" in options:
+            request.context["deadline"] = options.pop("deadline")
+        deadline = request.context.get("deadline")
+        if deadline is None:
+            return
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            raise DeadlineExceededError(deadline)
+        config = getattr(request.context.transport, "connection_config", None)
+        for option, default in (("connection_timeout", "timeout"), ("read_timeout", "read_timeout")):
+            current = options.get(option, getattr(config, default, None))
+            options[option] = remaining if current is None else min(current, remaining)
+        request.http_request.headers[DEADLINE_HEADER] = _format_deadline(deadline)
+
+
+class OffloadingContentDecodePolicy(CodecContentDecodePolicy):
+    """Content decode policy that decodes large JSON bodies on a worker thread.
+
+    Bodies of at least ``threshold`` bytes are decoded in ``executor``, one member of their outer
+    arrays and objects at a time, so other coroutines keep running while a multi-megabyte test
+    case payload is parsed. The decoded body is what ``response.json()`` returns, so it is not
+    decoded a second time by the operation.
+
+    :param int threshold: Minimum body size in bytes decoded off the event loop. Default value is
+     1048576 (1 MiB).
+    :param executor: Executor the bodies are decoded in. Default value is None, the loop's default
+     thread pool.
+    :type executor: ~concurrent.futures.Executor
+    """
+
+    def __init__(self, threshold: int = 1048576, executor: Optional[Executor] = None, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.threshold = threshold
+        self.executor = executor
+        self.offloaded = 0
+
+    async def on_response(self, request: PipelineRequest, response: PipelineResponse) -> None:  # type: ignore[override]
+        if response.context.options.get("stream", True):
+            return
+        http_response = response.http_response
+        if not isinstance(get_codec(http_response.content_type or JsonCodec.media_type), JsonCodec):
+            super().on_response(request, response)
+            return
+        content = http_response.content
+        if len(content) < self.threshold:
+            super().on_response(request, response)
+            deserialized = response.context[self.CONTEXT_NAME]
+        else:
+            encoding = request.context.get("response_encoding") or http_response.encoding
+            loop = asyncio.get_running_loop()
+            try:
+                deserialized = await loop.run_in_executor(self.executor, _loads_in_pieces, content, encoding)
+            except (ValueError, LookupError) as err:
+                raise DecodeError(message="JSON is invalid: {}".format(err), response=http_response, error=err) from err
+            self.offloaded += 1
+            response.context[self.CONTEXT_NAME] = deserialized
+        http_response._json = deserialized  # pylint: disable=protected-access
@@ -0,0 +1,26 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""Async polling of long-running test case generation jobs."""
+from typing import Any
+
+from azure.core.polling.async_base_polling import AsyncLROBasePolling
+
+from .._polling import _AdaptivePollingMixin
+
+
+class AsyncAdaptiveLROBasePolling(_AdaptivePollingMixin, AsyncLROBasePolling):
+    """Async version of :class:`~maq_rai_sdk.AdaptiveLROBasePolling`.
+
+    :param float timeout: Longest wait between two status checks, in seconds. Default value is 30.
+    :keyword min_interval: Wait after the first status check, in seconds. Default value is 1.
+    :paramtype min_interval: float
+    :keyword factor: Growth of the wait after every check. Default value is 2.
+    :paramtype factor: float
+    """
+
+    def __init__(self, timeout: float = 30, *, min_interval: float = 1.0, factor: float = 2.0, **kwargs: Any) -> None:
+        super().__init__(timeout, **kwargs)
+        self._init_adaptive(min_interval, factor)
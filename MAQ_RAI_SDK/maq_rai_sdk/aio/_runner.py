@@ -0,0 +1,356 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""Resumable batch runs over JSONL files."""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, AsyncIterator, BinaryIO, Optional, Union
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore
+
+from azure.core.exceptions import AzureError, ClientAuthenticationError
+
+from .._deadline import DeadlineExceededError
+
+_OPERATIONS = {"reviewer": ("reviewer", "post"), "testcase": ("testcase", "generator_post")}
+_JOURNAL_VERSION = 1
+
+
+class _Line:
+    __slots__ = ("number", "raw", "record")
+
+    def __init__(self, number: int, raw: bytes) -> None:
+        self.number = number
+        self.raw = raw
+        self.record: Optional[bytes] = None
+
+
+class _Journal:
+    """Append-only progress log of a run.
+
+    The first record names the operation. Every following record marks that the first ``lines``
+    input lines are done, that their results end at byte ``offset`` of the output, and the
+    SHA-256 of those input lines. Only the last complete record matters on resume.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.operation: Optional[str] = None
+        self.lines = 0
+        self.offset = 0
+        self.sha256 = hashlib.sha256().hexdigest()
+        self._file: Optional[BinaryIO] = None
+
+    def open(self) -> None:
+        self._file = open(self.path, "a+b")  # pylint: disable=consider-using-with
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self.close()
+                raise ValueError("{} is in use by another run.".format(self.path)) from None
+
+    def load(self) -> bool:
+        assert self._file is not None
+        self._file.seek(0)
+        end = 0
+        for raw in self._file:
+            if not raw.endswith(b"\n"):
+                break  # torn write of a killed run, nothing was acknowledged after it
+            try:
+                record = json.loads(raw)
+            except ValueError:
+                break
+            if "operation" in record:
+                self.operation = record["operation"]
+            else:
+                self.lines, self.offset, self.sha256 = record["lines"], record["offset"], record["sha256"]
+            end += len(raw)
+        # Drop the torn record, or the next one would be appended to it and never parse.
+        self._file.truncate(end)
+        return self.operation is not None
+
+    def start(self, operation: str) -> None:
+        assert self._file is not None
+        self._file.truncate(0)
+        self.operation = operation
+        self._append({"version": _JOURNAL_VERSION, "operation": operation})
+
+    def commit(self, lines: int, offset: int, sha256: str) -> None:
+        self.lines, self.offset, self.sha256 = lines, offset, sha256
+        self._append({"lines": lines, "offset": offset, "sha256": sha256})
+
+    def _append(self, record: dict[str, Any]) -> None:
+        assert self._file is not None
+        self._file.write(json.dumps(record).encode("utf-8") + b"\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class BatchRunner:
+    """Runs every line of a JSONL file through one operation of the async client.
+
+    Each input line is the JSON body of one call. Calls run ``max_concurrency`` at a time and
+    their results are written to the output in input order, one JSON line each:
+    ``{"line": 3, "result": {...}}``, or ``{"line": 3, "error": {"type": ..., "status": ...,
+    "message": ...}}`` for a call that failed. Blank lines are skipped.
+
+    Progress is recorded in an append-only journal next to the output. Running again with the
+    same input, output and journal resumes after the last recorded line: results written after
+    it are discarded and recomputed, so every line appears in the output exactly once. The
+    journal keeps a hash of the lines it covers and refuses to resume with different input.
+    At most ``window`` lines are held in memory, however large the input.
+
+    :param client: A :class:`~maq_rai_sdk.aio.MAQRAISDK` or :class:`~maq_rai_sdk.aio.MultiEndpointClient`.
+    :type client: ~maq_rai_sdk.aio.MAQRAISDK or ~maq_rai_sdk.aio.MultiEndpointClient
+    :param str operation: "reviewer" for ``reviewer.post`` or "testcase" for
+     ``testcase.generator_post``. Default value is "reviewer".
+    :keyword max_concurrency: Maximum number of calls running at once. Default value is 8.
+    :paramtype max_concurrency: int
+    :keyword window: Maximum number of lines read ahead of the first unfinished one. Default
+     value is None, eight times ``max_concurrency``.
+    :paramtype window: int
+    :keyword timeout: Seconds each call may take; a call exceeding it is written as an error.
+     Default value is None, no limit.
+    :paramtype timeout: float
+    :keyword deadline: Time by which the run stops, as seconds since the epoch or an aware
+     datetime. Calls still running are cancelled and left for the next run. Default value is
+     None, no deadline.
+    :paramtype deadline: float or ~datetime.datetime
+
+    Any other keyword arguments are passed to every call.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        operation: str = "reviewer",
+        *,
+        max_concurrency: int = 8,
+        window: Optional[int] = None,
+        timeout: Optional[float] = None,
+        deadline: Union[float, datetime, None] = None,
+        **kwargs: Any
+    ) -> None:
+        if operation not in _OPERATIONS:
+            raise ValueError("Unknown operation {!r}, expected one of: {}".format(operation, ", ".join(_OPERATIONS)))
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        self.client = client
+        self.operation = operation
+        self.max_concurrency = max_concurrency
+        self.window = window if window is not None else max_concurrency * 8
+        if self.window < max_concurrency:
+            raise ValueError("window must be at least max_concurrency")
+        self.deadline = deadline.timestamp() if isinstance(deadline, datetime) else deadline
+        self._kwargs = kwargs
+        if timeout is not None:
+            self._kwargs["timeout"] = timeout
+
+    async def run(
+        self,
+        source: Union[str, BinaryIO],
+        output: str,
+        *,
+        journal: Optional[str] = None,
+        restart: bool = False,
+    ) -> dict[str, Any]:
+        """Run the lines of ``source`` not done yet and append their results to ``output``.
+
+        :param source: Path of the JSONL input, or a binary stream such as ``sys.stdin.buffer``.
+        :type source: str or BinaryIO
+        :param str output: Path of the JSONL output.
+        :keyword journal: Path of the checkpoint journal. Default value is None, ``output`` with a
+         ".journal" suffix.
+        :paramtype journal: str
+        :keyword restart: Ignore the journal and start over. Default value is False.
+        :paramtype restart: bool
+        :return: ``lines`` read in total, ``resumed`` (lines skipped thanks to the journal),
+         ``succeeded`` and ``failed`` calls of this run, and ``complete``, False if the run
+         stopped at its deadline.
+        :rtype: dict[str, any]
+        :raises ValueError: If the journal is in use by another run or belongs to another
+         operation, or if the input or output does not match it.
+        :raises ~azure.core.exceptions.ClientAuthenticationError: If the service rejects the
+         credentials. Progress up to the failure is kept.
+        """
+        state = _Journal(journal or output + ".journal")
+        state.open()
+        try:
+            resume = not restart and state.load()
+            if resume and state.operation != self.operation:
+                raise ValueError(
+                    "{} was written for the {!r} operation, not {!r}.".format(
+                        state.path, state.operation, self.operation
+                    )
+                )
+        except BaseException:
+            state.close()
+            raise
+        out = open(output, "r+b" if resume else "wb")  # pylint: disable=consider-using-with
+        src: BinaryIO = open(source, "rb") if isinstance(source, str) else source  # pylint: disable=consider-using-with
+        try:
+            lines = _read_lines(src)
+            digest = hashlib.sha256()
+            if resume:
+                out.seek(0, os.SEEK_END)
+                if out.tell() < state.offset:
+                    raise ValueError("{} is shorter than {} records.".format(output, state.path))
+                out.truncate(state.offset)
+                out.seek(state.offset)
+                await _skip(lines, state, digest)
+            else:
+                state.start(self.operation)
+            return await self._run(lines, out, state, digest)
+        finally:
+            state.close()
+            out.close()
+            if isinstance(source, str):
+                src.close()
+
+    async def _run(
+        self, lines: AsyncIterator[bytes], out: BinaryIO, state: _Journal, digest: "hashlib._Hash"
+    ) -> dict[str, Any]:
+        group, name = _OPERATIONS[self.operation]
+        call = getattr(getattr(self.client, group), name)
+        kwargs = dict(self._kwargs)
+        if self.deadline is not None:
+            kwargs["deadline"] = self.deadline
+        pending: "deque[_Line]" = deque()
+        window = asyncio.Semaphore(self.window)
+        slots = asyncio.Semaphore(self.max_concurrency)
+        tasks: set["asyncio.Task[None]"] = set()
+        stats: dict[str, Any] = {"lines": state.lines, "resumed": state.lines, "succeeded": 0, "failed": 0}
+        stop: list[BaseException] = []
+
+        def finish(line: _Line, record: bytes) -> None:
+            line.record = record
+            committed = state.lines
+            while pending and pending[0].record is not None:
+                done = pending.popleft()
+                digest.update(done.raw)
+                out.write(done.record)  # type: ignore[arg-type]
+                committed = done.number
+                window.release()
+            if committed != state.lines:
+                out.flush()
+                state.commit(committed, out.tell(), digest.hexdigest())
+
+        def halt(reason: BaseException) -> None:
+            stop.append(reason)
+            window.release()  # wake the reader so it notices
+
+        async def process(line: _Line, body: Any) -> None:
+            try:
+                async with slots:
+                    if stop:
+                        return
+                    result = await call(body, **kwargs)
+            except ClientAuthenticationError as error:
+                halt(error)
+            except AzureError as error:
+                if isinstance(error, DeadlineExceededError) and self._past_deadline():
+                    halt(error)  # the line is left for the next run
+                else:
+                    stats["failed"] += 1
+                    finish(line, _error_record(line.number, error))
+            except BaseException as error:  # pylint: disable=broad-except
+                halt(error)
+                if not isinstance(error, Exception):
+                    raise
+            else:
+                stats["succeeded"] += 1
+                finish(line, _encode({"line": line.number, "result": result}))
+
+        number = state.lines
+        async for raw in lines:
+            await window.acquire()
+            if stop or self._past_deadline():
+                break
+            number += 1
+            stats["lines"] = number
+            line = _Line(number, raw)
+            pending.append(line)
+            if not raw.strip():
+                finish(line, b"")
+                continue
+            try:
+                body = json.loads(raw)
+            except ValueError as error:
+                stats["failed"] += 1
+                finish(line, _error_record(number, error))
+                continue
+            task = asyncio.ensure_future(process(line, body))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks)
+        errors = [reason for reason in stop if not isinstance(reason, DeadlineExceededError)]
+        if errors:
+            raise errors[0]
+        stats["complete"] = not pending and not self._past_deadline()
+        return stats
+
+    def _past_deadline(self) -> bool:
+        return self.deadline is not None and time.time() >= self.deadline
+
+    def __repr__(self) -> str:
+        return "<BatchRunner operation={} max_concurrency={} window={}>".format(
+            self.operation, self.max_concurrency, self.window
+        )
+
+
+async def _read_lines(src: BinaryIO) -> AsyncIterator[bytes]:
+    """Yield the lines of ``src`` without blocking the event loop on a slow pipe."""
+    loop = asyncio.get_running_loop()
+    while True:
+        chunk = await loop.run_in_executor(None, src.readlines, 1 << 16)
+        if not chunk:
+            return
+        for raw in chunk:
+            yield raw
+
+
+async def _skip(lines: AsyncIterator[bytes], state: _Journal, digest: "hashlib._Hash") -> None:
+    """Consume the lines covered by the journal and check they are the ones it recorded."""
+    skipped = 0
+    while skipped < state.lines:
+        try:
+            raw = await lines.__anext__()
+        except StopAsyncIteration:
+            break
+        digest.update(raw)
+        skipped += 1
+    if skipped < state.lines or digest.hexdigest() != state.sha256:
+        raise ValueError("The input does not match the lines recorded in {}.".format(state.path))
+
+
+def _error_record(number: int, error: BaseException) -> bytes:
+    return _encode(
+        {
+            "line": number,
+            "error": {
+                "type": type(error).__name__,
+                "status": getattr(error, "status_code", None),
+                "message": str(error),
+            },
+        }
+    )
+
+
+def _encode(record: dict[str, Any]) -> bytes:
+    return json.dumps(record, default=str).encode("utf-8") + b"\n"
@@ -0,0 +1,186 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""Priority scheduling of concurrent calls."""
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Mapping, Optional
+
+from .._metrics import LatencyHistogram
+
+
+class _PriorityClass:
+    def __init__(self, name: str, weight: float, reserved: int) -> None:
+        self.name = name
+        self.weight = weight
+        self.reserved = reserved
+        self.running = 0
+        self.dispatched = 0
+        self.vtime = 0.0
+        self.waiters: "deque[tuple[asyncio.Future[None], float]]" = deque()
+        self.queue_time = LatencyHistogram()
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "weight": self.weight,
+            "reserved": self.reserved,
+            "running": self.running,
+            "queued": sum(1 for waiter, _ in self.waiters if not waiter.done()),
+            "dispatched": self.dispatched,
+            "queue_time": self.queue_time.snapshot(),
+        }
+
+
+class PriorityScheduler:
+    """Shares a concurrency limit between priority classes with weighted fair queuing.
+
+    Calls wait in one queue per class. Whenever a slot frees up, the waiting class that received
+    the least service relative to its weight goes next, so a class with weight 4 is served four
+    times as often as one with weight 1 while both have work queued, and an idle class leaves its
+    share to the others. ``reserved`` slots can only be used by their class, so interactive calls
+    always find capacity however much batch work is queued. Pass it to the client as
+    ``scheduler`` and choose the class per call with ``priority``.
+
+    :param int max_concurrency: Maximum number of calls running at once.
+    :keyword weights: Weight of every priority class. Default value is None,
+     ``{"interactive": 4, "batch": 1}``.
+    :paramtype weights: dict[str, float]
+    :keyword reserved: Slots reserved for a class. Default value is None, no reservations.
+    :paramtype reserved: dict[str, int]
+    :keyword default: Class of calls made without a priority. Default value is "batch".
+    :paramtype default: str
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        *,
+        weights: Optional[Mapping[str, float]] = None,
+        reserved: Optional[Mapping[str, int]] = None,
+        default: str = "batch",
+    ) -> None:
+        weights = dict(weights) if weights is not None else {"interactive": 4.0, "batch": 1.0}
+        reserved = dict(reserved or {})
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if default not in weights:
+            raise ValueError("The default class {!r} has no weight.".format(default))
+        if any(weight <= 0 for weight in weights.values()):
+            raise ValueError("Weights must be positive.")
+        unknown = set(reserved) - set(weights)
+        if unknown:
+            raise ValueError("Reservations for unknown classes: {}".format(", ".join(sorted(unknown))))
+        if sum(reserved.values()) > max_concurrency:
+            raise ValueError("Reservations exceed max_concurrency.")
+        self.max_concurrency = max_concurrency
+        self.default = default
+        self._classes = {name: _PriorityClass(name, weight, reserved.get(name, 0)) for name, weight in weights.items()}
+        self._shared = max_concurrency - sum(reserved.values())
+        self._vtime = 0.0
+
+    def _get(self, priority: Optional[str]) -> _PriorityClass:
+        try:
+            return self._classes[priority or self.default]
+        except KeyError:
+            raise ValueError("Unknown priority class {!r}.".format(priority)) from None
+
+    def _can_run(self, cls: _PriorityClass) -> bool:
+        if cls.running < cls.reserved:
+            return True
+        shared_in_use = sum(max(other.running - other.reserved, 0) for other in self._classes.values())
+        return shared_in_use < self._shared
+
+    def _dispatch(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            for cls in self._classes.values():
+                while cls.waiters and cls.waiters[0][0].done():
+                    cls.waiters.popleft()  # cancelled while queued
+            ready = [cls for cls in self._classes.values() if cls.waiters and self._can_run(cls)]
+            if not ready:
+                return
+            cls = min(ready, key=lambda candidate: candidate.vtime)
+            waiter, enqueued = cls.waiters.popleft()
+            self._vtime = cls.vtime
+            cls.vtime += 1.0 / cls.weight
+            cls.running += 1
+            cls.dispatched += 1
+            cls.queue_time.observe(loop.time() - enqueued)
+            waiter.set_result(None)
+
+    async def acquire(self, priority: Optional[str] = None) -> None:
+        """Wait for a slot of ``priority``. Every acquired slot must be given back with :meth:`release`.
+
+        :param priority: The priority class. Default value is None, the default class.
+        :type priority: str or None
+        :raises ValueError: If the class does not exist.
+        """
+        cls = self._get(priority)
+        loop = asyncio.get_running_loop()
+        if not any(not waiter.done() for waiter, _ in cls.waiters):
+            # A class that was idle starts at the current virtual time instead of cashing in the
+            # service it did not use.
+            cls.vtime = max(cls.vtime, self._vtime)
+        waiter: "asyncio.Future[None]" = loop.create_future()
+        cls.waiters.append((waiter, loop.time()))
+        self._dispatch()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release(priority)  # the slot was granted while the caller was being cancelled
+            raise
+
+    def release(self, priority: Optional[str] = None) -> None:
+        """Give back a slot taken with :meth:`acquire`.
+
+        :param priority: The priority class the slot was acquired for. Default value is None,
+         the default class.
+        :type priority: str or None
+        """
+        self._get(priority).running -= 1
+        self._dispatch()
+
+    @asynccontextmanager
+    async def slot(self, priority: Optional[str] = None) -> AsyncIterator[None]:
+        """Hold a slot of ``priority`` for the duration of an ``async with`` block.
+
+        :param priority: The priority class. Default value is None, the default class.
+        :type priority: str or None
+        """
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release(priority)
+
+    async def run(self, call: Callable[[], Awaitable[Any]], priority: Optional[str] = None) -> Any:
+        """Await ``call()`` in a slot of ``priority``.
+
+        :param call: Starts the work.
+        :type call: Callable[[], Awaitable[any]]
+        :param priority: The priority class. Default value is None, the default class.
+        :type priority: str or None
+        :return: The result of the call.
+        :rtype: any
+        """
+        async with self.slot(priority):
+            return await call()
+
+    def metrics(self) -> dict[str, dict[str, Any]]:
+        """Return the state of every priority class.
+
+        :return: Per class: weight, reserved, running, queued, dispatched and ``queue_time``, a
+         :meth:`~maq_rai_sdk.LatencyHistogram.snapshot` of the time calls waited for a slot.
+        :rtype: dict[str, dict]
+        """
+        return {name: cls.snapshot() for name, cls in self._classes.items()}
+
+    def __repr__(self) -> str:
+        return "<PriorityScheduler max_concurrency={} {}>".format(
+            self.max_concurrency,
+            " ".join("{}={}/{}".format(name, cls.running, len(cls.waiters)) for name, cls in self._classes.items()),
+        )
@@ -0,0 +1,236 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""HTTP/2-capable async transport built on httpx."""
+from typing import Any, AsyncIterator, MutableMapping, Optional
+from typing_extensions import Self
+
+from azure.core.configuration import ConnectionConfiguration
+from azure.core.exceptions import (
+    IncompleteReadError,
+    ServiceRequestError,
+    ServiceRequestTimeoutError,
+    ServiceResponseError,
+    ServiceResponseTimeoutError,
+)
+from azure.core.pipeline.transport import AsyncHttpTransport
+from azure.core.rest import AsyncHttpResponse, HttpRequest
+from azure.core.rest._http_response_impl_async import AsyncHttpResponseImpl
+
+
+def _import_httpx() -> Any:
+    try:
+        import httpx  # pylint: disable=import-outside-toplevel
+    except ImportError as err:
+        raise ImportError(
+            "AsyncHttpXTransport requires httpx. Install it with `pip install maq-rai-sdk[http2]`."
+        ) from err
+    return httpx
+
+
+def _map_httpx_error(httpx: Any, err: Exception) -> Exception:
+    if isinstance(err, httpx.ConnectTimeout):
+        return ServiceRequestTimeoutError(err, error=err)
+    if isinstance(err, httpx.TimeoutException):
+        return ServiceResponseTimeoutError(err, error=err)
+    if isinstance(err, (httpx.ConnectError, httpx.UnsupportedProtocol)):
+        return ServiceRequestError(err, error=err)
+    if isinstance(err, httpx.RemoteProtocolError):
+        return IncompleteReadError(err, error=err)
+    return ServiceResponseError(err, error=err)
+
+
+class _HttpXStreamDownloadGenerator(AsyncIterator):
+    """Streams the body of an httpx response.
+
+    :param pipeline: The pipeline object. Unused.
+    :type pipeline: ~azure.core.pipeline.AsyncPipeline
+    :param response: The response being streamed.
+    :type response: ~maq_rai_sdk.aio._transport.AsyncHttpXTransportResponse
+    :keyword bool decompress: If True, which is the default, decode the body according to its
+     *content-encoding* header.
+    """
+
+    def __init__(self, pipeline: Any, response: "AsyncHttpXTransportResponse", **kwargs: Any) -> None:
+        self.pipeline = pipeline
+        self.response = response
+        internal = response._internal_response  # pylint: disable=protected-access
+        decompress = kwargs.pop("decompress", True)
+        self._iter = internal.aiter_bytes() if decompress else internal.aiter_raw()
+
+    async def __anext__(self) -> bytes:
+        httpx = _import_httpx()
+        try:
+            return await self._iter.__anext__()
+        except StopAsyncIteration:
+            await self.response.close()
+            raise
+        except httpx.HTTPError as err:
+            await self.response.close()
+            raise _map_httpx_error(httpx, err) from err
+
+
+class AsyncHttpXTransportResponse(AsyncHttpResponseImpl):
+    """Async response wrapping an ``httpx.Response``.
+
+    :keyword request: The request that led to the response.
+    :paramtype request: ~azure.core.rest.HttpRequest
+    :keyword internal_response: The httpx response.
+    :paramtype internal_response: ~httpx.Response
+    :keyword block_size: The block size used when iterating over loaded content.
+    :paramtype block_size: int
+    """
+
+    def __init__(self, *, request: HttpRequest, internal_response: Any, block_size: Optional[int] = None) -> None:
+        super().__init__(
+            request=request,
+            internal_response=internal_response,
+            status_code=internal_response.status_code,
+            headers=internal_response.headers,
+            reason=internal_response.reason_phrase,
+            content_type=internal_response.headers.get("content-type"),
+            stream_download_generator=_HttpXStreamDownloadGenerator,
+            block_size=block_size,
+        )
+
+    @property
+    def http_version(self) -> str:
+        """The HTTP version the response was received over, for example "HTTP/2".
+
+        :return: The HTTP version.
+        :rtype: str
+        """
+        return self._internal_response.http_version
+
+    async def close(self) -> None:
+        if not self.is_closed:
+            self._is_closed = True
+            await self._internal_response.aclose()
+
+
+class AsyncHttpXTransport(AsyncHttpTransport):
+    """Async transport built on ``httpx.AsyncClient`` that negotiates HTTP/2.
+
+    Over HTTP/2 many concurrent requests to the same endpoint are multiplexed on a few
+    connections instead of opening one HTTP/1.1 connection each. Requires the ``http2``
+    extra (``pip install maq-rai-sdk[http2]``).
+
+    :keyword client: An ``httpx.AsyncClient`` to use instead of creating one.
+    :paramtype client: ~httpx.AsyncClient
+    :keyword client_owner: Whether the transport closes ``client`` when it is closed. Default value is True.
+    :paramtype client_owner: bool
+    :keyword http2: Whether to negotiate HTTP/2. Default value is True.
+    :paramtype http2: bool
+    :keyword max_connections: Maximum number of open connections. Default value is 100.
+    :paramtype max_connections: int
+    :keyword max_keepalive_connections: Maximum number of idle connections kept open. Default value is 20.
+    :paramtype max_keepalive_connections: int
+    :keyword keepalive_expiry: Seconds an idle connection is kept open. Default value is 5.
+    :paramtype keepalive_expiry: float
+    :keyword use_env_settings: Uses proxy settings from environment. Default value is True.
+    :paramtype use_env_settings: bool
+
+    Connection settings (``connection_timeout``, ``read_timeout``, ``connection_verify``,
+    ``connection_cert``) are accepted as for the other azure-core transports.
+    """
+
+    def __init__(
+        self,
+        *,
+        client: Any = None,
+        client_owner: bool = True,
+        http2: bool = True,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 5.0,
+        **kwargs: Any
+    ) -> None:
+        self.client = client
+        self._client_owner = client_owner
+        self._http2 = http2
+        self._limits = (max_connections, max_keepalive_connections, keepalive_expiry)
+        self._use_env_settings = kwargs.pop("use_env_settings", True)
+        self.connection_config = ConnectionConfiguration(**kwargs)
+        self._has_been_opened = False
+
+    async def __aenter__(self) -> Self:
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_details: Any) -> None:
+        await self.close()
+
+    async def open(self) -> None:
+        """Opens the connection pool."""
+        if self._has_been_opened and not self.client:
+            raise ValueError(
+                "HTTP transport has already been closed. "
+                "You may check if you're calling a function outside of the `async with` of your client creation, "
+                "or if you called `await close()` on your client already."
+            )
+        if self.client is None:
+            httpx = _import_httpx()
+            max_connections, max_keepalive_connections, keepalive_expiry = self._limits
+            self.client = httpx.AsyncClient(
+                http2=self._http2,
+                verify=self.connection_config.verify,
+                cert=self.connection_config.cert,
+                trust_env=self._use_env_settings,
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_keepalive_connections,
+                    keepalive_expiry=keepalive_expiry,
+                ),
+            )
+        self._has_been_opened = True
+
+    async def close(self) -> None:
+        """Closes the connection pool if this transport owns it."""
+        if self._client_owner and self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def send(  # type: ignore[override]
+        self,
+        request: HttpRequest,
+        *,
+        stream: bool = False,
+        proxies: Optional[MutableMapping[str, str]] = None,
+        **config: Any
+    ) -> AsyncHttpResponse:
+        """Send the request using httpx.
+
+        Pre-loads the body into memory unless ``stream`` is True. Per-request ``proxies`` are not
+        supported by httpx; configure proxies through the environment or a custom ``client``.
+
+        :param request: The HttpRequest object.
+        :type request: ~azure.core.rest.HttpRequest
+        :keyword bool stream: Defaults to False.
+        :return: The AsyncHttpResponse.
+        :rtype: ~azure.core.rest.AsyncHttpResponse
+        """
+        httpx = _import_httpx()
+        await self.open()
+        timeout = httpx.Timeout(
+            None,
+            connect=config.pop("connection_timeout", self.connection_config.timeout),
+            read=config.pop("read_timeout", self.connection_config.read_timeout),
+        )
+        content = request.content
+        if hasattr(content, "read"):
+            content = content.read()
+        try:
+            internal_request = self.client.build_request(  # type: ignore[union-attr]
+                request.method, request.url, headers=dict(request.headers), content=content, timeout=timeout
+            )
+            internal_response = await self.client.send(internal_request, stream=True)  # type: ignore[union-attr]
+            response = AsyncHttpXTransportResponse(
+                request=request, internal_response=internal_response, block_size=self.connection_config.data_block_size
+            )
+            if not stream:
+                await response.read()
+        except httpx.HTTPError as err:
+            raise _map_httpx_error(httpx, err) from err
+        return response
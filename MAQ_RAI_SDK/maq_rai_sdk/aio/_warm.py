@@ -0,0 +1,134 @@
+# coding=utf-8
+# --------------------------------------------------------------------------
+# Copyright (c) Microsoft Corporation. All rights reserved.
+# Licensed under the MIT License. See License.txt in the project root for license information.
+# --------------------------------------------------------------------------
+"""Keep-warm and pre-warm probes for the Function App endpoint."""
+import asyncio
+import logging
+import random
+from typing import Any, Optional
+
+from azure.core.rest import HttpRequest
+
+from .._metrics import LatencyHistogram
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class KeepWarm:
+    """Sends cheap probe requests to keep Function App instances warm.
+
+    A probe is a plain request to ``path`` that never reaches the review functions; any answer,
+    including 404, means the host was reached. Probes slower than ``cold_threshold`` are counted
+    as cold starts. Started with :meth:`maq_rai_sdk.aio.MAQRAISDK.keep_warm`.
+
+    :param client: The client the probes are sent with.
+    :type client: ~maq_rai_sdk.aio.MAQRAISDK
+    :keyword interval: Seconds between probes. Default value is 240, below the idle timeout of the
+     Consumption plan.
+    :paramtype interval: float
+    :keyword path: Path probed, relative to the endpoint. Default value is "/".
+    :paramtype path: str
+    :keyword cold_threshold: Probe latency in seconds above which the instance is considered cold.
+     Default value is 1.0.
+    :paramtype cold_threshold: float
+    :keyword jitter: Fraction of ``interval`` the schedule is randomly shifted by. Default value is 0.1.
+    :paramtype jitter: float
+    :ivar cold: Latencies of probes that hit a cold instance.
+    :vartype cold: ~maq_rai_sdk.LatencyHistogram
+    :ivar warm: Latencies of probes that hit a warm instance.
+    :vartype warm: ~maq_rai_sdk.LatencyHistogram
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        *,
+        interval: float = 240.0,
+        path: str = "/",
+        cold_threshold: float = 1.0,
+        jitter: float = 0.1,
+    ) -> None:
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        self._client = client
+        self.interval = interval
+        self.path = path
+        self.cold_threshold = cold_threshold
+        self.jitter = jitter
+        self.cold = LatencyHistogram()
+        self.warm = LatencyHistogram()
+        self.failures = 0
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    @property
+    def running(self) -> bool:
+        """Whether the background probe task is running.
+
+        :return: True while probing.
+        :rtype: bool
+        """
+        return self._task is not None and not self._task.done()
+
+    async def probe(self, *, close_connection: bool = False) -> Optional[float]:
+        """Send one probe and record its latency.
+
+        :keyword close_connection: Ask the server to close the connection afterwards, so concurrent
+         probes are not funnelled through one kept-alive connection. Default value is False.
+        :paramtype close_connection: bool
+        :return: The latency in seconds, or None if the probe failed.
+        :rtype: float or None
+        """
+        headers = {"Cache-Control": "no-store"}
+        if close_connection:
+            headers["Connection"] = "close"
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            response = await self._client.send_request(HttpRequest("GET", self.path, headers=headers))
+            await response.close()
+        except asyncio.CancelledError:
+            raise
+        except Exception:  # pylint: disable=broad-except
+            self.failures += 1
+            _LOGGER.debug("Keep-warm probe to %s failed", self.path, exc_info=True)
+            return None
+        latency = loop.time() - started
+        (self.cold if latency > self.cold_threshold else self.warm).observe(latency)
+        return latency
+
+    async def prewarm(self, instances: int) -> list[Optional[float]]:
+        """Send ``instances`` probes at once, each on its own connection.
+
+        Concurrent load is what makes the platform scale out, so this asks for up to
+        ``instances`` instances; how many are actually allocated is up to the Function App.
+
+        :param int instances: Number of concurrent probes.
+        :return: The probe latencies, None for failed probes.
+        :rtype: list[float or None]
+        """
+        return list(await asyncio.gather(*(self.probe(close_connection=True) for _ in range(instances))))
+
+    def start(self) -> None:
+        """Start the background probe task on the running loop. Does nothing if already running."""
+        if not self.running:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background probe task."""
+        task, self._task = self._task, None
+        if task is not None and not task.done():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _run(self) -> None:
+        while True:
+            await self.probe()
+            spread = self.interval * self.jitter
+            await asyncio.sleep(max(self.interval + random.uniform(-spread, spread), 0.0))
+
+    def __repr__(self) -> str:
+        return "<KeepWarm running={} cold={} warm={} failures={}>".format(
+            self.running, self.cold.count, self.warm.count, self.failures
+        )
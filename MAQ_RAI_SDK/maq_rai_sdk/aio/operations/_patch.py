@@ -7,9 +7,272 @@
 
 Follow our quickstart for examples: https://aka.ms/azsdk/python/dpcodegen/python/customize
 """
+import asyncio
+import time
+from collections.abc import MutableMapping
+from io import IOBase
+from typing import Any, Awaitable, Callable, IO, Optional, Union, cast
 
+from azure.core.exceptions import HttpResponseError
+from azure.core.pipeline import PipelineResponse
+from azure.core.polling import AsyncLROPoller, AsyncNoPolling, AsyncPollingMethod
+from azure.core.tracing.decorator_async import distributed_trace_async
 
-__all__: list[str] = []  # Add all objects you want publicly available to users at this package level
+from ..._deadline import DeadlineExceededError, _resolve_deadline
+from ..._polling import _job_result
+from ..._review import ConvergeResult, _Convergence
+from ...operations._patch import (
+    _build_job_request,
+    _check_job_response,
+    _job_error_map,
+    _raise_for_status,
+    _request_codec,
+)
+from .._polling import AsyncAdaptiveLROBasePolling
+from ._operations import JSON
+from ._operations import ReviewerOperations as ReviewerOperationsGenerated
+from ._operations import TestcaseOperations as TestcaseOperationsGenerated
+
+
+class _NegotiatedOperationsMixin:
+    _config: Any
+    _batch_group: str
+
+    async def _call_negotiated(
+        self, operation: Callable[..., Awaitable[Any]], body: Any, kwargs: dict[str, Any]
+    ) -> Any:
+        if getattr(self._config, "retry_budget", None) is not None:
+            kwargs["cls"] = _raise_for_status(kwargs.get("cls"))
+        codec = _request_codec(self._config, body, kwargs)
+        if codec is None:
+            return await operation(body, **kwargs)
+        try:
+            return await operation(codec.dumps(body), content_type=codec.media_type, **kwargs)
+        except HttpResponseError as err:
+            if err.status_code != 415:
+                raise
+            self._config.content_negotiator.reject(codec.media_type)
+        return await operation(body, **kwargs)
+
+    async def _call_hedged(
+        self, operation: Callable[..., Awaitable[Any]], body: Any, kwargs: dict[str, Any]
+    ) -> Any:
+        hedger = getattr(self._config, "hedger", None)
+        if hedger is None or isinstance(body, IOBase):
+            return await self._call_negotiated(operation, body, kwargs)
+        return await hedger.run(lambda: self._call_negotiated(operation, body, dict(kwargs)))
+
+    async def _call_batched(
+        self, operation: Callable[..., Awaitable[Any]], body: Any, kwargs: dict[str, Any]
+    ) -> Any:
+        batcher = getattr(self._config, "batcher", None)
+        if batcher is None or not batcher.accepts(self._batch_group, body, kwargs):
+            return await self._call_hedged(operation, body, kwargs)
+        return await batcher.submit(self._batch_group, body, lambda: self._call_hedged(operation, body, kwargs))
+
+    async def _call_scheduled(
+        self, operation: Callable[..., Awaitable[Any]], body: Any, kwargs: dict[str, Any]
+    ) -> Any:
+        priority = kwargs.pop("priority", None)
+        scheduler = getattr(self._config, "scheduler", None)
+        if scheduler is None:
+            return await self._call_batched(operation, body, kwargs)
+        async with scheduler.slot(priority):
+            return await self._call_batched(operation, body, kwargs)
+
+    async def _call_with_deadline(
+        self, operation: Callable[..., Awaitable[Any]], body: Any, kwargs: dict[str, Any]
+    ) -> Any:
+        deadline = _resolve_deadline(kwargs)
+        if deadline is None:
+            return await self._call_scheduled(operation, body, kwargs)
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            raise DeadlineExceededError(deadline)
+        kwargs["deadline"] = deadline
+        try:
+            return await asyncio.wait_for(self._call_scheduled(operation, body, kwargs), remaining)
+        except asyncio.TimeoutError:
+            if time.time() < deadline:
+                raise
+            raise DeadlineExceededError(deadline) from None
+
+
+class ReviewerOperations(_NegotiatedOperationsMixin, ReviewerOperationsGenerated):
+    __doc__ = ReviewerOperationsGenerated.__doc__
+    _batch_group = "reviewer"
+
+    async def post(self, body: Union[JSON, IO[bytes]], **kwargs: Any) -> Optional[JSON]:
+        """Review and update a prompt.
+
+        JSON bodies are sent in the negotiated media type when the client was created with
+        ``content_types``, falling back to JSON if the service rejects it. Slow calls are hedged
+        when the client was created with ``hedging``. Clients created with ``resilient`` raise for
+        401 and 500 answers instead of returning None. Time spent queued by a ``scheduler`` counts
+        against the deadline. With ``batching``, concurrent calls are sent together.
+
+        :param body: Is either a JSON type or a IO[bytes] type. Required.
+        :type body: JSON or IO[bytes]
+        :keyword deadline: Time by which the call must complete, as seconds since the epoch or an
+         aware datetime. The call is cancelled when it passes. Default value is None, no deadline.
+        :paramtype deadline: float or ~datetime.datetime
+        :keyword timeout: Seconds the call may take, retries included. Default value is None.
+        :paramtype timeout: float
+        :keyword priority: Priority class of the call when the client was created with a
+         ``scheduler``. Default value is None, the scheduler's default class.
+        :paramtype priority: str
+        :return: JSON object or None
+        :rtype: JSON or None
+        :raises ~azure.core.exceptions.HttpResponseError:
+        :raises ~maq_rai_sdk.DeadlineExceededError: If the deadline passed.
+        """
+        return await self._call_with_deadline(super().post, body, kwargs)
+
+    async def converge(
+        self,
+        prompt: str,
+        *,
+        max_rounds: int = 5,
+        review_options: Optional[dict[str, Any]] = None,
+        review_cache: Optional[MutableMapping] = None,
+        **kwargs: Any
+    ) -> ConvergeResult:
+        """Review a prompt, then its updated prompt, until the reviews stop finding improvements.
+
+        Every round posts ``{"prompt": ...}`` with ``review_options`` and continues with the
+        ``updated_result.updatedPrompt`` of the review. The loop stops as soon as every category of
+        ``review_of_updated_prompt`` is Compliant, the ``updated_compliance_score`` does not improve
+        on the previous round, the service hands back a prompt already reviewed in the loop, or
+        after ``max_rounds`` rounds. A prompt found in ``review_cache`` is not sent again.
+
+        :param str prompt: The prompt to start from. Required.
+        :keyword max_rounds: Maximum number of reviews. Default value is 5.
+        :paramtype max_rounds: int
+        :keyword review_options: Fields added to every review body, for example
+         ``{"need_metrics": True}``. Default value is None.
+        :paramtype review_options: dict[str, any]
+        :keyword review_cache: Reviews by prompt. Share one between calls so prompts reviewed by an
+         earlier call are not sent again; new reviews are added to it. Default value is None, a
+         cache for this call only.
+        :paramtype review_cache: MutableMapping[str, JSON]
+
+        Any other keyword arguments, such as ``timeout``, are passed to every ``post``, so
+        ``deadline`` and ``priority`` apply to each round.
+
+        :return: The best prompt found, its review, and why the loop stopped.
+        :rtype: ~maq_rai_sdk.ConvergeResult
+        :raises ValueError: If ``max_rounds`` is less than 1.
+        :raises ~azure.core.exceptions.HttpResponseError:
+        """
+        state = _Convergence(prompt, max_rounds, review_cache)
+        current = state.next_prompt()
+        while current is not None:
+            state.record(await self.post(dict(review_options or {}, prompt=current), **kwargs))
+            current = state.next_prompt()
+        return state.result()
+
+
+class TestcaseOperations(_NegotiatedOperationsMixin, TestcaseOperationsGenerated):
+    __doc__ = TestcaseOperationsGenerated.__doc__
+    _batch_group = "testcase"
+
+    async def generator_post(self, body: Union[JSON, IO[bytes]], **kwargs: Any) -> Optional[JSON]:
+        """Generate testcases from a prompt.
+
+        JSON bodies are sent in the negotiated media type when the client was created with
+        ``content_types``, falling back to JSON if the service rejects it. Slow calls are hedged
+        when the client was created with ``hedging``. Clients created with ``resilient`` raise for
+        401 and 500 answers instead of returning None. Time spent queued by a ``scheduler`` counts
+        against the deadline. With ``batching``, concurrent calls are sent together.
+
+        :param body: Is either a JSON type or a IO[bytes] type. Required.
+        :type body: JSON or IO[bytes]
+        :keyword deadline: Time by which the call must complete, as seconds since the epoch or an
+         aware datetime. The call is cancelled when it passes. Default value is None, no deadline.
+        :paramtype deadline: float or ~datetime.datetime
+        :keyword timeout: Seconds the call may take, retries included. Default value is None.
+        :paramtype timeout: float
+        :keyword priority: Priority class of the call when the client was created with a
+         ``scheduler``. Default value is None, the scheduler's default class.
+        :paramtype priority: str
+        :return: JSON object or None
+        :rtype: JSON or None
+        :raises ~azure.core.exceptions.HttpResponseError:
+        :raises ~maq_rai_sdk.DeadlineExceededError: If the deadline passed.
+        """
+        return await self._call_with_deadline(super().generator_post, body, kwargs)
+
+    async def _generator_post_initial(self, body: Union[JSON, IO[bytes]], **kwargs: Any) -> PipelineResponse:
+        error_map = _job_error_map(kwargs)
+        _request = _build_job_request(self._client, body, kwargs)
+        pipeline_response: PipelineResponse = await self._client._pipeline.run(  # pylint: disable=protected-access
+            _request, stream=False, **kwargs
+        )
+        _check_job_response(pipeline_response, error_map)
+        return pipeline_response
+
+    @distributed_trace_async
+    async def begin_generator_post(
+        self, body: Union[JSON, IO[bytes]], **kwargs: Any
+    ) -> AsyncLROPoller[Optional[JSON]]:
+        """Submit a test case generation job and return a poller for it.
+
+        See :meth:`maq_rai_sdk.operations.TestcaseOperations.begin_generator_post`. Pollers wait
+        on the event loop, so one task can track thousands of jobs.
+
+        :param body: Is either a JSON type or a IO[bytes] type. Required.
+        :type body: JSON or IO[bytes]
+        :keyword polling: True for :class:`~maq_rai_sdk.aio.AsyncAdaptiveLROBasePolling`, False for
+         no polling, or a polling method. Default value is True.
+        :paramtype polling: bool or ~azure.core.polling.AsyncPollingMethod
+        :keyword polling_interval: Longest wait between two status checks, in seconds. Default value
+         is the ``polling_interval`` of the client configuration.
+        :paramtype polling_interval: float
+        :keyword continuation_token: Resume polling a job from a poller's continuation token.
+        :paramtype continuation_token: str
+        :return: A poller returning the JSON result of the job, or None.
+        :rtype: ~azure.core.polling.AsyncLROPoller[JSON]
+        :raises ~azure.core.exceptions.HttpResponseError:
+        """
+        cls = kwargs.pop("cls", None)
+        polling: Union[bool, AsyncPollingMethod] = kwargs.pop("polling", True)
+        lro_delay = kwargs.pop("polling_interval", self._config.polling_interval)
+        cont_token: Optional[str] = kwargs.pop("continuation_token", None)
+        if cont_token is None:
+            raw_result = await self._generator_post_initial(body, **kwargs)
+        kwargs.pop("error_map", None)
+        kwargs.pop("headers", None)
+        kwargs.pop("params", None)
+        kwargs.pop("content_type", None)
+
+        def get_long_running_output(pipeline_response: PipelineResponse) -> Optional[JSON]:
+            deserialized = _job_result(pipeline_response)
+            if cls:
+                return cls(pipeline_response, deserialized, {})  # type: ignore
+            return deserialized
+
+        if polling is True:
+            polling_method: AsyncPollingMethod = cast(
+                AsyncPollingMethod, AsyncAdaptiveLROBasePolling(lro_delay, **kwargs)
+            )
+        elif polling is False:
+            polling_method = cast(AsyncPollingMethod, AsyncNoPolling())
+        else:
+            polling_method = polling
+        if cont_token:
+            return AsyncLROPoller[Optional[JSON]].from_continuation_token(
+                polling_method=polling_method,
+                continuation_token=cont_token,
+                client=self._client,
+                deserialization_callback=get_long_running_output,
+            )
+        return AsyncLROPoller[Optional[JSON]](self._client, raw_result, get_long_running_output, polling_method)
+
+
+__all__: list[str] = [
+    "ReviewerOperations",
+    "TestcaseOperations",
+]  # Add all objects you want publicly available to users at this package level
 
 
 def patch_sdk():
@@ -7,9 +7,323 @@
 
 Follow our quickstart for examples: https://aka.ms/azsdk/python/dpcodegen/python/customize
 """
+from collections.abc import MutableMapping
+from io import IOBase
+from typing import Any, Callable, IO, Optional, Union, cast
 
+from azure.core.exceptions import (
+    ClientAuthenticationError,
+    HttpResponseError,
+    ResourceExistsError,
+    ResourceNotFoundError,
+    ResourceNotModifiedError,
+    map_error,
+)
+from azure.core.pipeline import PipelineResponse
+from azure.core.polling import LROPoller, NoPolling, PollingMethod
+from azure.core.rest import HttpRequest
+from azure.core.tracing.decorator import distributed_trace
+from azure.core.utils import case_insensitive_dict
 
-__all__: list[str] = []  # Add all objects you want publicly available to users at this package level
+from .._content import ContentCodec
+from .._polling import AdaptiveLROBasePolling, _job_result
+from .._review import ConvergeResult, _Convergence
+from ._operations import JSON, build_testcase_generator_post_request
+from ._operations import ReviewerOperations as ReviewerOperationsGenerated
+from ._operations import TestcaseOperations as TestcaseOperationsGenerated
+
+
+def _request_codec(config: Any, body: Any, kwargs: dict[str, Any]) -> Optional[ContentCodec]:
+    """Return the codec to send ``body`` with, or None to let the generated operation send it.
+
+    :param any config: The client configuration.
+    :param any body: The operation body.
+    :param dict kwargs: The operation keyword arguments.
+    :return: The negotiated codec or None.
+    :rtype: ~maq_rai_sdk.ContentCodec or None
+    """
+    negotiator = getattr(config, "content_negotiator", None)
+    if negotiator is None or isinstance(body, (IOBase, bytes)) or "content_type" in kwargs:
+        return None
+    if "Content-Type" in case_insensitive_dict(kwargs.get("headers") or {}):
+        return None
+    return negotiator.request_codec()
+
+
+def _raise_for_status(user_cls: Optional[Callable[..., Any]]) -> Callable[..., Any]:
+    """Wrap an operation ``cls`` callback so error statuses raise.
+
+    The generated operations return None for 401 and 500 instead of raising; resilient clients
+    raise :class:`~azure.core.exceptions.ClientAuthenticationError` and
+    :class:`~azure.core.exceptions.HttpResponseError` for them, like for any other error status.
+
+    :param user_cls: The callback passed by the caller, or None.
+    :type user_cls: Callable or None
+    :return: The wrapping callback.
+    :rtype: Callable
+    """
+
+    def cls(pipeline_response: Any, deserialized: Any, headers: Any) -> Any:
+        response = pipeline_response.http_response
+        if response.status_code >= 400:
+            map_error(status_code=response.status_code, response=response, error_map={401: ClientAuthenticationError})
+            raise HttpResponseError(response=response)
+        if user_cls is not None:
+            return user_cls(pipeline_response, deserialized, headers)
+        return deserialized
+
+    return cls
+
+
+def _build_job_request(client: Any, body: Union[JSON, IO[bytes]], kwargs: dict[str, Any]) -> HttpRequest:
+    """Build the request submitting a test case generation job.
+
+    It is the ``generator_post`` request with ``Prefer: respond-async``, asking the service to
+    answer 202 with an ``Operation-Location`` to poll instead of holding the connection open.
+
+    :param any client: The pipeline client.
+    :param body: The operation body.
+    :type body: JSON or IO[bytes]
+    :param dict kwargs: The operation keyword arguments, updated in place.
+    :return: The request.
+    :rtype: ~azure.core.rest.HttpRequest
+    """
+    _headers = case_insensitive_dict(kwargs.pop("headers", {}) or {})
+    _params = kwargs.pop("params", {}) or {}
+    _headers.setdefault("Prefer", "respond-async")
+    content_type: str = kwargs.pop("content_type", _headers.pop("Content-Type", None)) or "application/json"
+    _json = None
+    _content = None
+    if isinstance(body, (IOBase, bytes)):
+        _content = body
+    else:
+        _json = body
+    _request = build_testcase_generator_post_request(
+        content_type=content_type, json=_json, content=_content, headers=_headers, params=_params
+    )
+    _request.url = client.format_url(_request.url)
+    return _request
+
+
+def _check_job_response(pipeline_response: PipelineResponse, error_map: MutableMapping) -> None:
+    response = pipeline_response.http_response
+    if response.status_code not in [200, 201, 202]:
+        map_error(status_code=response.status_code, response=response, error_map=error_map)
+        raise HttpResponseError(response=response)
+
+
+def _job_error_map(kwargs: dict[str, Any]) -> MutableMapping:
+    error_map: MutableMapping = {
+        401: ClientAuthenticationError,
+        404: ResourceNotFoundError,
+        409: ResourceExistsError,
+        304: ResourceNotModifiedError,
+    }
+    error_map.update(kwargs.pop("error_map", {}) or {})
+    return error_map
+
+
+class _NegotiatedOperationsMixin:
+    _config: Any
+
+    def _call_negotiated(self, operation: Callable[..., Any], body: Any, kwargs: dict[str, Any]) -> Any:
+        if getattr(self._config, "retry_budget", None) is not None:
+            kwargs["cls"] = _raise_for_status(kwargs.get("cls"))
+        codec = _request_codec(self._config, body, kwargs)
+        if codec is None:
+            return operation(body, **kwargs)
+        try:
+            return operation(codec.dumps(body), content_type=codec.media_type, **kwargs)
+        except HttpResponseError as err:
+            if err.status_code != 415:
+                raise
+            self._config.content_negotiator.reject(codec.media_type)
+        return operation(body, **kwargs)
+
+    def _enqueue(self, operation: str, body: JSON) -> str:
+        queue = getattr(self._config, "submission_queue", None)
+        if queue is None:
+            raise ValueError("enqueue needs a client created with submission_queue.")
+        return queue.put(operation, body)
+
+
+class ReviewerOperations(_NegotiatedOperationsMixin, ReviewerOperationsGenerated):
+    __doc__ = ReviewerOperationsGenerated.__doc__
+
+    def post(self, body: Union[JSON, IO[bytes]], **kwargs: Any) -> Optional[JSON]:
+        """Review and update a prompt.
+
+        JSON bodies are sent in the negotiated media type when the client was created with
+        ``content_types``, falling back to JSON if the service rejects it. Clients created with
+        ``resilient`` raise for 401 and 500 answers instead of returning None.
+
+        :param body: Is either a JSON type or a IO[bytes] type. Required.
+        :type body: JSON or IO[bytes]
+        :return: JSON object or None
+        :rtype: JSON or None
+        :raises ~azure.core.exceptions.HttpResponseError:
+        """
+        return self._call_negotiated(super().post, body, kwargs)
+
+    def enqueue(self, body: JSON) -> str:
+        """Store a review call in the client's submission queue and return at once.
+
+        The call is sent by the queue's drain workers, and retried while the service is slow or
+        down. Collect the result with :meth:`~maq_rai_sdk.SubmissionQueue.result`.
+
+        :param body: The JSON body of the call. Required.
+        :type body: JSON
+        :return: The ticket of the call.
+        :rtype: str
+        :raises ValueError: If the client was created without ``submission_queue``.
+        """
+        return self._enqueue("reviewer", body)
+
+    def converge(
+        self,
+        prompt: str,
+        *,
+        max_rounds: int = 5,
+        review_options: Optional[dict[str, Any]] = None,
+        review_cache: Optional[MutableMapping] = None,
+        **kwargs: Any
+    ) -> ConvergeResult:
+        """Review a prompt, then its updated prompt, until the reviews stop finding improvements.
+
+        Every round posts ``{"prompt": ...}`` with ``review_options`` and continues with the
+        ``updated_result.updatedPrompt`` of the review. The loop stops as soon as every category of
+        ``review_of_updated_prompt`` is Compliant, the ``updated_compliance_score`` does not improve
+        on the previous round, the service hands back a prompt already reviewed in the loop, or
+        after ``max_rounds`` rounds. A prompt found in ``review_cache`` is not sent again.
+
+        :param str prompt: The prompt to start from. Required.
+        :keyword max_rounds: Maximum number of reviews. Default value is 5.
+        :paramtype max_rounds: int
+        :keyword review_options: Fields added to every review body, for example
+         ``{"need_metrics": True}``. Default value is None.
+        :paramtype review_options: dict[str, any]
+        :keyword review_cache: Reviews by prompt. Share one between calls so prompts reviewed by an
+         earlier call are not sent again; new reviews are added to it. Default value is None, a
+         cache for this call only.
+        :paramtype review_cache: MutableMapping[str, JSON]
+
+        Any other keyword arguments, such as ``timeout``, are passed to every ``post``.
+
+        :return: The best prompt found, its review, and why the loop stopped.
+        :rtype: ~maq_rai_sdk.ConvergeResult
+        :raises ValueError: If ``max_rounds`` is less than 1.
+        :raises ~azure.core.exceptions.HttpResponseError:
+        """
+        state = _Convergence(prompt, max_rounds, review_cache)
+        current = state.next_prompt()
+        while current is not None:
+            state.record(self.post(dict(review_options or {}, prompt=current), **kwargs))
+            current = state.next_prompt()
+        return state.result()
+
+
+class TestcaseOperations(_NegotiatedOperationsMixin, TestcaseOperationsGenerated):
+    __doc__ = TestcaseOperationsGenerated.__doc__
+
+    def generator_post(self, body: Union[JSON, IO[bytes]], **kwargs: Any) -> Optional[JSON]:
+        """Generate testcases from a prompt.
+
+        JSON bodies are sent in the negotiated media type when the client was created with
+        ``content_types``, falling back to JSON if the service rejects it. Clients created with
+        ``resilient`` raise for 401 and 500 answers instead of returning None.
+
+        :param body: Is either a JSON type or a IO[bytes] type. Required.
+        :type body: JSON or IO[bytes]
+        :return: JSON object or None
+        :rtype: JSON or None
+        :raises ~azure.core.exceptions.HttpResponseError:
+        """
+        return self._call_negotiated(super().generator_post, body, kwargs)
+
+    def enqueue(self, body: JSON) -> str:
+        """Store a test case generation call in the client's submission queue and return at once.
+
+        The call is sent by the queue's drain workers, and retried while the service is slow or
+        down. Collect the result with :meth:`~maq_rai_sdk.SubmissionQueue.result`.
+
+        :param body: The JSON body of the call. Required.
+        :type body: JSON
+        :return: The ticket of the call.
+        :rtype: str
+        :raises ValueError: If the client was created without ``submission_queue``.
+        """
+        return self._enqueue("testcase", body)
+
+    def _generator_post_initial(self, body: Union[JSON, IO[bytes]], **kwargs: Any) -> PipelineResponse:
+        error_map = _job_error_map(kwargs)
+        _request = _build_job_request(self._client, body, kwargs)
+        pipeline_response: PipelineResponse = self._client._pipeline.run(  # pylint: disable=protected-access
+            _request, stream=False, **kwargs
+        )
+        _check_job_response(pipeline_response, error_map)
+        return pipeline_response
+
+    @distributed_trace
+    def begin_generator_post(self, body: Union[JSON, IO[bytes]], **kwargs: Any) -> LROPoller[Optional[JSON]]:
+        """Submit a test case generation job and poll it until it completes.
+
+        The job is submitted with ``Prefer: respond-async``; the service answers 202 with an
+        ``Operation-Location`` status resource, so no connection is held open while the test cases
+        are generated. The status is checked soon after submitting and then less and less often,
+        up to the client's ``polling_interval``. A service that answers right away with the result
+        is supported as well.
+
+        :param body: Is either a JSON type or a IO[bytes] type. Required.
+        :type body: JSON or IO[bytes]
+        :keyword polling: True for :class:`~maq_rai_sdk.AdaptiveLROBasePolling`, False for no
+         polling, or a polling method. Default value is True.
+        :paramtype polling: bool or ~azure.core.polling.PollingMethod
+        :keyword polling_interval: Longest wait between two status checks, in seconds. Default value
+         is the ``polling_interval`` of the client configuration.
+        :paramtype polling_interval: float
+        :keyword continuation_token: Resume polling a job from a poller's continuation token.
+        :paramtype continuation_token: str
+        :return: A poller returning the JSON result of the job, or None.
+        :rtype: ~azure.core.polling.LROPoller[JSON]
+        :raises ~azure.core.exceptions.HttpResponseError:
+        """
+        cls = kwargs.pop("cls", None)
+        polling: Union[bool, PollingMethod] = kwargs.pop("polling", True)
+        lro_delay = kwargs.pop("polling_interval", self._config.polling_interval)
+        cont_token: Optional[str] = kwargs.pop("continuation_token", None)
+        if cont_token is None:
+            raw_result = self._generator_post_initial(body, **kwargs)
+        kwargs.pop("error_map", None)
+        kwargs.pop("headers", None)
+        kwargs.pop("params", None)
+        kwargs.pop("content_type", None)
+
+        def get_long_running_output(pipeline_response: PipelineResponse) -> Optional[JSON]:
+            deserialized = _job_result(pipeline_response)
+            if cls:
+                return cls(pipeline_response, deserialized, {})  # type: ignore
+            return deserialized
+
+        if polling is True:
+            polling_method: PollingMethod = cast(PollingMethod, AdaptiveLROBasePolling(lro_delay, **kwargs))
+        elif polling is False:
+            polling_method = cast(PollingMethod, NoPolling())
+        else:
+            polling_method = polling
+        if cont_token:
+            return LROPoller[Optional[JSON]].from_continuation_token(
+                polling_method=polling_method,
+                continuation_token=cont_token,
+                client=self._client,
+                deserialization_callback=get_long_running_output,
+            )
+        return LROPoller[Optional[JSON]](self._client, raw_result, get_long_running_output, polling_method)
+
+
+__all__: list[str] = [
+    "ReviewerOperations",
+    "TestcaseOperations",
+]  # Add all objects you want publicly available to users at this package level
 
 
 def patch_sdk():
@@ -0,0 +1,80 @@
+"""A local stand-in for the Function App that speaks HTTP/1.1 and cleartext HTTP/2 (h2c).
+
+Served by Hypercorn (``pip install hypercorn``). Every POST waits ``--latency`` seconds and
+answers like the service. ``GET /stats`` returns the number of connections and the HTTP
+versions seen since the previous ``GET /stats``.
+
+    python benchmarks/h2c_standin.py --port 8765
+"""
+import argparse
+import asyncio
+import json
+from typing import Any
+
+
+class StandIn:
+    def __init__(self, latency: float) -> None:
+        self.latency = latency
+        self.connections: set[Any] = set()
+        self.versions: set[str] = set()
+
+    async def __call__(self, scope: dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        if scope["method"] == "GET" and scope["path"].endswith("/stats"):
+            answer = {"connections": len(self.connections), "http_versions": sorted(self.versions)}
+            self.connections.clear()
+            self.versions.clear()
+        else:
+            self.connections.add(tuple(scope["client"]))
+            self.versions.add(scope["http_version"])
+            await asyncio.sleep(self.latency)
+            answer = self.answer(scope["path"], json.loads(body or b"{}"))
+        content = json.dumps(answer).encode("utf-8")
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(content)).encode())],
+            }
+        )
+        await send({"type": "http.response.body", "body": content})
+
+    @staticmethod
+    def answer(path: str, body: dict[str, Any]) -> dict[str, Any]:
+        if path.endswith("/Reviewer"):
+            prompt = body.get("prompt", "")
+            return {
+                "review_result": {"prompt": prompt},
+                "updated_result": {"updatedPrompt": prompt},
+                "review_of_updated_prompt": {},
+            }
+        count = int(body.get("number_of_testcases", 1))
+        return {"testcases": [{"id": index, "prompt": body.get("prompt", "")} for index in range(count)]}
+
+
+def main() -> None:
+    from hypercorn.asyncio import serve  # pylint: disable=import-outside-toplevel
+    from hypercorn.config import Config  # pylint: disable=import-outside-toplevel
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per call (default: %(default)s)")
+    args = parser.parse_args()
+    config = Config()
+    config.bind = ["127.0.0.1:{}".format(args.port)]
+    config.loglevel = "ERROR"
+    config.backlog = 4096
+    config.keep_alive_max_requests = 10**9  # the default 1000 sends GOAWAY mid-run
+    print("listening on http://127.0.0.1:{}/api".format(args.port), flush=True)
+    asyncio.run(serve(StandIn(args.latency), config))  # type: ignore[arg-type]
+
+
+if __name__ == "__main__":
+    main()
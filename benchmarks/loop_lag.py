@@ -0,0 +1,104 @@
+"""Tail latency of small calls while large test case payloads land on the same event loop.
+
+Starts a local stand-in answering ``reviewer.post`` with a small body and
+``testcase.generator_post`` with a large one, then runs a steady stream of small calls next to a
+few large ones through the aio client, once decoding every body on the loop and once with
+``decode_offload_threshold``. It prints the small-call latency percentiles and the stalls seen by
+a :class:`~maq_rai_sdk.aio.LoopLagMonitor`::
+
+    python benchmarks/loop_lag.py --cases 50000 --large-calls 5
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from maq_rai_sdk.aio import MAQRAISDK
+
+
+def _start_standin(cases: int) -> tuple[ThreadingHTTPServer, str]:
+    large = json.dumps(
+        {"testcases": [{"id": index, "prompt": "case " * 40, "tags": ["xpia", "jailbreak"]} for index in range(cases)]}
+    ).encode("utf-8")
+    small = json.dumps({"review_result": {}, "updated_result": {"updatedPrompt": "p"}}).encode("utf-8")
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+        def do_POST(self) -> None:  # pylint: disable=invalid-name
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            body = large if "testcase" in self.path.lower() else small
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print("large body: {:.1f} MB".format(len(large) / 1e6))
+    return server, "http://127.0.0.1:{}/api".format(server.server_address[1])
+
+
+async def _run(url: str, threshold: Any, large_calls: int) -> None:
+    latencies: list[float] = []
+    async with MAQRAISDK(endpoint=url, decode_offload_threshold=threshold) as client:
+        await client.reviewer.post({"prompt": "warm"})
+        monitor = await client.monitor_loop(0.005, threshold=0.05)
+        done = asyncio.Event()
+
+        async def small_calls() -> None:
+            while not done.is_set():
+                started = time.monotonic()
+                await client.reviewer.post({"prompt": "p"})
+                latencies.append(time.monotonic() - started)
+
+        async def large() -> None:
+            for _ in range(large_calls):
+                await client.testcase.generator_post({"user_prompt": "p"})
+            done.set()
+
+        await asyncio.gather(large(), *(small_calls() for _ in range(8)))
+    latencies.sort()
+
+    def pct(q: float) -> float:
+        return latencies[min(int(len(latencies) * q), len(latencies) - 1)] * 1000
+
+    print(
+        (
+            "{:<22} small calls {:>5}  p50 {:7.1f} ms  p99 {:7.1f} ms  max {:7.1f} ms  "
+            "stalls {:>3}  max lag {:6.1f} ms"
+        ).format(
+            "offloaded" if threshold else "on the loop",
+            len(latencies),
+            pct(0.5),
+            pct(0.99),
+            latencies[-1] * 1000,
+            monitor.stalls,
+            monitor.lag.max * 1000,
+        )
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--cases", type=int, default=50000, help="test cases in the large body")
+    parser.add_argument("--large-calls", type=int, default=5, help="large calls made")
+    args = parser.parse_args()
+    server, url = _start_standin(args.cases)
+    try:
+        for threshold in (None, 1048576):
+            asyncio.run(_run(url, threshold, args.large_calls))
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Compare the async transports at several concurrency levels.
+
+Starts ``h2c_standin.py`` on a free port and, for every concurrency level, sends that many
+concurrent ``testcase.generator_post`` calls through the aio client with
+
+* the default aiohttp transport (HTTP/1.1),
+* ``AsyncHttpXTransport(http2=False)`` (HTTP/1.1),
+* ``AsyncHttpXTransport`` over an httpx client speaking HTTP/2 with prior knowledge, since a
+  local stand-in has no TLS to negotiate HTTP/2 with.
+
+It prints the wall time, calls per second and the number of connections the stand-in saw.
+Requires the ``http2`` extra and Hypercorn::
+
+    pip install -e .[http2] hypercorn
+    python benchmarks/transports.py --concurrency 10 100 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Any, Callable, Optional
+
+import httpx
+
+from maq_rai_sdk.aio import MAQRAISDK, AsyncHttpXTransport
+
+_STANDIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "h2c_standin.py")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_standin(latency: float) -> tuple["subprocess.Popen[bytes]", str]:
+    port = _free_port()
+    process = subprocess.Popen(  # pylint: disable=consider-using-with
+        [sys.executable, _STANDIN, "--port", str(port), "--latency", str(latency)]
+    )
+    url = "http://127.0.0.1:{}/api".format(port)
+    for _ in range(100):
+        try:
+            _stats(url)
+            return process, url
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("The stand-in did not start.")
+
+
+def _stats(url: str) -> dict[str, Any]:
+    with urllib.request.urlopen(url + "/stats", timeout=5) as response:
+        return json.loads(response.read())
+
+
+_TRANSPORTS: dict[str, Callable[[], Optional[Any]]] = {
+    "aiohttp (HTTP/1.1)": lambda: None,
+    "httpx (HTTP/1.1)": lambda: AsyncHttpXTransport(http2=False, max_connections=1000),
+    "httpx (HTTP/2)": lambda: AsyncHttpXTransport(client=httpx.AsyncClient(http1=False, http2=True)),
+}
+
+
+async def _run(url: str, transport: Optional[Any], concurrency: int, rounds: int) -> float:
+    async with MAQRAISDK(endpoint=url, transport=transport) as client:
+        await client.testcase.generator_post({"prompt": "warm-up", "number_of_testcases": 1})
+        started = time.perf_counter()
+        for _ in range(rounds):
+            results = await asyncio.gather(
+                *(
+                    client.testcase.generator_post({"prompt": str(index), "number_of_testcases": 1})
+                    for index in range(concurrency)
+                )
+            )
+            assert [result["testcases"][0]["prompt"] for result in results] == [
+                str(index) for index in range(concurrency)
+            ]
+        return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare the async transports against a local stand-in.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--rounds", type=int, default=5, help="batches of concurrent calls per run")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds the stand-in takes per call")
+    args = parser.parse_args()
+
+    process, url = _start_standin(args.latency)
+    try:
+        print("{:>11}  {:<20} {:>8} {:>10} {:>11}  {}".format(
+            "concurrency", "transport", "seconds", "calls/s", "connections", "protocol"
+        ))
+        for concurrency in args.concurrency:
+            for name, transport in _TRANSPORTS.items():
+                _stats(url)  # reset the counters
+                elapsed = asyncio.run(_run(url, transport(), concurrency, args.rounds))
+                seen = _stats(url)
+                print("{:>11}  {:<20} {:>8.2f} {:>10.0f} {:>11}  {}".format(
+                    concurrency,
+                    name,
+                    elapsed,
+                    concurrency * args.rounds / elapsed,
+                    seen["connections"],
+                    ",".join(seen["http_versions"]),
+                ))
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == "__main__":
+    main()
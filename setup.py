@@ -11,6 +11,8 @@ Attributes:
     packages (list): A list of all Python import packages that should be included in the distribution package.
     package_dir (dict): A mapping of package names to directories.
     install_requires (list): A list of packages that are required for this package to work.
+    entry_points (dict): Console scripts installed with the package.
+    extras_require (dict): Optional dependency groups, installed with ``pip install maq-rai-sdk[<extra>]``.
     classifiers (list): A list of classifiers that provide some additional metadata about the package.
     python_requires (str): The Python version required for this package.
 """
@@ -39,6 +41,14 @@ setup(
         "PyYAML==6.0.2",
         "onnxruntime==1.22.0",
     ],
+    entry_points={
+        "console_scripts": ["maq-rai=maq_rai_sdk._cli:main"],
+    },
+    extras_require={
+        "http2": ["httpx[http2]>=0.24"],
+        "msgpack": ["msgpack>=1.0"],
+        "cbor": ["cbor2>=5.4"],
+    },
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Intended Audience :: Developers",
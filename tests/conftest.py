@@ -0,0 +1,112 @@
+"""Shared fixtures: a local stand-in for the Function App."""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, NamedTuple
+
+import pytest
+
+
+class Request(NamedTuple):
+    method: str
+    path: str
+    headers: Any
+    body: bytes
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+class Reply(NamedTuple):
+    status: int = 200
+    body: Any = None
+    headers: Any = ()
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class StandIn:
+    """Serves ``handler(request)`` on a free local port and records every request.
+
+    The handler returns a :class:`Reply`, or a JSON body answered with 200.
+    """
+
+    def __init__(self, handler: Callable[[Request], Any]) -> None:
+        self.handler = handler
+        self.requests: list[Request] = []
+        self.connections: set[tuple[str, int]] = set()
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args: Any) -> None:
+                pass
+
+            def _handle(self) -> None:
+                length = int(self.headers.get("Content-Length") or 0)
+                request = Request(self.command, self.path, self.headers, self.rfile.read(length))
+                standin.requests.append(request)
+                standin.connections.add(self.client_address)
+                reply = standin.handler(request)
+                if not isinstance(reply, Reply):
+                    reply = Reply(body=reply)
+                headers = list(reply.headers.items() if isinstance(reply.headers, dict) else reply.headers)
+                body = reply.body
+                if body is None:
+                    body = b""
+                elif not isinstance(body, bytes):
+                    body = json.dumps(body).encode("utf-8")
+                    if not any(name.lower() == "content-type" for name, _ in headers):
+                        headers.append(("Content-Type", "application/json"))
+                self.send_response(reply.status)
+                for name, value in headers:
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+
+            do_GET = do_POST = do_HEAD = _handle
+
+        self._server = _Server(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self) -> str:
+        return "http://127.0.0.1:{}/api".format(self._server.server_address[1])
+
+    def paths(self) -> list[str]:
+        return [request.path.split("?")[0] for request in self.requests]
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def review(prompt: str) -> dict[str, Any]:
+    """A reviewer answer in the shape the Function App returns."""
+    return {
+        "review_result": {"prompt": prompt},
+        "updated_result": {"updatedPrompt": prompt + "!"},
+        "review_of_updated_prompt": {},
+    }
+
+
+@pytest.fixture
+def standin() -> Any:
+    """Start stand-ins with ``standin(handler)``; they are shut down after the test."""
+    servers: list[StandIn] = []
+
+    def start(handler: Callable[[Request], Any]) -> StandIn:
+        server = StandIn(handler)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
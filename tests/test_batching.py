@@ -0,0 +1,147 @@
+import asyncio
+import time
+
+import pytest
+from azure.core.exceptions import ClientAuthenticationError, HttpResponseError
+
+from maq_rai_sdk.aio import MAQRAISDK, MicroBatcher
+
+from conftest import Reply, review
+
+_ITEM_STATUS = {"unauthorized": 401, "broken": 500, "flaky": 503}
+# Single calls fail the same way, except "flaky", which only failed inside its batch.
+_SINGLE_STATUS = {"unauthorized": 401, "broken": 500}
+FAST = {"retry_total": 1, "retry_backoff_factor": 0.01}
+
+
+def batch_route(request):
+    """Answers /Reviewer/batch item by item and single calls as usual."""
+    if request.path.startswith("/api/Reviewer/batch"):
+        results = []
+        for item in request.json()["items"]:
+            status = _ITEM_STATUS.get(item["prompt"], 200)
+            results.append({"status": status, "body": review(item["prompt"]) if status == 200 else None})
+        return {"results": results}
+    prompt = request.json()["prompt"]
+    if prompt in _SINGLE_STATUS:
+        return Reply(_SINGLE_STATUS[prompt])
+    return review(prompt)
+
+
+def without_batch_route(status):
+    def answer(request):
+        if request.path.startswith("/api/Reviewer/batch"):
+            return Reply(status)
+        return review(request.json()["prompt"])
+
+    return answer
+
+
+async def post_all(client, prompts, **kwargs):
+    return await asyncio.gather(
+        *(client.reviewer.post({"prompt": prompt}, **kwargs) for prompt in prompts), return_exceptions=True
+    )
+
+
+def test_batch_results_are_scattered_in_order(standin):
+    server = standin(batch_route)
+    prompts = ["p{}".format(index) for index in range(10)]
+
+    async def main():
+        batcher = MicroBatcher(linger=0.05, max_items=4)
+        async with MAQRAISDK(endpoint=server.url, batching=batcher) as client:
+            results = await post_all(client, prompts)
+        assert [result["review_result"]["prompt"] for result in results] == prompts
+        assert (batcher.batches, batcher.items) == (3, 10)
+
+    asyncio.run(main())
+    assert server.paths() == ["/api/Reviewer/batch"] * 3
+    # Full batches go out concurrently, so only the order within each batch is fixed.
+    batches = sorted([item["prompt"] for item in request.json()["items"]] for request in server.requests)
+    assert batches == [prompts[0:4], prompts[4:8], prompts[8:10]]
+
+
+def test_calls_with_a_timeout_or_deadline_are_batched(standin):
+    server = standin(batch_route)
+
+    async def main():
+        async with MAQRAISDK(endpoint=server.url, batching=True) as client:
+            results = await post_all(client, ["a", "b"], timeout=5)
+            results += await post_all(client, ["c", "d"], deadline=time.time() + 60)
+            results += await post_all(client, ["e"], headers={"x-trace": "1"})
+        return results
+
+    results = asyncio.run(main())
+    assert [result["review_result"]["prompt"] for result in results] == ["a", "b", "c", "d", "e"]
+    assert server.paths() == ["/api/Reviewer/batch", "/api/Reviewer/batch", "/api/Reviewer"]
+
+
+@pytest.mark.parametrize("status", [404, 405])
+def test_missing_batch_route_falls_back_to_single_calls(standin, status):
+    server = standin(without_batch_route(status))
+
+    async def main():
+        batcher = MicroBatcher()
+        async with MAQRAISDK(endpoint=server.url, batching=batcher) as client:
+            first = await post_all(client, ["a", "b", "c"])
+            second = await post_all(client, ["d", "e"])
+        assert batcher.batches == 0
+        return first + second
+
+    results = asyncio.run(main())
+    assert [result["review_result"]["prompt"] for result in results] == ["a", "b", "c", "d", "e"]
+    assert server.paths() == ["/api/Reviewer/batch"] + ["/api/Reviewer"] * 5
+
+
+def test_failed_items_return_none_like_single_calls(standin):
+    server = standin(batch_route)
+
+    async def main():
+        async with MAQRAISDK(endpoint=server.url, batching=True, **FAST) as client:
+            return await post_all(client, ["ok", "unauthorized", "broken", "flaky"])
+
+    ok, unauthorized, broken, flaky = asyncio.run(main())
+    assert ok["review_result"]["prompt"] == "ok"
+    assert unauthorized is None
+    assert broken is None
+    assert flaky["review_result"]["prompt"] == "flaky"
+    # The 5xx items were sent again on their own, and "broken" retried once more.
+    assert server.paths() == ["/api/Reviewer/batch"] + ["/api/Reviewer"] * 3
+
+
+def test_failed_items_raise_on_resilient_clients(standin):
+    server = standin(batch_route)
+
+    async def main():
+        async with MAQRAISDK(endpoint=server.url, batching=True, resilient=True, **FAST) as client:
+            results = await post_all(client, ["ok", "unauthorized", "broken", "flaky"])
+            return results, client.retry_budget
+
+    (ok, unauthorized, broken, flaky), budget = asyncio.run(main())
+    assert ok["review_result"]["prompt"] == "ok"
+    assert isinstance(unauthorized, ClientAuthenticationError)
+    assert unauthorized.status_code == 401
+    assert isinstance(broken, HttpResponseError)
+    assert not isinstance(broken, ClientAuthenticationError)
+    assert broken.status_code == 500
+    assert flaky["review_result"]["prompt"] == "flaky"
+    # Batching does not bypass the retry policy: the single call of "broken" was retried.
+    assert budget.retries == 1
+    assert sorted(server.paths()) == ["/api/Reviewer"] * 3 + ["/api/Reviewer/batch"]
+
+
+@pytest.mark.parametrize("status", [400, 413])
+def test_rejected_batches_are_split_into_single_calls(standin, status):
+    server = standin(without_batch_route(status))
+
+    async def main():
+        batcher = MicroBatcher()
+        async with MAQRAISDK(endpoint=server.url, batching=batcher) as client:
+            first = await post_all(client, ["a", "b"])
+            second = await post_all(client, ["c"])
+        return first + second
+
+    results = asyncio.run(main())
+    assert [result["review_result"]["prompt"] for result in results] == ["a", "b", "c"]
+    # Unlike a missing route, the next calls are batched again.
+    assert server.paths() == ["/api/Reviewer/batch"] + ["/api/Reviewer"] * 2 + ["/api/Reviewer/batch", "/api/Reviewer"]
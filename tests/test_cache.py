@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from maq_rai_sdk import MAQRAISDK, ResponseCache
+from maq_rai_sdk.aio import MAQRAISDK as AsyncMAQRAISDK
+
+from conftest import Reply, review
+
+
+def cached(headers):
+    """Answers every prompt with the given caching headers."""
+    return lambda request: Reply(body=review(request.json()["prompt"]), headers=headers)
+
+
+def etagged(request):
+    """Answers 304 when the client already holds the current ETag of the prompt."""
+    etag = '"{}"'.format(request.json()["prompt"])
+    if request.headers.get("If-None-Match") == etag:
+        return Reply(304, headers={"ETag": etag})
+    return Reply(body=review(request.json()["prompt"]), headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+
+def test_fresh_responses_are_served_without_a_request(standin):
+    server = standin(cached({"Cache-Control": "max-age=60"}))
+    cache = ResponseCache()
+    with MAQRAISDK(endpoint=server.url, response_cache=cache) as client:
+        first = client.reviewer.post({"prompt": "a"})
+        second = client.reviewer.post({"prompt": "a"})
+        other = client.reviewer.post({"prompt": "b"})
+    assert first == second
+    assert other["review_result"]["prompt"] == "b"
+    assert len(server.requests) == 2
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_stale_responses_are_revalidated_with_the_etag(standin):
+    server = standin(etagged)
+    cache = ResponseCache()
+    with MAQRAISDK(endpoint=server.url, response_cache=cache) as client:
+        first = client.reviewer.post({"prompt": "a"})
+        second = client.reviewer.post({"prompt": "a"})
+    assert second == first
+    assert "If-None-Match" not in server.requests[0].headers
+    assert server.requests[1].headers["If-None-Match"] == '"a"'
+    assert cache.revalidations == 1
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        {"Cache-Control": "no-store", "ETag": '"x"'},
+        {"Cache-Control": "max-age=60", "Vary": "*"},
+    ],
+)
+def test_uncacheable_responses_are_not_stored(standin, headers):
+    server = standin(cached(headers))
+    cache = ResponseCache()
+    with MAQRAISDK(endpoint=server.url, response_cache=cache) as client:
+        client.reviewer.post({"prompt": "a"})
+        client.reviewer.post({"prompt": "a"})
+    assert len(server.requests) == 2
+    assert "If-None-Match" not in server.requests[1].headers
+    assert len(cache) == 0
+
+
+def test_no_store_requests_bypass_the_cache(standin):
+    server = standin(cached({"Cache-Control": "max-age=60"}))
+    with MAQRAISDK(endpoint=server.url, response_cache=True) as client:
+        client.reviewer.post({"prompt": "a"})
+        client.reviewer.post({"prompt": "a"}, headers={"Cache-Control": "no-store"})
+    assert len(server.requests) == 2
+
+
+def test_aio_cache(standin):
+    server = standin(etagged)
+    fresh = standin(cached({"Cache-Control": "max-age=60"}))
+    cache = ResponseCache()
+
+    async def main():
+        async with AsyncMAQRAISDK(endpoint=server.url, response_cache=cache) as client:
+            first = await client.testcase.generator_post({"prompt": "a"})
+            assert await client.testcase.generator_post({"prompt": "a"}) == first
+        async with AsyncMAQRAISDK(endpoint=fresh.url, response_cache=cache) as client:
+            first = await client.testcase.generator_post({"prompt": "a"})
+            assert await client.testcase.generator_post({"prompt": "a"}) == first
+
+    asyncio.run(main())
+    assert server.requests[1].headers["If-None-Match"] == '"a"'
+    assert len(fresh.requests) == 1
+    assert (cache.hits, cache.revalidations) == (1, 1)
@@ -0,0 +1,112 @@
+import time
+
+import pytest
+from azure.core.exceptions import HttpResponseError
+
+from maq_rai_sdk import CircuitBreaker, CircuitBreakers, CircuitOpenError, MAQRAISDK, MultiEndpointClient
+
+from conftest import Reply, review
+
+
+class Switch:
+    """Answers 503 while ``down``, and takes ``latency`` seconds to answer."""
+
+    def __init__(self, down=True, latency=0.0):
+        self.down = down
+        self.latency = latency
+
+    def __call__(self, request):
+        time.sleep(self.latency)
+        if self.down:
+            return Reply(503)
+        return review(request.json()["prompt"])
+
+
+def test_failures_open_the_circuit():
+    breaker = CircuitBreaker(window=4, min_calls=4, failure_rate=0.5)
+    for ok in (True, False, True):
+        assert breaker.allow()
+        breaker.record(0.01, ok)
+    assert breaker.state == "closed"
+    breaker.record(0.01, False)
+    assert (breaker.state, breaker.trips) == ("open", 1)
+    assert not breaker.allow()
+    assert breaker.rejected == 1
+
+
+def test_slow_calls_open_the_circuit():
+    breaker = CircuitBreaker(window=4, min_calls=4, latency_threshold=0.1, slow_call_rate=0.75)
+    for latency in (0.2, 0.2, 0.01):
+        breaker.record(latency, True)
+    assert breaker.state == "closed"
+    breaker.record(0.2, True)
+    assert breaker.state == "open"
+    assert breaker.snapshot()["calls"] == 0
+
+
+def test_half_open_trials_close_or_reopen_the_circuit():
+    breaker = CircuitBreaker(window=2, min_calls=2, open_time=0.1, half_open_calls=2)
+    breaker.record(0.01, False)
+    breaker.record(0.01, False)
+    assert 0 < breaker.retry_after <= 0.1
+    time.sleep(0.1)
+    assert breaker.state == "half_open"
+    assert breaker.allow() and breaker.allow()
+    assert not breaker.allow()  # only the trial calls get through
+    breaker.record(0.01, True)
+    assert breaker.state == "half_open"
+    breaker.record(0.01, True)
+    assert breaker.state == "closed"
+
+    # Reopened, a failed trial call opens it again.
+    breaker.record(0.01, False)
+    breaker.record(0.01, False)
+    time.sleep(0.1)
+    assert breaker.allow()
+    breaker.record(0.01, False)
+    assert (breaker.state, breaker.trips) == ("open", 3)
+
+
+def test_open_circuits_reject_calls_without_sending_them(standin):
+    service = Switch()
+    server = standin(service)
+    breakers = CircuitBreakers(window=2, min_calls=2, open_time=0.2, half_open_calls=1)
+    with MAQRAISDK(endpoint=server.url, circuit_breakers=breakers, retry_total=0) as client:
+        for _ in range(2):
+            with pytest.raises(HttpResponseError):
+                client.reviewer.post({"prompt": "a"})
+        with pytest.raises(CircuitOpenError) as raised:
+            client.reviewer.post({"prompt": "a"})
+        assert len(server.requests) == 2
+        assert raised.value.endpoint == server.url.rsplit("/", 1)[0]
+        assert 0 < raised.value.retry_after <= 0.2
+
+        service.down = False
+        time.sleep(0.2)
+        assert client.reviewer.post({"prompt": "a"})["review_result"]["prompt"] == "a"
+        (state,) = breakers.snapshot().values()
+    assert (state["state"], state["trips"], state["rejected"]) == ("closed", 1, 1)
+
+
+def test_slow_endpoints_trip_their_circuit(standin):
+    server = standin(Switch(down=False, latency=0.1))
+    breakers = CircuitBreakers(min_calls=2, latency_threshold=0.05)
+    with MAQRAISDK(endpoint=server.url, circuit_breakers=breakers) as client:
+        client.reviewer.post({"prompt": "a"})
+        client.reviewer.post({"prompt": "b"})
+        with pytest.raises(CircuitOpenError):
+            client.reviewer.post({"prompt": "c"})
+    assert len(server.requests) == 2
+
+
+def test_multi_endpoint_client_fails_over_open_circuits(standin):
+    down, up = standin(Switch()), standin(Switch(down=False))
+    breakers = CircuitBreakers(window=2, min_calls=2)
+    for _ in range(2):
+        breakers.get(down.url).record(0.01, False)
+    with MultiEndpointClient([down.url, up.url], circuit_breakers=breakers, retry_total=0) as client:
+        for prompt in ("a", "b", "c", "d"):
+            assert client.reviewer.post({"prompt": prompt})["review_result"]["prompt"] == prompt
+    assert not down.requests
+    assert len(up.requests) == 4
+    assert breakers.get(down.url).rejected >= 1
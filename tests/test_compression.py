@@ -0,0 +1,107 @@
+import asyncio
+import gzip
+import zlib
+
+import pytest
+
+from maq_rai_sdk import MAQRAISDK, available_encodings
+from maq_rai_sdk._compression import compress
+from maq_rai_sdk.aio import MAQRAISDK as AsyncMAQRAISDK
+from maq_rai_sdk.aio import AsyncHttpXTransport
+
+from conftest import Reply
+
+ENCODINGS = ["gzip", "deflate", "br", "zstd"]
+LARGE = "x" * 5000
+
+
+def requires(encoding):
+    if encoding not in available_encodings():
+        pytest.skip("{} support is not installed".format(encoding))
+
+
+def decompress(encoding, data):
+    if encoding == "gzip":
+        return gzip.decompress(data)
+    if encoding == "deflate":
+        return zlib.decompress(data)
+    if encoding == "br":
+        import brotli
+
+        return brotli.decompress(data)
+    import zstandard
+
+    return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+
+def large_answer(request):
+    """Answers with a large body, compressed in the X-Respond-With coding if the client accepts it."""
+    body = request.body
+    if request.headers.get("Content-Encoding"):
+        body = decompress(request.headers["Content-Encoding"], body)
+    content = b'{"testcases": ["' + b"y" * 300000 + b'"], "prompt_length": ' + str(len(body)).encode() + b"}"
+    accepted = [coding.strip() for coding in (request.headers.get("Accept-Encoding") or "").split(",")]
+    encoding = request.headers.get("X-Respond-With")
+    if encoding not in accepted:
+        return Reply(body=content, headers={"Content-Type": "application/json"})
+    return Reply(
+        body=compress(encoding, content), headers={"Content-Type": "application/json", "Content-Encoding": encoding}
+    )
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_large_bodies_are_compressed(standin, encoding):
+    requires(encoding)
+    server = standin(lambda request: {})
+    with MAQRAISDK(endpoint=server.url, request_compression=encoding) as client:
+        client.reviewer.post({"prompt": LARGE})
+        client.reviewer.post({"prompt": "small"})
+    large, small = server.requests
+    assert large.headers["Content-Encoding"] == encoding
+    assert len(large.body) < len(LARGE)
+    assert b'"prompt": "' + LARGE.encode() + b'"' in decompress(encoding, large.body)
+    assert "Content-Encoding" not in small.headers
+    assert small.json() == {"prompt": "small"}
+
+
+def test_compression_threshold(standin):
+    server = standin(lambda request: {})
+    with MAQRAISDK(endpoint=server.url, request_compression="gzip", request_compression_threshold=20) as client:
+        client.reviewer.post({"prompt": "a"})
+        client.reviewer.post({"prompt": "just over twenty"})
+    below, above = server.requests
+    assert "Content-Encoding" not in below.headers
+    assert above.headers["Content-Encoding"] == "gzip"
+
+
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_requests_transport_decodes_responses(standin, encoding):
+    requires(encoding)
+    server = standin(large_answer)
+    with MAQRAISDK(endpoint=server.url, accept_encodings=[encoding]) as client:
+        result = client.testcase.generator_post({"prompt": LARGE}, headers={"X-Respond-With": encoding})
+    assert len(result["testcases"][0]) == 300000
+    assert server.requests[0].headers["Accept-Encoding"] == encoding
+
+
+@pytest.mark.parametrize("transport", ["aiohttp", "httpx"])
+@pytest.mark.parametrize("encoding", ENCODINGS)
+def test_aio_transports_decode_responses(standin, encoding, transport):
+    requires(encoding)
+    if transport == "httpx":
+        pytest.importorskip("httpx")
+    server = standin(large_answer)
+
+    async def main():
+        options = {"transport": AsyncHttpXTransport(http2=False)} if transport == "httpx" else {}
+        async with AsyncMAQRAISDK(
+            endpoint=server.url, request_compression="gzip", accept_encodings=available_encodings(), **options
+        ) as client:
+            return await client.testcase.generator_post({"prompt": LARGE}, headers={"X-Respond-With": encoding})
+
+    result = asyncio.run(main())
+    assert len(result["testcases"][0]) == 300000
+    assert result["prompt_length"] > len(LARGE)
+    request = server.requests[0]
+    assert request.headers["Content-Encoding"] == "gzip"
+    assert encoding in request.headers["Accept-Encoding"]
@@ -0,0 +1,105 @@
+import asyncio
+import json
+
+import pytest
+
+from maq_rai_sdk import MAQRAISDK
+from maq_rai_sdk.aio import MAQRAISDK as AsyncMAQRAISDK
+
+from conftest import Reply, review
+
+msgpack = pytest.importorskip("msgpack")
+cbor2 = pytest.importorskip("cbor2")
+
+CODECS = {
+    "application/json": (lambda obj: json.dumps(obj).encode("utf-8"), json.loads),
+    "application/msgpack": (msgpack.packb, msgpack.unpackb),
+    "application/cbor": (cbor2.dumps, cbor2.loads),
+}
+
+
+class Service:
+    """Answers in the first media type of ``Accept`` it knows, optionally advertising Accept-Post."""
+
+    def __init__(self, advertise=True, rejects=()):
+        self.advertise = advertise
+        self.rejects = set(rejects)
+
+    def __call__(self, request):
+        content_type = request.headers["Content-Type"]
+        if content_type in self.rejects:
+            return Reply(415)
+        body = CODECS[content_type][1](request.body)
+        answer_type = request.headers.get("Accept", "").split(",")[0].split(";")[0].strip()
+        if answer_type not in CODECS or not self.advertise:
+            answer_type = "application/json"
+        headers = {"Content-Type": answer_type}
+        if self.advertise:
+            headers["Accept-Post"] = ", ".join(CODECS)
+        return Reply(body=CODECS[answer_type][0](review(body["prompt"])), headers=headers)
+
+
+def content_types(server):
+    return [request.headers["Content-Type"] for request in server.requests]
+
+
+def test_accept_header_lists_preferred_types_then_json(standin):
+    server = standin(Service(advertise=False))
+    with MAQRAISDK(endpoint=server.url, content_types=["application/cbor", "application/msgpack"]) as client:
+        assert client.reviewer.post({"prompt": "a"})["review_result"]["prompt"] == "a"
+    assert server.requests[0].headers["Accept"] == "application/cbor, application/msgpack;q=0.8, application/json;q=0.5"
+
+
+@pytest.mark.parametrize("media_type", ["application/msgpack", "application/cbor"])
+def test_bodies_switch_once_the_service_advertises(standin, media_type):
+    server = standin(Service())
+    with MAQRAISDK(endpoint=server.url, content_types=[media_type]) as client:
+        results = [client.reviewer.post({"prompt": prompt}) for prompt in ("a", "b", "c")]
+    assert [result["updated_result"]["updatedPrompt"] for result in results] == ["a!", "b!", "c!"]
+    assert content_types(server) == ["application/json", media_type, media_type]
+
+
+def test_bodies_stay_json_without_advertisement(standin):
+    server = standin(Service(advertise=False))
+    with MAQRAISDK(endpoint=server.url, content_types=["application/msgpack"]) as client:
+        client.reviewer.post({"prompt": "a"})
+        client.reviewer.post({"prompt": "b"})
+    assert content_types(server) == ["application/json", "application/json"]
+
+
+def test_falls_back_to_json_after_415(standin):
+    service = Service()
+    server = standin(service)
+    with MAQRAISDK(endpoint=server.url, content_types=["application/msgpack"]) as client:
+        client.reviewer.post({"prompt": "a"})
+        service.rejects.add("application/msgpack")
+        assert client.reviewer.post({"prompt": "b"})["review_result"]["prompt"] == "b"
+        assert client.reviewer.post({"prompt": "c"})["review_result"]["prompt"] == "c"
+    assert content_types(server) == [
+        "application/json",
+        "application/msgpack",
+        "application/json",
+        "application/json",
+    ]
+
+
+def test_aio_negotiation_and_fallback(standin):
+    service = Service()
+    server = standin(service)
+
+    async def main():
+        async with AsyncMAQRAISDK(endpoint=server.url, content_types=["application/cbor"]) as client:
+            first = await client.testcase.generator_post({"prompt": "a"})
+            second = await client.testcase.generator_post({"prompt": "b"})
+            service.rejects.add("application/cbor")
+            third = await client.testcase.generator_post({"prompt": "c"})
+        return [first, second, third]
+
+    results = asyncio.run(main())
+    assert [result["review_result"]["prompt"] for result in results] == ["a", "b", "c"]
+    assert content_types(server) == [
+        "application/json",
+        "application/cbor",
+        "application/cbor",
+        "application/json",
+    ]
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from maq_rai_sdk import MAQRAISDK
+from maq_rai_sdk.aio import MAQRAISDK as AsyncMAQRAISDK
+
+CATEGORIES = ("XPIA", "Groundedness", "Jailbreak", "HarmfulContent")
+
+
+def graded(prompt, compliant, score, updated=None):
+    statuses = {
+        name: {"status": "Compliant" if index < compliant else "Non-Compliant"} for index, name in enumerate(CATEGORIES)
+    }
+    return {
+        "review_result": {},
+        "updated_result": {"updatedPrompt": updated if updated is not None else prompt + "!"},
+        "review_of_updated_prompt": statuses,
+        "updated_compliance_score": {"compliance_score (%)": score},
+    }
+
+
+def improving(request):
+    """Every rewrite makes one more category compliant."""
+    prompt = request.json()["prompt"]
+    fixed = min(prompt.count("!") + 1, 4)
+    return graded(prompt, fixed, fixed * 25.0)
+
+
+def test_converges_once_every_category_is_compliant(standin):
+    server = standin(improving)
+    with MAQRAISDK(endpoint=server.url) as client:
+        result = client.reviewer.converge("p", max_rounds=10, review_options={"need_metrics": True})
+
+    assert (result.prompt, result.converged, result.reason, result.calls) == ("p!!!!", True, "compliant", 4)
+    assert [request.json()["prompt"] for request in server.requests] == ["p", "p!", "p!!", "p!!!"]
+    assert all(request.json()["need_metrics"] is True for request in server.requests)
+    assert result.review is result.rounds[-1]
+
+
+def test_stops_when_the_score_stops_improving(standin):
+    def plateau(request):
+        prompt = request.json()["prompt"]
+        return graded(prompt, 2, 50.0 if prompt.count("!") < 2 else 40.0)
+
+    server = standin(plateau)
+    with MAQRAISDK(endpoint=server.url) as client:
+        result = client.reviewer.converge("p", max_rounds=10)
+    # "p!" already scored 50 for its rewrite "p!!", which scored no better in the next round.
+    assert (result.reason, result.converged, result.calls) == ("no_improvement", False, 2)
+    assert (result.prompt, result.review) == ("p!", result.rounds[0])
+
+
+def test_prompts_are_never_sent_twice(standin):
+    def cycling(request):
+        prompt = request.json()["prompt"]
+        return graded(prompt, 1, 30.0 if prompt == "b" else 25.0, updated="b" if prompt == "a" else "a")
+
+    server = standin(cycling)
+    cache = {}
+    with MAQRAISDK(endpoint=server.url) as client:
+        result = client.reviewer.converge("a", max_rounds=10, review_cache=cache)
+        assert (result.reason, result.calls) == ("repeated", 2)
+        again = client.reviewer.converge("b", max_rounds=10, review_cache=cache)
+    assert (again.calls, len(again.rounds)) == (0, 2)
+    assert [request.json()["prompt"] for request in server.requests] == ["a", "b"]
+    assert set(cache) == {"a", "b"}
+
+
+def test_rounds_are_capped(standin):
+    with MAQRAISDK(endpoint=standin(improving).url) as client:
+        result = client.reviewer.converge("p", max_rounds=2)
+        assert (result.prompt, result.reason, result.calls) == ("p!!", "max_rounds", 2)
+        with pytest.raises(ValueError):
+            client.reviewer.converge("p", max_rounds=0)
+
+
+def test_async_converge(standin):
+    url = standin(improving).url
+
+    async def main():
+        async with AsyncMAQRAISDK(endpoint=url) as client:
+            return await client.reviewer.converge("q", max_rounds=10, timeout=10)
+
+    result = asyncio.run(main())
+    assert (result.prompt, result.converged, result.calls) == ("q!!!!", True, 4)
@@ -0,0 +1,208 @@
+import json
+import sqlite3
+import threading
+import time
+
+import pytest
+from azure.core.exceptions import ClientAuthenticationError
+
+from maq_rai_sdk import BatchCoordinator, BatchWorker
+
+from conftest import Reply, review
+
+
+def answer(request):
+    prompt = request.json()["prompt"]
+    if prompt == "bad":
+        return Reply(400, {"error": "bad prompt"})
+    if prompt == "denied":
+        return Reply(401, {"error": "bad key"})
+    return review(prompt)
+
+
+def write_input(path, prompts):
+    with open(path, "w") as src:
+        src.writelines(json.dumps({"prompt": prompt}) + "\n" for prompt in prompts)
+    return str(path)
+
+
+def read_output(path):
+    with open(path) as out:
+        return [json.loads(line) for line in out]
+
+
+def run_workers(db, url, count, **kwargs):
+    stats = [None] * count
+
+    def work(index):
+        stats[index] = BatchWorker(db, url, poll_interval=0.05, name="w{}".format(index), **kwargs).run(until_idle=True)
+
+    threads = [threading.Thread(target=work, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return stats
+
+
+def test_workers_drain_a_run_and_results_come_back_in_order(standin, tmp_path):
+    server = standin(answer)
+    db = str(tmp_path / "runs.db")
+    prompts = [str(index) for index in range(50)]
+    prompts[7] = "bad"
+    with BatchCoordinator(db) as coordinator:
+        run = coordinator.submit(write_input(tmp_path / "in.jsonl", prompts), unit_size=8)
+        assert coordinator.progress(run)["queued"] == 7
+        stats = run_workers(db, server.url, 3, max_concurrency=4)
+        progress = coordinator.collect(run, str(tmp_path / "out.jsonl"), timeout=5)
+
+    records = read_output(tmp_path / "out.jsonl")
+    assert [record["line"] for record in records] == list(range(1, 51))
+    assert records[7]["error"]["status"] == 400
+    assert records[49]["result"]["review_result"]["prompt"] == "49"
+    assert (progress["done"], progress["succeeded"], progress["failed"]) == (7, 49, 1)
+    assert sum(worker["units"] for worker in stats) == 7
+    assert sum(worker["latency"]["count"] for worker in stats) == 49
+    assert len(server.requests) == 50
+
+
+def test_units_of_dead_workers_are_leased_again(standin, tmp_path):
+    server = standin(answer)
+    db = str(tmp_path / "runs.db")
+    with BatchCoordinator(db) as coordinator:
+        run = coordinator.submit(write_input(tmp_path / "in.jsonl", ["a", "b", "c"]), unit_size=1)
+        with sqlite3.connect(db) as raw:
+            # A worker leased the first unit and died; the second one's worker is still alive.
+            lease = "UPDATE units SET state = 'running', attempts = 1, lease = ?, expires = ? WHERE unit = ?"
+            raw.execute(lease, ("dead", time.time() - 1, 0))
+            raw.execute(lease, ("alive", time.time() + 0.5, 1))
+        started = time.monotonic()
+        [stats] = run_workers(db, server.url, 1)
+        # The live lease is respected until it expires without being renewed.
+        assert time.monotonic() - started >= 0.4
+        assert stats["units"] == 3
+        assert coordinator.progress(run)["done"] == 3
+    assert sorted(request.json()["prompt"] for request in server.requests) == ["a", "b", "c"]
+
+
+class PartitionedWorker(BatchWorker):
+    """A worker cut off from the database while it runs its unit, so its lease is not renewed."""
+
+    def _renew(self, lease):
+        pass
+
+
+def test_late_commits_do_not_overwrite_results(standin, tmp_path):
+    calls = []
+
+    def slow_first(request):
+        calls.append(request)
+        if len(calls) == 1:
+            time.sleep(1)
+        return review(request.json()["prompt"] + str(len(calls)))
+
+    url = standin(slow_first).url
+    db = str(tmp_path / "runs.db")
+    with BatchCoordinator(db) as coordinator:
+        run = coordinator.submit(write_input(tmp_path / "in.jsonl", ["a"]))
+        stalled = PartitionedWorker(db, url, max_concurrency=1, lease_time=0.3, poll_interval=0.05)
+        thread = threading.Thread(target=stalled.run, kwargs={"until_idle": True})
+        thread.start()
+        time.sleep(0.5)
+        [stats] = run_workers(db, url, 1)
+        thread.join()
+        coordinator.collect(run, str(tmp_path / "out.jsonl"), timeout=1)
+    assert (stats["units"], stalled.units, stalled.lost) == (1, 0, 1)
+    assert read_output(tmp_path / "out.jsonl")[0]["result"]["review_result"]["prompt"] == "a2"
+
+
+def test_units_are_given_up_after_max_attempts(standin, tmp_path):
+    db = str(tmp_path / "runs.db")
+    with BatchCoordinator(db, max_attempts=2) as coordinator:
+        run = coordinator.submit(write_input(tmp_path / "in.jsonl", ["a", "b"]), unit_size=1)
+        with sqlite3.connect(db) as raw:
+            raw.execute(
+                "UPDATE units SET state = 'running', attempts = 2, lease = 'x', expires = ? WHERE unit = 0",
+                (time.time() - 1,),
+            )
+        run_workers(db, standin(answer).url, 1)
+        progress = coordinator.collect(run, str(tmp_path / "out.jsonl"), timeout=1)
+    assert (progress["done"], progress["dead"]) == (1, 1)
+    first, second = read_output(tmp_path / "out.jsonl")
+    assert (first["line"], first["error"]["type"]) == (1, "WorkerLost")
+    assert second["result"]["review_result"]["prompt"] == "b"
+
+
+def test_rate_budget_is_shared_by_every_worker(standin, tmp_path):
+    db = str(tmp_path / "runs.db")
+    with BatchCoordinator(db) as coordinator:
+        source = write_input(tmp_path / "in.jsonl", [str(index) for index in range(30)])
+        run = coordinator.submit(source, unit_size=5, rate_limit=20)
+        started = time.monotonic()
+        run_workers(db, standin(answer).url, 2)
+        elapsed = time.monotonic() - started
+        assert coordinator.progress(run)["succeeded"] == 30
+    # 20 calls in the initial burst, then 10 more at 20 per second.
+    assert elapsed >= 0.45
+
+
+def test_clients_of_finished_runs_are_closed(standin, tmp_path, monkeypatch):
+    from maq_rai_sdk.aio import MAQRAISDK
+
+    closed = []
+    close = MAQRAISDK.close
+
+    async def record(client):
+        closed.append(client)
+        await close(client)
+
+    monkeypatch.setattr(MAQRAISDK, "close", record)
+
+    def wait_for(condition):
+        give_up = time.monotonic() + 5
+        while not condition():
+            assert time.monotonic() < give_up
+            time.sleep(0.01)
+
+    db = str(tmp_path / "runs.db")
+    server = standin(answer)
+    worker = BatchWorker(db, server.url, poll_interval=0.05)
+    thread = threading.Thread(target=worker.run)
+    thread.start()
+    try:
+        with BatchCoordinator(db) as coordinator:
+            for index in range(2):
+                source = write_input(tmp_path / "in.jsonl", ["a", "b", "c"])
+                run = coordinator.submit(source, unit_size=1, rate_limit=100)
+                coordinator.collect(run, str(tmp_path / "out.jsonl"), timeout=5)
+                # The worker keeps going, without the client and the limiter of the finished run.
+                wait_for(lambda: len(closed) == index + 1)
+                wait_for(lambda: not worker._limiters)
+    finally:
+        worker.stop()
+        thread.join()
+    assert len(closed) == 2 and closed[0] is not closed[1]
+    assert worker.units == 6
+
+
+def test_rejected_credentials_hand_the_unit_back(standin, tmp_path):
+    db = str(tmp_path / "runs.db")
+    with BatchCoordinator(db) as coordinator:
+        run = coordinator.submit(write_input(tmp_path / "in.jsonl", ["denied"]))
+        worker = BatchWorker(db, standin(answer).url, client_options={"resilient": True})
+        with pytest.raises(ClientAuthenticationError):
+            worker.run(until_idle=True)
+        assert coordinator.progress(run)["queued"] == 1
+
+
+def test_command_line(standin, tmp_path, capsys):
+    from maq_rai_sdk._cli import main
+
+    db = str(tmp_path / "runs.db")
+    source = write_input(tmp_path / "in.jsonl", ["a", "b", "c"])
+    assert main(["submit", source, "--db", db, "--unit-size", "2"]) == 0
+    run = capsys.readouterr().out.strip()
+    assert main(["work", "--db", db, "--endpoint", standin(answer).url, "--until-idle"]) == 0
+    assert main(["collect", run, "--db", db, "-o", str(tmp_path / "out.jsonl")]) == 0
+    records = read_output(tmp_path / "out.jsonl")
+    assert [record["result"]["review_result"]["prompt"] for record in records] == ["a", "b", "c"]
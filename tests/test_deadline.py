@@ -0,0 +1,102 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from azure.core.pipeline import PipelineContext, PipelineRequest
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.core.rest import HttpRequest
+
+from maq_rai_sdk import DeadlineExceededError
+from maq_rai_sdk.aio import DeadlinePolicy, MAQRAISDK, MultiEndpointClient
+
+from conftest import review
+
+
+def slow(latency):
+    def answer(request):
+        time.sleep(latency)
+        return review(request.json()["prompt"])
+
+    return answer
+
+
+def attempt(**options):
+    transport = AioHttpTransport(connection_timeout=300, read_timeout=300)
+    http_request = HttpRequest("POST", "http://localhost/api/Reviewer")
+    request = PipelineRequest(http_request, PipelineContext(transport, **options))
+    DeadlinePolicy().on_request(request)
+    return request
+
+
+def test_attempt_timeouts_are_capped_at_the_time_left():
+    deadline = time.time() + 2
+    request = attempt(deadline=deadline)
+    options = request.context.options
+    assert 1.5 < options["connection_timeout"] <= 2
+    assert 1.5 < options["read_timeout"] <= 2
+    assert request.context["deadline"] == deadline
+    stamp = request.http_request.headers["x-ms-client-deadline"]
+    assert stamp.endswith("Z")
+    assert abs(datetime.fromisoformat(stamp[:-1] + "+00:00").timestamp() - deadline) < 0.001
+
+    # Shorter timeouts of the call are kept.
+    assert attempt(deadline=deadline, read_timeout=0.5).context.options["read_timeout"] == 0.5
+    assert "x-ms-client-deadline" not in attempt().http_request.headers
+    with pytest.raises(DeadlineExceededError):
+        attempt(deadline=time.time() - 1)
+
+
+def test_the_deadline_header_is_sent(standin):
+    server = standin(slow(0))
+    deadline = datetime.now(timezone.utc) + timedelta(seconds=30)
+
+    async def main():
+        async with MAQRAISDK(endpoint=server.url) as client:
+            return await client.reviewer.post({"prompt": "a"}, deadline=deadline)
+
+    assert asyncio.run(main())["review_result"]["prompt"] == "a"
+    stamp = server.requests[0].headers["x-ms-client-deadline"]
+    assert abs(datetime.fromisoformat(stamp[:-1] + "+00:00") - deadline) < timedelta(milliseconds=1)
+
+
+def test_a_past_deadline_raises_before_sending(standin):
+    server = standin(slow(0))
+
+    async def main():
+        async with MAQRAISDK(endpoint=server.url) as client:
+            with pytest.raises(DeadlineExceededError):
+                await client.reviewer.post({"prompt": "a"}, deadline=time.time() - 1)
+            with pytest.raises(DeadlineExceededError):
+                await client.testcase.generator_post({"prompt": "a"}, timeout=0)
+
+    asyncio.run(main())
+    assert not server.requests
+
+
+def test_an_overrunning_call_is_cancelled(standin):
+    server = standin(slow(1))
+
+    async def main():
+        async with MAQRAISDK(endpoint=server.url) as client:
+            started = time.monotonic()
+            with pytest.raises(DeadlineExceededError) as raised:
+                await client.reviewer.post({"prompt": "a"}, deadline=time.time() + 0.2)
+            return time.monotonic() - started, raised.value
+
+    elapsed, error = asyncio.run(main())
+    assert 0.15 < elapsed < 0.6
+    assert error.deadline <= time.time()
+    assert len(server.requests) == 1
+
+
+def test_multi_endpoint_client_does_not_fail_over_past_the_deadline(standin):
+    servers = [standin(slow(1)), standin(slow(1))]
+
+    async def main():
+        async with MultiEndpointClient([server.url for server in servers]) as client:
+            with pytest.raises(DeadlineExceededError):
+                await client.reviewer.post({"prompt": "a"}, timeout=0.2)
+
+    asyncio.run(main())
+    assert len(servers[0].requests) + len(servers[1].requests) == 1
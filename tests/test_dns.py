@@ -0,0 +1,134 @@
+import asyncio
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import maq_rai_sdk._dns
+from maq_rai_sdk import DnsCache, MAQRAISDK
+from maq_rai_sdk.aio import MAQRAISDK as AsyncMAQRAISDK
+
+from conftest import review
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    """Resolve "standin.test" to the loopback address and record the lookups of it."""
+    resolve = socket.getaddrinfo
+    seen = []
+
+    def getaddrinfo(host, port, *args, **kwargs):
+        if host != "standin.test":
+            return resolve(host, port, *args, **kwargs)
+        seen.append(host)
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", port))]
+
+    monkeypatch.setattr(socket, "getaddrinfo", getaddrinfo)
+    return seen
+
+
+def named(server):
+    return server.url.replace("127.0.0.1", "standin.test")
+
+
+def test_resolutions_expire_after_their_ttl(lookups):
+    cache = DnsCache(ttl=0.1)
+    assert cache.resolve("standin.test", 80) == [(socket.AF_INET, "127.0.0.1")]
+    assert cache.resolve("standin.test", 443) == [(socket.AF_INET, "127.0.0.1")]
+    assert (len(lookups), cache.hits, cache.misses) == (1, 1, 1)
+    time.sleep(0.1)
+    cache.resolve("standin.test")
+    assert (len(lookups), cache.misses) == (2, 2)
+    cache.invalidate("standin.test")
+    cache.resolve("standin.test")
+    assert len(lookups) == 3
+    # Addresses are never looked up.
+    assert cache.resolve("10.0.0.1") == [(socket.AF_INET, "10.0.0.1")]
+    assert cache.resolve("[::1]") == [(socket.AF_INET6, "::1")]
+    assert len(cache) == 1
+
+
+def test_the_least_recently_used_names_are_dropped():
+    cache = DnsCache(max_entries=2)
+    for host in ("a.test", "b.test", "a.test", "c.test"):
+        cache._store(host, socket.AF_UNSPEC, [(socket.AF_INET, 0, 0, "", ("10.0.0.1", 0))])
+    assert [host for host, _ in cache._entries] == ["a.test", "c.test"]
+
+
+def test_clients_share_a_dns_cache(standin, lookups):
+    server = standin(lambda request: review(request.json()["prompt"]))
+    cache = DnsCache()
+
+    async def call():
+        async with AsyncMAQRAISDK(endpoint=named(server), dns_cache=cache) as client:
+            return await client.reviewer.post({"prompt": "async"})
+
+    with MAQRAISDK(endpoint=named(server), dns_cache=cache) as client:
+        assert client.reviewer.post({"prompt": "sync"})["review_result"]["prompt"] == "sync"
+    assert asyncio.run(call())["review_result"]["prompt"] == "async"
+    # The name only the test can resolve was looked up once for both clients.
+    assert lookups == ["standin.test"]
+    assert cache.hits >= 1
+
+
+def test_the_aio_resolver_answers_from_the_cache(lookups):
+    from maq_rai_sdk.aio._dns import _DnsCacheResolver  # pylint: disable=import-outside-toplevel
+
+    cache = DnsCache()
+
+    async def main():
+        resolver = _DnsCacheResolver(cache)
+        first = await resolver.resolve("standin.test", 8080)
+        second = await resolver.resolve("standin.test", 8080)
+        await resolver.close()
+        return first, second
+
+    first, second = asyncio.run(main())
+    assert first == second
+    assert first[0]["host"] == "127.0.0.1" and first[0]["port"] == 8080 and first[0]["hostname"] == "standin.test"
+    assert len(lookups) == 1
+
+
+def test_warmup_opens_connections_reused_by_later_calls(standin):
+    held = threading.Barrier(3, timeout=5)
+
+    def answer(request):
+        held.wait()  # three calls at once need three connections
+        return review(request.json()["prompt"])
+
+    server = standin(answer)
+    with MAQRAISDK(endpoint=server.url) as client:
+        assert client.warmup(3) == 3
+        assert not server.requests
+        adapter = client._client._pipeline._transport.session.get_adapter(server.url)
+        (pool,) = adapter.poolmanager.pools._container.values()
+        warmed = {conn.sock.getsockname() for conn in pool.pool.queue if conn is not None}
+        assert len(warmed) == 3
+        with ThreadPoolExecutor(3) as executor:
+            results = list(executor.map(lambda prompt: client.reviewer.post({"prompt": prompt}), "abc"))
+        assert [result["review_result"]["prompt"] for result in results] == ["a", "b", "c"]
+        assert pool.num_connections == 3
+    # The calls went over the connections opened by the warmup.
+    assert server.connections == warmed
+
+
+def test_warmup_falls_back_to_head_requests(standin, monkeypatch):
+    server = standin(lambda request: {})
+    monkeypatch.setattr(maq_rai_sdk._dns, "_preconnect", lambda session, url, connections: None)
+    monkeypatch.setattr(maq_rai_sdk._patch, "_preconnect", maq_rai_sdk._dns._preconnect)
+    with MAQRAISDK(endpoint=server.url) as client:
+        assert client.warmup(2) == 2
+    assert [request.method for request in server.requests] == ["HEAD", "HEAD"]
+
+
+def test_aio_warmup(standin):
+    server = standin(lambda request: {})
+
+    async def main():
+        async with AsyncMAQRAISDK(endpoint=server.url) as client:
+            return await client.warmup(3)
+
+    assert asyncio.run(main()) == 3
+    assert [request.method for request in server.requests] == ["HEAD"] * 3
@@ -0,0 +1,132 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from maq_rai_sdk.aio import MAQRAISDK, RequestHedger
+
+from conftest import review
+
+
+class Attempts:
+    """Starts attempts that take ``latencies[n]`` seconds and fail if it is negative."""
+
+    def __init__(self, *latencies):
+        self.latencies = list(latencies)
+        self.started = 0
+        self.cancelled = []
+
+    def __call__(self):
+        index = self.started
+        self.started += 1
+        return self._attempt(index, self.latencies[min(index, len(self.latencies) - 1)])
+
+    async def _attempt(self, index, latency):
+        try:
+            await asyncio.sleep(abs(latency))
+        except asyncio.CancelledError:
+            self.cancelled.append(index)
+            raise
+        if latency < 0:
+            raise ValueError("attempt {} failed".format(index))
+        return index
+
+
+def test_delay_follows_the_latency_quantile():
+    hedger = RequestHedger(quantile=0.9, initial_delay=2.0, min_delay=0.05, min_samples=10)
+    for latency in range(1, 10):
+        hedger.record(latency / 100)
+    assert hedger.delay() == 2.0
+    hedger.record(0.1)
+    assert hedger.delay() == pytest.approx(0.1)
+    fast = RequestHedger(min_samples=1)
+    fast.record(0.001)
+    assert fast.delay() == 0.05
+
+
+def test_hedges_wait_for_a_whole_token():
+    async def main():
+        hedger = RequestHedger(initial_delay=0.01, min_samples=1000)
+        hedged = []
+        for _ in range(20):
+            attempts = Attempts(0.03)
+            await hedger.run(attempts)
+            hedged.append(attempts.started == 2)
+        return hedger, hedged
+
+    hedger, hedged = asyncio.run(main())
+    # Every call earns 0.05 tokens: the 20th call is the first one hedged.
+    assert hedged == [False] * 19 + [True]
+    assert (hedger.calls, hedger.hedges) == (20, 1)
+
+
+def test_the_losing_attempt_is_cancelled():
+    async def main():
+        hedger = RequestHedger(budget=1, initial_delay=0.05, min_samples=1000)
+        attempts = Attempts(1, 0.01)
+        started = time.monotonic()
+        result = await hedger.run(attempts)
+        return hedger, attempts, result, time.monotonic() - started
+
+    hedger, attempts, result, elapsed = asyncio.run(main())
+    assert (result, attempts.cancelled) == (1, [0])
+    assert elapsed < 0.5
+    assert (hedger.hedges, hedger.hedge_wins) == (1, 1)
+    # The hedge's latency is recorded from when it was sent.
+    assert hedger._sorted == [pytest.approx(0.01, abs=0.04)]
+
+
+def test_a_failed_attempt_leaves_the_other_one_running():
+    async def main(*latencies):
+        hedger = RequestHedger(budget=1, initial_delay=0.05, min_samples=1000)
+        attempts = Attempts(*latencies)
+        try:
+            return await hedger.run(attempts), hedger, attempts
+        except ValueError as error:
+            return error, hedger, attempts
+
+    result, hedger, attempts = asyncio.run(main(-0.07, 0.1))
+    assert (result, hedger.hedge_wins, attempts.cancelled) == (1, 1, [])
+    result, hedger, attempts = asyncio.run(main(0.1, -0.01))
+    assert (result, hedger.hedge_wins, attempts.cancelled) == (0, 0, [])
+    assert hedger._sorted == [pytest.approx(0.1, abs=0.04)]
+    error, hedger, _ = asyncio.run(main(-0.07, -0.01))
+    assert str(error) == "attempt 1 failed"
+    assert not hedger._sorted
+
+
+def test_fast_calls_are_not_hedged():
+    async def main():
+        hedger = RequestHedger(budget=1, initial_delay=0.1)
+        for _ in range(3):
+            assert await hedger.run(Attempts(0)) == 0
+        return hedger
+
+    hedger = asyncio.run(main())
+    assert (hedger.calls, hedger.hedges, len(hedger._sorted)) == (3, 0, 3)
+
+
+def test_slow_service_calls_are_hedged(standin):
+    first = threading.Event()
+
+    def answer(request):
+        if not first.is_set():
+            first.set()
+            time.sleep(1)
+        return review(request.json()["prompt"])
+
+    server = standin(answer)
+
+    async def main():
+        hedger = RequestHedger(budget=1, initial_delay=0.1)
+        async with MAQRAISDK(endpoint=server.url, hedging=hedger) as client:
+            started = time.monotonic()
+            result = await client.reviewer.post({"prompt": "a"})
+            return result, hedger, time.monotonic() - started
+
+    result, hedger, elapsed = asyncio.run(main())
+    assert result["review_result"]["prompt"] == "a"
+    assert elapsed < 0.8
+    assert hedger.hedge_wins == 1
+    assert len(server.requests) == 2
@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+from azure.core.exceptions import HttpResponseError
+
+from maq_rai_sdk import MAQRAISDK, RateLimiter, RetryBudget
+
+from conftest import Reply, review
+
+
+def slow(delay):
+    """Reviews each prompt after ``delay`` seconds; the prompt "bad" is rejected."""
+
+    def handler(request):
+        prompt = request.json()["prompt"]
+        time.sleep(delay)
+        if prompt == "bad":
+            return Reply(400, {"error": "bad prompt"})
+        return review(prompt)
+
+    return handler
+
+
+def test_map_runs_calls_concurrently_and_keeps_their_order(standin):
+    server = standin(slow(0.2))
+    with MAQRAISDK(endpoint=server.url) as client:
+        started = time.monotonic()
+        results = client.map("reviewer", ({"prompt": str(index)} for index in range(20)), max_concurrency=10)
+        elapsed = time.monotonic() - started
+        generated = client.map("testcase", [{"prompt": "t"}])
+    assert [result["review_result"]["prompt"] for result in results] == [str(index) for index in range(20)]
+    assert generated[0]["review_result"]["prompt"] == "t"
+    # Two rounds of ten calls, not twenty calls one after the other.
+    assert elapsed < 1.5
+    assert len(server.connections) <= 10
+
+
+def test_map_raises_the_first_error_unless_asked_to_return_it(standin):
+    server = standin(slow(0))
+    with MAQRAISDK(endpoint=server.url) as client:
+        with pytest.raises(HttpResponseError):
+            client.map("reviewer", [{"prompt": "a"}, {"prompt": "bad"}])
+        results = client.map("reviewer", [{"prompt": "a"}, {"prompt": "bad"}], return_exceptions=True)
+    assert results[0]["review_result"]["prompt"] == "a"
+    assert isinstance(results[1], HttpResponseError) and results[1].status_code == 400
+
+
+def test_map_shares_the_client_options(standin):
+    server = standin(slow(0))
+    budget, limiter = RetryBudget(), RateLimiter(100)
+    with MAQRAISDK(endpoint=server.url, resilient=budget, rate_limit=limiter, headers={"X-Tenant": "t1"}) as client:
+        client.map("reviewer", [{"prompt": str(index)} for index in range(5)], timeout=5)
+        with pytest.raises(ValueError):
+            client.map("translate", [])
+    assert limiter.acquired == 5
+    assert budget.calls == 5
+    assert all(request.headers["X-Tenant"] == "t1" for request in server.requests)
+
+
+def test_map_from_many_threads(standin):
+    server = standin(slow(0.05))
+    results = {}
+    with MAQRAISDK(endpoint=server.url) as client:
+
+        def work(thread):
+            results[thread] = client.map("reviewer", [{"prompt": "{}-{}".format(thread, index)} for index in range(10)])
+
+        threads = [threading.Thread(target=work, args=(thread,)) for thread in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    for thread in range(4):
+        assert [result["review_result"]["prompt"] for result in results[thread]] == [
+            "{}-{}".format(thread, index) for index in range(10)
+        ]
+    assert not any(thread.name == "maq-rai-loop" for thread in threading.enumerate())
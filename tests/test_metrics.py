@@ -0,0 +1,63 @@
+import pickle
+
+import pytest
+
+from maq_rai_sdk import LatencyHistogram
+
+
+def test_latencies_fall_into_their_buckets():
+    histogram = LatencyHistogram([0.1, 0.5, 1.0])
+    for latency in (0.05, 0.1, 0.2, 0.3, 2.0):
+        histogram.observe(latency)
+    assert histogram.counts == [2, 2, 0, 1]
+    assert (histogram.count, histogram.min, histogram.max) == (5, 0.05, 2.0)
+    assert histogram.mean == pytest.approx(0.53)
+    snapshot = histogram.snapshot()
+    assert snapshot["buckets"] == {"0.1": 2, "0.5": 2, "1.0": 0, "+Inf": 1}
+    assert (snapshot["count"], snapshot["sum"]) == (5, pytest.approx(2.65))
+
+
+def test_quantiles_are_bucket_bounds():
+    histogram = LatencyHistogram([0.1, 0.5, 1.0])
+    assert histogram.quantile(0.5) == 0.0
+    for _ in range(90):
+        histogram.observe(0.08)
+    for _ in range(9):
+        histogram.observe(0.4)
+    histogram.observe(3.0)
+    assert histogram.quantile(0.5) == 0.1
+    assert histogram.quantile(0.95) == 0.5
+    # The unbounded bucket reports the largest latency seen.
+    assert histogram.quantile(1.0) == 3.0
+    assert (histogram.snapshot()["p50"], histogram.snapshot()["p99"]) == (0.1, 0.5)
+
+
+def test_small_latencies_are_capped_at_the_maximum():
+    histogram = LatencyHistogram()
+    histogram.observe(0.003)
+    assert histogram.quantile(0.5) == 0.003
+    assert LatencyHistogram().snapshot()["min"] == 0.0
+
+
+def test_histograms_merge():
+    first, second = LatencyHistogram([0.1, 1.0]), LatencyHistogram([0.1, 1.0])
+    first.observe(0.02)
+    second.observe(0.5)
+    second.observe(3)
+    first.merge(second)
+    assert first.counts == [1, 1, 1]
+    assert (first.count, first.total, first.min, first.max) == (3, pytest.approx(3.52), 0.02, 3)
+    first.merge(LatencyHistogram([0.1, 1.0]))
+    assert (first.count, first.min, first.max) == (3, 0.02, 3)
+    with pytest.raises(ValueError):
+        first.merge(LatencyHistogram([1, 2]))
+
+
+def test_histograms_survive_pickling():
+    histogram = LatencyHistogram()
+    histogram.observe(0.2)
+    copy = pickle.loads(pickle.dumps(histogram))
+    assert copy.snapshot() == histogram.snapshot()
+    # The copy has a lock of its own and keeps recording.
+    copy.observe(0.4)
+    assert (copy.count, histogram.count) == (2, 1)
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from azure.core.exceptions import DecodeError
+
+from maq_rai_sdk._content import _loads_in_pieces
+from maq_rai_sdk.aio import LoopLagMonitor, MAQRAISDK
+
+from conftest import Reply, review
+
+TESTCASES = {
+    "testcases": [{"id": index, "prompt": "case " * 40, "tags": ["xpia", "jailbreak"]} for index in range(5000)]
+}
+
+
+class RecordingExecutor(ThreadPoolExecutor):
+    def __init__(self):
+        super().__init__(max_workers=1, thread_name_prefix="decode")
+        self.submitted = 0
+
+    def submit(self, *args, **kwargs):
+        self.submitted += 1
+        return super().submit(*args, **kwargs)
+
+
+def answer(request):
+    body = request.json()
+    if "prompt" in body:
+        return review(body["prompt"])
+    if body.get("broken"):
+        return Reply(200, b'{"testcases": [' + b"1, " * 100000 + b"]", {"Content-Type": "application/json"})
+    return TESTCASES
+
+
+def test_large_bodies_are_decoded_off_the_loop(standin):
+    url = standin(answer).url
+    executor = RecordingExecutor()
+
+    async def main():
+        async with MAQRAISDK(endpoint=url, decode_offload_threshold=64 * 1024, decode_executor=executor) as client:
+            small, large = await asyncio.gather(
+                client.reviewer.post({"prompt": "p"}), client.testcase.generator_post({"user_prompt": "p"})
+            )
+            with pytest.raises(DecodeError):
+                await client.testcase.generator_post({"broken": True})
+            return small, large
+
+    try:
+        small, large = asyncio.run(main())
+    finally:
+        executor.shutdown()
+    assert small["review_result"]["prompt"] == "p"
+    assert large == TESTCASES
+    assert executor.submitted == 2
+
+
+def test_loop_monitor_reports_stalls(standin):
+    stalls = []
+
+    async def main():
+        async with MAQRAISDK(endpoint=standin(answer).url) as client:
+            monitor = await client.monitor_loop(0.01, threshold=0.1, on_stall=stalls.append)
+            await asyncio.sleep(0.05)
+            time.sleep(0.2)  # a callback blocking the loop
+            await asyncio.sleep(0.05)
+            assert client.loop_monitor is monitor
+        assert not monitor.running
+        return monitor
+
+    monitor = asyncio.run(main())
+    assert monitor.stalls == 1
+    assert stalls and stalls[0] >= 0.15
+    assert monitor.lag.count > 5
+    with pytest.raises(ValueError):
+        LoopLagMonitor(interval=0)
+
+
+@pytest.mark.parametrize(
+    "document",
+    [
+        "{}",
+        "[]",
+        ' { "a" : [ 1, [ ], { }, "s\\u00e9" ], "b": {"c": [null, true, 1.5e3]} } ',
+        '{"a": 1, "a": 2}',
+        '"text"',
+        "42",
+        "﻿[1, 2]",
+    ],
+)
+def test_pieces_decode_like_json_loads(document):
+    assert _loads_in_pieces(document.encode("utf-8")) == json.loads(document.lstrip("﻿"))
+
+
+@pytest.mark.parametrize("document", ['{"a": 1', "[1, 2", '{"a" 1}', "[1 2]", "{1: 2}", "[1],", '{"a": 1,}', "[1,]"])
+def test_pieces_reject_invalid_json(document):
+    with pytest.raises(json.JSONDecodeError):
+        _loads_in_pieces(document.encode("utf-8"))
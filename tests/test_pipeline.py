@@ -0,0 +1,126 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from azure.core.exceptions import ClientAuthenticationError
+
+from maq_rai_sdk.aio import MAQRAISDK, ReviewPipeline
+
+from conftest import Reply, review
+
+
+class Service:
+    """Stand-in handler with per-operation latency that tracks the calls running at once."""
+
+    def __init__(self, review_latency=0.0, generate_latency=0.0):
+        self.latency = {"review": review_latency, "generate": generate_latency}
+        self.running = {"review": 0, "generate": 0}
+        self.peak = {"review": 0, "generate": 0}
+        self.events = []
+        self.lock = threading.Lock()
+
+    def __call__(self, request):
+        stage = "generate" if "testcase" in request.path.lower() else "review"
+        prompt = request.json()["prompt"]
+        with self.lock:
+            self.running[stage] += 1
+            self.peak[stage] = max(self.peak[stage], self.running[stage])
+            self.events.append(("start", stage, prompt))
+        try:
+            time.sleep(self.latency[stage])
+            if prompt == "denied":
+                return Reply(401, {"error": "bad key"})
+            if prompt.startswith("bad"):
+                return Reply(400, {"error": "bad prompt"})
+            if stage == "generate":
+                return {"testcases": ["case for " + prompt]}
+            if prompt.startswith("fine"):
+                return dict(review(prompt), updated_result={"updatedPrompt": prompt})
+            return review(prompt)
+        finally:
+            with self.lock:
+                self.running[stage] -= 1
+                self.events.append(("end", stage, prompt))
+
+
+async def collect(url, prompts, **kwargs):
+    async with MAQRAISDK(endpoint=url) as client:
+        pipeline = ReviewPipeline(client, **kwargs)
+        results = [result async for result in pipeline.run(prompts)]
+    return pipeline, sorted(results, key=lambda result: result.index)
+
+
+def test_every_prompt_is_reviewed_and_generated_for_both_versions(standin):
+    service = Service()
+    server = standin(service)
+    pipeline, results = asyncio.run(
+        collect(server.url, ["a", "fine", "bad"], testcase_options={"number_of_testcases": 3})
+    )
+
+    first, unchanged, failed = results
+    assert (first.prompt, first.updated_prompt) == ("a", "a!")
+    assert first.testcases == {"testcases": ["case for a"]}
+    assert first.updated_testcases == {"testcases": ["case for a!"]}
+    assert first.errors == {}
+    # The review kept the prompt, so its test cases were generated once.
+    assert unchanged.updated_testcases is unchanged.testcases
+    assert failed.review is None and failed.errors["review"].status_code == 400
+    assert failed.errors["testcases"].status_code == 400 and failed.updated_testcases is None
+    generations = [request.json() for request in server.requests if "testcase" in request.path.lower()]
+    assert sorted(body["prompt"] for body in generations) == ["a", "a!", "bad", "fine"]
+    assert all(body["number_of_testcases"] == 3 for body in generations)
+    assert pipeline.latency["review"].count == 2
+
+
+def test_generation_on_the_original_prompt_starts_before_its_review_ends(standin):
+    service = Service(review_latency=0.3)
+    asyncio.run(collect(standin(service).url, ["a"]))
+    assert service.events.index(("start", "generate", "a")) < service.events.index(("end", "review", "a"))
+
+
+def test_stages_overlap_and_respect_their_limits(standin):
+    service = Service(review_latency=0.1, generate_latency=0.1)
+    prompts = [str(index) for index in range(10)]
+    started = time.monotonic()
+    _, results = asyncio.run(
+        collect(standin(service).url, prompts, review_concurrency=2, generate_concurrency=4, queue_size=2)
+    )
+    elapsed = time.monotonic() - started
+
+    assert [result.index for result in results] == list(range(10))
+    assert all(result.updated_testcases == {"testcases": ["case for {}!".format(result.prompt)]} for result in results)
+    assert service.peak == {"review": 2, "generate": 4}
+    # 10 reviews 2 at a time and 20 generations 4 at a time take 0.5 s each; one after the other
+    # they would take 1 s.
+    assert elapsed < 0.9
+
+
+def test_slow_consumers_hold_the_stages_back(standin):
+    service = Service()
+    server = standin(service)
+
+    async def main():
+        async with MAQRAISDK(endpoint=server.url) as client:
+            pipeline = ReviewPipeline(client, review_concurrency=1, generate_concurrency=1, queue_size=1)
+            results = pipeline.run(str(index) for index in range(50))
+            first = await results.__anext__()
+            await asyncio.sleep(0.3)
+            seen = len(server.requests)
+            await results.aclose()
+            return first, seen
+
+    first, seen = asyncio.run(main())
+    assert first.index == 0
+    assert seen < 20
+
+
+def test_rejected_credentials_stop_the_run(standin):
+    url = standin(Service()).url
+
+    async def main():
+        async with MAQRAISDK(endpoint=url, resilient=True) as client:
+            return [result async for result in ReviewPipeline(client).run(["a", "denied", "b"])]
+
+    with pytest.raises(ClientAuthenticationError):
+        asyncio.run(main())
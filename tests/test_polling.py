@@ -0,0 +1,124 @@
+import asyncio
+import itertools
+
+import pytest
+from azure.core.exceptions import HttpResponseError
+
+from maq_rai_sdk import MAQRAISDK, AdaptiveLROBasePolling
+from maq_rai_sdk.aio import MAQRAISDK as AsyncMAQRAISDK
+from maq_rai_sdk.aio import AsyncAdaptiveLROBasePolling
+
+from conftest import Reply
+
+
+class JobService:
+    """Runs each submitted job for ``polls`` status checks, then reports its result.
+
+    Bodies with ``"sync": true`` or requests without ``Prefer: respond-async`` are answered
+    right away.
+    """
+
+    def __init__(self, polls=2, retry_after=None):
+        self.polls = polls
+        self.retry_after = retry_after
+        self.jobs = {}
+        self._ids = itertools.count()
+
+    def __call__(self, request):
+        if request.method == "POST":
+            body = request.json()
+            if body.get("sync") or request.headers.get("Prefer") != "respond-async":
+                return {"testcases": body["prompt"]}
+            job = str(next(self._ids))
+            self.jobs[job] = [body, 0]
+            location = "http://{}/api/jobs/{}".format(request.headers["Host"], job)
+            return Reply(202, {"status": "NotStarted"}, {"Operation-Location": location})
+        job = self.jobs[request.path.rsplit("/", 1)[1]]
+        job[1] += 1
+        if job[1] <= self.polls:
+            headers = {"Retry-After": self.retry_after} if self.retry_after else {}
+            return Reply(body={"status": "Running"}, headers=headers)
+        if job[0].get("fail"):
+            return {"status": "Failed", "error": {"code": "Boom", "message": "generation failed"}}
+        return {"status": "Succeeded", "result": {"testcases": job[0]["prompt"]}}
+
+
+class RecordingPolling(AdaptiveLROBasePolling):
+    """Records the waits between status checks instead of sleeping."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.delays = []
+
+    def _sleep(self, delay):
+        self.delays.append(delay)
+
+
+def test_accepted_job_is_polled_until_it_succeeds(standin):
+    server = standin(JobService(polls=3))
+    polling = RecordingPolling(4, min_interval=1, factor=2)
+    with MAQRAISDK(endpoint=server.url) as client:
+        poller = client.testcase.begin_generator_post({"prompt": "p"}, polling=polling)
+        assert poller.result() == {"testcases": "p"}
+    assert server.requests[0].headers["Prefer"] == "respond-async"
+    assert server.paths() == ["/api/Testcase_generator"] + ["/api/jobs/0"] * 4
+    # The first check is immediate; then the wait grows by ``factor`` up to ``timeout``, +/-10%.
+    assert len(polling.delays) == 3
+    for delay, expected in zip(polling.delays, [1, 2, 4]):
+        assert expected * 0.9 <= delay <= expected * 1.1
+
+
+def test_retry_after_takes_precedence_over_the_adaptive_delay(standin):
+    server = standin(JobService(polls=2, retry_after="3"))
+    polling = RecordingPolling(30, min_interval=0.01)
+    with MAQRAISDK(endpoint=server.url) as client:
+        assert client.testcase.begin_generator_post({"prompt": "p"}, polling=polling).result() == {"testcases": "p"}
+    assert polling.delays == [3, 3]
+
+
+def test_synchronous_answer_needs_no_polling(standin):
+    server = standin(JobService())
+    with MAQRAISDK(endpoint=server.url) as client:
+        poller = client.testcase.begin_generator_post({"prompt": "p", "sync": True})
+        assert poller.result() == {"testcases": "p"}
+        assert poller.status() == "Succeeded"
+    assert server.paths() == ["/api/Testcase_generator"]
+
+
+def test_poller_resumes_from_its_continuation_token(standin):
+    server = standin(JobService(polls=1))
+    with MAQRAISDK(endpoint=server.url) as client:
+        token = client.testcase.begin_generator_post({"prompt": "p"}, polling=RecordingPolling()).continuation_token()
+        resumed = client.testcase.begin_generator_post(None, continuation_token=token, polling=RecordingPolling())
+        assert resumed.result() == {"testcases": "p"}
+    assert server.paths().count("/api/Testcase_generator") == 1
+
+
+def test_failed_job_raises(standin):
+    server = standin(JobService(polls=0))
+    with MAQRAISDK(endpoint=server.url) as client:
+        poller = client.testcase.begin_generator_post({"prompt": "p", "fail": True}, polling=RecordingPolling())
+        with pytest.raises(HttpResponseError):
+            poller.result()
+
+
+def test_aio_jobs_are_polled_concurrently(standin):
+    service = JobService(polls=2)
+    server = standin(service)
+
+    async def main():
+        async with AsyncMAQRAISDK(endpoint=server.url) as client:
+            pollers = await asyncio.gather(
+                *(
+                    client.testcase.begin_generator_post(
+                        {"prompt": str(index)}, polling=AsyncAdaptiveLROBasePolling(0.1, min_interval=0.01)
+                    )
+                    for index in range(20)
+                )
+            )
+            return await asyncio.gather(*(poller.result() for poller in pollers))
+
+    results = asyncio.run(main())
+    assert [result["testcases"] for result in results] == [str(index) for index in range(20)]
+    assert len(service.jobs) == 20
+    assert len(server.requests) == 20 * 4
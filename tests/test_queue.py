@@ -0,0 +1,182 @@
+import asyncio
+import time
+
+import pytest
+from azure.core.exceptions import HttpResponseError
+
+from maq_rai_sdk import MAQRAISDK, DeadLetterError, QueueDrainer, RateLimiter, SubmissionQueue
+from maq_rai_sdk.aio import MAQRAISDK as AsyncMAQRAISDK
+
+from conftest import Reply, review
+
+
+def flaky(failures, status=503, headers=None):
+    """Answers ``status`` to the first ``failures`` requests, then reviews the prompt."""
+    count = [0]
+
+    def handler(request):
+        count[0] += 1
+        if count[0] <= failures:
+            return Reply(status, {"error": "busy"}, headers or {})
+        return review(request.json()["prompt"])
+
+    return handler
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = SubmissionQueue(str(tmp_path / "calls.db"), max_attempts=3)
+    yield queue
+    queue.close()
+
+
+def test_enqueued_calls_are_sent_by_the_client_drainer(standin, tmp_path):
+    server = standin(flaky(0))
+    path = str(tmp_path / "calls.db")
+    with MAQRAISDK(endpoint=server.url, submission_queue=path) as client:
+        tickets = [client.reviewer.enqueue({"prompt": str(index)}) for index in range(5)]
+        tickets.append(client.testcase.enqueue({"prompt": "t"}))
+        results = [client.submission_queue.result(ticket, timeout=10) for ticket in tickets]
+        assert client.submission_queue.counts()["done"] == 6
+    assert [result["review_result"]["prompt"] for result in results] == ["0", "1", "2", "3", "4", "t"]
+    assert sorted(request.path for request in server.requests) == ["/api/Reviewer"] * 5 + ["/api/Testcase_generator"]
+    assert not client.drainer.running
+
+
+def test_enqueue_needs_a_queue(standin):
+    with MAQRAISDK(endpoint=standin(flaky(0)).url) as client:
+        with pytest.raises(ValueError):
+            client.reviewer.enqueue({"prompt": "a"})
+
+
+def test_transient_errors_are_retried_with_backoff(standin, queue):
+    server = standin(flaky(2))
+    with MAQRAISDK(endpoint=server.url, submission_queue=queue, drain_workers=0, retry_total=0) as client:
+        ticket = client.reviewer.enqueue({"prompt": "a"})
+        with QueueDrainer(client, queue, workers=1, poll_interval=0.01, backoff=0.01) as drainer:
+            assert queue.result(ticket, timeout=10)["review_result"]["prompt"] == "a"
+    assert len(server.requests) == 3
+    assert (drainer.succeeded, drainer.retried, drainer.dead_lettered) == (1, 2, 0)
+
+
+def test_retry_after_sets_the_next_attempt(standin, queue):
+    server = standin(flaky(1, status=429, headers={"Retry-After": "30"}))
+    with MAQRAISDK(endpoint=server.url, submission_queue=queue, drain_workers=0, retry_total=0) as client:
+        ticket = client.reviewer.enqueue({"prompt": "a"})
+        with QueueDrainer(client, queue, workers=1, poll_interval=0.01) as drainer:
+            with pytest.raises(TimeoutError):
+                queue.result(ticket, timeout=0.5)
+    assert drainer.retried == 1
+    assert queue.status(ticket) == "queued"
+    assert queue.lease() == []
+
+
+def test_calls_are_dead_lettered_after_max_attempts(standin, queue):
+    server = standin(flaky(10))
+    with MAQRAISDK(endpoint=server.url, submission_queue=queue, drain_workers=0, retry_total=0) as client:
+        ticket = client.reviewer.enqueue({"prompt": "a"})
+        with QueueDrainer(client, queue, workers=1, poll_interval=0.01, backoff=0.01):
+            with pytest.raises(DeadLetterError) as raised:
+                queue.result(ticket, timeout=10)
+    assert raised.value.ticket == ticket
+    assert len(server.requests) == 3
+    [letter] = queue.dead_letters()
+    assert (letter.ticket, letter.operation, letter.body, letter.attempts) == (ticket, "reviewer", {"prompt": "a"}, 3)
+    assert "Service Unavailable" in letter.error
+
+
+@pytest.mark.parametrize("status", [400, 401])
+def test_errors_retrying_cannot_fix_are_dead_lettered_at_once(standin, queue, status):
+    server = standin(flaky(1, status=status))
+    with MAQRAISDK(endpoint=server.url, submission_queue=queue, drain_workers=0, retry_total=0) as client:
+        ticket = client.reviewer.enqueue({"prompt": "a"})
+        with QueueDrainer(client, queue, workers=1, poll_interval=0.01, backoff=0.01) as drainer:
+            with pytest.raises(DeadLetterError):
+                queue.result(ticket, timeout=10)
+        assert drainer.dead_lettered == 1
+        queue.requeue(ticket)
+        assert queue.dead_letters() == []
+        with QueueDrainer(client, queue, workers=1, poll_interval=0.01):
+            assert queue.result(ticket, timeout=10)["review_result"]["prompt"] == "a"
+
+
+def test_expired_leases_make_calls_visible_again(tmp_path):
+    queue = SubmissionQueue(str(tmp_path / "calls.db"), visibility_timeout=0.2)
+    other = SubmissionQueue(str(tmp_path / "calls.db"), visibility_timeout=0.2)
+    try:
+        ticket = queue.put("testcase", {"prompt": "a"})
+        [first] = queue.lease()
+        assert other.lease() == []
+        time.sleep(0.3)
+        [second] = other.lease(limit=10)
+        assert (second.ticket, second.attempts) == (ticket, 2)
+        assert not queue.complete(first, {"late": True})
+        assert other.complete(second, {"testcases": "a"})
+        assert queue.result(ticket, timeout=1) == {"testcases": "a"}
+        queue.forget(ticket)
+        assert queue.status(ticket) is None
+    finally:
+        queue.close()
+        other.close()
+
+
+def test_calls_whose_worker_died_on_the_last_attempt_are_dead_lettered(tmp_path):
+    queue = SubmissionQueue(str(tmp_path / "calls.db"), visibility_timeout=0.1, max_attempts=2)
+    try:
+        ticket = queue.put("reviewer", {"prompt": "a"})
+        for attempt in (1, 2):
+            [call] = queue.lease()
+            assert call.attempts == attempt
+            time.sleep(0.15)  # the worker dies holding the lease
+        assert queue.lease() == []
+        assert queue.status(ticket) == "dead"
+        [letter] = queue.dead_letters()
+        assert (letter.ticket, letter.attempts, letter.body) == (ticket, 2, {"prompt": "a"})
+        with pytest.raises(DeadLetterError):
+            queue.result(ticket, timeout=1)
+        assert not queue.complete(call, {"late": True})
+        queue.requeue(ticket)
+        assert queue.lease()[0].attempts == 1
+    finally:
+        queue.close()
+
+
+def test_unknown_operations_are_rejected(queue):
+    with pytest.raises(ValueError):
+        queue.put("translate", {"prompt": "a"})
+
+
+def test_rate_limiter_spaces_calls_after_the_burst():
+    limiter = RateLimiter(20, burst=2)
+    started = time.monotonic()
+    for _ in range(6):
+        limiter.acquire()
+    assert time.monotonic() - started >= 0.18
+    assert limiter.acquired == 6
+    assert not limiter.acquire(timeout=0)
+
+
+def test_rate_limiter_pauses_on_throttling(standin):
+    server = standin(flaky(1, status=429, headers={"Retry-After": "1"}))
+    limiter = RateLimiter(100)
+    with MAQRAISDK(endpoint=server.url, rate_limit=limiter, retry_total=0) as client:
+        assert client.rate_limiter is limiter
+        with pytest.raises(HttpResponseError):
+            client.reviewer.post({"prompt": "a"})
+        started = time.monotonic()
+        client.reviewer.post({"prompt": "b"})
+    assert time.monotonic() - started >= 0.9
+
+
+def test_aio_rate_limit(standin):
+    server = standin(flaky(0))
+    limiter = RateLimiter(50, burst=1)
+
+    async def main():
+        async with AsyncMAQRAISDK(endpoint=server.url, rate_limit=limiter) as client:
+            started = time.monotonic()
+            await asyncio.gather(*(client.reviewer.post({"prompt": str(index)}) for index in range(6)))
+            return time.monotonic() - started
+
+    assert asyncio.run(main()) >= 0.09
+    assert limiter.acquired == 6
@@ -0,0 +1,52 @@
+import asyncio
+
+from maq_rai_sdk import ClientRegistry
+from maq_rai_sdk.aio import ClientRegistry as AsyncClientRegistry
+
+from conftest import review
+
+
+def test_registry_shares_one_transport(standin):
+    server = standin(lambda request: review(request.json()["prompt"]))
+    with ClientRegistry(max_clients=2) as registry:
+        first = registry.get(server.url, "a")
+        assert registry.get(server.url, "a") is first
+        second = registry.get(server.url, "b")
+        assert first._client._pipeline._transport is second._client._pipeline._transport
+        assert first.reviewer.post({"prompt": "hi"})["updated_result"]["updatedPrompt"] == "hi!"
+        registry.get(server.url, "c")
+        assert len(registry) == 2
+    assert [request.path.rsplit("code=", 1)[1] for request in server.requests] == ["a"]
+
+
+def test_aio_eviction_closes_the_client(standin):
+    server = standin(lambda request: {})
+
+    async def main():
+        async with AsyncClientRegistry(max_clients=1) as registry:
+            first = registry.get(server.url, "a")
+            warmer = await first.keep_warm(interval=0.05)
+            assert warmer.running
+            second = registry.get(server.url, "b")
+            await asyncio.sleep(0.05)
+            assert not warmer.running
+            assert len(registry) == 1
+            # The shared session stays open for the clients still cached.
+            assert (await second.reviewer.post({"prompt": "hi"})) == {}
+
+    asyncio.run(main())
+
+
+def test_aio_evict_closes_the_client(standin):
+    server = standin(lambda request: {})
+
+    async def main():
+        async with AsyncClientRegistry() as registry:
+            client = registry.get(server.url, "a")
+            warmer = await client.keep_warm(interval=0.05)
+            await registry.evict(server.url, "a")
+            assert not warmer.running
+            assert len(registry) == 0
+            await registry.evict(server.url, "missing")
+
+    asyncio.run(main())
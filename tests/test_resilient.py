@@ -0,0 +1,109 @@
+import asyncio
+import time
+
+import pytest
+from azure.core.exceptions import AzureError, ClientAuthenticationError, HttpResponseError
+
+from maq_rai_sdk import MAQRAISDK, ResilientRetryPolicy, RetryBudget
+from maq_rai_sdk.aio import MAQRAISDK as AsyncMAQRAISDK
+
+from conftest import Reply
+
+FAST = {"retry_backoff_factor": 0.01}
+
+
+class Failing:
+    """Answers ``status`` (or drops the connection for None) to the first ``failures`` requests."""
+
+    def __init__(self, status, failures=1, headers=()):
+        self.status = status
+        self.failures = failures
+        self.headers = headers
+        self.times = []
+
+    def __call__(self, request):
+        self.times.append(time.monotonic())
+        if len(self.times) > self.failures:
+            return {"ok": True}
+        if self.status is None:
+            raise ConnectionResetError("dropped")
+        return Reply(self.status, {"error": "down"}, self.headers)
+
+
+def test_every_retry_is_paid_from_the_budget(standin):
+    server = standin(Failing(502, failures=100))
+    budget = RetryBudget(0.5, burst=2)
+    with MAQRAISDK(endpoint=server.url, resilient=budget, **FAST) as client:
+        with pytest.raises(HttpResponseError):
+            client.reviewer.post({"prompt": "a"})
+        assert (len(server.requests), budget.calls, budget.retries, budget.refused) == (3, 1, 2, 1)
+        # Half a token per call is not enough for a retry.
+        with pytest.raises(HttpResponseError):
+            client.reviewer.post({"prompt": "b"})
+        assert (len(server.requests), budget.retries, budget.refused, budget.tokens) == (4, 2, 2, 0.5)
+        # The next half token makes one.
+        with pytest.raises(HttpResponseError):
+            client.reviewer.post({"prompt": "c"})
+        assert (len(server.requests), budget.retries, budget.refused, budget.tokens) == (6, 3, 3, 0.0)
+
+
+@pytest.mark.parametrize("status", [502, None])
+def test_post_is_retried_after_502_and_dropped_connections(standin, status):
+    plain = standin(Failing(status))
+    with MAQRAISDK(endpoint=plain.url, **FAST) as client:
+        with pytest.raises(AzureError):
+            client.reviewer.post({"prompt": "a"})
+    assert len(plain.requests) == 1
+
+    resilient = standin(Failing(status))
+    with MAQRAISDK(endpoint=resilient.url, resilient=True, **FAST) as client:
+        assert client.reviewer.post({"prompt": "a"}) == {"ok": True}
+        assert client.retry_budget.retries == 1
+    assert len(resilient.requests) == 2
+
+
+def test_retry_after_replaces_the_jittered_backoff(standin, monkeypatch):
+    backoffs = []
+    monkeypatch.setattr(ResilientRetryPolicy, "get_backoff_time", lambda self, settings: backoffs.append(1) or 5.0)
+    service = Failing(503, headers={"Retry-After": "0.3"})
+    with MAQRAISDK(endpoint=standin(service).url, resilient=True) as client:
+        assert client.reviewer.post({"prompt": "a"}) == {"ok": True}
+    assert 0.25 < service.times[1] - service.times[0] < 2
+    assert not backoffs
+
+
+def test_backoff_is_drawn_up_to_the_exponential_delay():
+    policy = ResilientRetryPolicy(retry_backoff_factor=1, retry_backoff_max=3)
+    delays = [policy.get_backoff_time({"history": [None] * attempts}) for attempts in (1, 2, 3, 4) for _ in range(50)]
+    assert all(0 <= delay <= 3 for delay in delays)
+    assert max(delays[:50]) <= 1 < max(delays[50:100]) <= 2 < max(delays[100:])
+
+
+@pytest.mark.parametrize("status, error", [(401, ClientAuthenticationError), (500, HttpResponseError)])
+def test_error_statuses_raise(standin, status, error):
+    server = standin(Failing(status, failures=100))
+    with MAQRAISDK(endpoint=server.url, **FAST) as client:
+        assert client.reviewer.post({"prompt": "a"}) is None
+    with MAQRAISDK(endpoint=server.url, resilient=True, retry_total=1, **FAST) as client:
+        with pytest.raises(error) as raised:
+            client.reviewer.post({"prompt": "a"})
+        with pytest.raises(error):
+            client.testcase.generator_post({"prompt": "a"})
+    assert raised.value.response.status_code == status
+
+
+def test_async_client_shares_the_budget(standin):
+    server = standin(Failing(502, failures=2))
+    budget = RetryBudget(burst=1)
+
+    async def main():
+        async with AsyncMAQRAISDK(endpoint=server.url, resilient=budget, **FAST) as client:
+            with pytest.raises(HttpResponseError) as raised:
+                await client.reviewer.post({"prompt": "a"})
+            return raised.value.status_code
+
+    assert asyncio.run(main()) == 502
+    assert (len(server.requests), budget.retries, budget.refused) == (2, 1, 1)
+    with MAQRAISDK(endpoint=server.url, resilient=budget, **FAST) as client:
+        assert client.reviewer.post({"prompt": "a"}) == {"ok": True}
+    assert budget.calls == 2
@@ -0,0 +1,69 @@
+import asyncio
+import time
+
+import pytest
+from azure.core.exceptions import HttpResponseError
+
+from maq_rai_sdk import ConsistentHashRouter, DeadlineExceededError, MultiEndpointClient
+from maq_rai_sdk.aio import MultiEndpointClient as AsyncMultiEndpointClient
+
+from conftest import Reply, review
+
+
+def answer(request):
+    prompt = request.json()["prompt"]
+    if prompt == "bad":
+        return Reply(400, {"error": "bad prompt"})
+    if prompt == "slow":
+        time.sleep(0.5)
+    return review(prompt)
+
+
+def test_client_errors_do_not_eject_endpoints(standin):
+    servers = [standin(answer), standin(answer)]
+    with MultiEndpointClient([server.url for server in servers], eject_after=2) as client:
+        for _ in range(4):
+            with pytest.raises(HttpResponseError):
+                client.reviewer.post({"prompt": "bad"})
+        endpoints = client.metrics()["endpoints"]
+    assert all(endpoint["healthy"] for endpoint in endpoints)
+    assert sum(endpoint["failures"] for endpoint in endpoints) == 0
+    assert all(endpoint["outstanding"] == 0 for endpoint in endpoints)
+    assert all(endpoint["ewma"] is None for endpoint in endpoints)
+    assert len(servers[0].requests) + len(servers[1].requests) == 4
+
+
+def test_server_errors_fail_over_and_eject(standin):
+    down = standin(lambda request: Reply(503))
+    up = standin(answer)
+    router = ConsistentHashRouter()
+    with MultiEndpointClient([down.url, up.url], router=router, eject_after=1, retry_total=0) as client:
+        prompts = ["p{}".format(index) for index in range(20)]
+        for prompt in prompts:
+            assert client.reviewer.post({"prompt": prompt})["review_result"]["prompt"] == prompt
+        state = {endpoint["url"]: endpoint for endpoint in client.metrics()["endpoints"]}
+    assert state[down.url]["failures"] >= 1
+    assert not state[down.url]["healthy"]
+    assert state[up.url]["healthy"]
+
+
+def test_aio_deadline_and_client_errors_do_not_count(standin):
+    servers = [standin(answer), standin(answer)]
+
+    async def main():
+        async with AsyncMultiEndpointClient([server.url for server in servers], eject_after=1) as client:
+            with pytest.raises(HttpResponseError):
+                await client.reviewer.post({"prompt": "bad"})
+            with pytest.raises(DeadlineExceededError):
+                await client.reviewer.post({"prompt": "slow"}, timeout=0.1)
+            task = asyncio.ensure_future(client.reviewer.post({"prompt": "slow"}))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            endpoints = client.metrics()["endpoints"]
+            assert all(endpoint["healthy"] for endpoint in endpoints)
+            assert sum(endpoint["failures"] for endpoint in endpoints) == 0
+            assert all(endpoint["outstanding"] == 0 for endpoint in endpoints)
+            assert (await client.reviewer.post({"prompt": "ok"}))["review_result"]["prompt"] == "ok"
+
+    asyncio.run(main())
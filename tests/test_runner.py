@@ -0,0 +1,166 @@
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+from azure.core.exceptions import ClientAuthenticationError
+
+from maq_rai_sdk._cli import main
+from maq_rai_sdk.aio import MAQRAISDK, BatchRunner
+
+from conftest import Reply, review
+
+PACKAGE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "MAQ_RAI_SDK")
+
+
+class Service:
+    """Reviews prompts, rejecting the credentials for the prompts in ``denied``."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.denied = set()
+
+    def __call__(self, request):
+        time.sleep(self.latency)
+        prompt = request.json()["prompt"]
+        if prompt in self.denied:
+            return Reply(401, {"error": "bad key"})
+        return review(prompt)
+
+
+def write_input(path, count):
+    path.write_text("".join(json.dumps({"prompt": "p{}".format(number)}) + "\n" for number in range(1, count + 1)))
+    return str(path)
+
+
+def records(path):
+    return [json.loads(line) for line in open(path, "rb")]
+
+
+def batch(url, source, output, restart=False, **kwargs):
+    async def main():
+        async with MAQRAISDK(endpoint=url, resilient=True) as client:
+            runner = BatchRunner(client, max_concurrency=kwargs.pop("max_concurrency", 1), **kwargs)
+            return await runner.run(source, output, restart=restart)
+
+    return asyncio.run(main())
+
+
+def sent(server):
+    return [request.json()["prompt"] for request in server.requests]
+
+
+def test_killed_run_resumes_with_every_line_once(standin, tmp_path):
+    server = standin(Service(latency=0.05))
+    source, output = write_input(tmp_path / "in.jsonl", 30), str(tmp_path / "out.jsonl")
+    command = [sys.executable, "-m", "maq_rai_sdk._cli", "batch", source, "-o", output, "--endpoint", server.url]
+    env = dict(os.environ, PYTHONPATH=PACKAGE)
+    worker = subprocess.Popen(command + ["-c", "2"], env=env)  # pylint: disable=consider-using-with
+    try:
+        while not os.path.exists(output) or len(open(output, "rb").readlines()) < 5:
+            assert worker.poll() is None
+            time.sleep(0.01)
+    finally:
+        worker.send_signal(signal.SIGKILL)
+        worker.wait()
+    done = len(server.requests)
+
+    assert main(["batch", source, "-o", output, "--endpoint", server.url]) == 0
+    assert [record["line"] for record in records(output)] == list(range(1, 31))
+    for record in records(output):
+        assert record["result"]["review_result"]["prompt"] == "p{}".format(record["line"])
+    # Only the calls running when the worker was killed are sent twice.
+    assert len(server.requests) - 30 <= done - 5
+
+
+def test_rejected_credentials_halt_the_run_and_keep_its_progress(standin, tmp_path):
+    service = Service()
+    service.denied.add("p4")
+    server = standin(service)
+    source, output = write_input(tmp_path / "in.jsonl", 6), str(tmp_path / "out.jsonl")
+
+    with pytest.raises(ClientAuthenticationError):
+        batch(server.url, source, output)
+    assert [record["line"] for record in records(output)] == [1, 2, 3]
+    assert sent(server) == ["p1", "p2", "p3", "p4"]
+
+    service.denied.clear()
+    stats = batch(server.url, source, output)
+    assert stats == {"lines": 6, "resumed": 3, "succeeded": 3, "failed": 0, "complete": True}
+    assert [record["line"] for record in records(output)] == [1, 2, 3, 4, 5, 6]
+    assert sent(server)[4:] == ["p4", "p5", "p6"]
+
+
+def test_a_torn_journal_record_is_dropped(standin, tmp_path):
+    service = Service()
+    service.denied.add("p3")
+    server = standin(service)
+    source, output = write_input(tmp_path / "in.jsonl", 8), str(tmp_path / "out.jsonl")
+    with pytest.raises(ClientAuthenticationError):
+        batch(server.url, source, output)
+    # A kill in the middle of a journal write leaves half a record, and results past the checkpoint.
+    with open(output + ".journal", "ab") as journal:
+        journal.write(b'{"lines": 9, "off')
+    with open(output, "ab") as out:
+        out.write(b'{"line": 3, "res')
+
+    service.denied = {"p6"}
+    with pytest.raises(ClientAuthenticationError):
+        batch(server.url, source, output)
+    assert all(json.loads(line) for line in open(output + ".journal", "rb"))
+    service.denied.clear()
+    stats = batch(server.url, source, output)
+    # The second run's checkpoints were read back, so it resumed after line 5, not line 2.
+    assert stats["resumed"] == 5
+    assert [record["line"] for record in records(output)] == list(range(1, 9))
+
+
+def test_resuming_with_other_input_is_refused(standin, tmp_path):
+    service = Service()
+    service.denied.add("p3")
+    server = standin(service)
+    source, output = write_input(tmp_path / "in.jsonl", 4), str(tmp_path / "out.jsonl")
+    with pytest.raises(ClientAuthenticationError):
+        batch(server.url, source, output)
+    with open(source, "r+b") as changed:
+        changed.write(b'{"prompt": "x1"}')
+
+    with pytest.raises(ValueError, match="does not match"):
+        batch(server.url, source, output)
+    assert main(["batch", source, "-o", output, "--endpoint", server.url]) == 2
+    service.denied.clear()
+    stats = batch(server.url, source, output, restart=True)
+    assert (stats["resumed"], stats["succeeded"]) == (0, 4)
+
+
+def test_blank_and_invalid_lines(standin, tmp_path):
+    server = standin(Service())
+    source = tmp_path / "in.jsonl"
+    source.write_bytes(b'{"prompt": "p1"}\n\nnot json\n{"prompt": "p4"}\n')
+    output = str(tmp_path / "out.jsonl")
+
+    stats = batch(server.url, str(source), output)
+    first, invalid, last = records(output)
+    assert (first["line"], invalid["line"], last["line"]) == (1, 3, 4)
+    assert invalid["error"]["type"] == "JSONDecodeError"
+    assert (stats["lines"], stats["succeeded"], stats["failed"]) == (4, 2, 1)
+    assert sent(server) == ["p1", "p4"]
+    assert main(["batch", str(source), "-o", output, "--endpoint", server.url, "--restart"]) == 1
+
+
+def test_the_deadline_stops_the_run(standin, tmp_path):
+    server = standin(Service(latency=0.1))
+    source, output = write_input(tmp_path / "in.jsonl", 20), str(tmp_path / "out.jsonl")
+
+    stats = batch(server.url, source, output, deadline=time.time() + 0.35)
+    assert not stats["complete"]
+    assert 0 < stats["succeeded"] < 20
+    assert len(records(output)) == stats["succeeded"]
+
+    stats = batch(server.url, source, output)
+    assert stats["complete"]
+    assert [record["line"] for record in records(output)] == list(range(1, 21))
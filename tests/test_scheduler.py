@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from maq_rai_sdk.aio import MAQRAISDK, PriorityScheduler
+
+from conftest import review
+
+
+async def hold(scheduler, priority, order, release):
+    async with scheduler.slot(priority):
+        order.append(priority)
+        await release.wait()
+
+
+def test_classes_are_served_in_proportion_to_their_weights():
+    async def main():
+        scheduler = PriorityScheduler(1, weights={"interactive": 3, "batch": 1})
+        order = []
+
+        async def record(priority):
+            order.append(priority)
+
+        gate = asyncio.Event()
+        first = asyncio.ensure_future(hold(scheduler, "batch", [], gate))
+        await asyncio.sleep(0)
+        # Queued while the only slot is taken: 8 batch calls, then 6 interactive ones.
+        calls = [asyncio.ensure_future(scheduler.run(lambda: record("batch"), "batch")) for _ in range(8)]
+        calls += [asyncio.ensure_future(scheduler.run(lambda: record("interactive"), "interactive")) for _ in range(6)]
+        await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(first, *calls)
+        return order
+
+    order = asyncio.run(main())
+    # Three interactive calls for every batch call while both are queued, then the rest of the batch.
+    assert order[:8].count("interactive") == 6
+    assert order[8:] == ["batch"] * 6
+
+
+def test_reserved_slots_are_kept_for_their_class():
+    async def main():
+        scheduler = PriorityScheduler(3, reserved={"interactive": 2})
+        order = []
+        gate = asyncio.Event()
+        batch = [asyncio.ensure_future(hold(scheduler, "batch", order, gate)) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        assert order == ["batch"]
+        assert scheduler.metrics()["batch"]["queued"] == 2
+        interactive = [asyncio.ensure_future(hold(scheduler, "interactive", order, gate)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        assert order == ["batch", "interactive", "interactive"]
+        gate.set()
+        await asyncio.gather(*batch, *interactive)
+        return scheduler.metrics()
+
+    metrics = asyncio.run(main())
+    assert metrics["batch"]["dispatched"] == 3
+    assert metrics["batch"]["running"] == metrics["interactive"]["running"] == 0
+
+
+def test_cancelled_waiters_give_their_place_up():
+    async def main():
+        scheduler = PriorityScheduler(1)
+        order = []
+        gate = asyncio.Event()
+        running = asyncio.ensure_future(hold(scheduler, "batch", order, gate))
+        await asyncio.sleep(0)
+        queued = asyncio.ensure_future(hold(scheduler, "batch", order, gate))
+        last = asyncio.ensure_future(hold(scheduler, "interactive", order, gate))
+        await asyncio.sleep(0)
+        queued.cancel()
+        await asyncio.gather(queued, return_exceptions=True)
+        gate.set()
+        await asyncio.gather(running, last)
+        # Every slot came back: the limit still lets one call through at a time, and only one.
+        await scheduler.acquire()
+        assert scheduler.metrics()["batch"]["running"] == 1
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(scheduler.acquire("interactive"), 0.05)
+        scheduler.release()
+        return order, scheduler.metrics()
+
+    order, metrics = asyncio.run(main())
+    assert order == ["batch", "interactive"]
+    assert metrics["batch"]["queued"] == metrics["interactive"]["queued"] == 0
+    assert metrics["batch"]["running"] == metrics["interactive"]["running"] == 0
+
+
+def test_queue_time_is_recorded_per_class(standin):
+    server = standin(lambda request: review(request.json()["prompt"]))
+
+    async def main():
+        scheduler = PriorityScheduler(1)
+        async with MAQRAISDK(endpoint=server.url, scheduler=scheduler) as client:
+            await asyncio.gather(
+                *(client.reviewer.post({"prompt": str(index)}) for index in range(4)),
+                client.reviewer.post({"prompt": "now"}, priority="interactive"),
+            )
+            with pytest.raises(ValueError):
+                await client.reviewer.post({"prompt": "x"}, priority="urgent")
+        return scheduler.metrics()
+
+    metrics = asyncio.run(main())
+    batch, interactive = metrics["batch"], metrics["interactive"]
+    assert (batch["dispatched"], interactive["dispatched"]) == (4, 1)
+    assert (batch["queue_time"]["count"], interactive["queue_time"]["count"]) == (4, 1)
+    # The first call did not wait; the others queued behind at least one call.
+    assert batch["queue_time"]["min"] < 0.01 < batch["queue_time"]["max"]
+    assert set(batch) == {"weight", "reserved", "running", "queued", "dispatched", "queue_time"}
+    assert len(server.requests) == 5
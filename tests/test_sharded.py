@@ -0,0 +1,106 @@
+import json
+import multiprocessing
+import pickle
+import time
+
+import pytest
+from azure.core.exceptions import ClientAuthenticationError
+
+import maq_rai_sdk._ratelimit
+from maq_rai_sdk import FileRateLimiter, ShardedBatchRunner
+
+from conftest import Reply, review
+
+
+def answer(request):
+    prompt = request.json()["prompt"]
+    if prompt == "bad":
+        return Reply(400, {"error": "bad prompt"})
+    if prompt == "denied":
+        return Reply(401, {"error": "bad key"})
+    return review(prompt)
+
+
+def write_input(path, prompts):
+    with open(path, "w") as src:
+        for prompt in prompts:
+            src.write(json.dumps({"prompt": prompt}) + "\n" if prompt is not None else "\n")
+
+
+def read_output(path):
+    with open(path) as out:
+        return [json.loads(line) for line in out]
+
+
+def test_results_are_merged_in_input_order(standin, tmp_path):
+    server = standin(answer)
+    prompts = [str(index) for index in range(200)]
+    prompts[10] = "bad"
+    prompts[20] = None
+    write_input(tmp_path / "in.jsonl", prompts)
+    runner = ShardedBatchRunner(server.url, processes=2, max_concurrency=4, chunk_size=16)
+    stats = runner.run(str(tmp_path / "in.jsonl"), str(tmp_path / "out.jsonl"))
+
+    records = read_output(tmp_path / "out.jsonl")
+    assert [record["line"] for record in records] == [number for number in range(1, 201) if number != 21]
+    assert records[10]["error"]["status"] == 400
+    assert records[0]["result"]["review_result"]["prompt"] == "0"
+    assert records[-1]["result"]["review_result"]["prompt"] == "199"
+    assert (stats["lines"], stats["succeeded"], stats["failed"]) == (200, 198, 1)
+    assert stats["latency"]["count"] == 198
+    assert len(stats["workers"]) == 2
+    assert sum(worker["chunks"] for worker in stats["workers"]) == 13
+    assert sum(worker["succeeded"] for worker in stats["workers"]) == 198
+
+
+def test_rate_limit_is_shared_by_the_processes(standin, tmp_path):
+    server = standin(answer)
+    write_input(tmp_path / "in.jsonl", [str(index) for index in range(30)])
+    runner = ShardedBatchRunner(server.url, processes=2, chunk_size=5, rate_limit=20)
+    started = time.monotonic()
+    stats = runner.run(str(tmp_path / "in.jsonl"), str(tmp_path / "out.jsonl"))
+    # 20 calls in the initial burst, then 10 more at 20 per second.
+    assert time.monotonic() - started >= 0.45
+    assert stats["succeeded"] == 30
+    assert stats["rate_limit_wait"] > 0
+
+
+def test_rejected_credentials_stop_the_run(standin, tmp_path):
+    server = standin(answer)
+    write_input(tmp_path / "in.jsonl", ["a", "denied"] + [str(index) for index in range(100)])
+    runner = ShardedBatchRunner(server.url, processes=2, chunk_size=2, client_options={"resilient": True})
+    with pytest.raises(ClientAuthenticationError):
+        runner.run(str(tmp_path / "in.jsonl"), str(tmp_path / "out.jsonl"))
+
+
+def hammer(limiter, count):
+    for _ in range(count):
+        limiter.acquire()
+
+
+def test_file_rate_limiter_is_shared_across_processes(tmp_path):
+    limiter = FileRateLimiter(str(tmp_path / "rate"), 50, burst=5)
+    assert pickle.loads(pickle.dumps(limiter)).burst == 5
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=hammer, args=(limiter, 10)) for _ in range(2)]
+    started = time.monotonic()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    # 5 in the burst, the other 15 spaced 20 ms apart.
+    assert time.monotonic() - started >= 0.3
+    assert [worker.exitcode for worker in workers] == [0, 0]
+
+
+
+def test_rate_limits_need_fcntl(monkeypatch, tmp_path):
+    monkeypatch.setattr(maq_rai_sdk._ratelimit, "fcntl", None)
+    with pytest.raises(RuntimeError):
+        FileRateLimiter(str(tmp_path / "rate"), 10)
+    source, output = tmp_path / "in.jsonl", tmp_path / "out.jsonl"
+    write_input(source, ["a"])
+    runner = ShardedBatchRunner("http://127.0.0.1:9/api", processes=1, rate_limit=10)
+    with pytest.raises(RuntimeError, match="SqliteRateLimiter"):
+        runner.run(str(source), str(output))
+    assert not output.exists()
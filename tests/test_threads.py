@@ -0,0 +1,87 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from azure.core.pipeline.transport import RequestsTransport
+
+from maq_rai_sdk import DnsCache, MAQRAISDK
+from maq_rai_sdk.operations._operations import build_reviewer_post_request
+
+from conftest import review
+
+
+def slow_review(request):
+    time.sleep(0.01)
+    return review(request.json()["prompt"])
+
+
+def hammer(client, threads, calls):
+    def work(thread):
+        return [client.reviewer.post({"prompt": "{}-{}".format(thread, call)}) for call in range(calls)]
+
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        return list(executor.map(work, range(threads)))
+
+
+def test_many_threads_share_one_client(standin):
+    server = standin(slow_review)
+    with MAQRAISDK(endpoint=server.url, max_threads=8) as client:
+        results = hammer(client, 64, 5)
+        assert client.pool_wait.count == 64 * 5
+        # 64 threads queue for 8 connections.
+        assert client.pool_wait.max > 0.005
+
+    for thread, answers in enumerate(results):
+        prompts = [answer["review_result"]["prompt"] for answer in answers]
+        assert prompts == ["{}-{}".format(thread, call) for call in range(5)]
+    assert len(server.requests) == 64 * 5
+    assert len(server.connections) <= 8
+    assert all(request.headers["Content-Type"] == "application/json" for request in server.requests)
+
+
+def test_pool_is_sized_for_the_drain_workers_too(standin, tmp_path):
+    with MAQRAISDK(
+        endpoint=standin(slow_review).url, max_threads=4, submission_queue=str(tmp_path / "q.db"), drain_workers=3
+    ) as client:
+        transport = client._client._pipeline._transport
+        transport.open()
+        assert transport.session.get_adapter(client._client.format_url("/"))._pool_maxsize == 7
+
+
+def test_pool_wait_with_dns_cache(standin):
+    dns = DnsCache()
+    server = standin(slow_review)
+    with MAQRAISDK(endpoint=server.url.replace("127.0.0.1", "localhost"), max_threads=2, dns_cache=dns) as client:
+        hammer(client, 4, 3)
+        assert client.pool_wait.count == 12
+    assert len(server.connections) <= 2
+    assert len(dns) == 1  # connections were resolved through the cache
+
+
+def test_max_threads_options():
+    assert MAQRAISDK(endpoint="http://127.0.0.1:1/api").pool_wait is None
+    with pytest.raises(ValueError):
+        MAQRAISDK(endpoint="http://127.0.0.1:1/api", max_threads=0)
+    with pytest.raises(ValueError):
+        MAQRAISDK(endpoint="http://127.0.0.1:1/api", max_threads=4, transport=RequestsTransport())
+
+
+def test_request_builders_share_the_module_serializer_safely():
+    errors = []
+    barrier = threading.Barrier(16)
+
+    def build(index):
+        barrier.wait()
+        for _ in range(200):
+            accept = "application/{}".format(index)
+            request = build_reviewer_post_request(content_type="application/json", headers={"Accept": accept})
+            if request.headers["Accept"] != accept:
+                errors.append(request.headers["Accept"])
+
+    threads = [threading.Thread(target=build, args=(index,)) for index in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
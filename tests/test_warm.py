@@ -0,0 +1,67 @@
+import asyncio
+import time
+
+from maq_rai_sdk.aio import MAQRAISDK
+
+from conftest import review
+
+
+def probes(server):
+    return [request for request in server.requests if request.method == "GET"]
+
+
+def test_keep_warm_probes_fill_the_cold_and_warm_histograms(standin):
+    def answer(request):
+        if request.method == "GET" and len(probes(server)) == 1:
+            time.sleep(0.2)  # the first probe hits a cold instance
+        return review("probe")
+
+    server = standin(answer)
+
+    async def main():
+        async with MAQRAISDK(endpoint=server.url) as client:
+            warmer = await client.keep_warm(interval=0.05, cold_threshold=0.1, jitter=0)
+            await asyncio.sleep(0.4)
+            assert warmer.running
+            again = await client.keep_warm(interval=10)
+            assert not warmer.running and again.running
+            await asyncio.sleep(0.05)  # its first probe
+        assert not again.running
+        return again
+
+    warmer = asyncio.run(main())
+    assert warmer.cold.count == 1
+    assert warmer.cold.min >= 0.2
+    assert warmer.warm.count >= 2
+    assert warmer.failures == 0
+    assert len(probes(server)) == warmer.cold.count + warmer.warm.count
+    assert all(request.headers["Cache-Control"] == "no-store" for request in probes(server))
+    assert {request.path for request in probes(server)} == {"/api/"}
+
+
+def test_failed_probes_are_counted(standin):
+    server = standin(review)
+    url = server.url
+    server.close()
+
+    async def main():
+        async with MAQRAISDK(endpoint=url, retry_total=0) as client:
+            return await client.prewarm(2), client.warmer
+
+    latencies, warmer = asyncio.run(main())
+    assert latencies == [None, None]
+    assert (warmer.failures, warmer.warm.count, warmer.cold.count) == (2, 0, 0)
+
+
+def test_prewarm_opens_one_connection_per_probe(standin):
+    server = standin(lambda request: review("probe"))
+
+    async def main():
+        async with MAQRAISDK(endpoint=server.url) as client:
+            return await client.prewarm(6)
+
+    latencies = asyncio.run(main())
+    assert len(latencies) == 6 and all(latency is not None for latency in latencies)
+    assert len(probes(server)) == 6
+    assert len(server.connections) == 6
+    assert all(request.headers["Connection"] == "close" for request in probes(server))